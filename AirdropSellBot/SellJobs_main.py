@@ -0,0 +1,36 @@
+# Продажа по списку заданий: все аккаунты и токены в одном процессе
+# Запуск: python SellJobs_main.py [jobs.json]
+#
+# Формат файла — массив заданий:
+# [
+#   {"exchange": "binance", "env": "BINANCE_SUB1", "asset": "ARB", "sell_percentage": 1},
+#   {"exchange": "okx", "account": "main", "asset": "ARB", "sell_percentage": 0.5,
+#    "listing_time": "2024-03-23 13:00:00"}
+# ]
+# env — префикс ключей аккаунта в .env (BINANCE_SUB1_API_KEY, BINANCE_SUB1_API_SECRET),
+# без env и api_key/api_secret используются ключи биржи по умолчанию.
+import asyncio
+import sys
+
+import bootstrap
+from case.SellJobs import load_jobs, run_jobs
+from config import JOBS_FILE
+
+
+def main():
+    bootstrap.setup()
+    path = sys.argv[1] if len(sys.argv) > 1 else JOBS_FILE
+    jobs = load_jobs(path)
+    print(f"Загружено заданий: {len(jobs)}")
+    for job in jobs:
+        print(f"  {job}")
+    asyncio.run(run_jobs(jobs))
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except KeyboardInterrupt:
+        print("\nПрограмма остановлена пользователем.")
+    except Exception as e:
+        print(f"Произошла ошибка: {e}")
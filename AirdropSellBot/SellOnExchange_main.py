@@ -1,45 +1,115 @@
 # Консольное приложение
+# Без аргументов — интерактивный выбор биржи и параметров. Для запуска под супервизором:
+#   python SellOnExchange_main.py --exchange okx --asset ARB --percent 1
+#   python SellOnExchange_main.py --config sell.json
+# Файл конфигурации — JSON с теми же полями: exchange (строка или список), asset, percent, listing_time, async.
+# Флаги командной строки важнее файла.
+import argparse
+import asyncio
+import json
+import signal
+
+import bootstrap
+from case import AsyncLimitSell
 from case.LimitSell import limit_sell
-from exchange.BinanceExchange import BinanceExchange
-from exchange.BybitExchange import BybitExchange
-from exchange.GateIOExchange import GateIOExchange
-from exchange.MEXCExchange import MEXCExchange
-from exchange.OKXExchange import OKXExchange
+from case.ListingSchedule import ListingSchedule
+from case.MultiExchangeSell import multi_limit_sell
+from config import METRICS_FILE, METRICS_FORMAT, USE_ASYNC_EXCHANGE
+from exchange.Registry import create_exchange, exchange_names, exchange_title
+from metrics.ExchangeMetrics import exchange_metrics
 
+CONFIG_FIELDS = {"exchange": "exchange", "asset": "asset", "percent": "percent", "listing_time": "listing_time",
+                 "async": "use_async"}
 
-def main():
+
+def dump_metrics(signum, frame):
+    """Выгрузка метрик по запросу: kill -USR1 <pid>."""
+    exchange_metrics.dump(METRICS_FILE, METRICS_FORMAT)
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Лимитная продажа токенов при поступлении на биржу")
+    parser.add_argument("--config", help="JSON-файл с параметрами запуска")
+    parser.add_argument("--exchange", nargs="+", choices=exchange_names(),
+                        help="Биржа; несколько — продажа на всех одновременно")
+    parser.add_argument("--asset", help="Символ монеты, например BTC")
+    parser.add_argument("--percent", type=float, help="Доля продаваемого актива, от 0.01 до 1")
+    parser.add_argument("--listing-time", help="Время листинга UTC (ГГГГ-ММ-ДД ЧЧ:ММ:СС) или unix-время")
+    parser.add_argument("--async", dest="use_async", action="store_true", default=None,
+                        help="AsyncExchange-адаптеры на aiohttp (по умолчанию USE_ASYNC_EXCHANGE)")
+    args = parser.parse_args(argv)
+
+    if args.config:
+        with open(args.config, "r", encoding="utf-8") as f:
+            settings = json.load(f)
+        unknown = set(settings) - set(CONFIG_FIELDS)
+        if unknown:
+            parser.error(f"Неизвестные поля в {args.config}: {', '.join(sorted(unknown))}")
+        for field, name in CONFIG_FIELDS.items():
+            if field in settings and getattr(args, name) is None:
+                setattr(args, name, settings[field])
+        if isinstance(args.exchange, str):
+            args.exchange = [args.exchange]
+    for name in args.exchange or []:
+        if name not in exchange_names():
+            parser.error(f"Неизвестная биржа: {name}")
+    return args
+
+
+def ask_exchanges() -> list:
+    names = exchange_names()
     print("Выберите биржу:")
-    print("1 - OKX")
-    print("2 - Bybit")
-    print("3 - Binance")
-    print("4 - Gate.io")
-    print("5 - MEXC")
+    for number, name in enumerate(names, 1):
+        print(f"{number} - {exchange_title(name)}")
 
     while True:
         try:
-            choice = int(input("Введите номер биржи (1-5): "))
-            if choice in [1, 2, 3, 4, 5]:
-                break
-            print("Пожалуйста, введите число от 1 до 5.")
+            # Несколько номеров через запятую — продажа на всех этих биржах одновременно
+            answer = input(f"Введите номер биржи (1-{len(names)}) или несколько через запятую: ")
+            choices = [int(choice) for choice in answer.split(",")]
+            if choices and all(1 <= choice <= len(names) for choice in choices):
+                return [names[choice - 1] for choice in dict.fromkeys(choices)]
+            print(f"Пожалуйста, введите числа от 1 до {len(names)}.")
         except ValueError:
-            print("Некорректный ввод, введите число от 1 до 5.")
+            print(f"Некорректный ввод, введите числа от 1 до {len(names)}.")
+
+
+def main():
+    args = parse_args()
+    bootstrap.setup()
+    if hasattr(signal, "SIGUSR1"):
+        signal.signal(signal.SIGUSR1, dump_metrics)
 
-    asset = input("Введите символ монеты (например, BTC): ").upper()
-    sell_percentage = float(input("Введите процент продаваемого актива (от 0.01 до 1): "))
+    # Недостающие параметры спрашиваются; время листинга — только в интерактивном режиме
+    interactive = not (args.exchange and args.asset and args.percent is not None)
+    exchanges = args.exchange or ask_exchanges()
+    asset = (args.asset or input("Введите символ монеты (например, BTC): ")).upper()
+    sell_percentage = args.percent if args.percent is not None else \
+        float(input("Введите процент продаваемого актива (от 0.01 до 1): "))
+    listing_time = args.listing_time
+    if listing_time is None and interactive:
+        listing_time = input("Время листинга UTC (ГГГГ-ММ-ДД ЧЧ:ММ:СС), Enter — продавать сразу: ")
+    listing_time = str(listing_time or "").strip()  # В файле конфигурации может быть unix-время числом
+    listing = ListingSchedule(ListingSchedule.parse(listing_time)) if listing_time else None
+    use_async = USE_ASYNC_EXCHANGE if args.use_async is None else args.use_async
 
-    exchange = None
-    if choice == 1:
-        exchange = OKXExchange()
-    elif choice == 2:  # Bybit
-        exchange = BybitExchange()
-    elif choice == 3:  # Binance
-        exchange = BinanceExchange()
-    elif choice == 4:
-        exchange = GateIOExchange()
-    elif choice == 5:  # MEXC
-        exchange = MEXCExchange()
+    if len(exchanges) > 1:
+        if listing is not None:
+            print("Время листинга при продаже на нескольких биржах не используется, продаём по поступлении")
+        multi_limit_sell([create_exchange(name) for name in exchanges], sell_percentage, asset)
+        return
 
-    limit_sell(exchange, sell_percentage, asset)
+    if use_async:
+        asyncio.run(async_limit_sell(create_exchange(exchanges[0], True), sell_percentage, asset, listing))
+    else:
+        limit_sell(create_exchange(exchanges[0]), sell_percentage, asset, listing)
+
+
+async def async_limit_sell(exchange, sell_percentage: float, asset: str, listing: ListingSchedule = None):
+    try:
+        await AsyncLimitSell.limit_sell(exchange, sell_percentage, asset, listing)
+    finally:
+        await exchange.close()
 
 
 if __name__ == "__main__":
@@ -48,4 +118,4 @@ if __name__ == "__main__":
     except KeyboardInterrupt:
         print("\nПрограмма остановлена пользователем.")
     except Exception as e:
-        print(f"Произошла ошибка: {e}")
\ No newline at end of file
+        print(f"Произошла ошибка: {e}")
@@ -1,18 +1,25 @@
-import time
 import os
 from web3 import Web3
 from dotenv import load_dotenv
 from loguru import logger
 
+from chain.DepositWatcher import DepositWatcher
+from chain.TxPipeline import TxPipeline
+from config import CHAIN_RPC_URL, CHAIN_ID, CHAIN_WS_URL, TRANSFER_GAS_LIMIT, MIN_DEPOSIT_BALANCE
+
 # Настройка логирования
 logger.add("metamask_to_exchange.log", rotation="1 MB", level="INFO")
 
 # Загрузка переменных из .env
 load_dotenv()
 
-# Подключение к сети BNB (Binance Smart Chain)
-BSC_RPC_URL = "https://bsc-dataseed.binance.org/"  # Публичный RPC-эндпоинт BNB
-w3 = Web3(Web3.HTTPProvider(BSC_RPC_URL))
+# Подключение к сети BNB (Binance Smart Chain). CHAIN_RPC_URL и CHAIN_ID в .env переопределяют config —
+# например, локальная dev-сеть anvil (http://127.0.0.1:8545, 31337) для проверки переводов.
+# CHAIN_WS_URL — WebSocket того же узла для подписки на входящие переводы, без него логи опрашиваются по HTTP
+RPC_URL = os.getenv("CHAIN_RPC_URL", CHAIN_RPC_URL)
+WS_URL = os.getenv("CHAIN_WS_URL", CHAIN_WS_URL)
+TX_CHAIN_ID = int(os.getenv("CHAIN_ID", CHAIN_ID))
+w3 = Web3(Web3.HTTPProvider(RPC_URL))
 
 # Проверка подключения
 if not w3.is_connected():
@@ -70,73 +77,47 @@ TOKEN_ABI = [
 # Создание контракта
 token_contract = w3.eth.contract(address=TOKEN_CONTRACT_ADDRESS, abi=TOKEN_ABI)
 
+# Конвейер отправки: локальный nonce, кэш цены газа и фоновая замена зависших транзакций
+tx_pipeline = TxPipeline(w3, account, TX_CHAIN_ID)
 
-def get_token_balance(address: str) -> float:
-    """Получение баланса токена в читаемом формате (с учётом decimals)."""
-    try:
-        balance_wei = token_contract.functions.balanceOf(address).call()
-        # Предполагаем 18 decimals (стандарт для большинства токенов на BSC)
-        balance = balance_wei / 10 ** 18
-        return balance
-    except Exception as e:
-        logger.error(f"Ошибка при получении баланса: {e}")
-        return 0.0
+# Ожидание поступления по логам Transfer (подписка или eth_getLogs) вместо опроса balanceOf
+deposit_watcher = DepositWatcher(w3, token_contract, METAMASK_ADDRESS, WS_URL)
 
-def transfer_tokens(amount: float):
-    """Перевод токенов на адрес биржи с высоким газом и приоритетом (EIP-1559)."""
+
+def transfer_tokens(amount_wei: int) -> bool:
+    """
+    Перевод токенов на адрес биржи с высоким газом и приоритетом (EIP-1559).
+    Транзакция уходит без запросов nonce и цены газа; если она не смайнена за TX_BUMP_BLOCKS блоков,
+    конвейер переотправляет её с тем же nonce и поднятой комиссией.
+    """
     try:
-        # Получаем базовую цену газа
-        gas_price = w3.eth.gas_price
-        # Устанавливаем параметры EIP-1559
-        max_fee_per_gas = int(gas_price * 2.5)  # Максимальная плата за газ
-        max_priority_fee_per_gas = int(gas_price * 1.5)  # Приоритетная плата для майнеров
-        gas_limit = 100000  # Высокий gasLimit для надёжности
-
-        # Конвертируем сумму в wei (с учётом decimals)
-        amount_wei = int(amount * 10**18)
-
-        # Создаём транзакцию с параметрами EIP-1559
-        tx = token_contract.functions.transfer(
-            EXCHANGE_WALLET_ADDRESS,
-            amount_wei
-        ).build_transaction({
-            'from': METAMASK_ADDRESS,
-            'gas': gas_limit,
-            'maxFeePerGas': max_fee_per_gas,
-            'maxPriorityFeePerGas': max_priority_fee_per_gas,
-            'nonce': w3.eth.get_transaction_count(METAMASK_ADDRESS),
-            'chainId': 56  # ID сети BSC
-        })
-
-        # Подписываем транзакцию
-        signed_tx = w3.eth.account.sign_transaction(tx, METAMASK_PRIVATE_KEY)
-
-        # Отправляем транзакцию
-        tx_hash = w3.eth.send_raw_transaction(signed_tx.raw_transaction)
-        logger.info(f"Транзакция отправлена: {tx_hash.hex()}")
-
-        # Ожидаем подтверждения
-        receipt = w3.eth.wait_for_transaction_receipt(tx_hash, timeout=120)
+        receipt = tx_pipeline.submit(
+            token_contract.functions.transfer(EXCHANGE_WALLET_ADDRESS, amount_wei), TRANSFER_GAS_LIMIT
+        ).result()
         if receipt.status == 1:
-            logger.info(f"Перевод {amount} токенов на {EXCHANGE_WALLET_ADDRESS} успешно выполнен")
-        else:
-            logger.error("Транзакция не удалась")
+            logger.info(f"Перевод {amount_wei / 10 ** 18} токенов на {EXCHANGE_WALLET_ADDRESS} успешно выполнен")
+            return True
+        logger.error("Транзакция не удалась")
     except Exception as e:
         logger.error(f"Ошибка при переводе токенов: {e}")
+    return False
 
 
 def main():
     logger.info("Запуск скрипта для мониторинга баланса MetaMask в сети BNB")
-    while True:
-        balance = get_token_balance(METAMASK_ADDRESS)
-        logger.info(f"Текущий баланс токена: {balance}")
-
-        if balance > 0.00001:
-            logger.info(f"Баланс {balance} превысил минимум, начинаем перевод")
-            transfer_tokens(balance)
-            break  # Выходим после успешного перевода
+    tx_pipeline.start()
+    tx_pipeline.gas.start_refresh()  # К поступлению токенов цена газа уже в кэше
+    deposit_watcher.start()
+    try:
+        # Перевод уходит сразу по логу поступления, не дожидаясь очередного опроса баланса
+        balance_wei = deposit_watcher.wait_for_balance(int(MIN_DEPOSIT_BALANCE * 10 ** 18))
+        logger.info(f"Баланс {balance_wei / 10 ** 18} превысил минимум, начинаем перевод")
+        transfer_tokens(balance_wei)  # Весь баланс в wei, без округления через float
+    finally:
+        deposit_watcher.stop()
+        tx_pipeline.gas.stop_refresh()
+        tx_pipeline.stop()
 
-        time
 
 if __name__ == "__main__":
     try:
@@ -0,0 +1,204 @@
+import heapq
+import itertools
+from bisect import insort
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from exchange.SellLadder import build_sell_ladder, to_depth_array
+from exchange.SymbolInfo import SymbolInfo
+from stream.DepthRecorder import DepthRecording, ASK, SNAPSHOT
+
+CHUNK_ROWS = 1 << 16  # Строк записи, переводимых в списки Python за раз
+NS = 1_000_000_000
+
+
+# Итог прогона лестницы на записанной книге
+class BacktestResult:
+    def __init__(self, start_rate: float, rate_step: float, requote_interval: float):
+        self.start_rate = start_rate
+        self.rate_step = rate_step
+        self.requote_interval = requote_interval
+        self.sold = 0.0
+        self.proceeds = 0.0
+        self.unsold = 0.0
+        self.cycles = 0
+        self.reference_price = 0.0  # Лучший бид в момент зачисления
+        self.duration = 0.0  # От зачисления до последней сделки, секунды
+        self.events = 0  # Сколько строк записи воспроизведено
+
+    @property
+    def avg_price(self) -> float:
+        return self.proceeds / self.sold if self.sold else 0.0
+
+    @property
+    def slippage(self) -> float:
+        """Средняя цена относительно лучшего бида на старте: -0.05 — продали на 5% хуже."""
+        return self.avg_price / self.reference_price - 1 if self.reference_price and self.sold else 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "start_rate": self.start_rate,
+            "rate_step": self.rate_step,
+            "requote_interval": self.requote_interval,
+            "sold": round(self.sold, 8),
+            "unsold": round(self.unsold, 8),
+            "proceeds": round(self.proceeds, 8),
+            "avg_price": round(self.avg_price, 8),
+            "slippage_pct": round(self.slippage * 100, 4),
+            "duration_s": round(self.duration, 3),
+            "cycles": self.cycles,
+            "events": self.events,
+        }
+
+
+# Книга бидов из записи и наши ордера на продажу в ней
+class _Replay:
+    def __init__(self, recording: DepthRecording, start_ts: int):
+        self.bids = {}  # цена -> объём по записи
+        self.consumed = {}  # цена -> объём, уже забранный нашими сделками на этом уровне
+        self.resting: List[List[float]] = []  # [цена, остаток] наших ордеров по возрастанию цены
+        self.ts = start_ts
+        self.sold = 0.0
+        self.proceeds = 0.0
+        self.last_fill_ts = start_ts
+        self.events = 0
+        self._events = self._iter_events(recording, recording.seek(start_ts))
+        self._pending = next(self._events, None)
+        self._snapshot_ts = None
+
+    @property
+    def exhausted(self) -> bool:
+        return self._pending is None
+
+    def advance(self, until_ts: int, stop_when_filled: bool = False):
+        """Применить события до until_ts включительно, исполняя наши ордера пересекающими бидами."""
+        while self._pending is not None and self._pending[0] <= until_ts:
+            if stop_when_filled and not self.resting:
+                return
+            self._apply(*self._pending)
+            self._pending = next(self._events, None)
+        self.ts = max(self.ts, until_ts)
+
+    def advance_next(self) -> bool:
+        """Применить следующее событие, False — запись закончилась."""
+        if self._pending is None:
+            return False
+        self.advance(self._pending[0])
+        return True
+
+    def top_bids(self, depth: int) -> np.ndarray:
+        """Лучшие биды за вычетом уже забранного нами объёма."""
+        levels = heapq.nlargest(depth, ((price, self._available(price)) for price in self.bids))
+        return to_depth_array([level for level in levels if level[1] > 0])
+
+    def place(self, orders: Sequence[Tuple[float, float]]):
+        """Выставить ордера: исполняются по бидам не хуже своей цены, остаток встаёт в книгу."""
+        for price, qty in orders:
+            for bid_price in sorted((p for p in self.bids if p >= price), reverse=True):
+                if qty <= 0:
+                    break
+                qty -= self._take(bid_price, bid_price, qty)
+            if qty > 0:
+                insort(self.resting, [price, qty])
+
+    def cancel_all(self) -> float:
+        """Снять наши ордера, вернуть неисполненный объём."""
+        left = sum(qty for _, qty in self.resting)
+        self.resting = []
+        return left
+
+    def _apply(self, ts: int, side: int, price: float, qty: float):
+        self.events += 1
+        self.ts = ts
+        if side & SNAPSHOT and ts != self._snapshot_ts:
+            self._snapshot_ts = ts
+            self.bids.clear()
+        if side & ASK:
+            return
+        if qty > 0:
+            self.bids[price] = qty
+        else:
+            self.bids.pop(price, None)
+            self.consumed.pop(price, None)
+            return
+        # Новый или выросший бид по цене не ниже нашего ордера исполняет его по цене ордера
+        while self.resting and self.resting[0][0] <= price and self._available(price) > 0:
+            order = self.resting[0]
+            order[1] -= self._take(price, order[0], order[1])
+            if order[1] <= 0:
+                self.resting.pop(0)
+
+    def _available(self, price: float) -> float:
+        return self.bids.get(price, 0.0) - self.consumed.get(price, 0.0)
+
+    def _take(self, bid_price: float, fill_price: float, qty: float) -> float:
+        qty = min(qty, self._available(bid_price))
+        if qty <= 0:
+            return 0.0
+        self.consumed[bid_price] = self.consumed.get(bid_price, 0.0) + qty
+        self.sold += qty
+        self.proceeds += qty * fill_price
+        self.last_fill_ts = self.ts
+        return qty
+
+    @staticmethod
+    def _iter_events(recording: DepthRecording, start: int) -> Iterator[Tuple[int, int, float, float]]:
+        for offset in range(start, len(recording), CHUNK_ROWS):
+            end = offset + CHUNK_ROWS
+            yield from zip(recording.ts[offset:end].tolist(), recording.side[offset:end].tolist(),
+                           recording.price[offset:end].tolist(), recording.qty[offset:end].tolist())
+
+
+def run_backtest(recording: DepthRecording, quantity: float, start_rate: float, rate_step: float,
+                 requote_interval: float, start_ts: Optional[int] = None, latency: float = 0.0,
+                 depth: int = 50, symbol_info: Optional[SymbolInfo] = None) -> BacktestResult:
+    """
+    Прогнать цикл limit_sell по записанной книге в виртуальном времени: лестница build_sell_ladder
+    по текущим бидам, исполнение по книге через latency секунд, ожидание requote_interval
+    (или до полного исполнения), отмена остатка и новая лестница.
+
+    Наши сделки уменьшают доступный объём уровня, пока запись не удалит этот уровень.
+    """
+    result = BacktestResult(start_rate, rate_step, requote_interval)
+    if not len(recording):
+        result.unsold = quantity
+        return result
+    start_ts = int(recording.ts[0]) if start_ts is None else start_ts
+    symbol_info = symbol_info or SymbolInfo()
+    replay = _Replay(recording, start_ts)
+    replay.advance(start_ts)
+
+    remaining = quantity
+    while remaining >= symbol_info.min_sell_quantity() and not replay.exhausted:
+        bids = replay.top_bids(depth)
+        if len(bids) < 2:
+            replay.advance_next()
+            continue
+        if not result.reference_price:
+            result.reference_price = float(bids[0, 0])
+        orders = symbol_info.normalize_orders(build_sell_ladder(bids, remaining, start_rate, rate_step))
+        if not orders:
+            break
+        result.cycles += 1
+        quoted_at = replay.ts
+        replay.advance(quoted_at + int(latency * NS))
+        remaining -= sum(qty for _, qty in orders)
+        replay.place(orders)
+        replay.advance(quoted_at + int((latency + requote_interval) * NS), stop_when_filled=True)
+        remaining += replay.cancel_all()
+
+    result.sold = replay.sold
+    result.proceeds = replay.proceeds
+    result.unsold = max(quantity - replay.sold, 0.0)
+    result.duration = (replay.last_fill_ts - start_ts) / NS
+    result.events = replay.events
+    return result
+
+
+def grid_search(recording: DepthRecording, quantity: float, start_rates: Sequence[float],
+                rate_steps: Sequence[float], requote_intervals: Sequence[float], **kwargs) -> List[BacktestResult]:
+    """Перебор параметров лестницы, лучшие по выручке — первыми."""
+    results = [run_backtest(recording, quantity, start_rate, rate_step, interval, **kwargs)
+               for start_rate, rate_step, interval in itertools.product(start_rates, rate_steps, requote_intervals)]
+    return sorted(results, key=lambda result: (-result.proceeds, result.duration))
@@ -0,0 +1,71 @@
+"""
+Подбор параметров лестницы по записанной книге (config.RECORD_DEPTH = True).
+
+Каждая комбинация стартовой доли, шага и интервала перевыставления прогоняется по записи
+в виртуальном времени, результаты сортируются по выручке.
+
+Запуск из каталога AirdropSellBot:
+    python -m backtest.run_backtest depth_records/Binance_XYZUSDT_20260101-120000 --quantity 5000 \\
+        --start-rates 0.05 0.1 0.2 --rate-steps 0.02 0.05 0.1 --intervals 0.5 1.5 3
+"""
+import argparse
+import time
+
+from backtest.Backtester import grid_search
+from config import SUCCESS_BID_START_RATE, SUCCESS_BID_RATE_STEP, ORDER_FILL_TIMEOUT
+from exchange.SymbolInfo import SymbolInfo
+from stream.DepthRecorder import DepthRecording
+
+COLUMNS = ["start_rate", "rate_step", "requote_interval", "sold", "unsold", "proceeds", "avg_price",
+           "slippage_pct", "duration_s", "cycles"]
+
+
+def print_table(rows):
+    table = [COLUMNS] + [[str(row[column]) for column in COLUMNS] for row in rows]
+    widths = [max(len(line[i]) for line in table) for i in range(len(COLUMNS))]
+    for line in table:
+        print("  ".join(value.rjust(width) for value, width in zip(line, widths)))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Бэктест лестницы продажи по записи книги")
+    parser.add_argument("recording", help="Каталог записи DepthRecorder")
+    parser.add_argument("--quantity", type=float, required=True, help="Сколько токенов продать")
+    parser.add_argument("--start-rates", type=float, nargs="+", default=[SUCCESS_BID_START_RATE])
+    parser.add_argument("--rate-steps", type=float, nargs="+", default=[SUCCESS_BID_RATE_STEP])
+    parser.add_argument("--intervals", type=float, nargs="+", default=[ORDER_FILL_TIMEOUT],
+                        help="Интервалы перевыставления, секунды")
+    parser.add_argument("--start", type=float, default=None,
+                        help="Момент зачисления: секунды от начала записи (по умолчанию — начало)")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Задержка выставления ордеров")
+    parser.add_argument("--depth", type=int, default=50, help="Уровней бидов для расчёта лестницы")
+    parser.add_argument("--top", type=int, default=20, help="Сколько лучших комбинаций показать")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    recording = DepthRecording(args.recording)
+    if not len(recording):
+        print(f"Запись {args.recording} пуста")
+        return
+    symbol_info = SymbolInfo.from_dict(recording.meta["symbol_info"]) if "symbol_info" in recording.meta \
+        else SymbolInfo()
+    start_ts = None if args.start is None else int(recording.ts[0]) + int(args.start * 1e9)
+    span = (int(recording.ts[-1]) - int(recording.ts[0])) / 1e9
+    print(f"Запись {recording.meta.get('exchange', '?')} {recording.meta.get('symbol', '?')}: "
+          f"{len(recording)} строк, {span:.1f} с, {symbol_info}")
+
+    started = time.perf_counter()
+    results = grid_search(recording, args.quantity, args.start_rates, args.rate_steps, args.intervals,
+                          start_ts=start_ts, latency=args.latency_ms / 1000, depth=args.depth,
+                          symbol_info=symbol_info)
+    elapsed = time.perf_counter() - started
+
+    print_table([result.to_dict() for result in results[:args.top]])
+    events = sum(result.events for result in results)
+    print(f"{len(results)} прогонов за {elapsed:.2f} с, {events / elapsed if elapsed else 0:.0f} событий/с")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,801 @@
+import base64
+import hashlib
+import json
+import struct
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlsplit
+
+from benchmark.MockVenue import MockVenue, MockOrder, ORDER_OPEN, ORDER_PARTIALLY_FILLED, ORDER_FILLED, \
+    ORDER_CANCELLED
+
+WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+Response = Tuple[int, object]
+
+
+# Подключение WebSocket к мок-бирже (RFC 6455 без расширений, только текстовые кадры)
+class MockWebSocket:
+    def __init__(self, handler: BaseHTTPRequestHandler, path: str, query: Dict[str, str]):
+        self.path = path
+        self.query = query
+        self.private = False  # Получает события по ордерам и балансам
+        self._rfile = handler.rfile
+        self._wfile = handler.wfile
+        self._lock = threading.Lock()
+        self.closed = False
+
+    def send(self, text: str):
+        payload = text.encode("utf-8")
+        self._send_frame(0x1, payload)
+
+    def receive(self) -> Optional[str]:
+        """Очередное текстовое сообщение клиента, None — подключение закрыто."""
+        while True:
+            header = self._rfile.read(2)
+            if len(header) < 2:
+                return None
+            opcode = header[0] & 0x0F
+            length = header[1] & 0x7F
+            if length == 126:
+                length = struct.unpack(">H", self._rfile.read(2))[0]
+            elif length == 127:
+                length = struct.unpack(">Q", self._rfile.read(8))[0]
+            mask = self._rfile.read(4) if header[1] & 0x80 else b"\x00\x00\x00\x00"
+            payload = bytes(b ^ mask[i % 4] for i, b in enumerate(self._rfile.read(length)))
+            if opcode == 0x8:
+                self._send_frame(0x8, payload[:2])
+                return None
+            if opcode == 0x9:
+                self._send_frame(0xA, payload)
+                continue
+            if opcode == 0x1:
+                return payload.decode("utf-8")
+
+    def _send_frame(self, opcode: int, payload: bytes):
+        header = bytes([0x80 | opcode])
+        if len(payload) < 126:
+            header += bytes([len(payload)])
+        elif len(payload) < 1 << 16:
+            header += bytes([126]) + struct.pack(">H", len(payload))
+        else:
+            header += bytes([127]) + struct.pack(">Q", len(payload))
+        with self._lock:
+            if self.closed:
+                return
+            try:
+                self._wfile.write(header + payload)
+                self._wfile.flush()
+            except OSError:
+                self.closed = True
+
+
+# Диалект биржи: REST-маршруты и формат WebSocket-сообщений, которые ожидают адаптер и его потоки
+class Dialect:
+    def __init__(self, venue: MockVenue, symbol: str):
+        self.venue = venue
+        self.symbol = symbol
+
+    def route(self, method: str, path: str, params: dict) -> Optional[Response]:
+        """Ответ (HTTP-код, тело) на REST-запрос или None, если маршрут неизвестен."""
+        raise NotImplementedError
+
+    def is_order_request(self, method: str, path: str) -> bool:
+        """Запросы выставления ордеров для счётчика бенчмарка."""
+        return False
+
+    def on_ws_connect(self, ws: MockWebSocket) -> List[str]:
+        return []
+
+    def on_ws_message(self, ws: MockWebSocket, message: str) -> List[str]:
+        raise NotImplementedError
+
+    def order_event(self, order: MockOrder) -> Optional[str]:
+        raise NotImplementedError
+
+    def balance_event(self, asset: str) -> Optional[str]:
+        raise NotImplementedError
+
+    def env(self, http_url: str, ws_url: str) -> Dict[str, str]:
+        """Переменные окружения, направляющие адаптер биржи на мок-сервер."""
+        raise NotImplementedError
+
+    def deposit(self, asset: str, qty: float):
+        self.venue.deposit(asset, qty)
+
+    @staticmethod
+    def levels(bids: List[Tuple[float, float]]) -> List[List[str]]:
+        return [[str(price), str(qty)] for price, qty in bids]
+
+
+class BinanceDialect(Dialect):
+    STATUSES = {ORDER_OPEN: "NEW", ORDER_PARTIALLY_FILLED: "PARTIALLY_FILLED",
+                ORDER_FILLED: "FILLED", ORDER_CANCELLED: "CANCELED"}
+
+    def route(self, method: str, path: str, params: dict) -> Optional[Response]:
+        venue = self.venue
+        if path == "/api/v3/ping":
+            return 200, {}
+        if path == "/api/v3/time":
+            return 200, {"serverTime": int(time.time() * 1000)}
+        if path == "/api/v3/exchangeInfo":
+            return 200, {"symbols": [{
+                "symbol": self.symbol,
+                "status": "TRADING",
+                "filters": [
+                    {"filterType": "PRICE_FILTER", "tickSize": str(venue.tick_size)},
+                    {"filterType": "LOT_SIZE", "stepSize": str(venue.lot_size), "minQty": str(venue.lot_size)},
+                    {"filterType": "NOTIONAL", "minNotional": str(venue.min_notional)}
+                ]
+            }]}
+        if path == "/api/v3/account":
+            assets = {venue.base_asset, venue.quote_asset}
+            return 200, {"balances": [{"asset": asset, "free": str(venue.free(asset)),
+                                       "locked": str(venue.total(asset) - venue.free(asset))} for asset in assets]}
+        if path == "/api/v3/depth":
+            return 200, {"lastUpdateId": venue.book_version,
+                         "bids": self.levels(venue.get_bids(int(params.get("limit", 100)))), "asks": []}
+        if path == "/api/v3/order" and method == "POST":
+            order, error = venue.place(float(params["price"]), float(params["quantity"]))
+            if order is None:
+                return 400, {"code": -2010, "msg": f"Order rejected: {error}"}
+            return 200, {"symbol": self.symbol, "orderId": int(order.order_id), "status": "NEW"}
+        if path == "/api/v3/order" and method == "GET":
+            order = venue.get_order(params["orderId"])
+            if order is None:
+                return 400, {"code": -2013, "msg": "Order does not exist."}
+            return 200, self._order(order)
+        if path == "/api/v3/order" and method == "DELETE":
+            order = venue.cancel(params["orderId"])
+            if order is None:
+                return 400, {"code": -2011, "msg": "Unknown order sent."}
+            return 200, self._order(order)
+        if path == "/api/v3/openOrders" and method == "DELETE":
+            return 200, [self._order(order) for order in venue.cancel_all()]
+        if path == "/api/v3/userDataStream":
+            return 200, {"listenKey": "mock-listen-key"} if method == "POST" else {}
+        return None
+
+    def is_order_request(self, method: str, path: str) -> bool:
+        return method == "POST" and path == "/api/v3/order"
+
+    def on_ws_connect(self, ws: MockWebSocket) -> List[str]:
+        ws.private = ws.path.startswith("/ws/")  # /ws/<listenKey>
+        return []
+
+    def on_ws_message(self, ws: MockWebSocket, message: str) -> List[str]:
+        request = json.loads(message)
+        if request.get("method") != "SUBSCRIBE":
+            return []
+        version = self.venue.book_version
+        # Пустое обновление сразу после снапшота: поток синхронизирует книгу по REST-снапшоту
+        return [json.dumps({"result": None, "id": request.get("id")}),
+                json.dumps({"e": "depthUpdate", "s": self.symbol, "U": version + 1, "u": version + 1,
+                            "b": [], "a": []})]
+
+    def order_event(self, order: MockOrder) -> Optional[str]:
+        return json.dumps({"e": "executionReport", "s": self.symbol, "i": int(order.order_id),
+                           "X": self.STATUSES[order.status], "z": str(order.filled),
+                           "Z": str(order.notional)})
+
+    def balance_event(self, asset: str) -> Optional[str]:
+        return json.dumps({"e": "outboundAccountPosition", "B": [{"a": asset, "f": str(self.venue.free(asset)),
+                                                                  "l": "0"}]})
+
+    def env(self, http_url: str, ws_url: str) -> Dict[str, str]:
+        return {"BINANCE_API_URL": http_url, "BINANCE_WS_URL": f"{ws_url}/ws",
+                "BINANCE_PRIVATE_WS_URL": f"{ws_url}/ws"}
+
+    def _order(self, order: MockOrder) -> dict:
+        return {"symbol": self.symbol, "orderId": int(order.order_id), "status": self.STATUSES[order.status],
+                "price": str(order.price), "origQty": str(order.qty), "executedQty": str(order.filled),
+                "cummulativeQuoteQty": str(order.notional)}
+
+
+class BybitDialect(Dialect):
+    STATUSES = {ORDER_OPEN: "New", ORDER_PARTIALLY_FILLED: "PartiallyFilled",
+                ORDER_FILLED: "Filled", ORDER_CANCELLED: "Cancelled"}
+
+    def route(self, method: str, path: str, params: dict) -> Optional[Response]:
+        venue = self.venue
+        if path == "/v5/market/time":
+            now = time.time()
+            return self._ok({"timeSecond": str(int(now)), "timeNano": str(int(now * 1e9))})
+        if path == "/v5/market/instruments-info":
+            return self._ok({"category": "spot", "list": [{
+                "symbol": self.symbol,
+                "priceFilter": {"tickSize": str(venue.tick_size)},
+                "lotSizeFilter": {"basePrecision": str(venue.lot_size), "minOrderQty": str(venue.lot_size),
+                                  "minOrderAmt": str(venue.min_notional)}
+            }]})
+        if path == "/v5/account/wallet-balance":
+            # walletBalance Bybit включает средства в ордерах
+            coins = [{"coin": asset, "walletBalance": str(venue.total(asset))}
+                     for asset in (venue.base_asset, venue.quote_asset)]
+            return self._ok({"list": [{"accountType": "UNIFIED", "coin": coins}]})
+        if path == "/v5/market/orderbook":
+            return self._ok({"s": self.symbol, "b": self.levels(venue.get_bids(int(params.get("limit", 50)))),
+                             "a": [], "u": venue.book_version, "ts": int(time.time() * 1000)})
+        if path == "/v5/order/create":
+            order, error = venue.place(float(params["price"]), float(params["qty"]))
+            if order is None:
+                return self._error(170131, f"Order rejected: {error}")
+            return self._ok({"orderId": order.order_id})
+        if path == "/v5/order/create-batch":
+            items, statuses = [], []
+            for request in params["request"]:
+                order, error = venue.place(float(request["price"]), float(request["qty"]))
+                items.append({"orderId": order.order_id if order else "", "symbol": self.symbol})
+                statuses.append({"code": 0, "msg": "OK"} if order else {"code": 170131, "msg": error})
+            return self._ok({"list": items}, statuses)
+        if path == "/v5/order/cancel":
+            order = venue.cancel(params["orderId"])
+            if order is None:
+                return self._error(170213, "Order does not exist.")
+            return self._ok({"orderId": order.order_id})
+        if path == "/v5/order/cancel-batch":
+            items, statuses = [], []
+            for request in params["request"]:
+                order = venue.cancel(request["orderId"])
+                items.append({"orderId": request["orderId"], "symbol": self.symbol})
+                statuses.append({"code": 0, "msg": "OK"} if order else {"code": 170213, "msg": "Order does not exist."})
+            return self._ok({"list": items}, statuses)
+        if path == "/v5/order/cancel-all":
+            return self._ok({"list": [{"orderId": order.order_id} for order in venue.cancel_all()]})
+        if path == "/v5/order/amend":
+            order, error = venue.amend(params["orderId"], float(params["price"]), float(params["qty"]))
+            if order is None:
+                return self._error(170213, f"Order not amended: {error}")
+            return self._ok({"orderId": order.order_id})
+        if path == "/v5/order/amend-batch":
+            items, statuses = [], []
+            for request in params["request"]:
+                order, error = venue.amend(request["orderId"], float(request["price"]), float(request["qty"]))
+                items.append({"orderId": request["orderId"], "symbol": self.symbol})
+                statuses.append({"code": 0, "msg": "OK"} if order else {"code": 170213, "msg": error})
+            return self._ok({"list": items}, statuses)
+        if path == "/v5/order/history":
+            order = venue.get_order(params["orderId"])
+            return self._ok({"list": [self._order(order)] if order else []})
+        if path == "/v5/order/realtime":
+            return self._ok({"list": [self._order(venue.get_order(order_id)) for order_id in venue.open_order_ids()]})
+        return None
+
+    def is_order_request(self, method: str, path: str) -> bool:
+        return path in ("/v5/order/create", "/v5/order/create-batch", "/v5/order/amend", "/v5/order/amend-batch")
+
+    def on_ws_connect(self, ws: MockWebSocket) -> List[str]:
+        ws.private = ws.path.endswith("/private")
+        return []
+
+    def on_ws_message(self, ws: MockWebSocket, message: str) -> List[str]:
+        request = json.loads(message)
+        op = request.get("op")
+        if op == "ping":
+            return [json.dumps({"op": "pong", "success": True})]
+        if op == "auth":
+            return [json.dumps({"op": "auth", "success": True})]
+        if op != "subscribe":
+            return []
+        replies = [json.dumps({"op": "subscribe", "success": True})]
+        if not ws.private:
+            replies.append(json.dumps({
+                "topic": f"orderbook.50.{self.symbol}",
+                "type": "snapshot",
+                "data": {"s": self.symbol, "b": self.levels(self.venue.get_bids(50)), "a": [],
+                         "u": self.venue.book_version}
+            }))
+        return replies
+
+    def order_event(self, order: MockOrder) -> Optional[str]:
+        avg_price = str(order.avg_price) if order.filled else ""
+        return json.dumps({"topic": "order", "data": [{
+            "category": "spot", "symbol": self.symbol, "orderId": order.order_id,
+            "orderStatus": self.STATUSES[order.status], "cumExecQty": str(order.filled), "avgPrice": avg_price
+        }]})
+
+    def balance_event(self, asset: str) -> Optional[str]:
+        return json.dumps({"topic": "wallet", "data": [{
+            "accountType": "UNIFIED", "coin": [{"coin": asset, "walletBalance": str(self.venue.total(asset))}]
+        }]})
+
+    def env(self, http_url: str, ws_url: str) -> Dict[str, str]:
+        return {"BYBIT_API_URL": http_url, "BYBIT_WS_URL": f"{ws_url}/v5/public/spot",
+                "BYBIT_PRIVATE_WS_URL": f"{ws_url}/v5/private"}
+
+    def _order(self, order: MockOrder) -> dict:
+        return {"orderId": order.order_id, "symbol": self.symbol, "orderStatus": self.STATUSES[order.status],
+                "price": str(order.price), "qty": str(order.qty), "cumExecQty": str(order.filled),
+                "avgPrice": str(order.avg_price) if order.filled else ""}
+
+    @staticmethod
+    def _ok(result: dict, statuses: list = None) -> Response:
+        return 200, {"retCode": 0, "retMsg": "OK", "result": result,
+                     "retExtInfo": {"list": statuses} if statuses is not None else {},
+                     "time": int(time.time() * 1000)}
+
+    @staticmethod
+    def _error(code: int, message: str) -> Response:
+        return 200, {"retCode": code, "retMsg": message, "result": {}, "retExtInfo": {},
+                     "time": int(time.time() * 1000)}
+
+
+class OKXDialect(Dialect):
+    STATUSES = {ORDER_OPEN: "live", ORDER_PARTIALLY_FILLED: "partially_filled",
+                ORDER_FILLED: "filled", ORDER_CANCELLED: "canceled"}
+
+    def route(self, method: str, path: str, params) -> Optional[Response]:
+        venue = self.venue
+        if path == "/api/v5/public/time":
+            return self._ok([{"ts": str(int(time.time() * 1000))}])
+        if path == "/api/v5/public/instruments":
+            return self._ok([{"instId": self.symbol, "instType": "SPOT", "tickSz": str(venue.tick_size),
+                              "lotSz": str(venue.lot_size), "minSz": str(venue.lot_size)}])
+        if path == "/api/v5/asset/balances":
+            asset = params.get("ccy")
+            return self._ok([{"ccy": asset, "availBal": str(venue.funding.get(asset, 0.0))}])
+        if path == "/api/v5/asset/transfer":
+            if not venue.transfer_from_funding(params["ccy"], float(params["amt"])):
+                return self._error("58350", "Insufficient balance")
+            return self._ok([{"transId": "1", "ccy": params["ccy"], "amt": str(params["amt"])}])
+        if path == "/api/v5/account/balance":
+            asset = params.get("ccy")
+            return self._ok([{"details": [{"ccy": asset, "availBal": str(venue.free(asset))}]}])
+        if path == "/api/v5/market/books":
+            bids = [[str(price), str(qty), "0", "1"] for price, qty in venue.get_bids(int(params.get("sz", 50)))]
+            return self._ok([{"bids": bids, "asks": [], "ts": str(int(time.time() * 1000))}])
+        if path == "/api/v5/trade/order" and method == "POST":
+            return self._batch([self._place(params)])
+        if path == "/api/v5/trade/batch-orders":
+            return self._batch([self._place(request) for request in params])
+        if path == "/api/v5/trade/cancel-order":
+            return self._batch([self._cancel(params["ordId"])])
+        if path == "/api/v5/trade/cancel-batch-orders":
+            return self._batch([self._cancel(request["ordId"]) for request in params])
+        if path == "/api/v5/trade/amend-order":
+            return self._batch([self._amend(params)])
+        if path == "/api/v5/trade/amend-batch-orders":
+            return self._batch([self._amend(request) for request in params])
+        if path == "/api/v5/trade/order" and method == "GET":
+            order = venue.get_order(params["ordId"])
+            if order is None:
+                return self._error("51603", "Order does not exist")
+            return self._ok([self._order(order)])
+        if path == "/api/v5/trade/orders-pending":
+            return self._ok([self._order(venue.get_order(order_id)) for order_id in venue.open_order_ids()])
+        return None
+
+    def is_order_request(self, method: str, path: str) -> bool:
+        return method == "POST" and path in ("/api/v5/trade/order", "/api/v5/trade/batch-orders",
+                                             "/api/v5/trade/amend-order", "/api/v5/trade/amend-batch-orders")
+
+    def deposit(self, asset: str, qty: float):
+        # Зачисления OKX приходят на Funding, адаптер переводит их на Trading сам
+        self.venue.deposit(asset, qty, funding=True)
+
+    def on_ws_message(self, ws: MockWebSocket, message: str) -> List[str]:
+        if message == "ping":
+            return ["pong"]
+        request = json.loads(message)
+        if request.get("op") == "login":
+            return [json.dumps({"event": "login", "code": "0", "msg": ""})]
+        if request.get("op") != "subscribe":
+            return []
+        replies = []
+        for arg in request["args"]:
+            replies.append(json.dumps({"event": "subscribe", "arg": arg}))
+            if arg["channel"] in ("orders", "account"):
+                ws.private = True
+            elif arg["channel"] == "books":
+                bids = [[str(price), str(qty), "0", "1"] for price, qty in self.venue.get_bids(400)]
+                replies.append(json.dumps({"arg": arg, "action": "snapshot", "data": [{
+                    "bids": bids, "asks": [], "ts": str(int(time.time() * 1000)),
+                    "seqId": self.venue.book_version, "prevSeqId": -1
+                }]}))
+        return replies
+
+    def order_event(self, order: MockOrder) -> Optional[str]:
+        return json.dumps({"arg": {"channel": "orders", "instType": "SPOT"}, "data": [{
+            "instId": self.symbol, "ordId": order.order_id, "state": self.STATUSES[order.status],
+            "accFillSz": str(order.filled), "avgPx": str(order.avg_price) if order.filled else ""
+        }]})
+
+    def balance_event(self, asset: str) -> Optional[str]:
+        return json.dumps({"arg": {"channel": "account"}, "data": [{
+            "details": [{"ccy": asset, "availBal": str(self.venue.free(asset))}]
+        }]})
+
+    def env(self, http_url: str, ws_url: str) -> Dict[str, str]:
+        return {"OKX_API_URL": http_url, "OKX_WS_URL": f"{ws_url}/ws/v5/public",
+                "OKX_PRIVATE_WS_URL": f"{ws_url}/ws/v5/private", "OKX_PASSPHRASE": "mock"}
+
+    def _place(self, request: dict) -> dict:
+        order, error = self.venue.place(float(request["px"]), float(request["sz"]))
+        if order is None:
+            return {"ordId": "", "sCode": "51008", "sMsg": f"Order rejected: {error}"}
+        return {"ordId": order.order_id, "sCode": "0", "sMsg": ""}
+
+    def _amend(self, request: dict) -> dict:
+        order, error = self.venue.amend(request["ordId"], float(request["newPx"]), float(request["newSz"]))
+        if order is None:
+            return {"ordId": request["ordId"], "sCode": "51503", "sMsg": f"Order modification failed: {error}"}
+        return {"ordId": order.order_id, "sCode": "0", "sMsg": ""}
+
+    def _cancel(self, order_id: str) -> dict:
+        if self.venue.cancel(order_id) is None:
+            return {"ordId": order_id, "sCode": "51400", "sMsg": "Order cancellation failed"}
+        return {"ordId": order_id, "sCode": "0", "sMsg": ""}
+
+    def _order(self, order: MockOrder) -> dict:
+        return {"instId": self.symbol, "ordId": order.order_id, "state": self.STATUSES[order.status],
+                "px": str(order.price), "sz": str(order.qty), "accFillSz": str(order.filled),
+                "avgPx": str(order.avg_price) if order.filled else ""}
+
+    def _batch(self, items: List[dict]) -> Response:
+        failed = sum(item["sCode"] != "0" for item in items)
+        code = "0" if not failed else "1" if failed < len(items) else "2"
+        return 200, {"code": code, "msg": "" if code == "0" else "Operation failed", "data": items}
+
+    @staticmethod
+    def _ok(data: list) -> Response:
+        return 200, {"code": "0", "msg": "", "data": data}
+
+    @staticmethod
+    def _error(code: str, message: str) -> Response:
+        return 200, {"code": code, "msg": message, "data": []}
+
+
+class GateIODialect(Dialect):
+    def route(self, method: str, path: str, params) -> Optional[Response]:
+        venue = self.venue
+        if path == "/api/v4/spot/time":
+            return 200, {"server_time": int(time.time() * 1000)}
+        if path == f"/api/v4/spot/currency_pairs/{self.symbol}":
+            return 200, {"id": self.symbol, "base": venue.base_asset, "quote": venue.quote_asset,
+                         "precision": _decimals(venue.tick_size), "amount_precision": _decimals(venue.lot_size),
+                         "min_base_amount": str(venue.lot_size), "min_quote_amount": str(venue.min_notional),
+                         "trade_status": "tradable"}
+        if path == "/api/v4/spot/accounts":
+            asset = params.get("currency")
+            return 200, [{"currency": asset, "available": str(venue.free(asset)),
+                          "locked": str(venue.total(asset) - venue.free(asset))}]
+        if path == "/api/v4/spot/order_book":
+            return 200, {"id": venue.book_version, "current": int(time.time() * 1000),
+                         "update": int(time.time() * 1000), "asks": [],
+                         "bids": self.levels(venue.get_bids(int(params.get("limit", 10))))}
+        if path == "/api/v4/spot/orders" and method == "POST":
+            order, error = venue.place(float(params["price"]), float(params["amount"]))
+            if order is None:
+                return 400, {"label": "BALANCE_NOT_ENOUGH", "message": f"Order rejected: {error}"}
+            return 201, self._order(order)
+        if path == "/api/v4/spot/batch_orders":
+            results = []
+            for request in params:
+                order, error = venue.place(float(request["price"]), float(request["amount"]))
+                if order is None:
+                    results.append({"succeeded": False, "label": "BALANCE_NOT_ENOUGH",
+                                    "message": f"Order rejected: {error}"})
+                else:
+                    results.append({"succeeded": True, **self._order(order)})
+            return 200, results
+        if path == "/api/v4/spot/cancel_batch_orders":
+            results = []
+            for request in params:
+                cancelled = venue.cancel(request["id"]) is not None
+                results.append({"currency_pair": self.symbol, "id": request["id"], "succeeded": cancelled,
+                                "label": "" if cancelled else "ORDER_NOT_FOUND",
+                                "message": "" if cancelled else "Order not found"})
+            return 200, results
+        if path == "/api/v4/spot/amend_batch_orders":
+            results = []
+            for request in params:
+                order, error = venue.amend(request["order_id"], float(request["price"]), float(request["amount"]))
+                if order is None:
+                    results.append({"succeeded": False, "id": request["order_id"], "label": "ORDER_NOT_FOUND",
+                                    "message": f"Order not amended: {error}"})
+                else:
+                    results.append({"succeeded": True, **self._order(order)})
+            return 200, results
+        if path.startswith("/api/v4/spot/orders/") and method == "PATCH":
+            order, error = venue.amend(path.rsplit("/", 1)[1], float(params["price"]), float(params["amount"]))
+            if order is None:
+                return 400, {"label": "ORDER_NOT_FOUND", "message": f"Order not amended: {error}"}
+            return 200, self._order(order)
+        if path == "/api/v4/spot/orders" and method == "DELETE":
+            return 200, [self._order(order) for order in venue.cancel_all()]
+        if path == "/api/v4/spot/orders" and method == "GET":
+            return 200, [self._order(venue.get_order(order_id)) for order_id in venue.open_order_ids()]
+        if path.startswith("/api/v4/spot/orders/"):
+            order_id = path.rsplit("/", 1)[1]
+            order = venue.cancel(order_id) if method == "DELETE" else venue.get_order(order_id)
+            if order is None:
+                return 404, {"label": "ORDER_NOT_FOUND", "message": "Order not found"}
+            return 200, self._order(order)
+        return None
+
+    def is_order_request(self, method: str, path: str) -> bool:
+        return method == "POST" and path in ("/api/v4/spot/orders", "/api/v4/spot/batch_orders",
+                                             "/api/v4/spot/amend_batch_orders") \
+            or method == "PATCH" and path.startswith("/api/v4/spot/orders/")
+
+    def on_ws_message(self, ws: MockWebSocket, message: str) -> List[str]:
+        request = json.loads(message)
+        channel = request.get("channel")
+        now = int(time.time())
+        if channel == "spot.ping":
+            return [json.dumps({"time": now, "channel": "spot.pong", "event": "", "result": None})]
+        if request.get("event") != "subscribe":
+            return []
+        replies = [json.dumps({"time": now, "channel": channel, "event": "subscribe",
+                               "result": {"status": "success"}})]
+        if channel in ("spot.orders", "spot.balances"):
+            ws.private = True
+        elif channel == "spot.order_book_update":
+            version = self.venue.book_version
+            replies.append(json.dumps({"time": now, "channel": channel, "event": "update", "result": {
+                "s": self.symbol, "U": version + 1, "u": version + 1, "b": [], "a": []
+            }}))
+        return replies
+
+    def order_event(self, order: MockOrder) -> Optional[str]:
+        result = {"id": order.order_id, "currency_pair": self.symbol, "amount": str(order.qty),
+                  "left": str(order.left), "avg_deal_price": str(order.avg_price) if order.filled else "0"}
+        if order.status in (ORDER_FILLED, ORDER_CANCELLED):
+            result.update(event="finish", finish_as="filled" if order.status == ORDER_FILLED else "cancelled")
+        else:
+            result.update(event="put" if not order.filled else "update")
+        return json.dumps({"time": int(time.time()), "channel": "spot.orders", "event": "update",
+                           "result": [result]})
+
+    def balance_event(self, asset: str) -> Optional[str]:
+        return json.dumps({"time": int(time.time()), "channel": "spot.balances", "event": "update",
+                           "result": [{"currency": asset, "available": str(self.venue.free(asset))}]})
+
+    def env(self, http_url: str, ws_url: str) -> Dict[str, str]:
+        return {"GATE_API_URL": f"{http_url}/api/v4", "GATE_WS_URL": f"{ws_url}/ws/v4/",
+                "GATE_PRIVATE_WS_URL": f"{ws_url}/ws/v4/"}
+
+    def _order(self, order: MockOrder) -> dict:
+        status = {ORDER_FILLED: "closed", ORDER_CANCELLED: "cancelled"}.get(order.status, "open")
+        return {"id": order.order_id, "currency_pair": self.symbol, "side": "sell", "type": "limit",
+                "amount": str(order.qty), "price": str(order.price), "left": str(order.left),
+                "filled_total": str(order.notional), "avg_deal_price": str(order.avg_price), "status": status}
+
+
+class MEXCDialect(Dialect):
+    STATUSES = {ORDER_OPEN: "NEW", ORDER_PARTIALLY_FILLED: "PARTIALLY_FILLED",
+                ORDER_FILLED: "FILLED", ORDER_CANCELLED: "CANCELED"}
+    STREAM_STATUSES = {ORDER_OPEN: 1, ORDER_FILLED: 2, ORDER_PARTIALLY_FILLED: 3, ORDER_CANCELLED: 4}
+
+    def route(self, method: str, path: str, params) -> Optional[Response]:
+        venue = self.venue
+        if path == "/api/v3/time":
+            return 200, {"serverTime": int(time.time() * 1000)}
+        if path == "/api/v3/exchangeInfo":
+            return 200, {"symbols": [{"symbol": self.symbol, "quotePrecision": _decimals(venue.tick_size),
+                                      "baseAssetPrecision": _decimals(venue.lot_size),
+                                      "baseSizePrecision": str(venue.lot_size),
+                                      "quoteAmountPrecision": str(venue.min_notional)}]}
+        if path == "/api/v3/account":
+            return 200, {"balances": [{"asset": asset, "free": str(venue.free(asset)),
+                                       "locked": str(venue.total(asset) - venue.free(asset))}
+                                      for asset in (venue.base_asset, venue.quote_asset)]}
+        if path == "/api/v3/depth":
+            return 200, {"lastUpdateId": venue.book_version,
+                         "bids": self.levels(venue.get_bids(int(params.get("limit", 100)))), "asks": []}
+        if path == "/api/v3/order" and method == "POST":
+            order, error = venue.place(float(params["price"]), float(params["quantity"]))
+            if order is None:
+                return 400, {"code": 30004, "msg": f"Order rejected: {error}"}
+            return 200, {"symbol": self.symbol, "orderId": order.order_id}
+        if path == "/api/v3/batchOrders":
+            results = []
+            for request in json.loads(params["batchOrders"]):
+                order, error = venue.place(float(request["price"]), float(request["quantity"]))
+                results.append({"symbol": self.symbol, "orderId": order.order_id} if order
+                               else {"code": 30004, "msg": f"Order rejected: {error}"})
+            return 200, results
+        if path == "/api/v3/order" and method == "GET":
+            order = venue.get_order(params["orderId"])
+            if order is None:
+                return 400, {"code": -2013, "msg": "Order does not exist."}
+            return 200, self._order(order)
+        if path == "/api/v3/order" and method == "DELETE":
+            order = venue.cancel(params["orderId"])
+            if order is None:
+                return 400, {"code": -2011, "msg": "Unknown order id."}
+            return 200, self._order(order)
+        if path == "/api/v3/openOrders" and method == "DELETE":
+            return 200, [self._order(order) for order in venue.cancel_all()]
+        if path == "/api/v3/userDataStream":
+            return 200, {"listenKey": "mock-listen-key"}
+        return None
+
+    def is_order_request(self, method: str, path: str) -> bool:
+        return method == "POST" and path in ("/api/v3/order", "/api/v3/batchOrders")
+
+    def on_ws_connect(self, ws: MockWebSocket) -> List[str]:
+        ws.private = "listenKey" in ws.query
+        return []
+
+    def on_ws_message(self, ws: MockWebSocket, message: str) -> List[str]:
+        request = json.loads(message)
+        if request.get("method") == "PING":
+            return [json.dumps({"id": 0, "code": 0, "msg": "PONG"})]
+        if request.get("method") != "SUBSCRIPTION":
+            return []
+        replies = []
+        for channel in request["params"]:
+            replies.append(json.dumps({"id": 0, "code": 0, "msg": channel}))
+            if channel.startswith("spot@public.limit.depth"):
+                bids = [{"p": str(price), "v": str(qty)} for price, qty in self.venue.get_bids(20)]
+                replies.append(json.dumps({"c": channel, "s": self.symbol, "t": int(time.time() * 1000),
+                                           "d": {"bids": bids, "asks": [], "r": str(self.venue.book_version)}}))
+        return replies
+
+    def order_event(self, order: MockOrder) -> Optional[str]:
+        return json.dumps({"c": "spot@private.orders.v3.api", "s": self.symbol, "d": {
+            "i": order.order_id, "s": self.STREAM_STATUSES[order.status], "cv": str(order.filled),
+            "ap": str(order.avg_price) if order.filled else "0"
+        }})
+
+    def balance_event(self, asset: str) -> Optional[str]:
+        return json.dumps({"c": "spot@private.account.v3.api", "d": {"a": asset, "f": str(self.venue.free(asset))}})
+
+    def env(self, http_url: str, ws_url: str) -> Dict[str, str]:
+        return {"MEXC_API_URL": f"{http_url}/api/v3", "MEXC_WS_URL": f"{ws_url}/ws",
+                "MEXC_PRIVATE_WS_URL": f"{ws_url}/ws"}
+
+    def _order(self, order: MockOrder) -> dict:
+        return {"symbol": self.symbol, "orderId": order.order_id, "status": self.STATUSES[order.status],
+                "price": str(order.price), "origQty": str(order.qty), "executedQty": str(order.filled),
+                "cummulativeQuoteQty": str(order.notional)}
+
+
+DIALECTS = {
+    "binance": BinanceDialect,
+    "bybit": BybitDialect,
+    "okx": OKXDialect,
+    "gate": GateIODialect,
+    "mexc": MEXCDialect,
+}
+
+
+def _decimals(step: float) -> int:
+    """Число знаков после запятой для шага вида 0.0001."""
+    text = f"{step:.10f}".rstrip("0")
+    return len(text.split(".")[1]) if "." in text else 0
+
+
+# Локальный HTTP/WebSocket-сервер, изображающий биржу с заданной сетевой задержкой
+class MockExchangeServer:
+    def __init__(self, dialect: Dialect, latency: float = 0.0, host: str = "127.0.0.1", port: int = 0):
+        self.dialect = dialect
+        self.venue = dialect.venue
+        self.latency = latency  # Задержка ответа на каждый REST-запрос в секундах (имитация RTT)
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+
+    @property
+    def http_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def ws_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"ws://{host}:{port}"
+
+    def env(self) -> Dict[str, str]:
+        return self.dialect.env(self.http_url, self.ws_url)
+
+    def start(self):
+        threading.Thread(target=self._server.serve_forever, name="mock-exchange", daemon=True).start()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # Keep-alive, как у настоящих бирж
+
+            def do_GET(self):
+                if self.headers.get("Upgrade", "").lower() == "websocket":
+                    server._serve_websocket(self)
+                else:
+                    server._serve_rest(self, "GET")
+
+            def do_POST(self):
+                server._serve_rest(self, "POST")
+
+            def do_PUT(self):
+                server._serve_rest(self, "PUT")
+
+            def do_DELETE(self):
+                server._serve_rest(self, "DELETE")
+
+            def do_PATCH(self):
+                server._serve_rest(self, "PATCH")
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def _serve_rest(self, handler: BaseHTTPRequestHandler, method: str):
+        url = urlsplit(handler.path)
+        length = int(handler.headers.get("Content-Length") or 0)
+        body = handler.rfile.read(length).decode("utf-8") if length else ""
+        params = _parse_params(url.query, body)
+        self.venue.count_request(self.dialect.is_order_request(method, url.path))
+        if self.latency:
+            time.sleep(self.latency)
+        try:
+            response = self.dialect.route(method, url.path, params)
+        except (KeyError, ValueError, TypeError) as e:
+            response = 400, {"code": -1, "msg": f"Bad request: {e}"}
+        status, payload = response if response is not None else (404, {"code": -1, "msg": "Not found"})
+        data = json.dumps(payload).encode("utf-8")
+        handler.send_response(status)
+        handler.send_header("Content-Type", "application/json")
+        handler.send_header("Content-Length", str(len(data)))
+        handler.end_headers()
+        handler.wfile.write(data)
+
+    def _serve_websocket(self, handler: BaseHTTPRequestHandler):
+        key = handler.headers["Sec-WebSocket-Key"]
+        accept = base64.b64encode(hashlib.sha1((key + WS_GUID).encode("ascii")).digest()).decode("ascii")
+        handler.send_response(101, "Switching Protocols")
+        handler.send_header("Upgrade", "websocket")
+        handler.send_header("Connection", "Upgrade")
+        handler.send_header("Sec-WebSocket-Accept", accept)
+        handler.end_headers()
+        handler.wfile.flush()
+        handler.close_connection = True
+
+        url = urlsplit(handler.path)
+        ws = MockWebSocket(handler, url.path, dict(parse_qsl(url.query)))
+
+        def listener(kind: str, payload):
+            if not ws.private:
+                return
+            message = self.dialect.order_event(payload) if kind == "order" else self.dialect.balance_event(payload)
+            if message:
+                ws.send(message)
+
+        self.venue.listeners.append(listener)
+        try:
+            for reply in self.dialect.on_ws_connect(ws):
+                ws.send(reply)
+            while True:
+                message = ws.receive()
+                if message is None:
+                    break
+                for reply in self.dialect.on_ws_message(ws, message):
+                    ws.send(reply)
+        except (OSError, ValueError):
+            pass
+        finally:
+            ws.closed = True
+            self.venue.listeners.remove(listener)
+
+
+def _parse_params(query: str, body: str):
+    """Параметры запроса: JSON-тело как есть (OKX и Gate шлют списки), иначе query + form-encoded тело."""
+    params = dict(parse_qsl(query))
+    if not body:
+        return params
+    try:
+        data = json.loads(body)
+    except ValueError:
+        params.update(parse_qsl(body))
+        return params
+    if isinstance(data, dict):
+        params.update(data)
+        return params
+    return data
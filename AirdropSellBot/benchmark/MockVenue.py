@@ -0,0 +1,199 @@
+import itertools
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Нормализованные статусы ордеров мок-биржи, диалекты переводят их в статусы конкретной биржи
+ORDER_OPEN = "open"
+ORDER_PARTIALLY_FILLED = "partially_filled"
+ORDER_FILLED = "filled"
+ORDER_CANCELLED = "cancelled"
+
+EPSILON = 1e-9
+
+
+class MockOrder:
+    def __init__(self, order_id: str, price: float, qty: float):
+        self.order_id = order_id
+        self.price = price
+        self.qty = qty
+        self.filled = 0.0
+        self.notional = 0.0  # Сумма сделок в котируемой валюте: цена ордера могла меняться между исполнениями
+        self.status = ORDER_OPEN
+
+    @property
+    def left(self) -> float:
+        return self.qty - self.filled
+
+    @property
+    def avg_price(self) -> float:
+        return self.notional / self.filled if self.filled else 0.0
+
+    @property
+    def active(self) -> bool:
+        return self.status in (ORDER_OPEN, ORDER_PARTIALLY_FILLED)
+
+
+# Состояние мок-биржи: статичная книга бидов, балансы, ордера и отметки времени для бенчмарка
+class MockVenue:
+    def __init__(self, base_asset: str, quote_asset: str = "USDT", best_bid: float = 1.0, levels: int = 30,
+                 level_step: float = 0.001, level_qty: float = 1000.0, tick_size: float = 0.0001,
+                 lot_size: float = 0.01, min_notional: float = 1.0, fill_ratio: float = 1.0,
+                 fill_delay: float = 0.05):
+        self.base_asset = base_asset
+        self.quote_asset = quote_asset
+        self.bids: List[Tuple[float, float]] = [(round(best_bid - i * level_step, 8), level_qty) for i in range(levels)]
+        self.book_version = 1000
+        self.tick_size = tick_size
+        self.lot_size = lot_size
+        self.min_notional = min_notional
+        self.fill_ratio = fill_ratio  # Доля объёма ордера, исполняемая книгой
+        self.fill_delay = fill_delay  # Пауза между приёмом ордера и его исполнением в секундах
+        self.balances: Dict[str, float] = {}  # Свободный баланс торгового аккаунта
+        self.locked: Dict[str, float] = {}
+        self.funding: Dict[str, float] = {}  # Отдельный Funding-аккаунт (OKX)
+        self.orders: Dict[str, MockOrder] = {}
+        self.listeners: List[Callable[[str, object], None]] = []  # Приватные WebSocket-подключения
+        self.requests = 0
+        self.order_requests = 0
+        self.deposited_at: Optional[float] = None
+        self.first_order_at: Optional[float] = None
+        self.full_fill_at: Optional[float] = None
+        self.target_qty = 0.0
+        self.sold_qty = 0.0
+        self._ids = itertools.count(1)
+        self._lock = threading.RLock()
+
+    # --- Управление сценарием ---
+
+    def deposit(self, asset: str, qty: float, funding: bool = False):
+        """Зачислить актив и запустить отсчёт: с этого момента измеряется время до ордера и исполнения."""
+        with self._lock:
+            accounts = self.funding if funding else self.balances
+            accounts[asset] = accounts.get(asset, 0.0) + qty
+            self.deposited_at = time.perf_counter()
+        if not funding:
+            self._push("balance", asset)
+
+    def set_target(self, qty: float):
+        """Объём, после продажи которого фиксируется время полного исполнения."""
+        self.target_qty = qty
+
+    def count_request(self, order_request: bool = False):
+        with self._lock:
+            self.requests += 1
+            if order_request:
+                self.order_requests += 1
+
+    # --- Торговые операции ---
+
+    def get_bids(self, depth: int) -> List[Tuple[float, float]]:
+        return self.bids[:depth]
+
+    def free(self, asset: str) -> float:
+        with self._lock:
+            return self.balances.get(asset, 0.0)
+
+    def total(self, asset: str) -> float:
+        with self._lock:
+            return self.balances.get(asset, 0.0) + self.locked.get(asset, 0.0)
+
+    def transfer_from_funding(self, asset: str, qty: float) -> bool:
+        with self._lock:
+            if self.funding.get(asset, 0.0) + EPSILON < qty:
+                return False
+            self.funding[asset] -= qty
+            self.balances[asset] = self.balances.get(asset, 0.0) + qty
+        self._push("balance", asset)
+        return True
+
+    def place(self, price: float, qty: float) -> Tuple[Optional[MockOrder], str]:
+        """Принять лимитный ордер на продажу. Возвращает (ордер, "") или (None, причина отказа)."""
+        with self._lock:
+            if qty <= 0 or price <= 0:
+                return None, "invalid"
+            if price * qty < self.min_notional:
+                return None, "min_notional"
+            if self.balances.get(self.base_asset, 0.0) + EPSILON < qty:
+                return None, "insufficient_balance"
+            self.balances[self.base_asset] -= qty
+            self.locked[self.base_asset] = self.locked.get(self.base_asset, 0.0) + qty
+            order = MockOrder(str(next(self._ids)), price, qty)
+            self.orders[order.order_id] = order
+            if self.first_order_at is None:
+                self.first_order_at = time.perf_counter()
+        threading.Timer(self.fill_delay, self._fill, [order.order_id]).start()
+        self._push("order", order)
+        self._push("balance", self.base_asset)
+        return order, ""
+
+    def cancel(self, order_id: str) -> Optional[MockOrder]:
+        """Отменить активный ордер, None — ордер не найден или уже закрыт."""
+        with self._lock:
+            order = self.orders.get(str(order_id))
+            if order is None or not order.active:
+                return None
+            order.status = ORDER_CANCELLED
+            self.locked[self.base_asset] -= order.left
+            self.balances[self.base_asset] += order.left
+        self._push("order", order)
+        self._push("balance", self.base_asset)
+        return order
+
+    def amend(self, order_id: str, price: float, qty: float) -> Tuple[Optional[MockOrder], str]:
+        """Изменить цену и полный объём активного ордера. Возвращает (ордер, "") или (None, причина отказа)."""
+        with self._lock:
+            order = self.orders.get(str(order_id))
+            if order is None or not order.active:
+                return None, "not_found"
+            if price <= 0 or qty <= order.filled + EPSILON:
+                return None, "invalid"
+            if price * (qty - order.filled) < self.min_notional:
+                return None, "min_notional"
+            delta = qty - order.qty
+            if self.balances.get(self.base_asset, 0.0) + EPSILON < delta:
+                return None, "insufficient_balance"
+            self.balances[self.base_asset] -= delta
+            self.locked[self.base_asset] += delta
+            order.price = price
+            order.qty = qty
+        threading.Timer(self.fill_delay, self._fill, [order.order_id]).start()
+        self._push("order", order)
+        self._push("balance", self.base_asset)
+        return order, ""
+
+    def cancel_all(self) -> List[MockOrder]:
+        return [order for order in map(self.cancel, self.open_order_ids()) if order]
+
+    def get_order(self, order_id: str) -> Optional[MockOrder]:
+        with self._lock:
+            return self.orders.get(str(order_id))
+
+    def open_order_ids(self) -> List[str]:
+        with self._lock:
+            return [order.order_id for order in self.orders.values() if order.active]
+
+    def _fill(self, order_id: str):
+        with self._lock:
+            order = self.orders[order_id]
+            if not order.active:
+                return
+            # Исполняется не больше, чем стоит бидов не хуже цены ордера, и не больше доли fill_ratio
+            executable = sum(qty for price, qty in self.bids if price >= order.price - EPSILON)
+            fill_qty = min(order.left, executable, order.qty * self.fill_ratio - order.filled)
+            if fill_qty <= EPSILON:
+                return
+            order.filled += fill_qty
+            order.notional += fill_qty * order.price
+            order.status = ORDER_FILLED if order.left <= EPSILON else ORDER_PARTIALLY_FILLED
+            self.locked[self.base_asset] -= fill_qty
+            self.balances[self.quote_asset] = self.balances.get(self.quote_asset, 0.0) + fill_qty * order.price
+            self.sold_qty += fill_qty
+            if self.full_fill_at is None and self.target_qty and self.sold_qty + EPSILON >= self.target_qty:
+                self.full_fill_at = time.perf_counter()
+        self._push("order", order)
+        self._push("balance", self.quote_asset)
+
+    def _push(self, kind: str, payload):
+        for listener in list(self.listeners):
+            listener(kind, payload)
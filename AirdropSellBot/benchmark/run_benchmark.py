@@ -0,0 +1,259 @@
+"""
+Бенчмарк limit_sell против локальной мок-биржи.
+
+Для каждой биржи поднимается HTTP/WebSocket-сервер с диалектом её API, настоящий адаптер направляется
+на него через переменные <PREFIX>_API_URL / _WS_URL / _PRIVATE_WS_URL, и запускается limit_sell.
+После того как бот ждёт поступления, мок зачисляет токены и замеряет:
+    - time-to-first-order: от зачисления до приёма первого ордера сервером;
+    - time-to-full-fill: от зачисления до исполнения всего объёма;
+    - число циклов лестницы и запросов к бирже после зачисления.
+
+Запуск из каталога AirdropSellBot:
+    python -m benchmark.run_benchmark --venues binance okx --latency-ms 30 --runs 3
+    python -m benchmark.run_benchmark --async  # то же на AsyncExchange-адаптерах
+    python -m benchmark.run_benchmark --listing-in 10  # токены уже на счёте, времена — от открытия торгов
+    python -m benchmark.run_benchmark --multi  # один объём на всех биржах сразу через case.MultiExchangeSell
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from statistics import median
+
+from loguru import logger
+
+import bootstrap
+from benchmark.MockExchangeServer import DIALECTS, MockExchangeServer
+from benchmark.MockVenue import MockVenue
+from case import AsyncLimitSell, LimitSell, MultiExchangeSell
+from case.ListingSchedule import ListingSchedule
+from config import ASSERT_OUT
+from exchange.Registry import exchange_class, exchange_names
+
+
+def start_venue(venue_name: str, args, best_bid: float = 1.0):
+    """Мок-биржа с сервером её диалекта и настоящий адаптер, направленный на него."""
+    venue = MockVenue(args.asset, ASSERT_OUT, best_bid=best_bid, fill_ratio=args.fill_ratio,
+                      fill_delay=args.fill_delay_ms / 1000)
+    dialect = DIALECTS[venue_name](venue, "")
+    server = MockExchangeServer(dialect, latency=args.latency_ms / 1000)
+    server.start()
+
+    adapter = exchange_class(venue_name, args.use_async)
+    os.environ.update(server.env())
+    os.environ.setdefault(f"{adapter.ENV_PREFIX}_API_KEY", "mock")
+    os.environ.setdefault(f"{adapter.ENV_PREFIX}_API_SECRET", "mock")
+    exchange = adapter()
+    dialect.symbol = exchange.create_symbol(args.asset, ASSERT_OUT)
+    return venue, dialect, server, exchange
+
+
+def run_once(venue_name: str, args) -> dict:
+    """Один прогон limit_sell на мок-бирже, времена в миллисекундах."""
+    venue, dialect, server, exchange = start_venue(venue_name, args)
+
+    # С --listing-in токены зачислены заранее, а отсчёт идёт от открытия торгов по расписанию
+    listing = None
+    if args.listing_in:
+        listing = ListingSchedule(int((time.time() + args.listing_in) * 1000), burst_window=args.listing_in / 2)
+        opens_at = time.perf_counter() + args.listing_in
+
+    cycles = []
+    place_sell_orders = exchange.place_sell_orders
+
+    if args.use_async:
+        async def counted_place_sell_orders(symbol, orders):
+            cycles.append(len(orders))
+            return await place_sell_orders(symbol, orders)
+
+        async def sell():
+            try:
+                symbol_info = await exchange.get_symbol_info(dialect.symbol)
+                venue.set_target(symbol_info.round_quantity(args.quantity))
+                await AsyncLimitSell.limit_sell(exchange, 1.0, args.asset, listing)
+            finally:
+                await exchange.close()
+
+        def target():
+            asyncio.run(sell())
+    else:
+        def counted_place_sell_orders(symbol, orders):
+            cycles.append(len(orders))
+            return place_sell_orders(symbol, orders)
+
+        venue.set_target(exchange.get_symbol_info(dialect.symbol).round_quantity(args.quantity))
+        def target():
+            LimitSell.limit_sell(exchange, 1.0, args.asset, listing)
+
+    exchange.place_sell_orders = counted_place_sell_orders
+
+    worker = threading.Thread(target=target, name=f"bench-{venue_name}", daemon=True)
+    worker.start()
+    if listing is None:
+        # Бот успевает подключить потоки и прогреть соединения до зачисления, как в реальном сценарии
+        time.sleep(args.settle)
+        requests_before = venue.requests
+        dialect.deposit(args.asset, args.quantity)
+        started_at = venue.deposited_at
+    else:
+        while not venue.target_qty:  # Асинхронный прогон задаёт объём уже в своём цикле событий
+            time.sleep(0.01)
+        dialect.deposit(args.asset, args.quantity)
+        requests_before = venue.requests
+        started_at = opens_at
+    worker.join(args.timeout + (args.listing_in or 0))
+    finished_at = time.perf_counter()
+    server.stop()
+
+    def since_deposit(moment):
+        return round((moment - started_at) * 1000, 2) if moment else None
+
+    return {
+        "venue": venue_name,
+        "completed": not worker.is_alive(),
+        "time_to_first_order_ms": since_deposit(venue.first_order_at),
+        "time_to_full_fill_ms": since_deposit(venue.full_fill_at),
+        "total_ms": since_deposit(finished_at) if not worker.is_alive() else None,
+        "ladder_cycles": len(cycles),
+        "orders_placed": sum(cycles),
+        "requests_after_deposit": venue.requests - requests_before,
+        "order_requests": venue.order_requests,
+        "sold_qty": round(venue.sold_qty, 8),
+    }
+
+
+def run_multi(args) -> dict:
+    """
+    Один прогон multi_limit_sell сразу на всех выбранных мок-биржах: объём делится между ними поровну,
+    книги смещены на шаг цены друг от друга, чтобы сводной лестнице было что выбирать.
+    """
+    started = [start_venue(venue_name, args, best_bid=1.0 - i * 0.002) for i, venue_name in enumerate(args.venues)]
+    venues = [venue for venue, _, _, _ in started]
+    worker = threading.Thread(target=MultiExchangeSell.multi_limit_sell, name="bench-multi", daemon=True,
+                              args=([exchange for _, _, _, exchange in started], 1.0, args.asset))
+    worker.start()
+    time.sleep(args.settle)
+    requests_before = sum(venue.requests for venue in venues)
+    for _, dialect, _, _ in started:
+        dialect.deposit(args.asset, args.quantity / len(started))
+    started_at = min(venue.deposited_at for venue in venues)
+    worker.join(args.timeout)
+    finished_at = time.perf_counter()
+    for _, _, server, _ in started:
+        server.stop()
+
+    first_orders = [venue.first_order_at for venue in venues if venue.first_order_at]
+    sold_qty = sum(venue.sold_qty for venue in venues)
+    proceeds = sum(venue.balances.get(ASSERT_OUT, 0.0) for venue in venues)
+    return {
+        "venue": "+".join(args.venues),
+        "completed": not worker.is_alive(),
+        "time_to_first_order_ms": round((min(first_orders) - started_at) * 1000, 2) if first_orders else None,
+        "total_ms": round((finished_at - started_at) * 1000, 2) if not worker.is_alive() else None,
+        "requests_after_deposit": sum(venue.requests for venue in venues) - requests_before,
+        "order_requests": sum(venue.order_requests for venue in venues),
+        "sold_qty": round(sold_qty, 8),
+        "avg_price": round(proceeds / sold_qty, 8) if sold_qty else None,
+        "sold_by_venue": {name: round(venue.sold_qty, 8) for name, venue in zip(args.venues, venues)},
+    }
+
+
+def summarize(results: list) -> dict:
+    """Медианы по прогонам одной биржи."""
+    summary = {"venue": results[0]["venue"], "runs": len(results),
+               "completed": sum(result["completed"] for result in results)}
+    for key in ("time_to_first_order_ms", "time_to_full_fill_ms", "total_ms", "ladder_cycles",
+                "orders_placed", "requests_after_deposit", "order_requests"):
+        values = [result[key] for result in results if result[key] is not None]
+        summary[key] = median(values) if values else None
+    return summary
+
+
+def print_table(summaries: list):
+    columns = ("venue", "completed", "time_to_first_order_ms", "time_to_full_fill_ms", "total_ms",
+               "ladder_cycles", "requests_after_deposit", "order_requests")
+    print(" | ".join(columns))
+    for summary in summaries:
+        print(" | ".join(str(summary[column]) for column in columns))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Бенчмарк limit_sell на локальной мок-бирже")
+    parser.add_argument("--venues", nargs="+", choices=sorted(exchange_names()), default=sorted(exchange_names()))
+    parser.add_argument("--runs", type=int, default=1, help="Прогонов на биржу, в отчёте медиана")
+    parser.add_argument("--asset", default="BENCH", help="Тикер продаваемого токена на мок-бирже")
+    parser.add_argument("--quantity", type=float, default=500.0, help="Сколько токенов зачислить")
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="Задержка ответа на REST-запрос")
+    parser.add_argument("--fill-ratio", type=float, default=1.0, help="Доля объёма ордера, которую исполняет книга")
+    parser.add_argument("--fill-delay-ms", type=float, default=50.0, help="Пауза от приёма ордера до исполнения")
+    parser.add_argument("--fill-timeout", type=float, default=LimitSell.ORDER_FILL_TIMEOUT,
+                        help="ORDER_FILL_TIMEOUT для прогона, секунды")
+    parser.add_argument("--async", dest="use_async", action="store_true",
+                        help="AsyncExchange-адаптеры на aiohttp и case.AsyncLimitSell")
+    parser.add_argument("--multi", action="store_true",
+                        help="Продавать объём на всех выбранных биржах одновременно через case.MultiExchangeSell")
+    parser.add_argument("--no-depth-stream", action="store_true", help="Биды только через REST")
+    parser.add_argument("--no-user-stream", action="store_true", help="Статусы ордеров только опросом")
+    parser.add_argument("--settle", type=float, default=2.0, help="Пауза перед зачислением, секунды")
+    parser.add_argument("--listing-in", type=float, help="Листинг по расписанию через столько секунд: токены "
+                                                         "зачисляются заранее, времена считаются от открытия")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Лимит времени на прогон, секунды")
+    parser.add_argument("--workdir", help="Каталог для trade.log, метрик и кэша метаданных прогона")
+    parser.add_argument("--output", help="Сохранить результаты в JSON")
+    parser.add_argument("--verbose", action="store_true", help="Показывать вывод limit_sell")
+    parser.add_argument("--log-level", default="WARNING")
+    args = parser.parse_args()
+    if args.multi and args.use_async:
+        parser.error("--multi работает только с синхронными адаптерами")
+    return args
+
+
+def main():
+    args = parse_args()
+    logger.remove(0)  # trade.log и счётчик ошибок метрик добавляет bootstrap.setup уже в рабочем каталоге прогона
+    logger.add(sys.stderr, level=args.log_level)
+
+    for module in (LimitSell, AsyncLimitSell, MultiExchangeSell):
+        module.ORDER_FILL_TIMEOUT = args.fill_timeout
+        module.USE_DEPTH_STREAM = not args.no_depth_stream
+        module.USE_USER_STREAM = not args.no_user_stream
+    # Метрики и кэш метаданных мок-пар не должны попасть в рабочие файлы бота
+    output = os.path.abspath(args.output) if args.output else None
+    workdir = args.workdir or tempfile.mkdtemp(prefix="sellbot-bench-")
+    os.makedirs(workdir, exist_ok=True)
+    os.chdir(workdir)
+    bootstrap.setup(console=False)
+
+    results, summaries = [], []
+    bot_output = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+    if args.multi:
+        with bot_output:
+            result = run_multi(args)
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+        print(f"Рабочий каталог прогона: {workdir}")
+        if output:
+            with open(output, "w", encoding="utf-8") as f:
+                json.dump({"args": vars(args), "runs": [result]}, f, indent=2)
+        return
+
+    with bot_output:
+        for venue_name in args.venues:
+            runs = [run_once(venue_name, args) for _ in range(args.runs)]
+            results.extend(runs)
+            summaries.append(summarize(runs))
+
+    print_table(summaries)
+    print(f"Рабочий каталог прогона: {workdir}")
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump({"args": vars(args), "summary": summaries, "runs": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+Репетиция листинга и профилирование цикла продажи на SimulatedExchange, без сети.
+
+Рынок раз в --flow-ms заменяет книгу бидов новым снапшотом (случайное блуждание цены), бот ждёт
+зачисления и продаёт через limit_sell. С --profile цикл запускается под cProfile, с --stress
+отдельно замеряется пропускная способность движка сопоставления.
+
+Запуск из каталога AirdropSellBot:
+    python -m benchmark.simulate_listing --quantity 5000 --profile
+"""
+import argparse
+import contextlib
+import cProfile
+import io
+import os
+import pstats
+import random
+import sys
+import tempfile
+import threading
+import time
+
+from loguru import logger
+
+from case import LimitSell
+from config import ASSERT_OUT
+from exchange.SimulatedExchange import SimulatedExchange
+from exchange.SymbolInfo import SymbolInfo
+from metrics.ExchangeMetrics import count_logged_errors
+
+
+def make_bids(best_bid: float, levels: int, step: float, level_qty: float):
+    return [(round(best_bid - i * step, 6), level_qty * random.uniform(0.5, 1.5)) for i in range(levels)]
+
+
+def run_market(exchange: SimulatedExchange, symbol: str, args, stop: threading.Event):
+    """Поток рынка: новые снапшоты бидов с дрейфом цены."""
+    best_bid = args.price
+    while not stop.wait(args.flow_ms / 1000):
+        best_bid = max(best_bid * (1 + random.gauss(args.drift, args.volatility)), args.tick * args.levels * 2)
+        exchange.set_bids(symbol, make_bids(best_bid, args.levels, args.tick * 10, args.level_qty))
+
+
+def stress(args):
+    """Пропускная способность: выставление и отмена ордеров в памяти."""
+    exchange = SimulatedExchange()
+    symbol = exchange.add_market("STRESS", ASSERT_OUT, make_bids(1.0, 100, 0.001, 1e6))
+    exchange.deposit("STRESS", float(args.stress))
+    started = time.perf_counter()
+    order_ids = exchange.place_sell_orders(symbol, [(round(2.0 + i * 1e-4, 4), 1.0) for i in range(args.stress)])
+    placed = time.perf_counter()
+    exchange.cancel_orders(symbol, order_ids)
+    cancelled = time.perf_counter()
+    print(f"Выставлено {len(order_ids)} ордеров: {len(order_ids) / (placed - started):.0f} ордеров/с, "
+          f"отмена: {len(order_ids) / (cancelled - placed):.0f} ордеров/с")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Репетиция листинга на SimulatedExchange")
+    parser.add_argument("--asset", default="SIM")
+    parser.add_argument("--quantity", type=float, default=1000.0, help="Сколько токенов зачислить")
+    parser.add_argument("--price", type=float, default=1.0, help="Лучший бид на старте")
+    parser.add_argument("--levels", type=int, default=50, help="Уровней бидов в снапшоте")
+    parser.add_argument("--level-qty", type=float, default=100.0, help="Средний объём уровня")
+    parser.add_argument("--tick", type=float, default=0.0001)
+    parser.add_argument("--lot", type=float, default=0.01)
+    parser.add_argument("--flow-ms", type=float, default=100.0, help="Интервал обновления книги")
+    parser.add_argument("--drift", type=float, default=-0.002, help="Средний сдвиг цены за обновление")
+    parser.add_argument("--volatility", type=float, default=0.01)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Имитация задержки запроса")
+    parser.add_argument("--fill-timeout", type=float, default=0.2, help="ORDER_FILL_TIMEOUT для прогона")
+    parser.add_argument("--deposit-after", type=float, default=0.5, help="Через сколько секунд зачислить токены")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Лимит времени на продажу, секунды")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--profile", action="store_true", help="Запустить limit_sell под cProfile")
+    parser.add_argument("--stress", type=int, default=0, help="Только замер движка на N ордерах")
+    parser.add_argument("--verbose", action="store_true", help="Показывать вывод limit_sell")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    random.seed(args.seed)
+    logger.remove(0)
+    logger.add(sys.stderr, level="WARNING")
+    count_logged_errors()  # bootstrap.setup здесь не вызывается, а ошибки попадают в метрики прогона
+    if args.stress:
+        stress(args)
+        return
+
+    LimitSell.ORDER_FILL_TIMEOUT = args.fill_timeout
+    os.chdir(tempfile.mkdtemp(prefix="sellbot-sim-"))  # Метрики прогона не смешиваются с рабочими
+
+    exchange = SimulatedExchange(latency=args.latency_ms / 1000)
+    symbol = exchange.add_market(args.asset, ASSERT_OUT,
+                                 make_bids(args.price, args.levels, args.tick * 10, args.level_qty),
+                                 SymbolInfo(tick_size=args.tick, lot_size=args.lot, min_qty=args.lot))
+    stop = threading.Event()
+    threading.Thread(target=run_market, args=(exchange, symbol, args, stop), daemon=True).start()
+    threading.Timer(args.deposit_after, exchange.deposit, (args.asset, args.quantity)).start()
+
+    profiler = cProfile.Profile() if args.profile else None
+
+    def sell():
+        if profiler:
+            profiler.enable()
+        try:
+            LimitSell.limit_sell(exchange, 1.0, args.asset)
+        finally:
+            if profiler:
+                profiler.disable()
+
+    worker = threading.Thread(target=sell, name="sim-sell", daemon=True)
+    bot_output = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+    started = time.perf_counter()
+    with bot_output:
+        worker.start()
+        worker.join(args.timeout)
+    elapsed = time.perf_counter() - started - args.deposit_after
+    stop.set()
+    if worker.is_alive():
+        print(f"limit_sell не завершился за {args.timeout} с")
+
+    proceeds = exchange.get_balance(ASSERT_OUT)
+    sold = args.quantity - exchange.get_balance(args.asset)
+    print(f"Продано {sold:.4f} {args.asset} за {elapsed * 1000:.1f} мс после зачисления, "
+          f"выручка {proceeds:.4f} {ASSERT_OUT}, средняя цена {proceeds / sold if sold else 0:.6f}, "
+          f"ордеров: {len(exchange.orders)}")
+    if profiler and not worker.is_alive():
+        pstats.Stats(profiler).sort_stats("cumulative").print_stats(25)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+# Общая настройка процесса: переменные из .env, логи и журнал сделок подключаются один раз, до создания адаптеров
+import sys
+
+from dotenv import load_dotenv
+from loguru import logger
+
+from config import TRADE_LOG_FILE, LOG_LEVEL, TRADE_JOURNAL_FILE
+from metrics.ExchangeMetrics import count_logged_errors
+from metrics.TradeJournal import trade_journal
+
+_ready = False
+
+
+def setup(log_file: str = TRADE_LOG_FILE, console: bool = True):
+    """
+    Загрузить .env, добавить файловый лог и счётчик ошибок метрик, открыть журнал сделок. Повторный вызов ничего не делает.
+    Файловый лог пишется из фонового потока (enqueue), сообщения ниже LOG_LEVEL не форматируются вовсе.
+    console=False — консольный вывод настраивает вызывающий (бенчмарки).
+    """
+    global _ready
+    if _ready:
+        return
+    _ready = True
+    load_dotenv()
+    if console:
+        try:
+            logger.remove(0)  # Стандартный вывод loguru в stderr пишет и DEBUG
+        except ValueError:
+            pass
+        logger.add(sys.stderr, level=LOG_LEVEL)
+    logger.add(log_file, rotation="1 MB", level=LOG_LEVEL, enqueue=True)
+    count_logged_errors()
+    if TRADE_JOURNAL_FILE:
+        trade_journal.open(TRADE_JOURNAL_FILE)
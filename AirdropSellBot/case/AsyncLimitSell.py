@@ -0,0 +1,304 @@
+import asyncio
+import time
+from typing import Dict, List, Optional, Tuple
+
+from case.ListingSchedule import ListingSchedule
+from case.PositionLedger import PositionLedger
+from config import ASSERT_OUT, USE_DEPTH_STREAM, USE_USER_STREAM, ORDER_FILL_TIMEOUT, DELAY_BETWEEN_RETRIES, \
+    BALANCE_POLL_MIN_INTERVAL, BALANCE_POLL_MAX_INTERVAL, METRICS_FILE, METRICS_FORMAT, RECORD_DEPTH, DEPTH_RECORD_DIR, \
+    LISTING_BURST_POLL_INTERVAL, LISTING_CLOCK_SAMPLES, REQUOTE_WITH_AMEND
+from exchange.OrderState import OrderState
+from exchange.SymbolInfo import SymbolInfo
+from metrics.ExchangeMetrics import exchange_metrics, exchange_name, instrument
+from metrics.TradeJournal import trade_journal
+from stream.DepthRecorder import DepthRecorder
+
+
+# Асинхронный вариант case.LimitSell для AsyncExchange: независимые запросы цикла идут одновременно
+
+
+async def place_ladder(exchange, symbol: str, sell_orders: List[Tuple[float, float]]) -> List[Tuple[str, float, float]]:
+    """Отправить всю лестницу, вернуть успешно выставленные ордера (order_id, price, qty)."""
+    started = time.perf_counter()
+    order_ids = await exchange.place_sell_orders(symbol, sell_orders)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+
+    active_orders: List[Tuple[str, float, float]] = []
+    venue = exchange_name(exchange)
+    for order_id, (price, qty) in zip(order_ids, sell_orders):
+        trade_journal.order(venue, symbol, order_id or None, price, qty)
+        if order_id:
+            print(f"Ордер выставлен: {order_id}, цена: {price}, объём: {qty}")
+            active_orders.append((order_id, price, qty))
+        else:
+            print(f"Не удалось выставить ордер для цены {price}, объёма {qty}")
+    # Время каждого пакета или ордера лестницы — в exchange_metrics (place_sell_orders_batch, place_sell_order)
+    print(f"Лестница из {len(sell_orders)} ордеров выставлена за {elapsed_ms:.1f} мс")
+    return active_orders
+
+
+async def requote_ladder(exchange, symbol: str, resting: List[Tuple[str, float, float]],
+                         sell_orders: List[Tuple[float, float]], ledger: PositionLedger) -> List[Tuple[str, float, float]]:
+    """Перенести ордера из книги на новую лестницу через amend, см. case.LimitSell.requote_ladder."""
+    started = time.perf_counter()
+    resting = sorted(resting, key=lambda order: order[1], reverse=True)
+    paired = min(len(resting), len(sell_orders))
+
+    amendments, unchanged, levels = [], [], []
+    for order, (price, qty) in zip(resting, sell_orders):
+        if (order[1], order[2]) == (price, qty):
+            unchanged.append(order)
+        else:
+            amendments.append((order[0], price, ledger.filled_qty(order[0]) + qty))
+            levels.append((price, qty))
+    amended = await exchange.amend_orders(symbol, amendments) if amendments else []
+    active_orders = list(unchanged)
+    for (order_id, price, _), (_, qty), ok in zip(amendments, levels, amended):
+        trade_journal.amend(exchange_name(exchange), symbol, order_id, price, qty, ok)
+        if ok:
+            ledger.amended(order_id, qty)
+            active_orders.append((order_id, price, qty))
+            print(f"Ордер {order_id} перенесён: цена: {price}, объём: {qty}")
+
+    stale = [order_id for (order_id, _, _), ok in zip(amendments, amended) if not ok]
+    stale += [order_id for order_id, _, _ in resting[paired:]]
+    sold = 0.0
+    if stale:
+        trade_journal.cancel(exchange_name(exchange), symbol, stale)
+        await exchange.cancel_orders(symbol, stale)
+        prices = {order_id: price for order_id, price, _ in resting}
+        for order_id, state in (await exchange.get_order_states(symbol, stale)).items():
+            sold += ledger.apply(state, prices[order_id])
+            trade_journal.fill(exchange_name(exchange), symbol, state)
+            if state.filled:
+                print(f"Ордер {order_id} выполнен")
+
+    # Проданное до переноса снимается с самых дешёвых из выставляемых заново уровней
+    to_place = [level for level, ok in zip(levels, amended) if not ok] + list(sell_orders[paired:])
+    excess = sold
+    for i in range(len(to_place) - 1, -1, -1):
+        if excess <= 0:
+            break
+        price, qty = to_place[i]
+        to_place[i] = (price, max(qty - excess, 0.0))
+        excess -= qty
+    to_place = await exchange.normalize_orders(symbol, [(price, qty) for price, qty in to_place if qty > 0])
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    print(f"Лестница перенесена за {elapsed_ms:.1f} мс: изменено {sum(amended)}, без изменений {len(unchanged)}, "
+          f"снято {len(stale)}, новых уровней {len(to_place)}")
+    if to_place:
+        placed = await place_ladder(exchange, symbol, to_place)
+        for order_id, _, qty in placed:
+            ledger.placed(order_id, qty)
+        active_orders += placed
+    return active_orders
+
+
+async def settle_orders(exchange, symbol: str, order_ids: List[str], unfilled: List[str],
+                        cancel: bool) -> Dict[str, OrderState]:
+    """Отменить неисполненные (если cancel) и вернуть накопленное исполнение всех ордеров лестницы."""
+    if cancel and unfilled:
+        trade_journal.cancel(exchange_name(exchange), symbol, unfilled)
+        await exchange.cancel_orders(symbol, unfilled)
+    return await exchange.get_order_states(symbol, order_ids, settled=cancel)
+
+
+async def wait_for_deposit(exchange, asset: str, min_interval: float = BALANCE_POLL_MIN_INTERVAL) -> float:
+    """Вернуть баланс, как только он становится ненулевым (событие потока или REST-опрос)."""
+    poll_interval = min_interval
+    while True:
+        balance = await exchange.get_balance(asset, True)
+        print(f"Текущий баланс {asset}: {balance}")
+        if balance > 0:
+            return balance
+
+        if exchange.balance_stream_live():
+            poll_interval = min(poll_interval * 2, BALANCE_POLL_MAX_INTERVAL)
+        else:
+            poll_interval = min_interval
+        print(f"Баланс {asset} равен 0, ждём поступления (опрос через {poll_interval} с)...")
+
+        streamed_balance = await exchange.wait_for_balance(asset, poll_interval)
+        if streamed_balance and exchange.DEPOSITS_PUSHED:
+            print(f"Поступление {asset} из потока: {streamed_balance}")
+            return streamed_balance
+
+
+async def prepare_listing(exchange, symbol: str, asset: str, listing: ListingSchedule) -> Tuple[SymbolInfo, float]:
+    """Простой до burst-окна, затем калибровка часов и одновременно прогрев, проверка пары и баланса."""
+    await exchange.sync_clock()
+    print(f"Листинг {symbol} через {listing.seconds_to_open(exchange.clock):.0f} с, ждём burst-окна")
+    while True:
+        idle = listing.idle_sleep(exchange.clock)
+        if idle <= 0:
+            break
+        await asyncio.sleep(idle)
+        await exchange.sync_clock()
+
+    print(f"Burst-окно: до открытия {listing.seconds_to_open(exchange.clock):.1f} с")
+    # Замеры времени идут по одному: параллельные запросы исказили бы задержку
+    await exchange.sync_clock(LISTING_CLOCK_SAMPLES)
+    _, symbol_info, balance = await asyncio.gather(
+        exchange.warm_up(), exchange.refresh_symbol_info(symbol), exchange.get_balance(asset, True))
+    while symbol_info is None and listing.seconds_to_open(exchange.clock) > DELAY_BETWEEN_RETRIES:
+        await asyncio.sleep(DELAY_BETWEEN_RETRIES)
+        symbol_info = await exchange.refresh_symbol_info(symbol)
+    if symbol_info is None:
+        print(f"Пара {symbol} не найдена до открытия, используем ограничения из кэша")
+        symbol_info = await exchange.get_symbol_info(symbol)
+    print(f"Пара {symbol} проверена, баланс {asset}: {balance}")
+    return symbol_info, balance
+
+
+async def limit_sell(exchange, sell_percentage: float, asset: str, listing: Optional[ListingSchedule] = None) -> None:
+    """
+    Основная функция лимитной продажи для AsyncExchange.
+
+    Args:
+        exchange: Инстанс асинхронной биржи (например, AsyncBinanceExchange)
+        sell_percentage: Процент от баланса для продажи (0.0 - 1.0)
+        asset: Символ токена (например, "BTC")
+        listing: Время листинга; None — начать сразу
+    """
+    if not 0 <= sell_percentage <= 1:
+        print(f"Ошибка: Процент должен быть между 0 и 1, получено {sell_percentage}")
+        return
+
+    exchange = instrument(exchange)
+    symbol = exchange.create_symbol(asset, ASSERT_OUT)
+
+    print(f"Запуск лимитной продажи {sell_percentage * 100}% токенов {asset} на {symbol}")
+
+    balance = None
+    if listing is not None:
+        symbol_info, balance = await prepare_listing(exchange, symbol, asset, listing)
+
+    recorder = None
+    if USE_DEPTH_STREAM:
+        depth_stream = exchange.start_depth_stream(symbol)
+        if RECORD_DEPTH:
+            recorder = DepthRecorder.for_symbol(DEPTH_RECORD_DIR, exchange_name(exchange), symbol)
+            recorder.attach(depth_stream.book)
+    if USE_USER_STREAM:
+        exchange.start_user_stream()
+    exchange.start_heartbeat()
+
+    if listing is None:
+        # Метаданные пары и первый прогрев соединений — одновременно, до поступления токенов
+        symbol_info, _ = await asyncio.gather(exchange.get_symbol_info(symbol), exchange.warm_up())
+    print(f"Ограничения пары {symbol}: {symbol_info}")
+
+    try:
+        if listing is not None:
+            await listing.wait_for_open_async(exchange.clock)
+        await _sell_loop(exchange, symbol, sell_percentage, asset, listing, balance)
+    except (KeyboardInterrupt, asyncio.CancelledError):
+        print(f"Остановка: отменяем все открытые ордера по {symbol}")
+        await exchange.cancel_all_orders(symbol)
+        raise
+    finally:
+        exchange.stop_depth_stream()
+        if recorder is not None:
+            recorder.close()
+        exchange.stop_user_stream()
+        exchange.stop_heartbeat()
+        exchange_metrics.dump(METRICS_FILE, METRICS_FORMAT)
+
+
+def _retry_delay(exchange, listing: Optional[ListingSchedule]) -> float:
+    return listing.retry_delay(exchange.clock) if listing is not None else DELAY_BETWEEN_RETRIES
+
+
+async def _sell_loop(exchange, symbol: str, sell_percentage: float, asset: str,
+                     listing: Optional[ListingSchedule] = None, balance: Optional[float] = None) -> None:
+    # Неисполненные ордера не отменяются, а переносятся на следующую лестницу через amend
+    amend_mode = REQUOTE_WITH_AMEND and exchange.SUPPORTS_AMEND
+    while True:
+        # Шаг 1: Ожидание ненулевого баланса (к листингу он уже запрошен в burst-окне)
+        if not balance:
+            in_burst = listing is not None and listing.in_burst(exchange.clock)
+            balance = await wait_for_deposit(exchange, asset,
+                                             LISTING_BURST_POLL_INTERVAL if in_burst else BALANCE_POLL_MIN_INTERVAL)
+
+        # Шаг 2: Количество для продажи; биды запрашиваются одновременно с метаданными
+        symbol_info, bids = await asyncio.gather(exchange.get_symbol_info(symbol), exchange.get_bids(symbol))
+        sell_quantity = symbol_info.round_quantity(balance * sell_percentage)
+        print(f"Количество для продажи: {sell_quantity} {asset}")
+
+        # Шаг 3: Основной цикл продажи. Остаток считается по фактическим исполнениям ордеров
+        ledger = PositionLedger(sell_quantity)
+        resting: List[Tuple[str, float, float]] = []  # Ордера, оставшиеся в книге (order_id, price, qty)
+
+        while ledger.remaining >= symbol_info.min_sell_quantity():
+            # 3.1: Лестница по бидам, полученным заранее (на первом цикле — вместе с метаданными)
+            sell_orders = symbol_info.normalize_orders(
+                await exchange.calculate_sell_orders(symbol, ledger.remaining, bids))
+            bids = None
+            if not sell_orders:
+                delay = _retry_delay(exchange, listing)
+                print(f"Не удалось рассчитать ордера, ждём {delay} с")
+                exchange_metrics.record_retry(exchange_name(exchange), "calculate_sell_orders")
+                await asyncio.sleep(delay)
+                continue
+
+            # 3.2: Выставление всей лестницы или перенос оставшихся в книге ордеров
+            if resting and amend_mode:
+                active_orders = await requote_ladder(exchange, symbol, resting, sell_orders, ledger)
+            else:
+                active_orders = await place_ladder(exchange, symbol, sell_orders)
+                for order_id, _, qty in active_orders:
+                    ledger.placed(order_id, qty)
+                # Ордера, которые не удалось отменить в прошлом цикле, снимаются и учитываются вместе с новыми
+                active_orders += resting
+            resting = []
+
+            if not active_orders:
+                print("Все ордера провалились, повторяем")
+                exchange_metrics.record_retry(exchange_name(exchange), "place_sell_orders")
+                await asyncio.sleep(_retry_delay(exchange, listing))
+                continue
+            if listing is not None:
+                listing.record_first_order(exchange)
+
+            # 3.3: Ожидание исполнения: до ORDER_FILL_TIMEOUT или пока не исполнится вся лестница
+            order_ids = [order_id for order_id, _, _ in active_orders]
+            filled = await exchange.wait_for_fills(symbol, order_ids, ORDER_FILL_TIMEOUT)
+
+            # 3.4: Отмена неисполненных с учётом исполнений и биды для следующей лестницы — одновременно.
+            # В режиме amend неисполненные остаются в книге до следующей лестницы
+            unfilled = [order_id for order_id in order_ids if order_id not in filled]
+            bids, states = await asyncio.gather(
+                exchange.get_bids(symbol), settle_orders(exchange, symbol, order_ids, unfilled, not amend_mode))
+            for order_id, price, qty in active_orders:
+                state = states.get(order_id)
+                if state is not None:
+                    ledger.apply(state, price)
+                    trade_journal.fill(exchange_name(exchange), symbol, state)
+                if state is not None and state.filled:
+                    print(f"Ордер {order_id} выполнен")
+                elif state is not None and not state.active:
+                    print(f"Ордер {order_id} отменён, исполнено {state.filled_qty} из {qty}")
+                else:
+                    open_qty = ledger.open_qty(order_id)
+                    print(f"Ордер {order_id} не выполнен, в книге {open_qty}"
+                          + (", будет перенесён" if amend_mode else ", не удалось отменить"))
+                    resting.append((order_id, price, open_qty))
+
+            # 3.5: Проверка результата
+            print(f"Продано: {ledger.sold} по средней цене {ledger.avg_price:.8g}, "
+                  f"осталось продать: {ledger.remaining}")
+
+            # Остаток, из которого нельзя собрать ордер даже по лучшей цене лестницы, — пыль, его не продать
+            best_price = max(price for _, price, _ in active_orders)
+            if not symbol_info.is_valid(best_price, ledger.remaining):
+                if resting:
+                    await exchange.cancel_orders(symbol, [order_id for order_id, _, _ in resting])
+                print("Все токены успешно проданы!")
+                usdt_balance = await exchange.get_balance(ASSERT_OUT, False)
+                print(f"Текущий баланс {ASSERT_OUT}: {usdt_balance}")
+                return
+            else:
+                print(f"Осталось продать {ledger.remaining} {asset}, пересчитываем")
+        if resting:
+            await exchange.cancel_orders(symbol, [order_id for order_id, _, _ in resting])
+        balance = None
@@ -1,27 +1,173 @@
 import time
-from typing import List, Tuple
-import requests
-from requests.adapters import HTTPAdapter
-from urllib3 import Retry
-
-from config import ROUNDING_PRECISION, ASSERT_OUT
-
-
-# Настройка глобального HTTP-клиента
-def setup_requests_retries(max_retries=3, backoff_factor=1, timeout=10):
-    session = requests.Session()
-    retries = Retry(
-        total=max_retries,  # Максимальное количество повторов
-        backoff_factor=backoff_factor,  # Задержка между повторами (1 сек, 2 сек, 4 сек и т.д.)
-        status_forcelist=[500, 502, 503, 504],  # Коды ошибок для повтора
-        allowed_methods=["GET", "POST"]  # Методы, для которых применяются повторы
-    )
-    adapter = HTTPAdapter(max_retries=retries)
-    session.mount("https://", adapter)
-    session.timeout = timeout  # Устанавливаем таймаут для всех запросов
-    # Привязываем настроенную сессию к requests
-    requests.sessions.HTTPAdapter = lambda self, *args, **kwargs: adapter
-    return session
+from typing import List, Optional, Tuple
+
+from case.ListingSchedule import ListingSchedule
+from case.PositionLedger import PositionLedger
+from config import ASSERT_OUT, USE_DEPTH_STREAM, USE_USER_STREAM, ORDER_FILL_TIMEOUT, DELAY_BETWEEN_RETRIES, \
+    BALANCE_POLL_MIN_INTERVAL, BALANCE_POLL_MAX_INTERVAL, METRICS_FILE, METRICS_FORMAT, RECORD_DEPTH, DEPTH_RECORD_DIR, \
+    LISTING_BURST_POLL_INTERVAL, LISTING_CLOCK_SAMPLES, REQUOTE_WITH_AMEND
+from exchange.SymbolInfo import SymbolInfo
+from metrics.ExchangeMetrics import exchange_metrics, exchange_name, instrument
+from metrics.TradeJournal import trade_journal
+from stream.DepthRecorder import DepthRecorder
+
+
+# Выставление всей лестницы ордеров пакетом
+def place_ladder(exchange, symbol: str, sell_orders: List[Tuple[float, float]]) -> List[Tuple[str, float, float]]:
+    """
+    Отправляет всю лестницу через exchange.place_sell_orders: нативный пакетный запрос на бирже,
+    где он есть, иначе параллельное выставление по одному ордеру.
+
+    Returns:
+        Список успешно выставленных ордеров (order_id, price, qty)
+    """
+    started = time.perf_counter()
+    order_ids = exchange.place_sell_orders(symbol, sell_orders)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+
+    active_orders: List[Tuple[str, float, float]] = []
+    venue = exchange_name(exchange)
+    for order_id, (price, qty) in zip(order_ids, sell_orders):
+        trade_journal.order(venue, symbol, order_id or None, price, qty)
+        if order_id:
+            print(f"Ордер выставлен: {order_id}, цена: {price}, объём: {qty}")
+            active_orders.append((order_id, price, qty))
+        else:
+            print(f"Не удалось выставить ордер для цены {price}, объёма {qty}")
+    # Время каждого пакета или ордера лестницы — в exchange_metrics (place_sell_orders_batch, place_sell_order)
+    print(f"Лестница из {len(sell_orders)} ордеров выставлена за {elapsed_ms:.1f} мс")
+    return active_orders
+
+
+# Перенос оставшихся в книге ордеров на новую лестницу
+def requote_ladder(exchange, symbol: str, resting: List[Tuple[str, float, float]],
+                   sell_orders: List[Tuple[float, float]], ledger: PositionLedger) -> List[Tuple[str, float, float]]:
+    """
+    Ордера из книги по убыванию цены сопоставляются с уровнями новой лестницы и меняются через amend —
+    один запрос вместо отмены и нового выставления, без окна, когда в книге нет ни старого, ни нового ордера.
+    Неизменённые (исполненные, снятые) и лишние ордера отменяются, уровни без ордера выставляются заново.
+
+    Args:
+        resting: Ордера в книге (order_id, price, неисполненный объём)
+
+    Returns:
+        Лестница после переноса (order_id, price, qty)
+    """
+    started = time.perf_counter()
+    resting = sorted(resting, key=lambda order: order[1], reverse=True)
+    paired = min(len(resting), len(sell_orders))
+
+    # Ордер уже стоит на своём уровне — запрос не нужен. Биржа ждёт полный объём ордера с исполненной частью
+    amendments, unchanged, levels = [], [], []
+    for order, (price, qty) in zip(resting, sell_orders):
+        if (order[1], order[2]) == (price, qty):
+            unchanged.append(order)
+        else:
+            amendments.append((order[0], price, ledger.filled_qty(order[0]) + qty))
+            levels.append((price, qty))
+    amended = exchange.amend_orders(symbol, amendments) if amendments else []
+    active_orders = list(unchanged)
+    for (order_id, price, _), (_, qty), ok in zip(amendments, levels, amended):
+        trade_journal.amend(exchange_name(exchange), symbol, order_id, price, qty, ok)
+        if ok:
+            ledger.amended(order_id, qty)
+            active_orders.append((order_id, price, qty))
+            print(f"Ордер {order_id} перенесён: цена: {price}, объём: {qty}")
+
+    # Неизменённые ордера могли исполниться до переноса: учитываем их итоговое исполнение
+    stale = [order_id for (order_id, _, _), ok in zip(amendments, amended) if not ok]
+    stale += [order_id for order_id, _, _ in resting[paired:]]
+    sold = 0.0
+    if stale:
+        trade_journal.cancel(exchange_name(exchange), symbol, stale)
+        exchange.cancel_orders(symbol, stale)
+        prices = {order_id: price for order_id, price, _ in resting}
+        for order_id, state in exchange.get_order_states(symbol, stale).items():
+            sold += ledger.apply(state, prices[order_id])
+            trade_journal.fill(exchange_name(exchange), symbol, state)
+            if state.filled:
+                print(f"Ордер {order_id} выполнен")
+
+    # Проданное до переноса снимается с самых дешёвых из выставляемых заново уровней
+    to_place = [level for level, ok in zip(levels, amended) if not ok] + list(sell_orders[paired:])
+    excess = sold
+    for i in range(len(to_place) - 1, -1, -1):
+        if excess <= 0:
+            break
+        price, qty = to_place[i]
+        to_place[i] = (price, max(qty - excess, 0.0))
+        excess -= qty
+    to_place = exchange.normalize_orders(symbol, [(price, qty) for price, qty in to_place if qty > 0])
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    print(f"Лестница перенесена за {elapsed_ms:.1f} мс: изменено {sum(amended)}, без изменений {len(unchanged)}, "
+          f"снято {len(stale)}, новых уровней {len(to_place)}")
+    if to_place:
+        placed = place_ladder(exchange, symbol, to_place)
+        for order_id, _, qty in placed:
+            ledger.placed(order_id, qty)
+        active_orders += placed
+    return active_orders
+
+
+# Ожидание поступления токенов на аккаунт
+def wait_for_deposit(exchange, asset: str, min_interval: float = BALANCE_POLL_MIN_INTERVAL) -> float:
+    """
+    Возвращает баланс, как только он становится ненулевым. Событие приватного потока будит сразу,
+    REST-опрос остаётся страховкой: пока поток жив, его интервал растёт до BALANCE_POLL_MAX_INTERVAL.
+    """
+    poll_interval = min_interval
+    while True:
+        balance = exchange.get_balance(asset, True)
+        print(f"Текущий баланс {asset}: {balance}")
+        if balance > 0:
+            return balance
+
+        if exchange.balance_stream_live():
+            poll_interval = min(poll_interval * 2, BALANCE_POLL_MAX_INTERVAL)
+        else:
+            poll_interval = min_interval
+        print(f"Баланс {asset} равен 0, ждём поступления (опрос через {poll_interval} с)...")
+
+        streamed_balance = exchange.wait_for_balance(asset, poll_interval)
+        if streamed_balance and exchange.DEPOSITS_PUSHED:
+            print(f"Поступление {asset} из потока: {streamed_balance}")
+            return streamed_balance
+
+
+# Подготовка к листингу по расписанию
+def prepare_listing(exchange, symbol: str, asset: str, listing: ListingSchedule) -> Tuple[SymbolInfo, float]:
+    """
+    До начала burst-окна бот простаивает и не тратит лимит запросов: часы биржи лишь изредка пересинхронизируются.
+    В burst-окне — калибровка часов, прогрев соединений, проверка пары и баланса.
+
+    Returns:
+        Метаданные пары и баланс токена к открытию торгов
+    """
+    exchange.sync_clock()
+    print(f"Листинг {symbol} через {listing.seconds_to_open(exchange.clock):.0f} с, ждём burst-окна")
+    while True:
+        idle = listing.idle_sleep(exchange.clock)
+        if idle <= 0:
+            break
+        time.sleep(idle)
+        exchange.sync_clock()
+
+    print(f"Burst-окно: до открытия {listing.seconds_to_open(exchange.clock):.1f} с")
+    exchange.sync_clock(LISTING_CLOCK_SAMPLES)
+    exchange.warm_up()
+
+    # Пара может появиться в метаданных незадолго до открытия; после открытия проверка не задерживает лестницу
+    symbol_info = exchange.refresh_symbol_info(symbol)
+    while symbol_info is None and listing.seconds_to_open(exchange.clock) > DELAY_BETWEEN_RETRIES:
+        time.sleep(DELAY_BETWEEN_RETRIES)
+        symbol_info = exchange.refresh_symbol_info(symbol)
+    if symbol_info is None:
+        print(f"Пара {symbol} не найдена до открытия, используем ограничения из кэша")
+        symbol_info = exchange.get_symbol_info(symbol)
+
+    balance = exchange.get_balance(asset, True)
+    print(f"Пара {symbol} проверена, баланс {asset}: {balance}")
+    return symbol_info, balance
 
 
 """
@@ -31,92 +177,155 @@ def setup_requests_retries(max_retries=3, backoff_factor=1, timeout=10):
         exchange: Инстанс биржи (например, BinanceExchange)
         sell_percentage: Процент от баланса для продажи (0.0 - 1.0)
         asset: Символ токена (например, "BTC")
+        listing: Время листинга; None — начать сразу
     """
 
 
-def limit_sell(exchange, sell_percentage: float, asset: str) -> None:
+def limit_sell(exchange, sell_percentage: float, asset: str, listing: Optional[ListingSchedule] = None) -> None:
     if not 0 <= sell_percentage <= 1:
         print(f"Ошибка: Процент должен быть между 0 и 1, получено {sell_percentage}")
         return
 
-    # Настраиваем requests перед инициализацией API
-    setup_requests_retries(max_retries=3, backoff_factor=1, timeout=3)
-
+    # Замер задержек, ошибок и повторов каждого вызова биржи
+    exchange = instrument(exchange)
     symbol = exchange.create_symbol(asset, ASSERT_OUT)
 
     print(f"Запуск лимитной продажи {sell_percentage * 100}% токенов {asset} на {symbol}")
 
-    while True:
-        # Шаг 1: Проверка баланса
-        balance = exchange.get_balance(asset, True)
-        print(f"Текущий баланс {asset}: {balance}")
+    if listing is not None:
+        symbol_info, balance = prepare_listing(exchange, symbol, asset, listing)
+    else:
+        # Загружаем шаг цены и количества заранее, чтобы не тратить на это время после поступления
+        symbol_info, balance = exchange.get_symbol_info(symbol), None
+    print(f"Ограничения пары {symbol}: {symbol_info}")
+
+    # Локальная книга из WebSocket, пока она не синхронизирована, биды берутся через REST
+    recorder = None
+    if USE_DEPTH_STREAM:
+        depth_stream = exchange.start_depth_stream(symbol)
+        # Запись книги для подбора параметров лестницы в backtest.run_backtest
+        if RECORD_DEPTH and depth_stream is not None:
+            recorder = DepthRecorder.for_symbol(DEPTH_RECORD_DIR, exchange_name(exchange), symbol,
+                                                {"symbol_info": symbol_info.to_dict()})
+            recorder.attach(depth_stream.book)
+    # Приватный поток ордеров: цикл просыпается по событию исполнения, пока он не подключён — опрос статусов
+    if USE_USER_STREAM:
+        exchange.start_user_stream()
+    # Тёплые keep-alive соединения с торговым хостом к моменту первого ордера
+    exchange.start_heartbeat()
+
+    try:
+        if listing is not None:
+            listing.wait_for_open(exchange.clock)
+        _sell_loop(exchange, symbol, sell_percentage, asset, listing, balance)
+    except KeyboardInterrupt:
+        # Снимаем все выставленные ордера по паре одним запросом
+        print(f"Остановка: отменяем все открытые ордера по {symbol}")
+        exchange.cancel_all_orders(symbol)
+        raise
+    finally:
+        exchange.stop_depth_stream()
+        if recorder is not None:
+            recorder.close()
+        exchange.stop_user_stream()
+        exchange.stop_heartbeat()
+        exchange_metrics.dump(METRICS_FILE, METRICS_FORMAT)
+
+
+def _retry_delay(exchange, listing: Optional[ListingSchedule]) -> float:
+    return listing.retry_delay(exchange.clock) if listing is not None else DELAY_BETWEEN_RETRIES
 
-        if balance <= 0:
-            print(f"Баланс {asset} равен 0, ждём 1 секунду...")
-            time.sleep(1)
-            continue
 
-        # Шаг 2: Расчёт количества токенов для продажи
-        sell_quantity = balance * sell_percentage
-        sell_quantity = round(sell_quantity / ROUNDING_PRECISION) * ROUNDING_PRECISION  # Округление
+def _sell_loop(exchange, symbol: str, sell_percentage: float, asset: str,
+               listing: Optional[ListingSchedule] = None, balance: Optional[float] = None) -> None:
+    # Неисполненные ордера не отменяются, а переносятся на следующую лестницу через amend
+    amend_mode = REQUOTE_WITH_AMEND and exchange.SUPPORTS_AMEND
+    while True:
+        # Шаг 1: Ожидание ненулевого баланса (к листингу он уже запрошен в burst-окне)
+        if not balance:
+            in_burst = listing is not None and listing.in_burst(exchange.clock)
+            balance = wait_for_deposit(exchange, asset,
+                                       LISTING_BURST_POLL_INTERVAL if in_burst else BALANCE_POLL_MIN_INTERVAL)
+
+        # Шаг 2: Расчёт количества токенов для продажи (вниз до шага количества пары)
+        symbol_info = exchange.get_symbol_info(symbol)
+        sell_quantity = symbol_info.round_quantity(balance * sell_percentage)
         print(f"Количество для продажи: {sell_quantity} {asset}")
 
-        # Шаг 3: Основной цикл продажи
-        remaining_to_sell = sell_quantity
+        # Шаг 3: Основной цикл продажи. Остаток считается по фактическим исполнениям ордеров
+        ledger = PositionLedger(sell_quantity)
+        resting: List[Tuple[str, float, float]] = []  # Ордера, оставшиеся в книге (order_id, price, qty)
 
-        while remaining_to_sell >= ROUNDING_PRECISION:
-            # 3.1: Расчёт ордеров
-            sell_orders = exchange.calculate_sell_orders(symbol, remaining_to_sell)
+        while ledger.remaining >= symbol_info.min_sell_quantity():
+            # 3.1: Расчёт ордеров с округлением до точности биржи
+            sell_orders = exchange.normalize_orders(symbol, exchange.calculate_sell_orders(symbol, ledger.remaining))
             if not sell_orders:
-                print("Не удалось рассчитать ордера, ждём 1 секунду")
-                time.sleep(1)
+                delay = _retry_delay(exchange, listing)
+                print(f"Не удалось рассчитать ордера, ждём {delay} с")
+                exchange_metrics.record_retry(exchange_name(exchange), "calculate_sell_orders")
+                time.sleep(delay)
                 continue
 
-            # 3.2: Выставление ордеров
-            active_orders: List[Tuple[str, float, float]] = []  # (order_id, price, qty)
-            for price, qty in sell_orders:
-                order_id = exchange.place_sell_order(symbol, qty, price)
-                if order_id:
-                    print(f"Ордер выставлен: {order_id}, цена: {price}, объём: {qty}")
-                    active_orders.append((order_id, price, qty))
-                else:
-                    print(f"Не удалось выставить ордер для цены {price}, объёма {qty}")
+            # 3.2: Выставление ордеров (всей лестницей одновременно) или перенос оставшихся в книге
+            if resting and amend_mode:
+                active_orders = requote_ladder(exchange, symbol, resting, sell_orders, ledger)
+            else:
+                active_orders = place_ladder(exchange, symbol, sell_orders)  # (order_id, price, qty)
+                for order_id, _, qty in active_orders:
+                    ledger.placed(order_id, qty)
+                # Ордера, которые не удалось отменить в прошлом цикле, снимаются и учитываются вместе с новыми
+                active_orders += resting
+            resting = []
 
             if not active_orders:
                 print("Все ордера провалились, повторяем")
-                time.sleep(1)
+                exchange_metrics.record_retry(exchange_name(exchange), "place_sell_orders")
+                time.sleep(_retry_delay(exchange, listing))
                 continue
+            if listing is not None:
+                listing.record_first_order(exchange)
+
+            # 3.3: Ожидание исполнения: до ORDER_FILL_TIMEOUT или пока не исполнится вся лестница
+            order_ids = [order_id for order_id, _, _ in active_orders]
+            filled = exchange.wait_for_fills(symbol, order_ids, ORDER_FILL_TIMEOUT)
 
-            # 3.3: Ожидание 1500 мс
-            time.sleep(1.5)
+            # 3.4: Пакетная отмена неисполненных ордеров. В режиме amend они остаются в книге до следующей лестницы
+            unfilled = [order_id for order_id in order_ids if order_id not in filled]
+            if unfilled and not amend_mode:
+                trade_journal.cancel(exchange_name(exchange), symbol, unfilled)
+                exchange.cancel_orders(symbol, unfilled)
 
-            # 3.4: Проверка статуса ордеров
-            for order_id, price, qty in active_orders[:]:  # Копируем список для изменения во время итерации
-                if exchange.check_order_status(order_id, symbol):
-                    print(f"Ордер {order_id} выполнен, удаляем из списка")
-                    active_orders.remove((order_id, price, qty))
-                    remaining_to_sell -= qty
+            # 3.5: Учёт исполнений: накопленный объём каждого ордера, в том числе частично исполненных и снятых
+            states = exchange.get_order_states(symbol, order_ids, settled=not amend_mode)
+            for order_id, price, qty in active_orders:
+                state = states.get(order_id)
+                if state is not None:
+                    ledger.apply(state, price)
+                    trade_journal.fill(exchange_name(exchange), symbol, state)
+                if state is not None and state.filled:
+                    print(f"Ордер {order_id} выполнен")
+                elif state is not None and not state.active:
+                    print(f"Ордер {order_id} отменён, исполнено {state.filled_qty} из {qty}")
                 else:
-                    print(f"Ордер {order_id} не выполнен, отменяем")
-                    exchange.cancel_order(order_id, symbol)
-                    # Проверяем ещё раз после отмены
-                    if exchange.check_order_status(order_id, symbol):
-                        print(f"Ордер {order_id} всё-таки выполнен после отмены")
-                        active_orders.remove((order_id, price, qty))
-                        remaining_to_sell -= qty
-                    else:
-                        active_orders.remove((order_id, price, qty))
-
-            # 3.5: Проверка результата
-            current_balance = exchange.get_balance(asset, False)
-            sold_amount = balance - current_balance
-            print(f"Продано: {sold_amount}, осталось продать: {remaining_to_sell}")
-
-            if remaining_to_sell <= 0:
+                    # Ордер в книге или его состояние неизвестно: перенос или повторная отмена в следующем цикле
+                    open_qty = ledger.open_qty(order_id)
+                    print(f"Ордер {order_id} не выполнен, в книге {open_qty}"
+                          + (", будет перенесён" if amend_mode else ", не удалось отменить"))
+                    resting.append((order_id, price, open_qty))
+            print(f"Продано: {ledger.sold} по средней цене {ledger.avg_price:.8g}, "
+                  f"осталось продать: {ledger.remaining}")
+
+            # Остаток, из которого нельзя собрать ордер даже по лучшей цене лестницы, — пыль, его не продать
+            best_price = max(price for _, price, _ in active_orders)
+            if not symbol_info.is_valid(best_price, ledger.remaining):
+                if resting:
+                    exchange.cancel_orders(symbol, [order_id for order_id, _, _ in resting])
                 print("Все токены успешно проданы!")
                 usdt_balance = exchange.get_balance(ASSERT_OUT, False)
                 print(f"Текущий баланс {ASSERT_OUT}: {usdt_balance}")
                 return
             else:
-                print(f"Осталось продать {remaining_to_sell} {asset}, пересчитываем")
-                balance = current_balance  # Обновляем баланс для следующей итерации
+                print(f"Осталось продать {ledger.remaining} {asset}, пересчитываем")
+        if resting:
+            exchange.cancel_orders(symbol, [order_id for order_id, _, _ in resting])
+        balance = None
@@ -0,0 +1,83 @@
+import asyncio
+import time
+from datetime import datetime, timezone
+from typing import Optional
+
+from config import DELAY_BETWEEN_RETRIES, SERVER_TIME_SYNC_INTERVAL, LISTING_BURST_WINDOW, \
+    LISTING_BURST_POLL_INTERVAL, LISTING_BURST_DURATION, LISTING_SPIN_THRESHOLD
+from exchange.RequestSigner import ServerClock
+from metrics.ExchangeMetrics import exchange_metrics, exchange_name
+
+
+# Известное время листинга: простой до T−LISTING_BURST_WINDOW, burst-окно и открытие ровно в T по часам биржи
+class ListingSchedule:
+    def __init__(self, listing_ms: int, burst_window: float = LISTING_BURST_WINDOW):
+        self.listing_ms = listing_ms  # Время открытия торгов по часам биржи, мс
+        self.burst_window = burst_window
+        self.opened_at: Optional[float] = None  # time.perf_counter() момента открытия
+        self._first_order_recorded = False
+
+    @staticmethod
+    def parse(text: str) -> int:
+        """Время листинга из строки: 'ГГГГ-ММ-ДД ЧЧ:ММ[:СС]' в UTC или unix-время в секундах/миллисекундах."""
+        text = text.strip()
+        if text.isdigit():
+            value = int(text)
+            return value if value > 10 ** 11 else value * 1000
+        moment = datetime.fromisoformat(text)
+        if moment.tzinfo is None:
+            moment = moment.replace(tzinfo=timezone.utc)
+        return int(moment.timestamp() * 1000)
+
+    def seconds_to_open(self, clock: ServerClock) -> float:
+        return (self.listing_ms - clock.now_ms()) / 1000
+
+    def idle_sleep(self, clock: ServerClock) -> float:
+        """Сколько спать в простое: до начала burst-окна, но не дольше интервала пересинхронизации часов."""
+        return min(self.seconds_to_open(clock) - self.burst_window, SERVER_TIME_SYNC_INTERVAL)
+
+    def in_burst(self, clock: ServerClock) -> bool:
+        if self.opened_at is not None:
+            return time.perf_counter() - self.opened_at < LISTING_BURST_DURATION
+        return self.seconds_to_open(clock) <= self.burst_window
+
+    def retry_delay(self, clock: ServerClock) -> float:
+        """Пауза между повторами: в burst-окне частые попытки, вне его — обычная пауза."""
+        return LISTING_BURST_POLL_INTERVAL if self.in_burst(clock) else DELAY_BETWEEN_RETRIES
+
+    def _deadline(self, clock: ServerClock) -> float:
+        # Время биржи переводится в монотонные часы один раз, дальше ожидание не зависит от системных часов
+        return time.perf_counter() + self.seconds_to_open(clock)
+
+    def _opened(self, deadline: float):
+        self.opened_at = time.perf_counter()
+        print(f"Открытие торгов, опоздание {(self.opened_at - deadline) * 1000:.3f} мс")
+
+    def wait_for_open(self, clock: ServerClock):
+        """Проспать до T−LISTING_SPIN_THRESHOLD и докрутить остаток активным ожиданием."""
+        deadline = self._deadline(clock)
+        remaining = deadline - time.perf_counter()
+        if remaining > LISTING_SPIN_THRESHOLD:
+            time.sleep(remaining - LISTING_SPIN_THRESHOLD)
+        while time.perf_counter() < deadline:
+            pass
+        self._opened(deadline)
+
+    async def wait_for_open_async(self, clock: ServerClock):
+        """То же в цикле событий: спин последних миллисекунд ненадолго занимает цикл."""
+        deadline = self._deadline(clock)
+        remaining = deadline - time.perf_counter()
+        if remaining > LISTING_SPIN_THRESHOLD:
+            await asyncio.sleep(remaining - LISTING_SPIN_THRESHOLD)
+        while time.perf_counter() < deadline:
+            pass
+        self._opened(deadline)
+
+    def record_first_order(self, exchange):
+        """Время от открытия до принятой биржей первой лестницы — в метрики как time_to_first_order."""
+        if self.opened_at is None or self._first_order_recorded:
+            return
+        self._first_order_recorded = True
+        elapsed = time.perf_counter() - self.opened_at
+        exchange_metrics.record(exchange_name(exchange), "time_to_first_order", elapsed)
+        print(f"Первая лестница принята через {elapsed * 1000:.1f} мс после открытия")
@@ -0,0 +1,159 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Tuple
+
+import numpy as np
+
+from case.LimitSell import place_ladder, wait_for_deposit
+from case.PositionLedger import PositionLedger
+from config import ASSERT_OUT, USE_DEPTH_STREAM, USE_USER_STREAM, ORDER_FILL_TIMEOUT, DELAY_BETWEEN_RETRIES, \
+    METRICS_FILE, METRICS_FORMAT
+from exchange.SellLadder import route_sell_ladder
+from metrics.ExchangeMetrics import exchange_metrics, exchange_name, instrument
+from metrics.TradeJournal import trade_journal
+
+
+# Одна биржа в общей продаже: пара, ограничения, учёт проданного и ордера, которые не удалось снять
+class VenueSeller:
+    def __init__(self, exchange, asset: str):
+        self.exchange = instrument(exchange)
+        self.name = exchange_name(self.exchange)
+        self.symbol = self.exchange.create_symbol(asset, ASSERT_OUT)
+        self.symbol_info = None
+        self.ledger = None
+        self.resting: List[Tuple[str, float, float]] = []  # Снимаются и учитываются в следующем цикле
+
+    def start(self):
+        """Метаданные пары, потоки и прогрев соединений до поступления токенов."""
+        self.symbol_info = self.exchange.get_symbol_info(self.symbol)
+        print(f"{self.name}: ограничения пары {self.symbol}: {self.symbol_info}")
+        if USE_DEPTH_STREAM:
+            self.exchange.start_depth_stream(self.symbol)
+        if USE_USER_STREAM:
+            self.exchange.start_user_stream()
+        self.exchange.start_heartbeat()
+
+    def stop(self):
+        self.exchange.stop_depth_stream()
+        self.exchange.stop_user_stream()
+        self.exchange.stop_heartbeat()
+
+    def best_price(self, bids: np.ndarray) -> float:
+        """Цена первого уровня, на который ставит лестница (первый бид пропускается)."""
+        return float(bids[1, 0]) if len(bids) > 1 else 0.0
+
+    def sell_cycle(self, sell_orders: List[Tuple[float, float]]):
+        """Выставить свою часть сводной лестницы, дождаться исполнения, снять остаток и учесть исполненное."""
+        active_orders = place_ladder(self.exchange, self.symbol, sell_orders) if sell_orders else []
+        for order_id, _, qty in active_orders:
+            self.ledger.placed(order_id, qty)
+        active_orders += self.resting
+        self.resting = []
+        if not active_orders:
+            return
+
+        order_ids = [order_id for order_id, _, _ in active_orders]
+        filled = self.exchange.wait_for_fills(self.symbol, order_ids, ORDER_FILL_TIMEOUT)
+        unfilled = [order_id for order_id in order_ids if order_id not in filled]
+        if unfilled:
+            trade_journal.cancel(self.name, self.symbol, unfilled)
+            self.exchange.cancel_orders(self.symbol, unfilled)
+
+        states = self.exchange.get_order_states(self.symbol, order_ids)
+        for order_id, price, qty in active_orders:
+            state = states.get(order_id)
+            if state is not None:
+                self.ledger.apply(state, price)
+                trade_journal.fill(self.name, self.symbol, state)
+            if state is None or state.active:
+                print(f"{self.name}: ордер {order_id} не удалось отменить")
+                self.resting.append((order_id, price, self.ledger.open_qty(order_id)))
+
+    def cancel_resting(self):
+        if self.resting:
+            self.exchange.cancel_orders(self.symbol, [order_id for order_id, _, _ in self.resting])
+
+
+def multi_limit_sell(exchanges: list, sell_percentage: float, asset: str) -> None:
+    """
+    Одновременная продажа токена на нескольких биржах.
+
+    Каждый цикл книги всех бирж запрашиваются параллельно и сливаются в сводную лестницу (route_sell_ladder):
+    объём уходит туда, где сейчас глубже и дороже, в пределах баланса на каждой бирже.
+    Части лестницы выставляются и снимаются на всех биржах одновременно, остаток считается по исполнениям.
+
+    Args:
+        exchanges: Инстансы синхронных бирж (например, [BinanceExchange(), OKXExchange()])
+        sell_percentage: Процент от суммарного баланса для продажи (0.0 - 1.0)
+        asset: Символ токена (например, "BTC")
+    """
+    if not 0 <= sell_percentage <= 1:
+        print(f"Ошибка: Процент должен быть между 0 и 1, получено {sell_percentage}")
+        return
+
+    sellers = [VenueSeller(exchange, asset) for exchange in exchanges]
+    print(f"Запуск лимитной продажи {sell_percentage * 100}% токенов {asset} на "
+          f"{', '.join(seller.name for seller in sellers)}")
+
+    with ThreadPoolExecutor(max_workers=len(sellers)) as pool:
+        try:
+            list(pool.map(VenueSeller.start, sellers))
+            _sell_loop(pool, sellers, sell_percentage, asset)
+        except KeyboardInterrupt:
+            print("Остановка: отменяем все открытые ордера на всех биржах")
+            list(pool.map(lambda seller: seller.exchange.cancel_all_orders(seller.symbol), sellers))
+            raise
+        finally:
+            list(pool.map(VenueSeller.stop, sellers))
+            exchange_metrics.dump(METRICS_FILE, METRICS_FORMAT)
+
+
+def _sell_loop(pool: ThreadPoolExecutor, sellers: List[VenueSeller], sell_percentage: float, asset: str) -> None:
+    # Шаг 1: Ожидание поступления на всех биржах. Продаётся доля суммарного баланса,
+    # а баланс каждой биржи ограничивает только то, сколько можно отправить на неё
+    balances = list(pool.map(lambda seller: wait_for_deposit(seller.exchange, asset), sellers))
+    sell_quantity = 0.0
+    for seller, balance in zip(sellers, balances):
+        seller.ledger = PositionLedger(seller.symbol_info.round_quantity(balance))
+        sell_quantity += seller.symbol_info.round_quantity(balance * sell_percentage)
+    print(f"Количество для продажи: {sell_quantity} {asset}")
+
+    while True:
+        sold = sum(seller.ledger.sold for seller in sellers)
+        remaining = sell_quantity - sold
+
+        # Шаг 2: Книги всех бирж одновременно и сводная лестница по ним
+        books = list(pool.map(lambda seller: seller.exchange.get_bids(seller.symbol), sellers))
+        ladders = route_sell_ladder(books, [seller.ledger.remaining for seller in sellers], remaining)
+        ladders = [seller.symbol_info.normalize_orders(ladder) for seller, ladder in zip(sellers, ladders)]
+        for seller, bids, ladder in zip(sellers, books, ladders):
+            trade_journal.book(seller.name, seller.symbol, bids)
+            trade_journal.ladder(seller.name, seller.symbol, ladder)
+
+        if not any(ladders) and not any(seller.resting for seller in sellers):
+            # Остаток, из которого ни на одной бирже нельзя собрать ордер, — пыль, его не продать
+            if remaining <= 0 or all(len(bids) > 1 for bids in books) and not any(
+                    seller.symbol_info.is_valid(seller.best_price(bids), min(remaining, seller.ledger.remaining))
+                    for seller, bids in zip(sellers, books)):
+                break
+            print(f"Не удалось рассчитать ордера, ждём {DELAY_BETWEEN_RETRIES} с")
+            time.sleep(DELAY_BETWEEN_RETRIES)
+            continue
+        print("Распределение лестницы: " + ", ".join(
+            f"{seller.name} {sum(qty for _, qty in ladder)}" for seller, ladder in zip(sellers, ladders)))
+
+        # Шаг 3: Выставление, ожидание и снятие на всех биржах одновременно
+        list(pool.map(VenueSeller.sell_cycle, sellers, ladders))
+
+        # Шаг 4: Итог цикла по каждой бирже и в целом
+        sold = sum(seller.ledger.sold for seller in sellers)
+        proceeds = sum(seller.ledger.proceeds for seller in sellers)
+        for seller in sellers:
+            print(f"{seller.name}: продано {seller.ledger.sold} по средней цене {seller.ledger.avg_price:.8g}")
+        print(f"Продано: {sold} по средней цене {proceeds / sold if sold else 0.0:.8g}, "
+              f"осталось продать: {sell_quantity - sold}")
+
+    list(pool.map(VenueSeller.cancel_resting, sellers))
+    print("Все токены успешно проданы!")
+    for seller in sellers:
+        print(f"{seller.name}: баланс {ASSERT_OUT}: {seller.exchange.get_balance(ASSERT_OUT, False)}")
@@ -0,0 +1,57 @@
+from typing import Dict, List
+
+from exchange.OrderState import OrderState
+
+
+# Учёт продаваемой позиции по фактическим исполнениям ордеров, включая частичные
+class PositionLedger:
+    def __init__(self, quantity: float):
+        self.quantity = quantity  # Сколько токенов нужно продать
+        self.sold = 0.0
+        self.proceeds = 0.0  # Выручка в котируемой валюте
+        self._orders: Dict[str, List[float]] = {}  # order_id -> [объём ордера, учтённое исполнение, учтённая выручка]
+
+    @property
+    def remaining(self) -> float:
+        """Непроданный остаток, включая объём, который ещё стоит в книге."""
+        return self.quantity - self.sold
+
+    @property
+    def avg_price(self) -> float:
+        return self.proceeds / self.sold if self.sold else 0.0
+
+    def placed(self, order_id: str, qty: float):
+        self._orders[order_id] = [qty, 0.0, 0.0]
+
+    def amended(self, order_id: str, open_qty: float):
+        """Ордер изменён: сверх уже исполненного в книге остаётся open_qty."""
+        entry = self._orders[order_id]
+        entry[0] = entry[1] + open_qty
+
+    def filled_qty(self, order_id: str) -> float:
+        return self._orders[order_id][1] if order_id in self._orders else 0.0
+
+    def open_qty(self, order_id: str) -> float:
+        """Сколько из ордера ещё может исполниться."""
+        if order_id not in self._orders:
+            return 0.0
+        total, filled, _ = self._orders[order_id]
+        return max(total - filled, 0.0)
+
+    def apply(self, state: OrderState, price: float = 0.0) -> float:
+        """
+        Учесть состояние ордера, вернуть объём, исполненный с прошлого учёта.
+        Биржи сообщают накопленное исполнение, поэтому повторный учёт того же состояния ничего не меняет.
+        price — цена ордера для выручки, если биржа не сообщила среднюю цену исполнения.
+        """
+        entry = self._orders.setdefault(state.order_id, [state.filled_qty, 0.0, 0.0])
+        if not state.active:
+            entry[0] = state.filled_qty  # Ордер закрыт, больше он не исполнится
+        delta = state.filled_qty - entry[1]
+        if delta <= 0:
+            return 0.0
+        notional = state.filled_qty * (state.avg_price or price)
+        self.sold += delta
+        self.proceeds += notional - entry[2]
+        entry[1], entry[2] = state.filled_qty, notional
+        return delta
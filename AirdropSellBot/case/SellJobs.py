@@ -0,0 +1,78 @@
+import asyncio
+import json
+import os
+from typing import Dict, List, Optional
+
+from loguru import logger
+
+from case import AsyncLimitSell
+from case.ListingSchedule import ListingSchedule
+from exchange.AsyncHttp import close_sessions
+from exchange.Registry import create_exchange, exchange_names
+
+CREDENTIALS = ("api_key", "api_secret", "passphrase")
+
+
+# Задание продажи: биржа, аккаунт, токен и доля баланса
+class SellJob:
+    def __init__(self, exchange: str, asset: str, sell_percentage: float, account: str = "",
+                 credentials: Optional[Dict[str, str]] = None, listing_time: Optional[str] = None):
+        self.exchange = exchange.lower()
+        self.asset = asset.upper()
+        self.sell_percentage = sell_percentage
+        self.account = account
+        self.credentials = credentials or {}  # Пусто — ключи биржи из .env, как у SellOnExchange_main
+        self.listing_time = listing_time
+
+    @staticmethod
+    def from_dict(data: dict) -> "SellJob":
+        """
+        Задание из записи списка. Ключи указываются прямо (api_key, api_secret, passphrase)
+        или через env — префикс переменных окружения: env "BINANCE_SUB1" читает BINANCE_SUB1_API_KEY и т.д.
+        """
+        if data.get("exchange", "").lower() not in exchange_names():
+            raise ValueError(f"Неизвестная биржа в задании: {data.get('exchange')}")
+        credentials = {name: data[name] for name in CREDENTIALS if data.get(name)}
+        if data.get("env"):
+            for name in CREDENTIALS:
+                value = os.getenv(f"{data['env']}_{name.upper()}")
+                if value:
+                    credentials.setdefault(name, value)
+        return SellJob(data["exchange"], data["asset"], float(data.get("sell_percentage", 1.0)),
+                       data.get("account") or data.get("env", ""), credentials, data.get("listing_time"))
+
+    def create_exchange(self):
+        return create_exchange(self.exchange, True, **self.credentials)
+
+    def __str__(self) -> str:
+        return f"{self.exchange}/{self.account or 'default'} {self.asset} {self.sell_percentage * 100}%"
+
+
+def load_jobs(path: str) -> List[SellJob]:
+    """Список заданий из JSON-файла: массив объектов с полями exchange, asset, sell_percentage, ..."""
+    with open(path, "r", encoding="utf-8") as f:
+        return [SellJob.from_dict(data) for data in json.load(f)]
+
+
+async def run_job(job: SellJob):
+    """Цикл limit_sell одного задания. Ошибка задания пишется в лог и не останавливает остальные."""
+    print(f"Задание {job}: запуск")
+    try:
+        exchange = job.create_exchange()
+        listing = ListingSchedule(ListingSchedule.parse(job.listing_time)) if job.listing_time else None
+        await AsyncLimitSell.limit_sell(exchange, job.sell_percentage, job.asset, listing)
+        print(f"Задание {job}: завершено")
+    except Exception as e:
+        logger.error(f"Задание {job} остановлено с ошибкой: {e}")
+
+
+async def run_jobs(jobs: List[SellJob]):
+    """
+    Все задания в одном цикле событий: каждое ждёт своего поступления и продаёт независимо от остальных.
+    Задания одной биржи делят пул keep-alive соединений хоста (exchange.AsyncHttp),
+    лимиты запросов считаются на ключ аккаунта, а лимиты IP — общие для всех ключей биржи.
+    """
+    try:
+        await asyncio.gather(*(run_job(job) for job in jobs))
+    finally:
+        await close_sessions()
@@ -0,0 +1,74 @@
+import time
+from typing import Optional
+
+from loguru import logger
+
+from config import DEPOSIT_POLL_INTERVAL, DEPOSIT_LOGS_MAX_RANGE, DEPOSIT_STREAM_TIMEOUT
+from stream.TransferLogStream import TransferLogStream, transfer_filter
+
+
+# Ожидание поступления токена на адрес без постоянного опроса balanceOf.
+# С WebSocket-RPC — подписка на логи Transfer в адрес; без неё (или пока подписка не подключена) —
+# eth_blockNumber раз в DEPOSIT_POLL_INTERVAL и eth_getLogs по новым блокам, только когда блок сменился.
+# balanceOf запрашивается один раз при старте и затем только после найденного перевода
+class DepositWatcher:
+    def __init__(self, w3, token_contract, owner: str, ws_url: str = ""):
+        self.w3 = w3
+        self.token_contract = token_contract
+        self.owner = owner
+        self.filter = transfer_filter(token_contract.address, owner)
+        self.stream = TransferLogStream(ws_url, token_contract.address, owner) if ws_url else None
+        self._next_block: Optional[int] = None  # Первый ещё не просмотренный блок опроса логов
+
+    def start(self):
+        if self.stream:
+            self.stream.start()
+
+    def stop(self):
+        if self.stream:
+            self.stream.stop()
+
+    def balance(self, block="latest") -> int:
+        return self.token_contract.functions.balanceOf(self.owner).call(block_identifier=block)
+
+    def wait_for_balance(self, min_balance: int) -> int:
+        """Вернуть баланс (в минимальных единицах), как только он не меньше min_balance."""
+        balance = self._anchor()
+        while balance < min_balance:
+            block = self._next_transfer()
+            if block is None:
+                continue
+            balance = self.balance()
+            logger.info(f"Входящий перевод в блоке {block}, баланс: {balance / 10 ** 18}")
+        return balance
+
+    def _anchor(self) -> int:
+        """Баланс на текущем блоке; опрос логов продолжается со следующего, ничего не пропуская."""
+        block = self.w3.eth.block_number
+        self._next_block = block + 1
+        return self.balance(block)
+
+    def _next_transfer(self) -> Optional[int]:
+        """Блок очередного входящего перевода или None по истечении одного интервала ожидания."""
+        if self.stream and self.stream.connected:
+            # С подпиской логи догоняются раз в DEPOSIT_STREAM_TIMEOUT: это закрывает блоки до её подключения,
+            # страхует от потерянных уведомлений, и после обрыва опрос продолжается без пропусков
+            block = self._poll_logs(wait=False)
+            if block is not None:
+                return block
+            return self.stream.wait_for_transfer(DEPOSIT_STREAM_TIMEOUT)
+        return self._poll_logs()
+
+    def _poll_logs(self, wait: bool = True) -> Optional[int]:
+        latest = self.w3.eth.block_number
+        if latest < self._next_block:
+            if wait:
+                time.sleep(DEPOSIT_POLL_INTERVAL)
+            return None
+        # Длинный пропуск просматривается частями: узлы ограничивают диапазон eth_getLogs
+        to_block = min(latest, self._next_block + DEPOSIT_LOGS_MAX_RANGE - 1)
+        logs = self.w3.eth.get_logs(dict(self.filter, fromBlock=self._next_block, toBlock=to_block))
+        self._next_block = to_block + 1
+        if logs:
+            return logs[-1]["blockNumber"]
+        return None
@@ -0,0 +1,65 @@
+import threading
+import time
+from typing import Tuple
+
+from loguru import logger
+
+from config import GAS_PRICE_TTL, GAS_MAX_FEE_MULTIPLIER, GAS_PRIORITY_FEE_MULTIPLIER, TX_FEE_BUMP
+
+
+# Цена газа с кэшем на GAS_PRICE_TTL: перевод в момент поступления токенов не ждёт запроса eth_gasPrice,
+# если оракул прогрет заранее (warm_up или фоновое обновление start_refresh на время ожидания).
+# Комиссии EIP-1559 — множители от цены газа сети
+class GasOracle:
+    def __init__(self, w3, ttl: float = GAS_PRICE_TTL):
+        self.w3 = w3
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._gas_price = 0
+        self._updated = 0.0
+        self._refresh_running = False
+
+    def warm_up(self):
+        """Обновить кэш, если он устарел."""
+        self.gas_price()
+
+    def start_refresh(self):
+        """Обновлять кэш в фоне, чтобы цена газа к моменту перевода была свежей."""
+        self.warm_up()
+        if self._refresh_running:
+            return
+        self._refresh_running = True
+        threading.Thread(target=self._refresh_loop, name="gas-oracle", daemon=True).start()
+
+    def stop_refresh(self):
+        self._refresh_running = False
+
+    def _refresh_loop(self):
+        while self._refresh_running:
+            time.sleep(self.ttl / 2)  # Кэш обновляется, как только устаревает
+            try:
+                self.warm_up()
+            except Exception as e:
+                logger.warning(f"Ошибка обновления цены газа: {e}")
+
+    def gas_price(self) -> int:
+        with self._lock:
+            if time.monotonic() - self._updated >= self.ttl:
+                self._gas_price = self.w3.eth.gas_price
+                self._updated = time.monotonic()
+            return self._gas_price
+
+    def fees(self) -> Tuple[int, int]:
+        """(maxFeePerGas, maxPriorityFeePerGas) для новой транзакции."""
+        gas_price = self.gas_price()
+        return int(gas_price * GAS_MAX_FEE_MULTIPLIER), int(gas_price * GAS_PRIORITY_FEE_MULTIPLIER)
+
+    def bump(self, fees: Tuple[int, int]) -> Tuple[int, int]:
+        """
+        Комиссии замены с тем же nonce: узлы принимают замену, только если обе комиссии выросли
+        не меньше чем на 10%, поэтому каждая поднимается в TX_FEE_BUMP раз, но не ниже текущих по сети.
+        """
+        max_fee, priority_fee = fees
+        current_max_fee, current_priority_fee = self.fees()
+        return (max(int(max_fee * TX_FEE_BUMP) + 1, current_max_fee),
+                max(int(priority_fee * TX_FEE_BUMP) + 1, current_priority_fee))
@@ -0,0 +1,26 @@
+import threading
+from typing import Optional
+
+
+# Локальный счётчик nonce адреса: сеть спрашивается один раз, дальше nonce выдаются без запросов к RPC.
+# Несколько переводов подряд получают последовательные nonce и отправляются, не дожидаясь майнинга предыдущих
+class NonceManager:
+    def __init__(self, w3, address: str):
+        self.w3 = w3
+        self.address = address
+        self._lock = threading.Lock()
+        self._next: Optional[int] = None
+
+    def next(self) -> int:
+        """Следующий свободный nonce (первый — из сети с учётом транзакций в мемпуле)."""
+        with self._lock:
+            if self._next is None:
+                self._next = self.w3.eth.get_transaction_count(self.address, "pending")
+            nonce = self._next
+            self._next += 1
+            return nonce
+
+    def reset(self):
+        """Забыть счётчик: следующий nonce будет перечитан из сети (после ошибки отправки)."""
+        with self._lock:
+            self._next = None
@@ -0,0 +1,146 @@
+import threading
+import time
+from concurrent.futures import Future
+from typing import Dict, List, Optional
+
+from loguru import logger
+from web3.exceptions import TransactionNotFound
+
+from chain.GasOracle import GasOracle
+from chain.NonceManager import NonceManager
+from config import CHAIN_ID, TX_BUMP_BLOCKS, TX_MAX_BUMPS, TX_RECEIPT_POLL_INTERVAL, TX_RECEIPT_TIMEOUT
+
+
+# Отправленная транзакция до майнинга: все её версии (замены с тем же nonce) и Future с квитанцией
+class PendingTx:
+    def __init__(self, tx: dict, future: Future):
+        self.tx = tx
+        self.future = future
+        self.hashes: List[bytes] = []  # Смайниться может любая из версий, квитанция ищется по всем
+        self.sent_block = 0
+        self.bumps = 0
+        self.started = time.monotonic()
+
+    @property
+    def nonce(self) -> int:
+        return self.tx["nonce"]
+
+
+# Конвейер отправки транзакций одного аккаунта.
+# submit() подписывает и отправляет транзакцию сразу (nonce — локальный счётчик, газ — из кэша оракула)
+# и возвращает Future. Квитанции проверяет фоновый поток раз в новый блок; транзакция, не смайненная
+# за TX_BUMP_BLOCKS блоков, заменяется копией с тем же nonce и поднятыми комиссиями (до TX_MAX_BUMPS раз)
+class TxPipeline:
+    def __init__(self, w3, account, chain_id: int = CHAIN_ID, nonces: Optional[NonceManager] = None,
+                 gas: Optional[GasOracle] = None):
+        self.w3 = w3
+        self.account = account
+        self.chain_id = chain_id
+        self.nonces = nonces or NonceManager(w3, account.address)
+        self.gas = gas or GasOracle(w3)
+        self._pending: Dict[int, PendingTx] = {}
+        self._lock = threading.Lock()
+        self._running = False
+
+    def start(self):
+        """Запустить фоновую проверку квитанций."""
+        if self._running:
+            return
+        self._running = True
+        threading.Thread(target=self._watch_loop, name="tx-receipts", daemon=True).start()
+
+    def stop(self):
+        self._running = False
+
+    def submit(self, function, gas_limit: int) -> Future:
+        """
+        Отправить вызов контракта (например, token.functions.transfer(to, amount)).
+        Future завершается квитанцией (status проверяет вызывающий) или TimeoutError через TX_RECEIPT_TIMEOUT.
+        """
+        max_fee, priority_fee = self.gas.fees()
+        tx = function.build_transaction({
+            "from": self.account.address,
+            "gas": gas_limit,
+            "maxFeePerGas": max_fee,
+            "maxPriorityFeePerGas": priority_fee,
+            "nonce": self.nonces.next(),
+            "chainId": self.chain_id,
+        })
+        pending = PendingTx(tx, Future())
+        try:
+            self._send(pending)
+        except Exception:
+            self.nonces.reset()  # Nonce не ушёл в сеть, следующий перечитывается
+            raise
+        with self._lock:
+            self._pending[pending.nonce] = pending
+        self.start()
+        return pending.future
+
+    def _send(self, pending: PendingTx):
+        signed_tx = self.account.sign_transaction(pending.tx)
+        tx_hash = self.w3.eth.send_raw_transaction(signed_tx.raw_transaction)
+        pending.hashes.append(tx_hash)
+        pending.sent_block = self.w3.eth.block_number
+        logger.info(f"Транзакция отправлена: {tx_hash.hex()}, nonce {pending.nonce}, "
+                    f"maxFeePerGas {pending.tx['maxFeePerGas']}")
+
+    def _replace(self, pending: PendingTx):
+        """Переотправить транзакцию с тем же nonce и поднятыми комиссиями."""
+        max_fee, priority_fee = self.gas.bump((pending.tx["maxFeePerGas"], pending.tx["maxPriorityFeePerGas"]))
+        previous = pending.tx
+        pending.tx = dict(previous, maxFeePerGas=max_fee, maxPriorityFeePerGas=priority_fee)
+        pending.bumps += 1
+        try:
+            self._send(pending)
+        except Exception as e:
+            # Обычно предыдущая версия уже смайнена (nonce too low) — квитанция найдётся в следующем блоке
+            pending.tx = previous
+            logger.warning(f"Замена транзакции с nonce {pending.nonce} не отправлена: {e}")
+
+    def _receipt(self, pending: PendingTx):
+        for tx_hash in pending.hashes:
+            try:
+                return self.w3.eth.get_transaction_receipt(tx_hash)
+            except TransactionNotFound:
+                continue
+        return None
+
+    def _watch_loop(self):
+        last_block = -1
+        while self._running:
+            time.sleep(TX_RECEIPT_POLL_INTERVAL)
+            with self._lock:
+                pending_txs = list(self._pending.values())
+            if not pending_txs:
+                continue
+            try:
+                block = self.w3.eth.block_number
+                if block == last_block:
+                    continue
+                last_block = block
+                for pending in pending_txs:
+                    self._check(pending, block)
+            except Exception as e:
+                logger.warning(f"Ошибка проверки квитанций: {e}")
+
+    def _check(self, pending: PendingTx, block: int):
+        receipt = self._receipt(pending)
+        if receipt is not None:
+            self._finish(pending)
+            logger.info(f"Транзакция {receipt['transactionHash'].hex()} смайнена в блоке {receipt['blockNumber']}, "
+                        f"статус {receipt['status']}")
+            pending.future.set_result(receipt)
+        elif time.monotonic() - pending.started > TX_RECEIPT_TIMEOUT:
+            self._finish(pending)
+            self.nonces.reset()  # Nonce брошенной транзакции не должен остаться дырой перед следующими
+            pending.future.set_exception(TimeoutError(f"Транзакция с nonce {pending.nonce} не смайнена "
+                                                      f"за {TX_RECEIPT_TIMEOUT} с"))
+        elif block - pending.sent_block >= TX_BUMP_BLOCKS and pending.bumps < TX_MAX_BUMPS:
+            logger.info(f"Транзакция с nonce {pending.nonce} не смайнена за {block - pending.sent_block} блоков, "
+                        f"поднимаем комиссию")
+            self._replace(pending)
+
+    def _finish(self, pending: PendingTx):
+        with self._lock:
+            self._pending.pop(pending.nonce, None)
@@ -3,8 +3,62 @@
 # Server requests
 REQUEST_TIMEOUT = 10  # How many seconds to try to get a successful response to the request
 DELAY_BETWEEN_RETRIES = 1  # Delay between retries after an error in seconds
+WARM_CONNECTIONS = 4  # Keep-alive connections opened to the trading host before the first order
+HEARTBEAT_INTERVAL = 15  # Lightweight request on every warm connection to keep it open, in seconds
+SERVER_TIME_SYNC_INTERVAL = 300  # How often the cached exchange clock offset used in signed requests is re-measured, in seconds
+RATE_LIMIT_SAFETY = 0.9  # Share of each published exchange rate limit the client-side scheduler lets the bot use
+HTTP_RETRIES = 1  # Immediate retries of a GET on 5xx or a connection error; each attempt is charged to the rate limiter
 
 # Trade
 ASSERT_OUT = "USDT"
 SUCCESS_BID_START_RATE = 0.10
-ROUNDING_PRECISION = 0.01
+SUCCESS_BID_RATE_STEP = 0.05  # How much the share of each next bid level grows in the sell ladder
+ROUNDING_PRECISION = 0.01  # Fallback quantity step when the exchange symbol metadata is unavailable
+SYMBOL_INFO_CACHE_FILE = "symbols_cache.json"  # Tick size / lot step / minimums per exchange symbol
+SYMBOL_INFO_REFRESH_INTERVAL = 3600  # Background refresh of the symbol metadata cache, in seconds
+
+# Logging
+TRADE_LOG_FILE = "trade.log"  # loguru sink added once per process by bootstrap.setup(), written from a background thread
+LOG_LEVEL = "INFO"  # Level of trade.log and the console; DEBUG also formats the per-order adapter messages
+TRADE_JOURNAL_FILE = "trade_journal.jsonl"  # Structured book/ladder/order/fill events for post-mortems, "" to disable
+
+# Metrics
+METRICS_FILE = "exchange_metrics.json"  # Latency/error/retry stats per exchange method, written after each run
+METRICS_FORMAT = "json"  # "json" or "prometheus"
+
+# Market data
+USE_DEPTH_STREAM = True  # Keep a local order book from the exchange WebSocket depth stream instead of REST snapshots
+USE_USER_STREAM = True  # Track order fills through the private WebSocket stream instead of status polling
+ORDER_FILL_TIMEOUT = 1.5  # How long to wait for a ladder to fill before re-quoting, in seconds
+REQUOTE_WITH_AMEND = True  # Move resting orders to the new ladder in place (amend) where supported instead of cancel-and-replace
+ORDER_STATUS_POLL_INTERVAL = 0.25  # Status polling interval when the private stream is unavailable, in seconds
+ORDER_STATE_TIMEOUT = 0.5  # How long to wait for the private stream to report the final state of a closed order before asking REST, in seconds
+BALANCE_POLL_MIN_INTERVAL = 1  # REST balance polling interval without a live balance stream, in seconds
+BALANCE_POLL_MAX_INTERVAL = 30  # Backed-off REST balance polling interval while the balance stream is live, in seconds
+RECORD_DEPTH = False  # Record every local order book update to columnar files for the replay backtester
+DEPTH_RECORD_DIR = "depth_records"  # One sub-directory per recorded listing: <exchange>_<symbol>_<start time>
+LISTING_BURST_WINDOW = 30  # Seconds before a scheduled listing to leave idle mode: clock calibration, warm-up, symbol check, streams
+LISTING_BURST_POLL_INTERVAL = 0.05  # Balance polling and retry interval inside the burst window, in seconds
+LISTING_BURST_DURATION = 60  # How long after the open retries keep the burst rate, in seconds
+LISTING_SPIN_THRESHOLD = 0.02  # The last part of the wait for the open is a busy spin on the monotonic clock, in seconds
+LISTING_CLOCK_SAMPLES = 5  # /time round trips in the pre-open clock calibration, the fastest one sets the offset
+USE_ASYNC_EXCHANGE = False  # Run the aiohttp-based AsyncExchange adapters with case.AsyncLimitSell instead of the SDK adapters
+JOBS_FILE = "jobs.json"  # Job list for SellJobs_main: exchange, account credentials, asset and sell percentage per job
+
+# Chain (TransferToExchange_main)
+CHAIN_RPC_URL = "https://bsc-dataseed.binance.org/"  # Public BNB Smart Chain RPC; a local dev chain (anvil: http://127.0.0.1:8545) for testing
+CHAIN_ID = 56  # BNB Smart Chain; anvil uses 31337
+TRANSFER_GAS_LIMIT = 100000  # Gas limit of the ERC-20 transfer to the exchange deposit address
+GAS_PRICE_TTL = 3  # How long the cached network gas price is reused for new transactions, in seconds
+GAS_MAX_FEE_MULTIPLIER = 2.5  # maxFeePerGas as a multiple of the network gas price
+GAS_PRIORITY_FEE_MULTIPLIER = 1.5  # maxPriorityFeePerGas as a multiple of the network gas price
+TX_BUMP_BLOCKS = 3  # Blocks without a receipt before the transaction is replaced with a higher fee under the same nonce
+TX_FEE_BUMP = 1.125  # Fee multiplier of each replacement; nodes require at least +10% to accept it
+TX_MAX_BUMPS = 5  # Replacements per transaction before it is left to the original fees
+TX_RECEIPT_POLL_INTERVAL = 0.5  # How often the receipt watcher checks for a new block, in seconds
+TX_RECEIPT_TIMEOUT = 120  # Give up waiting for a receipt after this many seconds
+CHAIN_WS_URL = ""  # WebSocket RPC for the eth_subscribe Transfer log subscription; "" polls eth_getLogs over CHAIN_RPC_URL
+DEPOSIT_POLL_INTERVAL = 0.5  # eth_blockNumber polling interval of the deposit watcher without a live subscription, in seconds
+DEPOSIT_LOGS_MAX_RANGE = 1000  # Largest eth_getLogs block range per request; longer gaps are scanned in chunks
+DEPOSIT_STREAM_TIMEOUT = 10  # With a live subscription, eth_getLogs still catches up this often as a safety net, in seconds
+MIN_DEPOSIT_BALANCE = 0.00001  # Token balance that triggers the transfer to the exchange
@@ -0,0 +1,174 @@
+import os
+from typing import Any, Optional, Tuple
+from urllib.parse import urlencode
+
+import numpy as np
+from loguru import logger
+
+from exchange.AsyncExchange import AsyncExchange
+from exchange.AsyncHttp import request_json
+from exchange.OrderState import OrderState, BINANCE_STATUSES, ORDER_OPEN
+from exchange.RateLimiter import rate_limiter
+from exchange.RequestSigner import HmacSigner
+from exchange.SellLadder import to_depth_array
+from exchange.SymbolInfo import SymbolInfo
+from stream.DepthStream import BinanceDepthStream, DepthStream
+from stream.UserDataStream import BinanceUserDataStream, UserDataStream
+
+
+BINANCE_API_URL = "https://api.binance.com"
+RECV_WINDOW = 5000
+BINANCE_TIMESTAMP_REJECTED = -1021  # Код ошибки: timestamp вне recvWindow
+
+
+class BinanceApiError(Exception):
+    pass
+
+
+# listenKey для BinanceUserDataStream: поток вызывает методы из своего потока, запросы идут в цикле событий
+class _ListenKeyClient:
+    def __init__(self, exchange: "AsyncBinanceExchange"):
+        self.exchange = exchange
+
+    def stream_get_listen_key(self) -> str:
+        return self.exchange.call_from_thread(self.exchange._request("POST", "/api/v3/userDataStream",
+                                                                     keyed=True))['listenKey']
+
+    def stream_keepalive(self, listen_key: str):
+        self.exchange.call_from_thread(self.exchange._request("PUT", "/api/v3/userDataStream",
+                                                              {"listenKey": listen_key}, keyed=True))
+
+
+# Binance на aiohttp: спотовый REST API v3 без python-binance
+class AsyncBinanceExchange(AsyncExchange):
+    ORDER_BOOK_DEPTH = 100
+    ENV_PREFIX = "BINANCE"
+
+    def __init__(self, api_key: str = None, api_secret: str = None):
+        self.api_key = api_key or os.getenv("BINANCE_API_KEY")
+        self.api_secret = api_secret or os.getenv("BINANCE_API_SECRET")
+        if not self.api_key or not self.api_secret:
+            logger.error("API ключи для Binance не найдены в .env")
+            raise ValueError("API keys not provided")
+        self.api_url = self.endpoint_override("API") or BINANCE_API_URL
+        self.limiter = rate_limiter(self.ENV_PREFIX, self.api_key)
+        self.signer = HmacSigner(self.api_secret)
+
+    async def _request(self, method: str, path: str, params: dict = None, signed: bool = False,
+                       keyed: bool = False) -> Any:
+        """
+        Запрос к REST API; подписанные параметры передаются в строке запроса для любого метода.
+        timestamp берётся по часам биржи; если она его всё же отвергла, время перемеряется и запрос повторяется.
+        """
+        query = urlencode(params or {})
+        headers = {"X-MBX-APIKEY": self.api_key} if signed or keyed else {}
+        for attempt in range(2):
+            if signed:
+                signed_query = f"{query}&" if query else ""
+                signed_query += f"timestamp={self.clock.now_ms()}&recvWindow={RECV_WINDOW}"
+                url = f"{self.api_url}{path}?{signed_query}&signature={self.signer.hexdigest(signed_query)}"
+            else:
+                url = f"{self.api_url}{path}?{query}" if query else f"{self.api_url}{path}"
+            status, result = await request_json(method, url, self.limiter, headers=headers)
+            if status == 200:
+                return result
+            if attempt or not signed or not isinstance(result, dict) or result.get('code') != BINANCE_TIMESTAMP_REJECTED:
+                raise BinanceApiError(f"{status}: {result}")
+            logger.warning(f"Binance отверг timestamp запроса {path}, синхронизируем время")
+            await self.sync_clock()
+
+    def create_symbol(self, assert_in: str, assert_out: str) -> str:
+        return assert_in + assert_out
+
+    async def get_server_time(self) -> int:
+        return int((await self._request("GET", "/api/v3/time"))['serverTime'])
+
+    async def fetch_symbol_info(self, symbol: str) -> SymbolInfo:
+        result = await self._request("GET", "/api/v3/exchangeInfo", {"symbol": symbol})
+        if not result.get('symbols'):
+            raise ValueError(f"Пара {symbol} не найдена")
+        filters = {f['filterType']: f for f in result['symbols'][0]['filters']}
+        notional = filters.get('NOTIONAL') or filters.get('MIN_NOTIONAL') or {}
+        return SymbolInfo(
+            tick_size=float(filters['PRICE_FILTER']['tickSize']),
+            lot_size=float(filters['LOT_SIZE']['stepSize']),
+            min_qty=float(filters['LOT_SIZE']['minQty']),
+            min_notional=float(notional.get('minNotional', 0))
+        )
+
+    async def get_balance(self, asset: str, auto_transfer: bool = False) -> float:
+        try:
+            account = await self._request("GET", "/api/v3/account", signed=True)
+            for balance in account['balances']:
+                if balance['asset'] == asset:
+                    return float(balance['free'])
+            return 0.0
+        except Exception as e:
+            logger.error(f"Ошибка при получении баланса: {e}")
+            return 0.0
+
+    async def get_open_orders(self, symbol: str) -> list:
+        try:
+            return await self._request("GET", "/api/v3/openOrders", {"symbol": symbol}, signed=True)
+        except Exception as e:
+            logger.error(f"Ошибка при получении ордеров: {e}")
+            return []
+
+    def create_depth_stream(self, symbol: str, ws_url: str = None) -> DepthStream:
+        return BinanceDepthStream(symbol, self._load_depth_snapshot, ws_url)
+
+    def _load_depth_snapshot(self, symbol: str) -> Tuple[list, list, int]:
+        order_book = self.call_from_thread(self._request("GET", "/api/v3/depth", {"symbol": symbol, "limit": 1000}))
+        return order_book['bids'], order_book['asks'], int(order_book['lastUpdateId'])
+
+    async def fetch_bids(self, symbol: str, depth: int) -> np.ndarray:
+        try:
+            order_book = await self._request("GET", "/api/v3/depth", {"symbol": symbol, "limit": depth})
+            return to_depth_array(order_book['bids'])
+        except Exception as e:
+            logger.error(f"Ошибка при получении книги ордеров: {e}")
+            return to_depth_array([])
+
+    async def place_sell_order(self, symbol: str, quantity: float, price: float) -> str:
+        info = await self.get_symbol_info(symbol)
+        # У спота Binance нет пакетного выставления: лестница уходит одновременными запросами (place_sell_orders)
+        try:
+            order = await self._request("POST", "/api/v3/order", {
+                "symbol": symbol,
+                "side": "SELL",
+                "type": "LIMIT",
+                "timeInForce": "GTC",
+                "quantity": info.format_qty(quantity),
+                "price": info.format_price(price)
+            }, signed=True)
+            return str(order['orderId'])
+        except Exception as e:
+            logger.error(f"Ошибка при выставлении ордера: {e}")
+            return ""
+
+    async def cancel_order(self, order_id: str, symbol: str):
+        try:
+            await self._request("DELETE", "/api/v3/order", {"symbol": symbol, "orderId": order_id}, signed=True)
+        except Exception as e:
+            logger.error(f"Ошибка при отмене ордера: {e}")
+
+    async def cancel_all_orders(self, symbol: str) -> bool:
+        try:
+            await self._request("DELETE", "/api/v3/openOrders", {"symbol": symbol}, signed=True)
+            return True
+        except Exception as e:
+            logger.error(f"Ошибка при отмене всех ордеров: {e}")
+            return False
+
+    def create_user_stream(self, ws_url: str = None) -> UserDataStream:
+        return BinanceUserDataStream(_ListenKeyClient(self), ws_url)
+
+    async def get_order_state(self, order_id: str, symbol: str) -> Optional[OrderState]:
+        try:
+            order = await self._request("GET", "/api/v3/order", {"symbol": symbol, "orderId": order_id}, signed=True)
+            return OrderState.from_quote(order_id, BINANCE_STATUSES.get(order['status'], ORDER_OPEN),
+                                         float(order['executedQty']), float(order['cummulativeQuoteQty']))
+        except Exception as e:
+            logger.error(f"Ошибка при проверке статуса ордера: {e}")
+            return None
+
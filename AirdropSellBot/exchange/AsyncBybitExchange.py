@@ -0,0 +1,305 @@
+import asyncio
+import json
+import os
+from typing import List, Optional, Tuple
+from urllib.parse import urlencode
+
+import numpy as np
+from loguru import logger
+
+from exchange.AsyncExchange import AsyncExchange
+from exchange.AsyncHttp import request_json
+from exchange.OrderState import OrderState, ORDER_OPEN
+from exchange.RateLimiter import rate_limiter
+from exchange.RequestSigner import HmacSigner
+from exchange.SellLadder import to_depth_array
+from exchange.SymbolInfo import SymbolInfo
+from stream.DepthStream import BybitDepthStream, DepthStream
+from stream.UserDataStream import BybitUserDataStream, UserDataStream
+
+
+BYBIT_API_URL = "https://api.bybit.com"
+BYBIT_BATCH_SIZE = 10  # Максимум спотовых ордеров в одном запросе create-batch
+RECV_WINDOW = "5000"
+BYBIT_TIMESTAMP_REJECTED = 10002  # retCode: timestamp вне recv_window
+
+
+class BybitApiError(Exception):
+    pass
+
+
+# Bybit на aiohttp: REST API v5 без pybit
+class AsyncBybitExchange(AsyncExchange):
+    ORDER_BOOK_DEPTH = 10
+    SUPPORTS_AMEND = True
+    ENV_PREFIX = "BYBIT"
+
+    def __init__(self, api_key: str = None, api_secret: str = None):
+        self.api_key = api_key or os.getenv("BYBIT_API_KEY")
+        self.api_secret = api_secret or os.getenv("BYBIT_API_SECRET")
+        if not self.api_key or not self.api_secret:
+            logger.error("API ключи для Bybit не найдены в .env")
+            raise ValueError("API keys not provided")
+        self.api_url = self.endpoint_override("API") or BYBIT_API_URL
+        self.limiter = rate_limiter(self.ENV_PREFIX, self.api_key)
+        self.signer = HmacSigner(self.api_secret)
+
+    async def _request(self, method: str, path: str, params: dict = None, signed: bool = False) -> dict:
+        """
+        Запрос к API v5: GET с параметрами в строке запроса, POST с JSON-телом.
+        Подпись — HMAC от timestamp + api_key + recv_window + строка запроса или тело,
+        timestamp — по часам биржи; отвергнутый timestamp перемеряется и запрос повторяется.
+        """
+        params = params or {}
+        query = urlencode(params) if method == "GET" else ""
+        body = "" if method == "GET" else json.dumps(params, separators=(",", ":"))
+        url = f"{self.api_url}{path}?{query}" if query else f"{self.api_url}{path}"
+        headers = {"Content-Type": "application/json"}
+        if signed:
+            headers.update({"X-BAPI-API-KEY": self.api_key, "X-BAPI-RECV-WINDOW": RECV_WINDOW})
+            prefix = f"{self.api_key}{RECV_WINDOW}{query or body}"
+        for attempt in range(2):
+            if signed:
+                timestamp = str(self.clock.now_ms())
+                headers["X-BAPI-TIMESTAMP"] = timestamp
+                headers["X-BAPI-SIGN"] = self.signer.hexdigest(timestamp + prefix)
+            status, result = await request_json(method, url, self.limiter, data=body or None, headers=headers)
+            if status != 200 or not isinstance(result, dict):
+                raise BybitApiError(f"{status}: {result}")
+            if attempt or not signed or result.get('retCode') != BYBIT_TIMESTAMP_REJECTED:
+                return result
+            logger.warning(f"Bybit отверг timestamp запроса {path}, синхронизируем время")
+            await self.sync_clock()
+
+    def create_symbol(self, assert_in: str, assert_out: str) -> str:
+        return assert_in + assert_out
+
+    async def get_server_time(self) -> int:
+        result = await self._request("GET", "/v5/market/time")
+        return int(result['result']['timeNano']) // 1_000_000
+
+    async def fetch_symbol_info(self, symbol: str) -> SymbolInfo:
+        result = await self._request("GET", "/v5/market/instruments-info", {"category": "spot", "symbol": symbol})
+        instruments = result['result']['list']
+        if not instruments:
+            raise ValueError(f"Пара {symbol} не найдена")
+        instrument = instruments[0]
+        return SymbolInfo(
+            tick_size=float(instrument['priceFilter']['tickSize']),
+            lot_size=float(instrument['lotSizeFilter']['basePrecision']),
+            min_qty=float(instrument['lotSizeFilter']['minOrderQty']),
+            min_notional=float(instrument['lotSizeFilter']['minOrderAmt'])
+        )
+
+    async def get_balance(self, asset: str, auto_transfer: bool = False) -> float:
+        try:
+            result = await self._request("GET", "/v5/account/wallet-balance", {"accountType": "UNIFIED"}, signed=True)
+            for coin in result['result']['list'][0]['coin']:
+                if coin['coin'] == asset:
+                    logger.debug("Найден баланс для {}: {}", asset, coin['walletBalance'])
+                    return float(coin['walletBalance'])
+            logger.debug("Баланс для {} не найден, возвращаем 0", asset)
+            return 0.0
+        except Exception as e:
+            logger.error(f"Ошибка при получении баланса: {e}")
+            return 0.0
+
+    async def get_open_orders(self, symbol: str) -> list:
+        try:
+            result = await self._request("GET", "/v5/order/realtime", {"category": "spot", "symbol": symbol},
+                                         signed=True)
+            orders = result['result']['list']
+            logger.debug("Получены открытые ордера для {}: {} шт.", symbol, len(orders))
+            return orders
+        except Exception as e:
+            logger.error(f"Ошибка при получении ордеров: {e}")
+            return []
+
+    def create_depth_stream(self, symbol: str, ws_url: str = None) -> DepthStream:
+        return BybitDepthStream(symbol, ws_url)
+
+    async def fetch_bids(self, symbol: str, depth: int) -> np.ndarray:
+        try:
+            order_book = await self._request("GET", "/v5/market/orderbook",
+                                             {"category": "spot", "symbol": symbol, "limit": depth})
+            return to_depth_array(order_book['result']['b'])
+        except Exception as e:
+            logger.error(f"Ошибка при получении книги ордеров: {e}")
+            return to_depth_array([])
+
+    async def place_sell_order(self, symbol: str, quantity: float, price: float) -> str:
+        info = await self.get_symbol_info(symbol)
+        try:
+            result = await self._request("POST", "/v5/order/create", {
+                "category": "spot",
+                "symbol": symbol,
+                "side": "Sell",
+                "orderType": "Limit",
+                "qty": info.format_qty(quantity),
+                "price": info.format_price(price)
+            }, signed=True)
+            if result['retCode'] == 0:
+                order_id = result['result']['orderId']
+                logger.debug("Ордер успешно выставлен: {}", order_id)
+                return order_id
+            logger.error(f"Ошибка выставления ордера: {result['retMsg']}")
+            return ""
+        except Exception as e:
+            logger.error(f"Ошибка при выставлении ордера: {e}")
+            return ""
+
+    async def place_sell_orders(self, symbol: str, orders: List[Tuple[float, float]]) -> List[str]:
+        # Пакеты по BYBIT_BATCH_SIZE уходят одновременно
+        batches = await asyncio.gather(*(self._place_sell_orders_batch(symbol, orders[start:start + BYBIT_BATCH_SIZE])
+                                         for start in range(0, len(orders), BYBIT_BATCH_SIZE)))
+        return [order_id for batch in batches for order_id in batch]
+
+    async def _place_sell_orders_batch(self, symbol: str, orders: List[Tuple[float, float]]) -> List[str]:
+        info = await self.get_symbol_info(symbol)
+        try:
+            result = await self._request("POST", "/v5/order/create-batch", {
+                "category": "spot",
+                "request": [
+                    {
+                        "symbol": symbol,
+                        "side": "Sell",
+                        "orderType": "Limit",
+                        "qty": info.format_qty(quantity),
+                        "price": info.format_price(price)
+                    }
+                    for price, quantity in orders
+                ]
+            }, signed=True)
+            if result['retCode'] != 0:
+                logger.error(f"Ошибка пакетного выставления ордеров: {result['retMsg']}")
+                return [""] * len(orders)
+            order_ids = []
+            for item, status in zip(result['result']['list'], result['retExtInfo']['list']):
+                if status['code'] == 0:
+                    logger.debug("Ордер успешно выставлен: {}", item['orderId'])
+                    order_ids.append(item['orderId'])
+                else:
+                    logger.error(f"Ошибка выставления ордера: {status['msg']}")
+                    order_ids.append("")
+            return order_ids
+        except Exception as e:
+            logger.error(f"Ошибка при пакетном выставлении ордеров: {e}")
+            return [""] * len(orders)
+
+    async def amend_order(self, order_id: str, symbol: str, quantity: float, price: float) -> bool:
+        info = await self.get_symbol_info(symbol)
+        try:
+            result = await self._request("POST", "/v5/order/amend", {
+                "category": "spot",
+                "symbol": symbol,
+                "orderId": order_id,
+                "qty": info.format_qty(quantity),
+                "price": info.format_price(price)
+            }, signed=True)
+            if result['retCode'] == 0:
+                logger.debug("Ордер {} перенесён: {} по {}", order_id, quantity, price)
+                return True
+            logger.debug("Ордер {} не изменён: {}", order_id, result['retMsg'])
+            return False
+        except Exception as e:
+            logger.error(f"Ошибка при изменении ордера: {e}")
+            return False
+
+    async def amend_orders(self, symbol: str, amendments: List[Tuple[str, float, float]]) -> List[bool]:
+        batches = await asyncio.gather(*(self._amend_orders_batch(symbol, amendments[start:start + BYBIT_BATCH_SIZE])
+                                         for start in range(0, len(amendments), BYBIT_BATCH_SIZE)))
+        return [amended for batch in batches for amended in batch]
+
+    async def _amend_orders_batch(self, symbol: str, amendments: List[Tuple[str, float, float]]) -> List[bool]:
+        info = await self.get_symbol_info(symbol)
+        try:
+            result = await self._request("POST", "/v5/order/amend-batch", {
+                "category": "spot",
+                "request": [
+                    {"symbol": symbol, "orderId": order_id, "qty": info.format_qty(quantity), "price": info.format_price(price)}
+                    for order_id, price, quantity in amendments
+                ]
+            }, signed=True)
+            if result['retCode'] != 0:
+                logger.error(f"Ошибка пакетного изменения ордеров: {result['retMsg']}")
+                return [False] * len(amendments)
+            results = []
+            for (order_id, _, _), status in zip(amendments, result['retExtInfo']['list']):
+                if status['code'] != 0:
+                    logger.debug("Ордер {} не изменён: {}", order_id, status['msg'])
+                results.append(status['code'] == 0)
+            return results
+        except Exception as e:
+            logger.error(f"Ошибка при пакетном изменении ордеров: {e}")
+            return [False] * len(amendments)
+
+    async def cancel_order(self, order_id: str, symbol: str):
+        try:
+            result = await self._request("POST", "/v5/order/cancel",
+                                         {"category": "spot", "symbol": symbol, "orderId": order_id}, signed=True)
+            if result['retCode'] == 0:
+                logger.debug("Ордер {} отменён", order_id)
+            else:
+                logger.error(f"Ошибка отмены ордера: {result['retMsg']}")
+        except Exception as e:
+            logger.error(f"Ошибка при отмене ордера: {e}")
+
+    async def cancel_orders(self, symbol: str, order_ids: List[str]) -> Tuple[List[str], List[str]]:
+        results = await asyncio.gather(*(self._cancel_orders_batch(symbol, order_ids[start:start + BYBIT_BATCH_SIZE])
+                                         for start in range(0, len(order_ids), BYBIT_BATCH_SIZE)))
+        cancelled = [order_id for batch_cancelled, _ in results for order_id in batch_cancelled]
+        failed = [order_id for _, batch_failed in results for order_id in batch_failed]
+        logger.debug("Отменено ордеров: {}, не отменено: {}", len(cancelled), len(failed))
+        filled, _ = await self._split_filled(symbol, failed)
+        return cancelled, filled
+
+    async def _cancel_orders_batch(self, symbol: str, chunk: List[str]) -> Tuple[List[str], List[str]]:
+        try:
+            result = await self._request("POST", "/v5/order/cancel-batch", {
+                "category": "spot",
+                "request": [{"symbol": symbol, "orderId": order_id} for order_id in chunk]
+            }, signed=True)
+            if result['retCode'] != 0:
+                logger.error(f"Ошибка пакетной отмены ордеров: {result['retMsg']}")
+                return [], chunk
+            cancelled, failed = [], []
+            for order_id, status in zip(chunk, result['retExtInfo']['list']):
+                if status['code'] == 0:
+                    cancelled.append(order_id)
+                else:
+                    # 170213: ордер не найден среди активных — исполнен или уже отменён
+                    logger.debug("Ордер {} не отменён: {}", order_id, status['msg'])
+                    failed.append(order_id)
+            return cancelled, failed
+        except Exception as e:
+            logger.error(f"Ошибка при пакетной отмене ордеров: {e}")
+            return [], chunk
+
+    async def cancel_all_orders(self, symbol: str) -> bool:
+        try:
+            result = await self._request("POST", "/v5/order/cancel-all", {"category": "spot", "symbol": symbol},
+                                         signed=True)
+            if result['retCode'] != 0:
+                logger.error(f"Ошибка отмены всех ордеров: {result['retMsg']}")
+                return False
+            logger.info(f"Отменены все ордера по {symbol}: {len(result['result']['list'])} шт.")
+            return True
+        except Exception as e:
+            logger.error(f"Ошибка при отмене всех ордеров: {e}")
+            return False
+
+    def create_user_stream(self, ws_url: str = None) -> UserDataStream:
+        return BybitUserDataStream(self.api_key, self.api_secret, ws_url)
+
+    async def get_order_state(self, order_id: str, symbol: str) -> Optional[OrderState]:
+        try:
+            result = await self._request("GET", "/v5/order/history",
+                                         {"category": "spot", "symbol": symbol, "orderId": order_id}, signed=True)
+            order = result['result']['list'][0]
+            logger.debug("Статус ордера {}: {}, исполнено {}", order_id, order['orderStatus'], order['cumExecQty'])
+            return OrderState(order_id, BybitUserDataStream.STATUSES.get(order['orderStatus'], ORDER_OPEN),
+                              float(order['cumExecQty'] or 0), float(order.get('avgPrice') or 0))
+        except Exception as e:
+            logger.error(f"Ошибка при проверке статуса ордера: {e}")
+            return None
+
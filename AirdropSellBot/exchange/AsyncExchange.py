@@ -0,0 +1,274 @@
+import asyncio
+import os
+from abc import ABC, abstractmethod
+from typing import Awaitable, Dict, List, Optional, Tuple, TypeVar
+
+import numpy as np
+from loguru import logger
+
+from config import ORDER_STATUS_POLL_INTERVAL, ORDER_STATE_TIMEOUT, WARM_CONNECTIONS, HEARTBEAT_INTERVAL, \
+    REQUEST_TIMEOUT
+from exchange.AsyncHttp import close_sessions
+from exchange.OrderState import OrderState
+from exchange.RequestSigner import ServerClock, server_clock
+from exchange.SellLadder import build_sell_ladder, to_depth_array
+from exchange.SymbolInfo import SymbolInfo, symbol_info_cache
+from metrics.ExchangeMetrics import exchange_name
+from metrics.TradeJournal import trade_journal
+from stream.DepthStream import DepthStream
+from stream.UserDataStream import UserDataStream
+
+T = TypeVar("T")
+
+
+# Асинхронный аналог Exchange: REST-запросы — сопрограммы поверх общего пула aiohttp,
+# поэтому баланс, биды, выставление, отмены и статусы могут идти одновременно.
+# WebSocket-потоки те же, что у синхронных адаптеров, и работают в своих потоках.
+class AsyncExchange(ABC):
+    depth_stream: Optional[DepthStream] = None
+    user_stream: Optional[UserDataStream] = None
+    DEPOSITS_PUSHED = True
+    ORDER_BOOK_DEPTH = 50
+    SUPPORTS_AMEND = False
+    ENV_PREFIX = ""
+    _loop: Optional[asyncio.AbstractEventLoop] = None
+    _heartbeat_task: Optional[asyncio.Task] = None
+
+    def endpoint_override(self, kind: str) -> Optional[str]:
+        """Адрес из переменной <PREFIX>_<kind>_URL, None — боевой адрес биржи."""
+        return os.getenv(f"{self.ENV_PREFIX}_{kind}_URL") or None
+
+    @abstractmethod
+    def create_symbol(self, assert_in: str, assert_out: str) -> str:
+        """Создать идентификатор торговой пары"""
+        pass
+
+    @abstractmethod
+    async def get_server_time(self) -> int:
+        """Время сервера биржи в миллисекундах (самый лёгкий запрос к торговому хосту)."""
+        pass
+
+    @property
+    def clock(self) -> ServerClock:
+        """Смещение часов биржи для timestamp подписанных запросов (общее с синхронным адаптером)."""
+        return server_clock(self.ENV_PREFIX)
+
+    async def sync_clock(self, samples: int = 1):
+        await self.clock.sync_async(self.get_server_time, samples)
+
+    async def warm_up(self):
+        """Открыть WARM_CONNECTIONS keep-alive соединений в пуле хоста параллельными лёгкими запросами."""
+        await asyncio.gather(*(self.get_server_time() for _ in range(WARM_CONNECTIONS)))
+
+    def start_heartbeat(self, interval: float = HEARTBEAT_INTERVAL):
+        """Прогревать соединения в фоновой задаче цикла событий."""
+        if self._heartbeat_task is None or self._heartbeat_task.done():
+            self._heartbeat_task = asyncio.get_running_loop().create_task(self._heartbeat_loop(interval))
+
+    def stop_heartbeat(self):
+        if self._heartbeat_task is not None:
+            self._heartbeat_task.cancel()
+            self._heartbeat_task = None
+
+    async def _heartbeat_loop(self, interval: float):
+        while True:
+            try:
+                await self.warm_up()
+                if self.clock.stale():
+                    await self.sync_clock()
+            except Exception as e:
+                logger.warning(f"Ошибка heartbeat-запроса: {e}")
+            await asyncio.sleep(interval)
+
+    @abstractmethod
+    async def fetch_symbol_info(self, symbol: str) -> SymbolInfo:
+        """Запросить у биржи шаг цены, шаг количества и минимумы ордера для пары."""
+        pass
+
+    async def get_symbol_info(self, symbol: str) -> SymbolInfo:
+        """Метаданные пары из общего файлового кэша."""
+        return await symbol_info_cache.aget(self, symbol)
+
+    async def refresh_symbol_info(self, symbol: str) -> Optional[SymbolInfo]:
+        return await symbol_info_cache.arefresh(self, symbol)
+
+    async def normalize_orders(self, symbol: str, orders: List[Tuple[float, float]]) -> List[Tuple[float, float]]:
+        return (await self.get_symbol_info(symbol)).normalize_orders(orders)
+
+    @abstractmethod
+    async def get_balance(self, asset: str, auto_transfer: bool) -> float:
+        pass
+
+    @abstractmethod
+    async def get_open_orders(self, symbol: str) -> list:
+        pass
+
+    @abstractmethod
+    def create_depth_stream(self, symbol: str, ws_url: str = None) -> DepthStream:
+        pass
+
+    def start_depth_stream(self, symbol: str, ws_url: str = None) -> DepthStream:
+        """Запустить поток глубины. Вызывается из цикла событий: снапшоты поток запрашивает через него."""
+        self._loop = asyncio.get_running_loop()
+        self.stop_depth_stream()
+        self.depth_stream = self.create_depth_stream(symbol, ws_url or self.endpoint_override("WS"))
+        self.depth_stream.start()
+        return self.depth_stream
+
+    def stop_depth_stream(self):
+        if self.depth_stream:
+            self.depth_stream.stop()
+            self.depth_stream = None
+
+    def _stream_bids(self, symbol: str, depth: int) -> Optional[List[Tuple[float, float]]]:
+        if self.depth_stream is None or self.depth_stream.symbol != symbol:
+            return None
+        return self.depth_stream.get_bids(depth)
+
+    @abstractmethod
+    async def fetch_bids(self, symbol: str, depth: int) -> np.ndarray:
+        """Биды через REST: массив (N, 2) цена/объём по убыванию цены, пустой при ошибке."""
+        pass
+
+    async def get_bids(self, symbol: str) -> np.ndarray:
+        """Биды из локальной книги, если она синхронизирована, иначе через REST."""
+        streamed_bids = self._stream_bids(symbol, self.ORDER_BOOK_DEPTH)
+        if streamed_bids is not None:
+            return to_depth_array(streamed_bids)
+        return await self.fetch_bids(symbol, self.ORDER_BOOK_DEPTH)
+
+    async def calculate_sell_orders(self, symbol: str, quantity: float,
+                                    bids: Optional[np.ndarray] = None) -> List[Tuple[float, float]]:
+        """Лестница ордеров по бидам; bids можно запросить заранее, параллельно с другими запросами."""
+        if bids is None:
+            bids = await self.get_bids(symbol)
+        trade_journal.book(exchange_name(self), symbol, bids)
+
+        if len(bids) < 2:
+            logger.warning(f"Недостаточно бидов для {symbol} после пропуска первого")
+            return []
+
+        orders = build_sell_ladder(bids, quantity)
+        trade_journal.ladder(exchange_name(self), symbol, orders)
+        return orders
+
+    @abstractmethod
+    async def place_sell_order(self, symbol: str, quantity: float, price: float) -> str:
+        pass
+
+    async def place_sell_orders(self, symbol: str, orders: List[Tuple[float, float]]) -> List[str]:
+        """
+        Выставить пакет ордеров [(price, qty), ...], order_id в порядке входного списка, "" для невыставленных.
+        По умолчанию все ордера отправляются одновременно, биржи с пакетным API переопределяют метод.
+        """
+        return list(await asyncio.gather(*(self.place_sell_order(symbol, qty, price) for price, qty in orders)))
+
+    async def amend_order(self, order_id: str, symbol: str, quantity: float, price: float) -> bool:
+        """Перенести ордер на новую цену и полный объём; False — не принято или amend не поддерживается."""
+        return False
+
+    async def amend_orders(self, symbol: str, amendments: List[Tuple[str, float, float]]) -> List[bool]:
+        """Изменить пакет ордеров [(order_id, price, qty), ...], по умолчанию все одновременно."""
+        if not self.SUPPORTS_AMEND:
+            return [False] * len(amendments)
+        return list(await asyncio.gather(*(self.amend_order(order_id, symbol, qty, price)
+                                           for order_id, price, qty in amendments)))
+
+    @abstractmethod
+    async def cancel_order(self, order_id: str, symbol: str):
+        pass
+
+    async def cancel_orders(self, symbol: str, order_ids: List[str]) -> Tuple[List[str], List[str]]:
+        """Отменить пакет ордеров, вернуть (отменённые, уже исполненные) order_id."""
+        if not order_ids:
+            return [], []
+        await asyncio.gather(*(self.cancel_order(order_id, symbol) for order_id in order_ids))
+        filled, not_filled = await self._split_filled(symbol, order_ids)
+        return not_filled, filled
+
+    @abstractmethod
+    async def cancel_all_orders(self, symbol: str) -> bool:
+        pass
+
+    @abstractmethod
+    async def get_order_state(self, order_id: str, symbol: str) -> Optional[OrderState]:
+        """Статус и исполненный объём ордера через REST, None — запрос не удался."""
+        pass
+
+    async def check_order_status(self, order_id: str, symbol: str) -> bool:
+        state = await self.get_order_state(order_id, symbol)
+        return state is not None and state.filled
+
+    async def get_order_states(self, symbol: str, order_ids: List[str],
+                               settled: bool = True) -> Dict[str, OrderState]:
+        """Состояния ордеров из потока, недостающие — одновременно через REST, см. Exchange.get_order_states."""
+        states = {}
+        if self.user_stream is not None and self.user_stream.connected:
+            if settled:
+                states = await asyncio.to_thread(self.user_stream.get_orders, order_ids, ORDER_STATE_TIMEOUT, True)
+            else:
+                states = self.user_stream.get_orders(order_ids)
+        missing = [order_id for order_id in order_ids if order_id not in states]
+        fetched = await asyncio.gather(*(self.get_order_state(order_id, symbol) for order_id in missing))
+        states.update({order_id: state for order_id, state in zip(missing, fetched) if state is not None})
+        return states
+
+    @abstractmethod
+    def create_user_stream(self, ws_url: str = None) -> UserDataStream:
+        pass
+
+    def start_user_stream(self, ws_url: str = None) -> UserDataStream:
+        self._loop = asyncio.get_running_loop()
+        self.stop_user_stream()
+        self.user_stream = self.create_user_stream(ws_url or self.endpoint_override("PRIVATE_WS"))
+        self.user_stream.start()
+        return self.user_stream
+
+    def stop_user_stream(self):
+        if self.user_stream:
+            self.user_stream.stop()
+            self.user_stream = None
+
+    def balance_stream_live(self) -> bool:
+        return self.DEPOSITS_PUSHED and self.user_stream is not None and self.user_stream.connected
+
+    async def wait_for_balance(self, asset: str, timeout: float) -> Optional[float]:
+        """Ждать события о ненулевом балансе до timeout секунд, не блокируя цикл событий."""
+        if self.user_stream is not None and self.user_stream.connected:
+            return await asyncio.to_thread(self.user_stream.wait_for_balance, asset, timeout)
+        await asyncio.sleep(timeout)
+        return None
+
+    async def wait_for_fills(self, symbol: str, order_ids: List[str], timeout: float) -> List[str]:
+        """Ждать исполнения ордеров не дольше timeout секунд: по событиям потока или опросом статусов."""
+        if self.user_stream is not None and self.user_stream.connected:
+            return await asyncio.to_thread(self.user_stream.wait_for_fills, order_ids, timeout)
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        filled, pending = [], list(order_ids)
+        while pending:
+            newly_filled, pending = await self._split_filled(symbol, pending)
+            filled.extend(newly_filled)
+            remaining = deadline - loop.time()
+            if not pending or remaining <= 0:
+                break
+            await asyncio.sleep(min(ORDER_STATUS_POLL_INTERVAL, remaining))
+        return filled
+
+    async def _split_filled(self, symbol: str, order_ids: List[str]) -> Tuple[List[str], List[str]]:
+        """Одновременно проверить статусы ордеров, вернуть (исполненные, неисполненные)."""
+        statuses = await asyncio.gather(*(self.check_order_status(order_id, symbol) for order_id in order_ids))
+        filled = [order_id for order_id, status in zip(order_ids, statuses) if status]
+        not_filled = [order_id for order_id, status in zip(order_ids, statuses) if not status]
+        return filled, not_filled
+
+    def call_from_thread(self, coroutine: Awaitable[T]) -> T:
+        """Выполнить запрос из потока WebSocket (снапшот книги, listenKey) в цикле событий адаптера."""
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop).result(REQUEST_TIMEOUT)
+
+    async def close(self):
+        """Остановить потоки и heartbeat, закрыть пулы соединений."""
+        self.stop_heartbeat()
+        self.stop_depth_stream()
+        self.stop_user_stream()
+        await close_sessions()
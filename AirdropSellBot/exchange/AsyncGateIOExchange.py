@@ -0,0 +1,269 @@
+import asyncio
+import hashlib
+import json
+import os
+from typing import Any, List, Optional, Tuple
+from urllib.parse import urlencode, urlsplit
+
+import numpy as np
+from loguru import logger
+
+from exchange.AsyncExchange import AsyncExchange
+from exchange.AsyncHttp import request_json
+from exchange.OrderState import OrderState, gate_status
+from exchange.RateLimiter import rate_limiter
+from exchange.RequestSigner import HmacSigner
+from exchange.SellLadder import to_depth_array
+from exchange.SymbolInfo import SymbolInfo
+from stream.DepthStream import DepthStream, GateIODepthStream
+from stream.UserDataStream import GateIOUserDataStream, UserDataStream
+
+
+GATE_API_URL = "https://api.gateio.ws/api/v4"
+GATE_BATCH_SIZE = 10  # Максимум ордеров в одном запросе batch_orders
+GATE_CANCEL_BATCH_SIZE = 20  # Максимум ордеров в одном запросе cancel_batch_orders
+GATE_TIMESTAMP_REJECTED = "REQUEST_EXPIRED"  # label ошибки: timestamp запроса устарел
+
+
+class GateApiError(Exception):
+    pass
+
+
+# Gate.io на aiohttp: REST API v4 без gate-api
+class AsyncGateIOExchange(AsyncExchange):
+    SUPPORTS_AMEND = True
+    ENV_PREFIX = "GATE"
+
+    def __init__(self, api_key: str = None, api_secret: str = None):
+        self.api_key = api_key or os.getenv("GATE_API_KEY")
+        self.api_secret = api_secret or os.getenv("GATE_API_SECRET")
+        if not self.api_key or not self.api_secret:
+            logger.error("API ключи для Gate не найдены в .env")
+            raise ValueError("API keys not provided")
+        self.api_url = self.endpoint_override("API") or GATE_API_URL
+        self.limiter = rate_limiter(self.ENV_PREFIX, self.api_key)
+        self.signer = HmacSigner(self.api_secret, hashlib.sha512)
+        self.api_path = urlsplit(self.api_url).path  # /api/v4 входит в подписываемый путь
+
+    async def _request(self, method: str, path: str, params: dict = None, body=None, signed: bool = False) -> Any:
+        """
+        Запрос к API v4. Подпись — HMAC-SHA512 от строк
+        метод, путь, строка запроса, SHA512 тела и timestamp, разделённых переводом строки;
+        timestamp — по часам биржи, отвергнутый timestamp перемеряется и запрос повторяется.
+        """
+        query = urlencode(params) if params else ""
+        payload = json.dumps(body, separators=(",", ":")) if body is not None else ""
+        url = f"{self.api_url}{path}?{query}" if query else f"{self.api_url}{path}"
+        headers = {"Accept": "application/json", "Content-Type": "application/json"}
+        if signed:
+            headers["KEY"] = self.api_key
+            body_hash = hashlib.sha512(payload.encode("utf-8")).hexdigest()
+            prefix = f"{method}\n{self.api_path}{path}\n{query}\n{body_hash}\n"
+        for attempt in range(2):
+            if signed:
+                timestamp = str(self.clock.now_ms() // 1000)
+                headers["Timestamp"] = timestamp
+                headers["SIGN"] = self.signer.hexdigest(prefix + timestamp)
+            status, result = await request_json(method, url, self.limiter, data=payload or None, headers=headers)
+            if status < 400:
+                return result
+            if attempt or not signed or not isinstance(result, dict) or result.get('label') != GATE_TIMESTAMP_REJECTED:
+                raise GateApiError(f"{status}: {result}")
+            logger.warning(f"Gate отверг timestamp запроса {path}, синхронизируем время")
+            await self.sync_clock()
+
+    def create_symbol(self, assert_in: str, assert_out: str) -> str:
+        """Gate.io использует формат с подчёркиванием, например, BTC_USDT."""
+        return f"{assert_in}_{assert_out}"
+
+    async def get_server_time(self) -> int:
+        return int((await self._request("GET", "/spot/time"))['server_time'])
+
+    async def fetch_symbol_info(self, symbol: str) -> SymbolInfo:
+        """Точность цены и количества Gate.io задаёт числом знаков после запятой."""
+        pair = await self._request("GET", f"/spot/currency_pairs/{symbol}")
+        return SymbolInfo(
+            tick_size=10 ** -int(pair['precision']),
+            lot_size=10 ** -int(pair['amount_precision']),
+            min_qty=float(pair.get('min_base_amount') or 0),
+            min_notional=float(pair.get('min_quote_amount') or 0)
+        )
+
+    async def get_balance(self, asset: str, auto_transfer: bool = True) -> float:
+        """Gate.io не требует перевода между Funding и Trading, поэтому auto_transfer игнорируется."""
+        try:
+            accounts = await self._request("GET", "/spot/accounts", {"currency": asset}, signed=True)
+            for account in accounts:
+                if account['currency'] == asset:
+                    avail_bal = float(account['available'])
+                    logger.debug("Найден баланс для {}: {}", asset, avail_bal)
+                    return avail_bal
+            logger.debug("Баланс для {} не найден, возвращаем 0", asset)
+            return 0.0
+        except Exception as e:
+            logger.error(f"Ошибка при получении баланса: {e}")
+            return 0.0
+
+    async def get_open_orders(self, symbol: str) -> list:
+        try:
+            orders = await self._request("GET", "/spot/orders",
+                                         {"currency_pair": symbol, "status": "open", "page": 1, "limit": 100},
+                                         signed=True)
+            logger.debug("Получены открытые ордера для {}: {} шт.", symbol, len(orders))
+            return orders
+        except Exception as e:
+            logger.error(f"Ошибка при получении ордеров: {e}")
+            return []
+
+    def create_depth_stream(self, symbol: str, ws_url: str = None) -> DepthStream:
+        """Поток spot.order_book_update, синхронизируемый по REST-снапшоту с id."""
+        return GateIODepthStream(symbol, self._load_depth_snapshot, ws_url)
+
+    def _load_depth_snapshot(self, symbol: str) -> Tuple[list, list, int]:
+        order_book = self.call_from_thread(self._request("GET", "/spot/order_book",
+                                                         {"currency_pair": symbol, "limit": 100, "with_id": "true"}))
+        return order_book['bids'], order_book['asks'], int(order_book['id'])
+
+    async def fetch_bids(self, symbol: str, depth: int) -> np.ndarray:
+        try:
+            order_book = await self._request("GET", "/spot/order_book", {"currency_pair": symbol, "limit": depth})
+            return to_depth_array(order_book['bids'])
+        except Exception as e:
+            logger.error(f"Ошибка при получении книги ордеров: {e}")
+            return to_depth_array([])
+
+    async def place_sell_order(self, symbol: str, quantity: float, price: float) -> str:
+        info = await self.get_symbol_info(symbol)
+        try:
+            order = await self._request("POST", "/spot/orders", body=self._order(info, symbol, quantity, price), signed=True)
+            logger.debug("Ордер успешно выставлен: {}", order['id'])
+            return order['id']
+        except Exception as e:
+            logger.error(f"Ошибка при выставлении ордера: {e}")
+            return ""
+
+    async def place_sell_orders(self, symbol: str, orders: List[Tuple[float, float]]) -> List[str]:
+        batches = await asyncio.gather(*(self._place_sell_orders_batch(symbol, orders[start:start + GATE_BATCH_SIZE])
+                                         for start in range(0, len(orders), GATE_BATCH_SIZE)))
+        return [order_id for batch in batches for order_id in batch]
+
+    async def _place_sell_orders_batch(self, symbol: str, orders: List[Tuple[float, float]]) -> List[str]:
+        info = await self.get_symbol_info(symbol)
+        try:
+            created_orders = await self._request("POST", "/spot/batch_orders",
+                                                 body=[self._order(info, symbol, quantity, price) for price, quantity in orders],
+                                                 signed=True)
+            order_ids = []
+            for created_order in created_orders:
+                if created_order.get('succeeded'):
+                    logger.debug("Ордер успешно выставлен: {}", created_order['id'])
+                    order_ids.append(created_order['id'])
+                else:
+                    logger.error(f"Ошибка выставления ордера: {created_order.get('message')}")
+                    order_ids.append("")
+            return order_ids
+        except Exception as e:
+            logger.error(f"Ошибка при пакетном выставлении ордеров: {e}")
+            return [""] * len(orders)
+
+    @staticmethod
+    def _order(info: SymbolInfo, symbol: str, quantity: float, price: float) -> dict:
+        return {"currency_pair": symbol, "side": "sell", "type": "limit", "amount": info.format_qty(quantity), "price": info.format_price(price)}
+
+    async def amend_order(self, order_id: str, symbol: str, quantity: float, price: float) -> bool:
+        info = await self.get_symbol_info(symbol)
+        try:
+            await self._request("PATCH", f"/spot/orders/{order_id}", {"currency_pair": symbol},
+                                body={"amount": info.format_qty(quantity), "price": info.format_price(price)}, signed=True)
+            logger.debug("Ордер {} перенесён: {} по {}", order_id, quantity, price)
+            return True
+        except GateApiError as e:
+            # ORDER_NOT_FOUND и т.п.: ордер уже исполнен или отменён — его заменит новый
+            logger.debug("Ордер {} не изменён: {}", order_id, e)
+            return False
+        except Exception as e:
+            logger.error(f"Ошибка при изменении ордера: {e}")
+            return False
+
+    async def amend_orders(self, symbol: str, amendments: List[Tuple[str, float, float]]) -> List[bool]:
+        batches = await asyncio.gather(*(self._amend_orders_batch(symbol, amendments[start:start + GATE_BATCH_SIZE])
+                                         for start in range(0, len(amendments), GATE_BATCH_SIZE)))
+        return [amended for batch in batches for amended in batch]
+
+    async def _amend_orders_batch(self, symbol: str, amendments: List[Tuple[str, float, float]]) -> List[bool]:
+        info = await self.get_symbol_info(symbol)
+        try:
+            amended_orders = await self._request("POST", "/spot/amend_batch_orders", body=[
+                {"order_id": order_id, "currency_pair": symbol, "amount": info.format_qty(quantity), "price": info.format_price(price)}
+                for order_id, price, quantity in amendments
+            ], signed=True)
+            results = []
+            for (order_id, _, _), amended_order in zip(amendments, amended_orders):
+                if not amended_order.get('succeeded'):
+                    logger.debug("Ордер {} не изменён: {}", order_id, amended_order.get('message'))
+                results.append(bool(amended_order.get('succeeded')))
+            return results
+        except Exception as e:
+            logger.error(f"Ошибка при пакетном изменении ордеров: {e}")
+            return [False] * len(amendments)
+
+    async def cancel_order(self, order_id: str, symbol: str):
+        try:
+            await self._request("DELETE", f"/spot/orders/{order_id}", {"currency_pair": symbol}, signed=True)
+            logger.debug("Ордер {} отменён", order_id)
+        except Exception as e:
+            logger.error(f"Ошибка при отмене ордера: {e}")
+
+    async def cancel_orders(self, symbol: str, order_ids: List[str]) -> Tuple[List[str], List[str]]:
+        """Пакетная отмена ордеров, для неотменённых уточняется, не исполнены ли они."""
+        results = await asyncio.gather(*(
+            self._cancel_orders_batch(symbol, order_ids[start:start + GATE_CANCEL_BATCH_SIZE])
+            for start in range(0, len(order_ids), GATE_CANCEL_BATCH_SIZE)
+        ))
+        cancelled = [order_id for batch_cancelled, _ in results for order_id in batch_cancelled]
+        failed = [order_id for _, batch_failed in results for order_id in batch_failed]
+        logger.debug("Отменено ордеров: {}, не отменено: {}", len(cancelled), len(failed))
+        filled, _ = await self._split_filled(symbol, failed)
+        return cancelled, filled
+
+    async def _cancel_orders_batch(self, symbol: str, chunk: List[str]) -> Tuple[List[str], List[str]]:
+        try:
+            results = await self._request("POST", "/spot/cancel_batch_orders",
+                                          body=[{"currency_pair": symbol, "id": order_id} for order_id in chunk],
+                                          signed=True)
+            cancelled, failed = [], []
+            for result in results:
+                if result.get('succeeded'):
+                    cancelled.append(result['id'])
+                else:
+                    logger.debug("Ордер {} не отменён: {}", result['id'], result.get('message'))
+                    failed.append(result['id'])
+            return cancelled, failed
+        except Exception as e:
+            logger.error(f"Ошибка при пакетной отмене ордеров: {e}")
+            return [], chunk
+
+    async def cancel_all_orders(self, symbol: str) -> bool:
+        try:
+            cancelled = await self._request("DELETE", "/spot/orders", {"currency_pair": symbol}, signed=True)
+            logger.info(f"Отменены все ордера по {symbol}: {len(cancelled)} шт.")
+            return True
+        except Exception as e:
+            logger.error(f"Ошибка при отмене всех ордеров: {e}")
+            return False
+
+    def create_user_stream(self, ws_url: str = None) -> UserDataStream:
+        """Приватный канал spot.orders по всем парам."""
+        return GateIOUserDataStream(self.api_key, self.api_secret, ws_url)
+
+    async def get_order_state(self, order_id: str, symbol: str) -> Optional[OrderState]:
+        try:
+            order = await self._request("GET", f"/spot/orders/{order_id}", {"currency_pair": symbol}, signed=True)
+            filled_qty = float(order['amount']) - float(order['left'])
+            logger.debug("Статус ордера {}: {}, исполнено {}", order_id, order['status'], filled_qty)
+            return OrderState(order_id, gate_status(order['status'], filled_qty), filled_qty,
+                              float(order.get('avg_deal_price') or 0))
+        except Exception as e:
+            logger.error(f"Ошибка при проверке статуса ордера: {e}")
+            return None
+
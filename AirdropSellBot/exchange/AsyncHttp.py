@@ -0,0 +1,60 @@
+import asyncio
+import json
+from typing import Any, Dict, Tuple
+from urllib.parse import parse_qsl, urlsplit
+
+import aiohttp
+from loguru import logger
+from yarl import URL
+
+from config import REQUEST_TIMEOUT, WARM_CONNECTIONS
+from exchange.RateLimiter import RateLimiter
+
+CONNECTIONS_PER_HOST = max(WARM_CONNECTIONS, 16)  # Лестница и пакетные отмены уходят параллельно
+KEEPALIVE_TIMEOUT = 60  # Сколько секунд держать простаивающее соединение открытым
+DNS_CACHE_TTL = 300
+
+# Один пул keep-alive соединений на хост в каждом цикле событий: его делят все адаптеры и задачи
+_sessions: Dict[Tuple[int, str], aiohttp.ClientSession] = {}
+
+
+def get_session(base_url: str) -> aiohttp.ClientSession:
+    """Общая сессия aiohttp для хоста base_url в текущем цикле событий."""
+    url = urlsplit(base_url)
+    key = (id(asyncio.get_running_loop()), f"{url.scheme}://{url.netloc}")
+    session = _sessions.get(key)
+    if session is None or session.closed:
+        connector = aiohttp.TCPConnector(limit_per_host=CONNECTIONS_PER_HOST, keepalive_timeout=KEEPALIVE_TIMEOUT,
+                                         ttl_dns_cache=DNS_CACHE_TTL)
+        session = _sessions[key] = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=REQUEST_TIMEOUT)
+        )
+        logger.debug("Открыт пул соединений {}", key[1])
+    return session
+
+
+async def request_json(method: str, url: str, limiter: RateLimiter = None, **kwargs) -> Tuple[int, Any]:
+    """
+    HTTP-запрос через общий пул хоста, возвращает (код ответа, разобранный JSON или текст).
+    url передаётся как есть, без повторного кодирования: подпись считается по уже закодированной строке запроса.
+    С limiter запрос сначала ждёт места в лимитах биржи, а ответ сверяет с ними расход.
+    """
+    parts = urlsplit(url)
+    if limiter is not None:
+        await limiter.acquire_async(method, parts.path, dict(parse_qsl(parts.query)), kwargs.get("data"))
+    async with get_session(url).request(method, URL(url, encoded=True), **kwargs) as response:
+        if limiter is not None:
+            limiter.observe(method, parts.path, response.status, response.headers)
+        text = await response.text()
+        try:
+            return response.status, json.loads(text) if text else None
+        except ValueError:
+            return response.status, text
+
+
+async def close_sessions():
+    """Закрыть пулы текущего цикла событий (перед его завершением)."""
+    loop_id = id(asyncio.get_running_loop())
+    for key in [key for key in _sessions if key[0] == loop_id]:
+        await _sessions.pop(key).close()
@@ -0,0 +1,228 @@
+import asyncio
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from loguru import logger
+
+from exchange.AsyncExchange import AsyncExchange
+from exchange.AsyncHttp import request_json
+from exchange.OrderState import OrderState, BINANCE_STATUSES, ORDER_OPEN
+from exchange.RateLimiter import rate_limiter
+from exchange.RequestSigner import HmacSigner, JsonTemplate, QueryTemplate
+from exchange.SellLadder import to_depth_array
+from exchange.SymbolInfo import SymbolInfo
+from stream.DepthStream import DepthStream, MEXCDepthStream
+from stream.UserDataStream import MEXCUserDataStream, UserDataStream
+
+
+MEXC_API_URL = "https://api.mexc.com/api/v3"
+MEXC_BATCH_SIZE = 20  # Максимум ордеров в одном запросе batchOrders
+MEXC_TIMESTAMP_REJECTED = 700003  # Код ошибки: timestamp вне recvWindow
+
+
+class MEXCApiError(Exception):
+    def __init__(self, status: int, result: Any):
+        super().__init__(f"{status}: {result}")
+        self.result = result
+
+
+# MEXC на aiohttp вместо requests.Session
+class AsyncMEXCExchange(AsyncExchange):
+    ORDER_BOOK_DEPTH = 10
+    ENV_PREFIX = "MEXC"
+
+    def __init__(self, api_key: str = None, api_secret: str = None):
+        self.api_key = api_key or os.getenv("MEXC_API_KEY")
+        self.api_secret = api_secret or os.getenv("MEXC_API_SECRET")
+        if not self.api_key or not self.api_secret:
+            logger.error("API ключи для MEXC не найдены в .env")
+            raise ValueError("API keys not provided")
+        self.api_url = self.endpoint_override("API") or MEXC_API_URL
+        self.limiter = rate_limiter(self.ENV_PREFIX, self.api_key)
+        self.signer = HmacSigner(self.api_secret)
+        self._order_queries: Dict[str, QueryTemplate] = {}
+        self._batch_orders: Dict[str, JsonTemplate] = {}
+
+    async def _request(self, method: str, path: str, params: dict = None, signed: bool = False) -> Any:
+        """
+        Все параметры — в строке запроса и для POST/DELETE. Подписывается ровно отправляемая строка:
+        значения должны быть уже закодированы (batchOrders), остальные параметры в кодировании не нуждаются.
+        """
+        params = dict(params or {})
+        if not signed:
+            query = "&".join(f"{k}={v}" for k, v in sorted(params.items()))
+            return await self._send(method, f"{self.api_url}{path}?{query}" if query else f"{self.api_url}{path}")
+        template = QueryTemplate(params, ("timestamp",))
+        return await self._send_signed(method, path, lambda timestamp: template.render(timestamp=timestamp))
+
+    async def _send(self, method: str, url: str) -> Any:
+        status, result = await request_json(method, url, self.limiter, headers={"X-MEXC-APIKEY": self.api_key,
+                                                                                "Content-Type": "application/json"})
+        if status != 200:
+            raise MEXCApiError(status, result)
+        return result
+
+    async def _send_signed(self, method: str, path: str, build_query) -> Any:
+        """
+        Запрос с подписанной строкой build_query(timestamp), timestamp — по часам биржи.
+        Если биржа всё же отвергла timestamp, время перемеряется и запрос один раз подписывается заново.
+        """
+        for attempt in range(2):
+            query = build_query(self.clock.now_ms())
+            try:
+                return await self._send(method, f"{self.api_url}{path}?{query}&signature={self.signer.hexdigest(query)}")
+            except MEXCApiError as e:
+                if attempt or not isinstance(e.result, dict) or e.result.get('code') != MEXC_TIMESTAMP_REJECTED:
+                    raise
+            logger.warning(f"MEXC отверг timestamp запроса {path}, синхронизируем время")
+            await self.sync_clock()
+
+    def _order_query(self, symbol: str) -> QueryTemplate:
+        """Строка запроса ордера по паре: подставляются только цена, объём и timestamp."""
+        if symbol not in self._order_queries:
+            self._order_queries[symbol] = QueryTemplate({"symbol": symbol, "side": "SELL", "type": "LIMIT"},
+                                                        ("quantity", "price", "timestamp"))
+        return self._order_queries[symbol]
+
+    def _batch_order(self, symbol: str) -> JsonTemplate:
+        """Закодированный JSON ордера по паре для batchOrders."""
+        if symbol not in self._batch_orders:
+            self._batch_orders[symbol] = JsonTemplate(
+                {"symbol": symbol, "side": "SELL", "type": "LIMIT", "quantity": None, "price": None}, url_encode=True)
+        return self._batch_orders[symbol]
+
+    def create_symbol(self, assert_in: str, assert_out: str) -> str:
+        return f"{assert_in}{assert_out}"
+
+    async def get_server_time(self) -> int:
+        return int((await self._request("GET", "/time"))['serverTime'])
+
+    async def fetch_symbol_info(self, symbol: str) -> SymbolInfo:
+        result = await self._request("GET", "/exchangeInfo", {"symbol": symbol})
+        if not result.get('symbols'):
+            raise ValueError(f"Пара {symbol} не найдена: {result}")
+        info = result['symbols'][0]
+        # baseSizePrecision — шаг количества строкой, "0" означает точность baseAssetPrecision
+        lot_size = float(info.get('baseSizePrecision') or 0) or 10 ** -int(info['baseAssetPrecision'])
+        return SymbolInfo(
+            tick_size=10 ** -int(info['quotePrecision']),
+            lot_size=lot_size,
+            min_qty=lot_size,
+            min_notional=float(info.get('quoteAmountPrecision') or 0)
+        )
+
+    async def get_balance(self, asset: str, auto_transfer: bool = False) -> float:
+        try:
+            result = await self._request("GET", "/account", signed=True)
+            for balance in result.get('balances', []):
+                if balance['asset'] == asset:
+                    avail_bal = float(balance['free'])
+                    logger.debug("Найден баланс для {}: {}", asset, avail_bal)
+                    return avail_bal
+            logger.debug("Баланс для {} не найден, возвращаем 0", asset)
+            return 0.0
+        except Exception as e:
+            logger.error(f"Ошибка при получении баланса: {e}")
+            return 0.0
+
+    async def get_open_orders(self, symbol: str) -> list:
+        try:
+            result = await self._request("GET", "/openOrders", {"symbol": symbol}, signed=True)
+            logger.debug("Получены открытые ордера для {}: {} шт.", symbol, len(result))
+            return result
+        except Exception as e:
+            logger.error(f"Ошибка при получении ордеров: {e}")
+            return []
+
+    def create_depth_stream(self, symbol: str, ws_url: str = None) -> DepthStream:
+        return MEXCDepthStream(symbol, ws_url)
+
+    async def fetch_bids(self, symbol: str, depth: int) -> np.ndarray:
+        try:
+            result = await self._request("GET", "/depth", {"symbol": symbol, "limit": depth})
+            return to_depth_array(result['bids'])
+        except Exception as e:
+            logger.error(f"Ошибка при получении книги ордеров: {e}")
+            return to_depth_array([])
+
+    async def place_sell_order(self, symbol: str, quantity: float, price: float) -> str:
+        info = await self.get_symbol_info(symbol)
+        try:
+            template = self._order_query(symbol)
+            result = await self._send_signed("POST", "/order", lambda timestamp: template.render(
+                quantity=info.format_qty(quantity), price=info.format_price(price), timestamp=timestamp))
+            logger.debug("Ордер успешно выставлен: {}", result['orderId'])
+            return result['orderId']
+        except Exception as e:
+            logger.error(f"Ошибка при выставлении ордера: {e}")
+            return ""
+
+    async def place_sell_orders(self, symbol: str, orders: List[Tuple[float, float]]) -> List[str]:
+        batches = await asyncio.gather(*(self._place_sell_orders_batch(symbol, orders[start:start + MEXC_BATCH_SIZE])
+                                         for start in range(0, len(orders), MEXC_BATCH_SIZE)))
+        return [order_id for batch in batches for order_id in batch]
+
+    async def _place_sell_orders_batch(self, symbol: str, orders: List[Tuple[float, float]]) -> List[str]:
+        info = await self.get_symbol_info(symbol)
+        try:
+            batch_orders = self._batch_order(symbol).render_list(
+                {"quantity": info.format_qty(quantity), "price": info.format_price(price)} for price, quantity in orders)
+            result = await self._send_signed("POST", "/batchOrders",
+                                             lambda timestamp: f"batchOrders={batch_orders}&timestamp={timestamp}")
+            if not isinstance(result, list) or len(result) != len(orders):
+                logger.error(f"Ошибка пакетного выставления ордеров: {result}")
+                return [""] * len(orders)
+            order_ids = []
+            for item in result:
+                if 'orderId' in item:
+                    logger.debug("Ордер успешно выставлен: {}", item['orderId'])
+                    order_ids.append(item['orderId'])
+                else:
+                    logger.error(f"Ошибка выставления ордера: {item}")
+                    order_ids.append("")
+            return order_ids
+        except Exception as e:
+            logger.error(f"Ошибка при пакетном выставлении ордеров: {e}")
+            return [""] * len(orders)
+
+    async def cancel_order(self, order_id: str, symbol: str):
+        try:
+            await self._request("DELETE", "/order", {"orderId": order_id, "symbol": symbol}, signed=True)
+            logger.debug("Ордер {} отменён", order_id)
+        except Exception as e:
+            logger.error(f"Ошибка при отмене ордера: {e}")
+
+    async def cancel_all_orders(self, symbol: str) -> bool:
+        try:
+            result = await self._request("DELETE", "/openOrders", {"symbol": symbol}, signed=True)
+            logger.info(f"Отменены все ордера по {symbol}: {len(result)} шт.")
+            return True
+        except Exception as e:
+            logger.error(f"Ошибка при отмене всех ордеров: {e}")
+            return False
+
+    def create_user_stream(self, ws_url: str = None) -> UserDataStream:
+        return MEXCUserDataStream(lambda: self.call_from_thread(self._create_listen_key()),
+                                  lambda listen_key: self.call_from_thread(self._keepalive_listen_key(listen_key)),
+                                  ws_url)
+
+    async def _create_listen_key(self) -> str:
+        result = await self._request("POST", "/userDataStream", signed=True)
+        if 'listenKey' not in result:
+            raise ValueError(f"Не удалось получить listenKey: {result}")
+        return result['listenKey']
+
+    async def _keepalive_listen_key(self, listen_key: str):
+        await self._request("PUT", "/userDataStream", {"listenKey": listen_key}, signed=True)
+
+    async def get_order_state(self, order_id: str, symbol: str) -> Optional[OrderState]:
+        try:
+            result = await self._request("GET", "/order", {"orderId": order_id, "symbol": symbol}, signed=True)
+            logger.debug("Статус ордера {}: {}, исполнено {}", order_id, result['status'], result['executedQty'])
+            return OrderState.from_quote(order_id, BINANCE_STATUSES.get(result['status'], ORDER_OPEN),
+                                         float(result['executedQty']), float(result['cummulativeQuoteQty']))
+        except Exception as e:
+            logger.error(f"Ошибка при проверке статуса ордера: {e}")
+            return None
+
@@ -0,0 +1,315 @@
+import asyncio
+import json
+import os
+from datetime import datetime, timezone
+from typing import List, Optional, Tuple
+from urllib.parse import urlencode
+
+import numpy as np
+from loguru import logger
+
+from exchange.AsyncExchange import AsyncExchange
+from exchange.AsyncHttp import request_json
+from exchange.OrderState import OrderState, ORDER_OPEN
+from exchange.RateLimiter import rate_limiter
+from exchange.RequestSigner import HmacSigner
+from exchange.SellLadder import to_depth_array
+from exchange.SymbolInfo import SymbolInfo
+from stream.DepthStream import DepthStream, OKXDepthStream
+from stream.UserDataStream import OKXUserDataStream, UserDataStream
+
+
+OKX_API_URL = "https://www.okx.com"
+OKX_BATCH_SIZE = 20  # Максимум ордеров в одном запросе batch-orders
+OKX_TIMESTAMP_REJECTED = "50102"  # Код ошибки: timestamp запроса устарел
+
+
+class OKXApiError(Exception):
+    pass
+
+
+# OKX на aiohttp: REST API v5 без python-okx, все разделы API идут через один пул соединений
+class AsyncOKXExchange(AsyncExchange):
+    DEPOSITS_PUSHED = False  # Зачисления приходят на Funding, а приватный поток видит только Trading
+    SUPPORTS_AMEND = True
+    ENV_PREFIX = "OKX"
+
+    def __init__(self, api_key: str = None, api_secret: str = None, passphrase: str = None):
+        self.api_key = api_key or os.getenv("OKX_API_KEY")
+        self.api_secret = api_secret or os.getenv("OKX_API_SECRET")
+        self.passphrase = passphrase or os.getenv("OKX_PASSPHRASE")
+        self.api_url = self.endpoint_override("API") or OKX_API_URL
+        self.limiter = rate_limiter(self.ENV_PREFIX, self.api_key)
+        self.signer = HmacSigner(self.api_secret or "")
+
+    async def _request(self, method: str, path: str, params=None, signed: bool = False) -> dict:
+        """
+        Запрос к API v5: GET с параметрами в строке запроса, POST с JSON-телом (объект или список).
+        Подпись — base64(HMAC-SHA256) от timestamp + метод + путь с запросом + тело,
+        timestamp — по часам биржи; отвергнутый timestamp перемеряется и запрос повторяется.
+        """
+        query = urlencode(params) if method == "GET" and params else ""
+        request_path = f"{path}?{query}" if query else path
+        body = json.dumps(params, separators=(",", ":")) if method != "GET" and params is not None else ""
+        headers = {"Content-Type": "application/json"}
+        if signed:
+            headers.update({"OK-ACCESS-KEY": self.api_key, "OK-ACCESS-PASSPHRASE": self.passphrase})
+            suffix = f"{method}{request_path}{body}"
+        for attempt in range(2):
+            if signed:
+                timestamp = datetime.fromtimestamp(self.clock.now_ms() / 1000, timezone.utc) \
+                    .isoformat(timespec="milliseconds").replace("+00:00", "Z")
+                headers["OK-ACCESS-TIMESTAMP"] = timestamp
+                headers["OK-ACCESS-SIGN"] = self.signer.b64digest(timestamp + suffix)
+            status, result = await request_json(method, f"{self.api_url}{request_path}", self.limiter,
+                                                data=body or None, headers=headers)
+            if not isinstance(result, dict) or 'code' not in result:
+                raise OKXApiError(f"{status}: {result}")
+            if attempt or not signed or result['code'] != OKX_TIMESTAMP_REJECTED:
+                return result
+            logger.warning(f"OKX отверг timestamp запроса {path}, синхронизируем время")
+            await self.sync_clock()
+
+    def create_symbol(self, assert_in: str, assert_out: str) -> str:
+        return assert_in + "-" + assert_out
+
+    async def get_server_time(self) -> int:
+        result = await self._request("GET", "/api/v5/public/time")
+        return int(result['data'][0]['ts'])
+
+    async def fetch_symbol_info(self, symbol: str) -> SymbolInfo:
+        result = await self._request("GET", "/api/v5/public/instruments", {"instType": "SPOT", "instId": symbol})
+        if result['code'] != '0' or not result['data']:
+            raise ValueError(f"Пара {symbol} не найдена: {result['msg']}")
+        instrument = result['data'][0]
+        # OKX не публикует минимальную сумму ордера для спота
+        return SymbolInfo(
+            tick_size=float(instrument['tickSz']),
+            lot_size=float(instrument['lotSz']),
+            min_qty=float(instrument['minSz'])
+        )
+
+    async def get_balance(self, asset: str, auto_transfer: bool = False) -> float:
+        try:
+            if auto_transfer:
+                await self._transfer_from_funding(asset)
+            trading_result = await self._request("GET", "/api/v5/account/balance", {"ccy": asset}, signed=True)
+            if trading_result['code'] != '0':
+                logger.error(f"Ошибка получения баланса Trading: {trading_result['msg']}")
+                return 0.0
+            for balance in trading_result['data'][0]['details']:
+                if balance['ccy'] == asset:
+                    avail_bal = float(balance['availBal'])
+                    logger.debug("Найден баланс Trading для {}: {}", asset, avail_bal)
+                    return avail_bal
+            logger.debug("Баланс Trading для {} не найден, возвращаем 0", asset)
+            return 0.0
+        except Exception as e:
+            logger.error(f"Ошибка при получении баланса: {e}")
+            return 0.0
+
+    async def _transfer_from_funding(self, asset: str):
+        """Перевести всё доступное на Funding на торговый аккаунт."""
+        funding_result = await self._request("GET", "/api/v5/asset/balances", {"ccy": asset}, signed=True)
+        if funding_result['code'] != '0':
+            logger.error(f"Ошибка получения баланса Funding: {funding_result['msg']}")
+            return
+        funding_bal = sum(float(balance['availBal']) for balance in funding_result['data'] if balance['ccy'] == asset)
+        if funding_bal <= 0:
+            logger.debug("Баланс Funding для {} не найден", asset)
+            return
+        logger.info(f"Обнаружен баланс {funding_bal} {asset} на Funding, переводим на Trading")
+        transfer_result = await self._request("POST", "/api/v5/asset/transfer", {
+            "ccy": asset,
+            "amt": str(funding_bal),
+            "from": "6",  # Funding аккаунт (код 6)
+            "to": "18"  # Trading аккаунт (код 18)
+        }, signed=True)
+        if transfer_result['code'] != '0':
+            logger.error(f"Ошибка перевода средств: {transfer_result['msg']}")
+            return
+        logger.info(f"Успешно переведено {funding_bal} {asset} с Funding на Trading")
+        await asyncio.sleep(0.5)  # Ждём 0.5 секунды после перевода
+
+    async def get_open_orders(self, symbol: str) -> list:
+        try:
+            result = await self._request("GET", "/api/v5/trade/orders-pending", {"instId": symbol}, signed=True)
+            if result['code'] != '0':
+                logger.error(f"Ошибка получения ордеров: {result['msg']}")
+                return []
+            orders = result['data']
+            logger.debug("Получены открытые ордера для {}: {} шт.", symbol, len(orders))
+            return orders
+        except Exception as e:
+            logger.error(f"Ошибка при получении ордеров: {e}")
+            return []
+
+    def create_depth_stream(self, symbol: str, ws_url: str = None) -> DepthStream:
+        return OKXDepthStream(symbol, ws_url)
+
+    async def fetch_bids(self, symbol: str, depth: int) -> np.ndarray:
+        try:
+            order_book = await self._request("GET", "/api/v5/market/books", {"instId": symbol, "sz": depth})
+            if order_book['code'] != '0':
+                logger.error(f"Ошибка получения книги ордеров: {order_book['msg']}")
+                return to_depth_array([])
+            return to_depth_array(order_book['data'][0]['bids'])
+        except Exception as e:
+            logger.error(f"Ошибка при получении книги ордеров: {e}")
+            return to_depth_array([])
+
+    async def place_sell_order(self, symbol: str, quantity: float, price: float) -> str:
+        info = await self.get_symbol_info(symbol)
+        try:
+            result = await self._request("POST", "/api/v5/trade/order", {
+                "instId": symbol,
+                "tdMode": "cash",
+                "side": "sell",
+                "ordType": "limit",
+                "sz": info.format_qty(quantity),
+                "px": info.format_price(price)
+            }, signed=True)
+            if result['code'] == '0':
+                order_id = result['data'][0]['ordId']
+                logger.debug("Ордер успешно выставлен: {}", order_id)
+                return order_id
+            logger.error(f"Ошибка выставления ордера: {result['msg']}")
+            return ""
+        except Exception as e:
+            logger.error(f"Ошибка при выставлении ордера: {e}")
+            return ""
+
+    async def place_sell_orders(self, symbol: str, orders: List[Tuple[float, float]]) -> List[str]:
+        batches = await asyncio.gather(*(self._place_sell_orders_batch(symbol, orders[start:start + OKX_BATCH_SIZE])
+                                         for start in range(0, len(orders), OKX_BATCH_SIZE)))
+        return [order_id for batch in batches for order_id in batch]
+
+    async def _place_sell_orders_batch(self, symbol: str, orders: List[Tuple[float, float]]) -> List[str]:
+        info = await self.get_symbol_info(symbol)
+        try:
+            result = await self._request("POST", "/api/v5/trade/batch-orders", [
+                {
+                    "instId": symbol,
+                    "tdMode": "cash",
+                    "side": "sell",
+                    "ordType": "limit",
+                    "sz": info.format_qty(quantity),
+                    "px": info.format_price(price)
+                }
+                for price, quantity in orders
+            ], signed=True)
+            data = result.get('data') or []
+            if len(data) != len(orders):
+                logger.error(f"Ошибка пакетного выставления ордеров: {result['msg']}")
+                return [""] * len(orders)
+            order_ids = []
+            for item in data:
+                if item['sCode'] == '0':
+                    logger.debug("Ордер успешно выставлен: {}", item['ordId'])
+                    order_ids.append(item['ordId'])
+                else:
+                    logger.error(f"Ошибка выставления ордера: {item['sMsg']}")
+                    order_ids.append("")
+            return order_ids
+        except Exception as e:
+            logger.error(f"Ошибка при пакетном выставлении ордеров: {e}")
+            return [""] * len(orders)
+
+    async def amend_order(self, order_id: str, symbol: str, quantity: float, price: float) -> bool:
+        return (await self._amend_orders_batch(symbol, [(order_id, price, quantity)]))[0]
+
+    async def amend_orders(self, symbol: str, amendments: List[Tuple[str, float, float]]) -> List[bool]:
+        batches = await asyncio.gather(*(self._amend_orders_batch(symbol, amendments[start:start + OKX_BATCH_SIZE])
+                                         for start in range(0, len(amendments), OKX_BATCH_SIZE)))
+        return [amended for batch in batches for amended in batch]
+
+    async def _amend_orders_batch(self, symbol: str, amendments: List[Tuple[str, float, float]]) -> List[bool]:
+        info = await self.get_symbol_info(symbol)
+        try:
+            result = await self._request("POST", "/api/v5/trade/amend-batch-orders", [
+                {"instId": symbol, "ordId": order_id, "newSz": info.format_qty(quantity), "newPx": info.format_price(price)}
+                for order_id, price, quantity in amendments
+            ], signed=True)
+            data = result.get('data') or []
+            if len(data) != len(amendments):
+                logger.error(f"Ошибка пакетного изменения ордеров: {result['msg']}")
+                return [False] * len(amendments)
+            results = []
+            for item in data:
+                if item['sCode'] != '0':
+                    # 51503 и т.п.: ордер уже исполнен или отменён — его заменит новый
+                    logger.debug("Ордер {} не изменён: {}", item['ordId'], item['sMsg'])
+                results.append(item['sCode'] == '0')
+            return results
+        except Exception as e:
+            logger.error(f"Ошибка при пакетном изменении ордеров: {e}")
+            return [False] * len(amendments)
+
+    async def cancel_order(self, order_id: str, symbol: str):
+        try:
+            result = await self._request("POST", "/api/v5/trade/cancel-order", {"instId": symbol, "ordId": order_id},
+                                         signed=True)
+            if result['code'] == '0':
+                logger.debug("Ордер {} отменён", order_id)
+            else:
+                logger.error(f"Ошибка отмены ордера: {result['msg']}")
+        except Exception as e:
+            logger.error(f"Ошибка при отмене ордера: {e}")
+
+    async def cancel_orders(self, symbol: str, order_ids: List[str]) -> Tuple[List[str], List[str]]:
+        results = await asyncio.gather(*(self._cancel_orders_batch(symbol, order_ids[start:start + OKX_BATCH_SIZE])
+                                         for start in range(0, len(order_ids), OKX_BATCH_SIZE)))
+        cancelled = [order_id for batch_cancelled, _ in results for order_id in batch_cancelled]
+        failed = [order_id for _, batch_failed in results for order_id in batch_failed]
+        logger.debug("Отменено ордеров: {}, не отменено: {}", len(cancelled), len(failed))
+        filled, _ = await self._split_filled(symbol, failed)
+        return cancelled, filled
+
+    async def _cancel_orders_batch(self, symbol: str, chunk: List[str]) -> Tuple[List[str], List[str]]:
+        try:
+            result = await self._request("POST", "/api/v5/trade/cancel-batch-orders",
+                                         [{"instId": symbol, "ordId": order_id} for order_id in chunk], signed=True)
+            data = result.get('data') or []
+            if len(data) != len(chunk):
+                logger.error(f"Ошибка пакетной отмены ордеров: {result['msg']}")
+                return [], chunk
+            cancelled, failed = [], []
+            for item in data:
+                if item['sCode'] == '0':
+                    cancelled.append(item['ordId'])
+                else:
+                    # 51400/51402: ордер уже исполнен или закрыт — уточним статус
+                    logger.debug("Ордер {} не отменён: {}", item['ordId'], item['sMsg'])
+                    failed.append(item['ordId'])
+            return cancelled, failed
+        except Exception as e:
+            logger.error(f"Ошибка при пакетной отмене ордеров: {e}")
+            return [], chunk
+
+    async def cancel_all_orders(self, symbol: str) -> bool:
+        # У OKX нет cancel-all для спота: получаем открытые ордера и отменяем их пакетом
+        order_ids = [order['ordId'] for order in await self.get_open_orders(symbol)]
+        if not order_ids:
+            return True
+        cancelled, filled = await self.cancel_orders(symbol, order_ids)
+        logger.info(f"Отменены все ордера по {symbol}: отменено {len(cancelled)}, исполнено {len(filled)}")
+        return len(cancelled) + len(filled) == len(order_ids)
+
+    def create_user_stream(self, ws_url: str = None) -> UserDataStream:
+        return OKXUserDataStream(self.api_key, self.api_secret, self.passphrase, ws_url)
+
+    async def get_order_state(self, order_id: str, symbol: str) -> Optional[OrderState]:
+        try:
+            result = await self._request("GET", "/api/v5/trade/order", {"instId": symbol, "ordId": order_id},
+                                         signed=True)
+            if result['code'] != '0':
+                logger.error(f"Ошибка проверки статуса ордера: {result['msg']}")
+                return None
+            order = result['data'][0]
+            logger.debug("Статус ордера {}: {}, исполнено {}", order_id, order['state'], order['accFillSz'])
+            return OrderState(order_id, OKXUserDataStream.STATUSES.get(order['state'], ORDER_OPEN),
+                              float(order['accFillSz'] or 0), float(order.get('avgPx') or 0))
+        except Exception as e:
+            logger.error(f"Ошибка при проверке статуса ордера: {e}")
+            return None
+
@@ -1,32 +1,63 @@
-from typing import List, Tuple
+from typing import Optional
+
+import numpy as np
 
-from dotenv import load_dotenv
 import os
 from loguru import logger
 from binance.client import Client as BinanceClient
 
-from config import SUCCESS_BID_START_RATE
 from exchange.Exchange import Exchange
-
-load_dotenv()  # Загружаем переменные из .env
-
-# Настройка логирования
-logger.add("trade.log", rotation="1 MB")
+from exchange.OrderState import OrderState, BINANCE_STATUSES, ORDER_OPEN
+from exchange.RateLimiter import rate_limiter
+from exchange.SellLadder import to_depth_array
+from exchange.SymbolInfo import SymbolInfo
+from stream.DepthStream import BinanceDepthStream, DepthStream
+from stream.UserDataStream import BinanceUserDataStream, UserDataStream
 
 
 # Реализация для Binance
 class BinanceExchange(Exchange):
-    def __init__(self):
-        api_key = os.getenv("BINANCE_API_KEY")
-        api_secret = os.getenv("BINANCE_API_SECRET")
+    ORDER_BOOK_DEPTH = 100
+    ENV_PREFIX = "BINANCE"
+
+    def __init__(self, api_key: str = None, api_secret: str = None):
+        api_key = api_key or os.getenv("BINANCE_API_KEY")
+        api_secret = api_secret or os.getenv("BINANCE_API_SECRET")
         if not api_key or not api_secret:
             logger.error("API ключи для Binance не найдены в .env")
             raise ValueError("API keys not provided")
+        api_url = self.endpoint_override("API")
+        if api_url:
+            # Клиент пингует API_URL уже в конструкторе, поэтому адрес подменяется до его создания
+            BinanceClient.API_URL = f"{api_url}/api"
         self.client = BinanceClient(api_key, api_secret)
+        rate_limiter(self.ENV_PREFIX, api_key).mount(self.client.session)
+        self.client.timestamp_offset = self.clock.offset_ms
+
+    def sync_clock(self, samples: int = 1):
+        super().sync_clock(samples)
+        # timestamp подписанных запросов python-binance ставит сам, со своим смещением
+        self.client.timestamp_offset = self.clock.offset_ms
 
     def create_symbol(self, assert_in: str, assert_out: str) -> str:
         return assert_in + assert_out
 
+    def get_server_time(self) -> int:
+        return int(self.client.get_server_time()['serverTime'])
+
+    def fetch_symbol_info(self, symbol: str) -> SymbolInfo:
+        symbol_info = self.client.get_symbol_info(symbol)
+        if not symbol_info:
+            raise ValueError(f"Пара {symbol} не найдена")
+        filters = {f['filterType']: f for f in symbol_info['filters']}
+        notional = filters.get('NOTIONAL') or filters.get('MIN_NOTIONAL') or {}
+        return SymbolInfo(
+            tick_size=float(filters['PRICE_FILTER']['tickSize']),
+            lot_size=float(filters['LOT_SIZE']['stepSize']),
+            min_qty=float(filters['LOT_SIZE']['minQty']),
+            min_notional=float(notional.get('minNotional', 0))
+        )
+
     def get_balance(self, asset: str, auto_transfer: bool = False) -> float:
         try:
             account = self.client.get_account()
@@ -35,69 +66,62 @@ class BinanceExchange(Exchange):
                     return float(balance['free'])
             return 0.0
         except Exception as e:
-            print(f"Ошибка при получении баланса: {e}")
+            logger.error(f"Ошибка при получении баланса: {e}")
             return 0.0
 
     def get_open_orders(self, symbol: str) -> list:
         try:
             return self.client.get_open_orders(symbol=symbol)
         except Exception as e:
-            print(f"Ошибка при получении ордеров: {e}")
+            logger.error(f"Ошибка при получении ордеров: {e}")
             return []
 
-    def calculate_sell_orders(self, symbol: str, quantity: float) -> List[Tuple[float, float]]:
+    def create_depth_stream(self, symbol: str, ws_url: str = None) -> DepthStream:
+        return BinanceDepthStream(symbol, self._load_depth_snapshot, ws_url)
+
+    def _load_depth_snapshot(self, symbol: str):
+        order_book = self.client.get_order_book(symbol=symbol, limit=1000)
+        return order_book['bids'], order_book['asks'], int(order_book['lastUpdateId'])
+
+    def fetch_bids(self, symbol: str, depth: int) -> np.ndarray:
         try:
-            order_book = self.client.get_order_book(symbol=symbol)
-            bids = order_book['bids'][1:]  # Пропускаем первый ордер
-            logger.info(f"Получены биды для {symbol}: {[(float(price), float(qty)) for price, qty in bids]}")
-
-            if not bids:
-                logger.warning(f"Список бидов для {symbol} пуст")
-                return []
-
-            orders = []
-            remaining_qty = quantity
-            success_rate = SUCCESS_BID_START_RATE
-
-            for bid_price, bid_qty in bids:
-                bid_price = float(bid_price)
-                bid_qty = float(bid_qty)
-                sell_qty = bid_qty * success_rate
-
-                if sell_qty >= remaining_qty:
-                    orders.append((bid_price, remaining_qty))
-                    return orders
-
-                orders.append((bid_price, sell_qty))
-                remaining_qty -= sell_qty
-                success_rate += 0.05
-
-            if remaining_qty > 0 and bids:
-                last_price = float(bids[-1][0])
-                orders.append((last_price, remaining_qty))
-            return orders
+            return to_depth_array(self.client.get_order_book(symbol=symbol, limit=depth)['bids'])
         except Exception as e:
-            print(f"Ошибка при вычислении ордеров: {e}")
-            return []
+            logger.error(f"Ошибка при получении книги ордеров: {e}")
+            return to_depth_array([])
 
     def place_sell_order(self, symbol: str, quantity: float, price: float) -> str:
+        info = self.get_symbol_info(symbol)
         try:
-            order = self.client.order_limit_sell(symbol=symbol, quantity=quantity, price=price)
+            order = self.client.order_limit_sell(symbol=symbol, quantity=info.format_qty(quantity), price=info.format_price(price))
             return order['orderId']
         except Exception as e:
-            print(f"Ошибка при выставлении ордера: {e}")
+            logger.error(f"Ошибка при выставлении ордера: {e}")
             return ""
 
     def cancel_order(self, order_id: str, symbol: str):
         try:
             self.client.cancel_order(symbol=symbol, orderId=order_id)
         except Exception as e:
-            print(f"Ошибка при отмене ордера: {e}")
+            logger.error(f"Ошибка при отмене ордера: {e}")
+
+    def cancel_all_orders(self, symbol: str) -> bool:
+        try:
+            # DELETE /api/v3/openOrders, в python-binance нет публичной обёртки
+            self.client._delete('openOrders', True, data={'symbol': symbol})
+            return True
+        except Exception as e:
+            logger.error(f"Ошибка при отмене всех ордеров: {e}")
+            return False
+
+    def create_user_stream(self, ws_url: str = None) -> UserDataStream:
+        return BinanceUserDataStream(self.client, ws_url)
 
-    def check_order_status(self, order_id: str, symbol: str) -> bool:
+    def get_order_state(self, order_id: str, symbol: str) -> Optional[OrderState]:
         try:
             order = self.client.get_order(symbol=symbol, orderId=order_id)
-            return order['status'] == 'FILLED'
+            return OrderState.from_quote(order_id, BINANCE_STATUSES.get(order['status'], ORDER_OPEN),
+                                         float(order['executedQty']), float(order['cummulativeQuoteQty']))
         except Exception as e:
-            print(f"Ошибка при проверке статуса ордера: {e}")
-            return False
\ No newline at end of file
+            logger.error(f"Ошибка при проверке статуса ордера: {e}")
+            return None
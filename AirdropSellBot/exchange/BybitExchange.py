@@ -1,40 +1,71 @@
-from typing import List, Tuple
+from typing import List, Optional, Tuple
+
+import numpy as np
 
-from dotenv import load_dotenv
 import os
 from loguru import logger
 
-from config import SUCCESS_BID_START_RATE
 from exchange.Exchange import Exchange
+from exchange.OrderState import OrderState, ORDER_OPEN
+from exchange.RateLimiter import rate_limiter
+from exchange.SellLadder import to_depth_array
+from exchange.SymbolInfo import SymbolInfo
+from stream.DepthStream import BybitDepthStream, DepthStream
+from stream.UserDataStream import BybitUserDataStream, UserDataStream
 from pybit.unified_trading import HTTP as BybitClient
 
-load_dotenv()  # Загружаем переменные из .env
 
-# Настройка логирования
-logger.add("trade.log", rotation="1 MB")
+BYBIT_BATCH_SIZE = 10  # Максимум спотовых ордеров в одном запросе create-batch
 
 
 # Реализация для Bybit
 class BybitExchange(Exchange):
-    def __init__(self):
-        api_key = os.getenv("BYBIT_API_KEY")
-        api_secret = os.getenv("BYBIT_API_SECRET")
+    ORDER_BOOK_DEPTH = 10
+    SUPPORTS_AMEND = True
+    ENV_PREFIX = "BYBIT"
+
+    def __init__(self, api_key: str = None, api_secret: str = None):
+        api_key = api_key or os.getenv("BYBIT_API_KEY")
+        api_secret = api_secret or os.getenv("BYBIT_API_SECRET")
         if not api_key or not api_secret:
             logger.error("API ключи для Bybit не найдены в .env")
             raise ValueError("API keys not provided")
+        self.api_key = api_key
+        self.api_secret = api_secret
         self.client = BybitClient(testnet=False, api_key=api_key, api_secret=api_secret)
+        api_url = self.endpoint_override("API")
+        if api_url:
+            self.client.endpoint = api_url
+        rate_limiter(self.ENV_PREFIX, api_key).mount(self.client.client)
 
     def create_symbol(self, assert_in: str, assert_out: str) -> str:
         return assert_in + assert_out
 
+    def get_server_time(self) -> int:
+        result = self.client.get_server_time()
+        return int(result['result']['timeNano']) // 1_000_000
+
+    def fetch_symbol_info(self, symbol: str) -> SymbolInfo:
+        result = self.client.get_instruments_info(category="spot", symbol=symbol)
+        instruments = result['result']['list']
+        if not instruments:
+            raise ValueError(f"Пара {symbol} не найдена")
+        instrument = instruments[0]
+        return SymbolInfo(
+            tick_size=float(instrument['priceFilter']['tickSize']),
+            lot_size=float(instrument['lotSizeFilter']['basePrecision']),
+            min_qty=float(instrument['lotSizeFilter']['minOrderQty']),
+            min_notional=float(instrument['lotSizeFilter']['minOrderAmt'])
+        )
+
     def get_balance(self, asset: str, auto_transfer: bool = False) -> float:
         try:
             result = self.client.get_wallet_balance(accountType="UNIFIED")
             for coin in result['result']['list'][0]['coin']:
                 if coin['coin'] == asset:
-                    logger.debug(f"Найден баланс для {asset}: {coin['walletBalance']}")
+                    logger.debug("Найден баланс для {}: {}", asset, coin['walletBalance'])
                     return float(coin['walletBalance'])
-            logger.debug(f"Баланс для {asset} не найден, возвращаем 0")
+            logger.debug("Баланс для {} не найден, возвращаем 0", asset)
             return 0.0
         except Exception as e:
             logger.error(f"Ошибка при получении баланса: {e}")
@@ -44,65 +75,37 @@ class BybitExchange(Exchange):
         try:
             result = self.client.get_open_orders(category="spot", symbol=symbol)
             orders = result['result']['list']
-            logger.debug(f"Получены открытые ордера для {symbol}: {len(orders)} шт.")
+            logger.debug("Получены открытые ордера для {}: {} шт.", symbol, len(orders))
             return orders
         except Exception as e:
             logger.error(f"Ошибка при получении ордеров: {e}")
             return []
 
-    def calculate_sell_orders(self, symbol: str, quantity: float) -> List[Tuple[float, float]]:
+    def create_depth_stream(self, symbol: str, ws_url: str = None) -> DepthStream:
+        return BybitDepthStream(symbol, ws_url)
+
+    def fetch_bids(self, symbol: str, depth: int) -> np.ndarray:
         try:
-            order_book = self.client.get_orderbook(category="spot", symbol=symbol, limit=10)
-            bids = order_book['result']['b']  # Bybit возвращает bids как 'b'
-            bids = bids[1:]  # Пропускаем первый ордер
-            logger.info(f"Получены биды для {symbol}: {[(float(price), float(qty)) for price, qty in bids]}")
-
-            if not bids:
-                logger.warning(f"Список бидов для {symbol} пуст")
-                return []
-
-            orders = []
-            remaining_qty = quantity
-            success_rate = SUCCESS_BID_START_RATE
-
-            for bid_price, bid_qty in bids:
-                bid_price = float(bid_price)
-                bid_qty = float(bid_qty)
-                sell_qty = bid_qty * success_rate
-
-                if sell_qty >= remaining_qty:
-                    orders.append((bid_price, remaining_qty))
-                    logger.debug(f"Добавлен последний ордер: цена {bid_price}, объём {remaining_qty}")
-                    return orders
-
-                orders.append((bid_price, sell_qty))
-                logger.debug(f"Добавлен ордер: цена {bid_price}, объём {sell_qty}")
-                remaining_qty -= sell_qty
-                success_rate += 0.05
-
-            if remaining_qty > 0 and bids:
-                last_price = float(bids[-1][0])
-                orders.append((last_price, remaining_qty))
-                logger.debug(f"Добавлен остаточный ордер: цена {last_price}, объём {remaining_qty}")
-            logger.info(f"Итоговый список ордеров: {orders}")
-            return orders
+            order_book = self.client.get_orderbook(category="spot", symbol=symbol, limit=depth)
+            return to_depth_array(order_book['result']['b'])  # Bybit возвращает bids как 'b'
         except Exception as e:
-            logger.error(f"Ошибка при вычислении ордеров: {e}")
-            return []
+            logger.error(f"Ошибка при получении книги ордеров: {e}")
+            return to_depth_array([])
 
     def place_sell_order(self, symbol: str, quantity: float, price: float) -> str:
+        info = self.get_symbol_info(symbol)
         try:
             result = self.client.place_order(
                 category="spot",
                 symbol=symbol,
                 side="Sell",
                 orderType="Limit",
-                qty=str(quantity),
-                price=str(price)
+                qty=info.format_qty(quantity),
+                price=info.format_price(price)
             )
             if result['retCode'] == 0:
                 order_id = result['result']['orderId']
-                logger.debug(f"Ордер успешно выставлен: {order_id}")
+                logger.debug("Ордер успешно выставлен: {}", order_id)
                 return order_id
             else:
                 logger.error(f"Ошибка выставления ордера: {result['retMsg']}")
@@ -111,19 +114,145 @@ class BybitExchange(Exchange):
             logger.error(f"Ошибка при выставлении ордера: {e}")
             return ""
 
+    def place_sell_orders(self, symbol: str, orders: List[Tuple[float, float]]) -> List[str]:
+        # Пакеты по BYBIT_BATCH_SIZE уходят одновременно
+        batches = self.send_batches(orders, BYBIT_BATCH_SIZE, lambda chunk: self._place_sell_orders_batch(symbol, chunk))
+        return [order_id for batch in batches for order_id in batch]
+
+    def _place_sell_orders_batch(self, symbol: str, orders: List[Tuple[float, float]]) -> List[str]:
+        info = self.get_symbol_info(symbol)
+        try:
+            result = self.client.place_batch_order(
+                category="spot",
+                request=[
+                    {
+                        "symbol": symbol,
+                        "side": "Sell",
+                        "orderType": "Limit",
+                        "qty": info.format_qty(quantity),
+                        "price": info.format_price(price)
+                    }
+                    for price, quantity in orders
+                ]
+            )
+            if result['retCode'] != 0:
+                logger.error(f"Ошибка пакетного выставления ордеров: {result['retMsg']}")
+                return [""] * len(orders)
+            order_ids = []
+            # Результаты и коды ошибок приходят в двух параллельных списках в порядке запроса
+            for item, status in zip(result['result']['list'], result['retExtInfo']['list']):
+                if status['code'] == 0:
+                    logger.debug("Ордер успешно выставлен: {}", item['orderId'])
+                    order_ids.append(item['orderId'])
+                else:
+                    logger.error(f"Ошибка выставления ордера: {status['msg']}")
+                    order_ids.append("")
+            return order_ids
+        except Exception as e:
+            logger.error(f"Ошибка при пакетном выставлении ордеров: {e}")
+            return [""] * len(orders)
+
+    def amend_order(self, order_id: str, symbol: str, quantity: float, price: float) -> bool:
+        info = self.get_symbol_info(symbol)
+        try:
+            result = self.client.amend_order(category="spot", symbol=symbol, orderId=order_id,
+                                             qty=info.format_qty(quantity), price=info.format_price(price))
+            if result['retCode'] == 0:
+                logger.debug("Ордер {} перенесён: {} по {}", order_id, quantity, price)
+                return True
+            logger.debug("Ордер {} не изменён: {}", order_id, result['retMsg'])
+            return False
+        except Exception as e:
+            logger.error(f"Ошибка при изменении ордера: {e}")
+            return False
+
+    def amend_orders(self, symbol: str, amendments: List[Tuple[str, float, float]]) -> List[bool]:
+        batches = self.send_batches(amendments, BYBIT_BATCH_SIZE, lambda chunk: self._amend_orders_batch(symbol, chunk))
+        return [ok for batch in batches for ok in batch]
+
+    def _amend_orders_batch(self, symbol: str, amendments: List[Tuple[str, float, float]]) -> List[bool]:
+        info = self.get_symbol_info(symbol)
+        try:
+            result = self.client.amend_batch_order(
+                category="spot",
+                request=[
+                    {"symbol": symbol, "orderId": order_id, "qty": info.format_qty(quantity), "price": info.format_price(price)}
+                    for order_id, price, quantity in amendments
+                ]
+            )
+            if result['retCode'] != 0:
+                logger.error(f"Ошибка пакетного изменения ордеров: {result['retMsg']}")
+                return [False] * len(amendments)
+            results = []
+            for (order_id, _, _), status in zip(amendments, result['retExtInfo']['list']):
+                if status['code'] != 0:
+                    logger.debug("Ордер {} не изменён: {}", order_id, status['msg'])
+                results.append(status['code'] == 0)
+            return results
+        except Exception as e:
+            logger.error(f"Ошибка при пакетном изменении ордеров: {e}")
+            return [False] * len(amendments)
+
     def cancel_order(self, order_id: str, symbol: str):
         try:
             self.client.cancel_order(category="spot", symbol=symbol, orderId=order_id)
-            logger.debug(f"Ордер {order_id} отменён")
+            logger.debug("Ордер {} отменён", order_id)
         except Exception as e:
             logger.error(f"Ошибка при отмене ордера: {e}")
 
-    def check_order_status(self, order_id: str, symbol: str) -> bool:
+    def cancel_orders(self, symbol: str, order_ids: List[str]) -> Tuple[List[str], List[str]]:
+        results = self.send_batches(order_ids, BYBIT_BATCH_SIZE, lambda chunk: self._cancel_orders_batch(symbol, chunk))
+        cancelled = [order_id for batch_cancelled, _ in results for order_id in batch_cancelled]
+        failed = [order_id for _, batch_failed in results for order_id in batch_failed]
+        logger.debug("Отменено ордеров: {}, не отменено: {}", len(cancelled), len(failed))
+        filled, _ = self._split_filled(symbol, failed)
+        return cancelled, filled
+
+    def _cancel_orders_batch(self, symbol: str, chunk: List[str]) -> Tuple[List[str], List[str]]:
+        try:
+            result = self.client.cancel_batch_order(
+                category="spot",
+                request=[{"symbol": symbol, "orderId": order_id} for order_id in chunk]
+            )
+            if result['retCode'] != 0:
+                logger.error(f"Ошибка пакетной отмены ордеров: {result['retMsg']}")
+                return [], chunk
+            cancelled, failed = [], []
+            for order_id, status in zip(chunk, result['retExtInfo']['list']):
+                if status['code'] == 0:
+                    cancelled.append(order_id)
+                else:
+                    # 170213: ордер не найден среди активных — исполнен или уже отменён
+                    logger.debug("Ордер {} не отменён: {}", order_id, status['msg'])
+                    failed.append(order_id)
+            return cancelled, failed
+        except Exception as e:
+            logger.error(f"Ошибка при пакетной отмене ордеров: {e}")
+            return [], chunk
+
+    def cancel_all_orders(self, symbol: str) -> bool:
+        try:
+            result = self.client.cancel_all_orders(category="spot", symbol=symbol)
+            if result['retCode'] != 0:
+                logger.error(f"Ошибка отмены всех ордеров: {result['retMsg']}")
+                return False
+            logger.info(f"Отменены все ордера по {symbol}: {len(result['result']['list'])} шт.")
+            return True
+        except Exception as e:
+            logger.error(f"Ошибка при отмене всех ордеров: {e}")
+            return False
+
+    def create_user_stream(self, ws_url: str = None) -> UserDataStream:
+        return BybitUserDataStream(self.api_key, self.api_secret, ws_url)
+
+    def get_order_state(self, order_id: str, symbol: str) -> Optional[OrderState]:
         try:
             result = self.client.get_order_history(category="spot", symbol=symbol, orderId=order_id)
-            status = result['result']['list'][0]['orderStatus'] == 'Filled'
-            logger.debug(f"Статус ордера {order_id}: {'Filled' if status else 'Not Filled'}")
-            return status
+            order = result['result']['list'][0]
+            logger.debug("Статус ордера {}: {}, исполнено {}", order_id, order['orderStatus'], order['cumExecQty'])
+            return OrderState(order_id, BybitUserDataStream.STATUSES.get(order['orderStatus'], ORDER_OPEN),
+                              float(order['cumExecQty'] or 0), float(order.get('avgPrice') or 0))
         except Exception as e:
             logger.error(f"Ошибка при проверке статуса ордера: {e}")
-            return False
+            return None
+
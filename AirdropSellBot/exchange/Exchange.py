@@ -1,14 +1,111 @@
+import os
+import threading
+import time
 from abc import ABC, abstractmethod
-from typing import List, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple, TypeVar
+
+import numpy as np
+from loguru import logger
+
+from config import ORDER_STATUS_POLL_INTERVAL, ORDER_STATE_TIMEOUT, WARM_CONNECTIONS, HEARTBEAT_INTERVAL
+from exchange.OrderState import OrderState
+from exchange.RequestSigner import ServerClock, server_clock
+from exchange.SellLadder import build_sell_ladder, to_depth_array
+from exchange.SymbolInfo import SymbolInfo, symbol_info_cache
+from metrics.ExchangeMetrics import exchange_name
+from metrics.TradeJournal import trade_journal
+from stream.DepthStream import DepthStream
+from stream.UserDataStream import UserDataStream
+
+T = TypeVar("T")
 
 
 # Абстрактный базовый класс для бирж
 class Exchange(ABC):
+    depth_stream: Optional[DepthStream] = None  # Локальная книга из WebSocket, если поток запущен
+    user_stream: Optional[UserDataStream] = None  # Приватный поток с состояниями ордеров и балансов, если запущен
+    DEPOSITS_PUSHED = True  # Приходят ли зачисления на торговый аккаунт в приватный поток балансов
+    ORDER_BOOK_DEPTH = 50  # Сколько уровней бидов запрашивать для расчёта лестницы
+    SUPPORTS_AMEND = False  # Меняет ли биржа цену и объём ордера на месте (amend_order)
+    ENV_PREFIX = ""  # Префикс переменных окружения биржи: <PREFIX>_API_KEY, <PREFIX>_API_URL, ...
+    _heartbeat_running = False
+
+    def endpoint_override(self, kind: str) -> Optional[str]:
+        """
+        Адрес из переменной <PREFIX>_<kind>_URL (kind: API, WS, PRIVATE_WS), например локальной мок-биржи.
+        None — использовать боевой адрес биржи.
+        """
+        return os.getenv(f"{self.ENV_PREFIX}_{kind}_URL") or None
+
     @abstractmethod
     def create_symbol(self, assert_in: str, assert_out: str) -> str:
         """Создать идентификатор торговой пары"""
         pass
 
+    @abstractmethod
+    def get_server_time(self) -> int:
+        """Время сервера биржи в миллисекундах (самый лёгкий запрос к торговому хосту)."""
+        pass
+
+    @property
+    def clock(self) -> ServerClock:
+        """Смещение часов биржи для timestamp подписанных запросов."""
+        return server_clock(self.ENV_PREFIX)
+
+    def sync_clock(self, samples: int = 1):
+        """Перемерить смещение часов биржи (heartbeat делает это раз в SERVER_TIME_SYNC_INTERVAL)."""
+        self.clock.sync(self.get_server_time, samples)
+
+    def warm_up(self):
+        """
+        Открыть несколько keep-alive соединений с торговым хостом параллельными лёгкими запросами,
+        чтобы первый ордер после поступления не тратил время на DNS, TCP и TLS.
+        """
+        with ThreadPoolExecutor(max_workers=WARM_CONNECTIONS) as executor:
+            list(executor.map(lambda _: self.get_server_time(), range(WARM_CONNECTIONS)))
+
+    def start_heartbeat(self, interval: float = HEARTBEAT_INTERVAL):
+        """Прогреть соединения и поддерживать их открытыми периодическими запросами в фоне."""
+        self._heartbeat()
+        if self._heartbeat_running:
+            return
+        self._heartbeat_running = True
+        threading.Thread(target=self._heartbeat_loop, args=(interval,), name="heartbeat", daemon=True).start()
+
+    def stop_heartbeat(self):
+        self._heartbeat_running = False
+
+    def _heartbeat_loop(self, interval: float):
+        while self._heartbeat_running:
+            time.sleep(interval)
+            self._heartbeat()
+
+    def _heartbeat(self):
+        try:
+            self.warm_up()
+            if self.clock.stale():
+                self.sync_clock()
+        except Exception as e:
+            logger.warning(f"Ошибка heartbeat-запроса: {e}")
+
+    @abstractmethod
+    def fetch_symbol_info(self, symbol: str) -> SymbolInfo:
+        """Запросить у биржи шаг цены, шаг количества и минимумы ордера для пары."""
+        pass
+
+    def get_symbol_info(self, symbol: str) -> SymbolInfo:
+        """Метаданные пары из общего кэша (файл + фоновое обновление)."""
+        return symbol_info_cache.get(self, symbol)
+
+    def refresh_symbol_info(self, symbol: str) -> Optional[SymbolInfo]:
+        """Свежие метаданные пары с биржи (проверка пары перед листингом), None — пара ещё недоступна."""
+        return symbol_info_cache.refresh(self, symbol)
+
+    def normalize_orders(self, symbol: str, orders: List[Tuple[float, float]]) -> List[Tuple[float, float]]:
+        """Округлить цены и объёмы лестницы до точности биржи перед выставлением."""
+        return self.get_symbol_info(symbol).normalize_orders(orders)
+
     @abstractmethod
     def get_balance(self, asset: str, auto_transfer: bool) -> float:
         """Получить баланс конкретного актива."""
@@ -20,21 +117,201 @@ class Exchange(ABC):
         pass
 
     @abstractmethod
-    def calculate_sell_orders(self, symbol: str, quantity: float) -> List[Tuple[float, float]]:
-        """Вычислить список ордеров на продажу (новая логика)."""
+    def create_depth_stream(self, symbol: str, ws_url: str = None) -> DepthStream:
+        """Создать подписку на публичный поток глубины для торговой пары."""
+        pass
+
+    def start_depth_stream(self, symbol: str, ws_url: str = None) -> DepthStream:
+        """Запустить поток глубины, после синхронизации calculate_sell_orders читает биды из памяти."""
+        self.stop_depth_stream()
+        self.depth_stream = self.create_depth_stream(symbol, ws_url or self.endpoint_override("WS"))
+        self.depth_stream.start()
+        return self.depth_stream
+
+    def stop_depth_stream(self):
+        if self.depth_stream:
+            self.depth_stream.stop()
+            self.depth_stream = None
+
+    def _stream_bids(self, symbol: str, depth: int) -> Optional[List[Tuple[float, float]]]:
+        """Биды из локальной книги или None, если её нет или она не синхронизирована."""
+        if self.depth_stream is None or self.depth_stream.symbol != symbol:
+            return None
+        return self.depth_stream.get_bids(depth)
+
+    @abstractmethod
+    def fetch_bids(self, symbol: str, depth: int) -> np.ndarray:
+        """Получить биды через REST: массив (N, 2) цена/объём по убыванию цены, пустой при ошибке."""
         pass
 
+    def get_bids(self, symbol: str) -> np.ndarray:
+        """Биды из локальной книги, если она синхронизирована, иначе через REST."""
+        streamed_bids = self._stream_bids(symbol, self.ORDER_BOOK_DEPTH)
+        if streamed_bids is not None:
+            return to_depth_array(streamed_bids)
+        return self.fetch_bids(symbol, self.ORDER_BOOK_DEPTH)
+
+    def calculate_sell_orders(self, symbol: str, quantity: float,
+                              bids: Optional[np.ndarray] = None) -> List[Tuple[float, float]]:
+        """Вычислить список ордеров на продажу по бидам из локальной книги или REST (или переданным заранее)."""
+        if bids is None:
+            bids = self.get_bids(symbol)
+        trade_journal.book(exchange_name(self), symbol, bids)
+
+        if len(bids) < 2:
+            logger.warning(f"Недостаточно бидов для {symbol} после пропуска первого")
+            return []
+
+        orders = build_sell_ladder(bids, quantity)
+        trade_journal.ladder(exchange_name(self), symbol, orders)
+        return orders
+
     @abstractmethod
     def place_sell_order(self, symbol: str, quantity: float, price: float) -> str:
         """Выставить ордер на продажу."""
         pass
 
+    def place_sell_orders(self, symbol: str, orders: List[Tuple[float, float]]) -> List[str]:
+        """
+        Выставить пакет ордеров на продажу [(price, qty), ...].
+        Возвращает order_id в порядке входного списка, "" для невыставленных ордеров.
+        По умолчанию ордера отправляются параллельно по одному, биржи с пакетным API переопределяют метод.
+        """
+        if not orders:
+            return []
+        with ThreadPoolExecutor(max_workers=len(orders)) as executor:
+            return list(executor.map(lambda order: self.place_sell_order(symbol, order[1], order[0]), orders))
+
+    @staticmethod
+    def send_batches(items: list, batch_size: int, send_batch: Callable[[list], T]) -> List[T]:
+        """
+        Разбить items на пакеты по batch_size и отправить их одновременно, как отдельные ордера
+        в place_sell_orders. Результаты пакетов — в порядке items.
+        """
+        chunks = [items[start:start + batch_size] for start in range(0, len(items), batch_size)]
+        if len(chunks) <= 1:
+            return [send_batch(chunk) for chunk in chunks]
+        with ThreadPoolExecutor(max_workers=len(chunks)) as executor:
+            return list(executor.map(send_batch, chunks))
+
+    def amend_order(self, order_id: str, symbol: str, quantity: float, price: float) -> bool:
+        """
+        Перенести ордер на новую цену и объём без отмены; quantity — полный объём ордера с уже исполненной частью.
+        False — биржа не приняла изменение (ордер исполнен, снят) или не умеет amend (SUPPORTS_AMEND = False).
+        """
+        return False
+
+    def amend_orders(self, symbol: str, amendments: List[Tuple[str, float, float]]) -> List[bool]:
+        """
+        Изменить пакет ордеров [(order_id, price, qty), ...], результат — в порядке входного списка.
+        По умолчанию параллельно по одному, биржи с пакетным amend переопределяют метод.
+        """
+        if not amendments or not self.SUPPORTS_AMEND:
+            return [False] * len(amendments)
+        with ThreadPoolExecutor(max_workers=len(amendments)) as executor:
+            return list(executor.map(lambda amendment: self.amend_order(amendment[0], symbol, amendment[2],
+                                                                        amendment[1]), amendments))
+
     @abstractmethod
     def cancel_order(self, order_id: str, symbol: str):
         """Отменить ордер."""
         pass
 
+    def cancel_orders(self, symbol: str, order_ids: List[str]) -> Tuple[List[str], List[str]]:
+        """
+        Отменить пакет ордеров.
+        Возвращает (отменённые, уже исполненные) order_id; ордера вне обоих списков отменить не удалось.
+        По умолчанию ордера отменяются параллельно по одному, биржи с пакетной отменой переопределяют метод.
+        """
+        if not order_ids:
+            return [], []
+        with ThreadPoolExecutor(max_workers=len(order_ids)) as executor:
+            list(executor.map(lambda order_id: self.cancel_order(order_id, symbol), order_ids))
+        filled, not_filled = self._split_filled(symbol, order_ids)
+        return not_filled, filled
+
     @abstractmethod
+    def cancel_all_orders(self, symbol: str) -> bool:
+        """Отменить все открытые ордера по торговой паре одним запросом."""
+        pass
+
+    @abstractmethod
+    def get_order_state(self, order_id: str, symbol: str) -> Optional[OrderState]:
+        """Статус и исполненный объём ордера через REST, None — запрос не удался."""
+        pass
+
     def check_order_status(self, order_id: str, symbol: str) -> bool:
-        """Проверить статус ордера."""
+        """Исполнен ли ордер полностью."""
+        state = self.get_order_state(order_id, symbol)
+        return state is not None and state.filled
+
+    def get_order_states(self, symbol: str, order_ids: List[str], settled: bool = True) -> Dict[str, OrderState]:
+        """
+        Состояния ордеров с исполненным объёмом: из приватного потока, недостающие — параллельно через REST.
+        settled — ордера уже закрыты (исполнены или отменены): из потока берутся только итоговые состояния,
+        их событий ждём не дольше ORDER_STATE_TIMEOUT. Ордера, состояние которых узнать не удалось, в ответ не попадают.
+        """
+        states = {}
+        if self.user_stream is not None and self.user_stream.connected:
+            states = self.user_stream.get_orders(order_ids, ORDER_STATE_TIMEOUT if settled else 0.0, settled)
+        missing = [order_id for order_id in order_ids if order_id not in states]
+        if missing:
+            with ThreadPoolExecutor(max_workers=len(missing)) as executor:
+                fetched = list(executor.map(lambda order_id: self.get_order_state(order_id, symbol), missing))
+            states.update({order_id: state for order_id, state in zip(missing, fetched) if state is not None})
+        return states
+
+    @abstractmethod
+    def create_user_stream(self, ws_url: str = None) -> UserDataStream:
+        """Создать приватный поток событий по ордерам аккаунта."""
         pass
+
+    def start_user_stream(self, ws_url: str = None) -> UserDataStream:
+        self.stop_user_stream()
+        self.user_stream = self.create_user_stream(ws_url or self.endpoint_override("PRIVATE_WS"))
+        self.user_stream.start()
+        return self.user_stream
+
+    def stop_user_stream(self):
+        if self.user_stream:
+            self.user_stream.stop()
+            self.user_stream = None
+
+    def balance_stream_live(self) -> bool:
+        """Можно ли полагаться на приватный поток для обнаружения зачислений."""
+        return self.DEPOSITS_PUSHED and self.user_stream is not None and self.user_stream.connected
+
+    def wait_for_balance(self, asset: str, timeout: float) -> Optional[float]:
+        """Ждать события о ненулевом балансе до timeout секунд, без потока — просто пауза."""
+        if self.user_stream is not None and self.user_stream.connected:
+            return self.user_stream.wait_for_balance(asset, timeout)
+        time.sleep(timeout)
+        return None
+
+    def wait_for_fills(self, symbol: str, order_ids: List[str], timeout: float) -> List[str]:
+        """
+        Ждать исполнения ордеров не дольше timeout секунд, вернуть исполненные order_id.
+        С приватным потоком просыпается сразу по событию исполнения, без него опрашивает статусы.
+        """
+        if self.user_stream is not None and self.user_stream.connected:
+            return self.user_stream.wait_for_fills(order_ids, timeout)
+        deadline = time.monotonic() + timeout
+        filled, pending = [], list(order_ids)
+        while pending:
+            newly_filled, pending = self._split_filled(symbol, pending)
+            filled.extend(newly_filled)
+            remaining = deadline - time.monotonic()
+            if not pending or remaining <= 0:
+                break
+            time.sleep(min(ORDER_STATUS_POLL_INTERVAL, remaining))
+        return filled
+
+    def _split_filled(self, symbol: str, order_ids: List[str]) -> Tuple[List[str], List[str]]:
+        """Параллельно проверить статусы ордеров, вернуть (исполненные, неисполненные)."""
+        if not order_ids:
+            return [], []
+        with ThreadPoolExecutor(max_workers=len(order_ids)) as executor:
+            statuses = list(executor.map(lambda order_id: self.check_order_status(order_id, symbol), order_ids))
+        filled = [order_id for order_id, status in zip(order_ids, statuses) if status]
+        not_filled = [order_id for order_id, status in zip(order_ids, statuses) if not status]
+        return filled, not_filled
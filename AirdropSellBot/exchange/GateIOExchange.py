@@ -1,31 +1,44 @@
 import time
-from typing import List, Tuple
-from gate_api import ApiClient, Configuration, SpotApi, Order
+from typing import List, Optional, Tuple
+
+import numpy as np
+from gate_api import ApiClient, Configuration, SpotApi, Order, CancelBatchOrder, OrderPatch, BatchAmendItem
 from gate_api.exceptions import GateApiException
 
-from dotenv import load_dotenv
 import os
 from loguru import logger
 
 from exchange.Exchange import Exchange
+from exchange.OrderState import OrderState, gate_status
+from exchange.RateLimiter import rate_limiter
+from exchange.SellLadder import to_depth_array
+from exchange.SymbolInfo import SymbolInfo
+from stream.DepthStream import DepthStream, GateIODepthStream
+from stream.UserDataStream import GateIOUserDataStream, UserDataStream
 
-load_dotenv()  # Загружаем переменные из .env
 
-# Настройка логирования
-logger.add("trade.log", rotation="1 MB")
+GATE_API_URL = "https://api.gateio.ws/api/v4"
+GATE_BATCH_SIZE = 10  # Максимум ордеров в одном запросе batch_orders
+GATE_CANCEL_BATCH_SIZE = 20  # Максимум ордеров в одном запросе cancel_batch_orders
 
 
 class GateIOExchange(Exchange):
-    def __init__(self):
-        api_key = os.getenv("GATE_API_KEY")
-        api_secret = os.getenv("GATE_API_SECRET")
+    SUPPORTS_AMEND = True
+    ENV_PREFIX = "GATE"
+
+    def __init__(self, api_key: str = None, api_secret: str = None):
+        api_key = api_key or os.getenv("GATE_API_KEY")
+        api_secret = api_secret or os.getenv("GATE_API_SECRET")
         if not api_key or not api_secret:
             logger.error("API ключи для Gate не найдены в .env")
             raise ValueError("API keys not provided")
+        self.api_key = api_key
+        self.api_secret = api_secret
         # Настройка конфигурации с увеличенным таймаутом
-        config = Configuration(key=api_key, secret=api_secret)
+        config = Configuration(host=self.endpoint_override("API") or GATE_API_URL, key=api_key, secret=api_secret)
         config.timeout = 10  # Устанавливаем таймаут 10 секунд
         self.client = ApiClient(config)
+        rate_limiter(self.ENV_PREFIX, api_key).wrap_rest_client(self.client.rest_client)
         self.spot_api = SpotApi(self.client)
 
     def create_symbol(self, assert_in: str, assert_out: str) -> str:
@@ -33,12 +46,25 @@ class GateIOExchange(Exchange):
         try:
             # Gate.io использует формат с подчёркиванием, например, BTC_USDT
             symbol = f"{assert_in}_{assert_out}"
-            logger.debug(f"Создан символ для Gate.io: {symbol}")
+            logger.debug("Создан символ для Gate.io: {}", symbol)
             return symbol
         except Exception as e:
             logger.error(f"Ошибка при создании символа: {e}")
             return ""
 
+    def get_server_time(self) -> int:
+        return int(self.spot_api.get_system_time().server_time)
+
+    def fetch_symbol_info(self, symbol: str) -> SymbolInfo:
+        """Точность цены и количества Gate.io задаёт числом знаков после запятой."""
+        pair = self.spot_api.get_currency_pair(symbol)
+        return SymbolInfo(
+            tick_size=10 ** -pair.precision,
+            lot_size=10 ** -pair.amount_precision,
+            min_qty=float(pair.min_base_amount or 0),
+            min_notional=float(pair.min_quote_amount or 0)
+        )
+
     def get_balance(self, asset: str, auto_transfer: bool = True) -> float:
         """
         Получение доступного баланса для спотового аккаунта.
@@ -49,9 +75,9 @@ class GateIOExchange(Exchange):
             for account in accounts:
                 if account.currency == asset:
                     avail_bal = float(account.available)
-                    logger.debug(f"Найден баланс для {asset}: {avail_bal}")
+                    logger.debug("Найден баланс для {}: {}", asset, avail_bal)
                     return avail_bal
-            logger.debug(f"Баланс для {asset} не найден, возвращаем 0")
+            logger.debug("Баланс для {} не найден, возвращаем 0", asset)
             return 0.0
         except GateApiException as e:
             logger.error(f"Ошибка API Gate.io при получении баланса: {e}")
@@ -64,7 +90,7 @@ class GateIOExchange(Exchange):
         """Получение списка открытых ордеров для торговой пары."""
         try:
             orders = self.spot_api.list_orders(symbol, status='open', page=1, limit=100)
-            logger.debug(f"Получены открытые ордера для {symbol}: {len(orders)} шт.")
+            logger.debug("Получены открытые ордера для {}: {} шт.", symbol, len(orders))
             return orders
         except GateApiException as e:
             logger.error(f"Ошибка API Gate.io при получении ордеров: {e}")
@@ -73,68 +99,40 @@ class GateIOExchange(Exchange):
             logger.error(f"Ошибка при получении ордеров: {e}")
             return []
 
-    def calculate_sell_orders(self, symbol: str, quantity: float) -> List[Tuple[float, float]]:
-        """Расчёт лимитных ордеров на продажу на основе книги ордеров."""
+    def create_depth_stream(self, symbol: str, ws_url: str = None) -> DepthStream:
+        """Поток spot.order_book_update, синхронизируемый по REST-снапшоту с id."""
+        return GateIODepthStream(symbol, self._load_depth_snapshot, ws_url)
+
+    def _load_depth_snapshot(self, symbol: str):
+        order_book = self.spot_api.list_order_book(currency_pair=symbol, limit=100, with_id=True)
+        return order_book.bids, order_book.asks, int(order_book.id)
+
+    def fetch_bids(self, symbol: str, depth: int) -> np.ndarray:
+        """Биды из книги ордеров через REST."""
         try:
-            order_book = self.spot_api.list_order_book(currency_pair=symbol, limit=50)
-            bids = order_book.bids  # Список [цена, объём]
-            logger.info(f"Получены биды для {symbol}: {[(float(b[0]), float(b[1])) for b in bids]}")
-
-            if len(bids) > 1:
-                bids = bids[1:]  # Пропускаем первый бид
-            else:
-                logger.warning(f"Получен только один бид для {symbol}, недостаточно данных")
-                return []
-
-            if not bids:
-                logger.warning(f"Список бидов для {symbol} пуст после пропуска первого")
-                return []
-
-            orders = []
-            remaining_qty = quantity
-            success_rate = 0.10
-
-            for bid_price, bid_qty in bids:
-                bid_price = float(bid_price)
-                bid_qty = float(bid_qty)
-                sell_qty = bid_qty * success_rate
-
-                if sell_qty >= remaining_qty:
-                    orders.append((bid_price, remaining_qty))
-                    logger.debug(f"Добавлен последний ордер: цена {bid_price}, объём {remaining_qty}")
-                    return orders
-
-                orders.append((bid_price, sell_qty))
-                logger.debug(f"Добавлен ордер: цена {bid_price}, объём {sell_qty}")
-                remaining_qty -= sell_qty
-                success_rate += 0.05
-
-            if remaining_qty > 0 and bids:
-                last_price = float(bids[-1][0])
-                orders.append((last_price, remaining_qty))
-                logger.debug(f"Добавлен остаточный ордер: цена {last_price}, объём {remaining_qty}")
-            logger.info(f"Итоговый список ордеров: {orders}")
-            return orders
+            order_book = self.spot_api.list_order_book(currency_pair=symbol, limit=depth)
+            return to_depth_array(order_book.bids)  # Список [цена, объём]
         except GateApiException as e:
             logger.error(f"Ошибка API Gate.io при получении книги ордеров: {e}")
-            return []
+            return to_depth_array([])
         except Exception as e:
-            logger.error(f"Ошибка при вычислении ордеров: {e}")
-            return []
+            logger.error(f"Ошибка при получении книги ордеров: {e}")
+            return to_depth_array([])
 
     def place_sell_order(self, symbol: str, quantity: float, price: float) -> str:
         """Выставление лимитного ордера на продажу."""
+        info = self.get_symbol_info(symbol)
         try:
             order = Order(
                 currency_pair=symbol,
                 side='sell',
                 type='limit',
-                amount=str(quantity),
-                price=str(price)
+                amount=info.format_qty(quantity),
+                price=info.format_price(price)
             )
             created_order = self.spot_api.create_order(order)
             order_id = created_order.id
-            logger.debug(f"Ордер успешно выставлен: {order_id}")
+            logger.debug("Ордер успешно выставлен: {}", order_id)
             return order_id
         except GateApiException as e:
             logger.error(f"Ошибка API Gate.io при выставлении ордера: {e}")
@@ -143,26 +141,150 @@ class GateIOExchange(Exchange):
             logger.error(f"Ошибка при выставлении ордера: {e}")
             return ""
 
+    def place_sell_orders(self, symbol: str, orders: List[Tuple[float, float]]) -> List[str]:
+        """Пакетное выставление лимитных ордеров на продажу (до 10 ордеров за запрос)."""
+        batches = self.send_batches(orders, GATE_BATCH_SIZE, lambda chunk: self._place_sell_orders_batch(symbol, chunk))
+        return [order_id for batch in batches for order_id in batch]
+
+    def _place_sell_orders_batch(self, symbol: str, orders: List[Tuple[float, float]]) -> List[str]:
+        info = self.get_symbol_info(symbol)
+        try:
+            created_orders = self.spot_api.create_batch_orders([
+                Order(
+                    currency_pair=symbol,
+                    side='sell',
+                    type='limit',
+                    amount=info.format_qty(quantity),
+                    price=info.format_price(price)
+                )
+                for price, quantity in orders
+            ])
+            order_ids = []
+            for created_order in created_orders:
+                if created_order.succeeded:
+                    logger.debug("Ордер успешно выставлен: {}", created_order.id)
+                    order_ids.append(created_order.id)
+                else:
+                    logger.error(f"Ошибка выставления ордера: {created_order.message}")
+                    order_ids.append("")
+            return order_ids
+        except GateApiException as e:
+            logger.error(f"Ошибка API Gate.io при пакетном выставлении ордеров: {e}")
+            return [""] * len(orders)
+        except Exception as e:
+            logger.error(f"Ошибка при пакетном выставлении ордеров: {e}")
+            return [""] * len(orders)
+
+    def amend_order(self, order_id: str, symbol: str, quantity: float, price: float) -> bool:
+        """Изменение цены и объёма ордера без отмены."""
+        info = self.get_symbol_info(symbol)
+        try:
+            self.spot_api.amend_order(order_id, OrderPatch(amount=info.format_qty(quantity), price=info.format_price(price)),
+                                      currency_pair=symbol)
+            logger.debug("Ордер {} перенесён: {} по {}", order_id, quantity, price)
+            return True
+        except GateApiException as e:
+            # ORDER_NOT_FOUND и т.п.: ордер уже исполнен или отменён — его заменит новый
+            logger.debug("Ордер {} не изменён: {}", order_id, e.label)
+            return False
+        except Exception as e:
+            logger.error(f"Ошибка при изменении ордера: {e}")
+            return False
+
+    def amend_orders(self, symbol: str, amendments: List[Tuple[str, float, float]]) -> List[bool]:
+        """Пакетное изменение ордеров (до 10 ордеров за запрос)."""
+        batches = self.send_batches(amendments, GATE_BATCH_SIZE, lambda chunk: self._amend_orders_batch(symbol, chunk))
+        return [ok for batch in batches for ok in batch]
+
+    def _amend_orders_batch(self, symbol: str, amendments: List[Tuple[str, float, float]]) -> List[bool]:
+        info = self.get_symbol_info(symbol)
+        try:
+            amended_orders = self.spot_api.amend_batch_orders([
+                BatchAmendItem(order_id=order_id, currency_pair=symbol, amount=info.format_qty(quantity), price=info.format_price(price))
+                for order_id, price, quantity in amendments
+            ])
+            results = []
+            for (order_id, _, _), amended_order in zip(amendments, amended_orders):
+                if not amended_order.succeeded:
+                    logger.debug("Ордер {} не изменён: {}", order_id, amended_order.message)
+                results.append(bool(amended_order.succeeded))
+            return results
+        except GateApiException as e:
+            logger.error(f"Ошибка API Gate.io при пакетном изменении ордеров: {e}")
+            return [False] * len(amendments)
+        except Exception as e:
+            logger.error(f"Ошибка при пакетном изменении ордеров: {e}")
+            return [False] * len(amendments)
+
     def cancel_order(self, order_id: str, symbol: str):
         """Отмена ордера."""
         try:
             self.spot_api.cancel_order(order_id, symbol)
-            logger.debug(f"Ордер {order_id} отменён")
+            logger.debug("Ордер {} отменён", order_id)
         except GateApiException as e:
             logger.error(f"Ошибка API Gate.io при отмене ордера: {e}")
         except Exception as e:
             logger.error(f"Ошибка при отмене ордера: {e}")
 
-    def check_order_status(self, order_id: str, symbol: str) -> bool:
-        """Проверка статуса ордера."""
+    def cancel_orders(self, symbol: str, order_ids: List[str]) -> Tuple[List[str], List[str]]:
+        """Пакетная отмена ордеров, для неотменённых уточняется, не исполнены ли они."""
+        results = self.send_batches(order_ids, GATE_CANCEL_BATCH_SIZE,
+                                    lambda chunk: self._cancel_orders_batch(symbol, chunk))
+        cancelled = [order_id for batch_cancelled, _ in results for order_id in batch_cancelled]
+        failed = [order_id for _, batch_failed in results for order_id in batch_failed]
+        logger.debug("Отменено ордеров: {}, не отменено: {}", len(cancelled), len(failed))
+        filled, _ = self._split_filled(symbol, failed)
+        return cancelled, filled
+
+    def _cancel_orders_batch(self, symbol: str, chunk: List[str]) -> Tuple[List[str], List[str]]:
+        try:
+            results = self.spot_api.cancel_batch_orders(
+                [CancelBatchOrder(currency_pair=symbol, id=order_id) for order_id in chunk]
+            )
+            cancelled, failed = [], []
+            for result in results:
+                if result.succeeded:
+                    cancelled.append(result.id)
+                else:
+                    logger.debug("Ордер {} не отменён: {}", result.id, result.message)
+                    failed.append(result.id)
+            return cancelled, failed
+        except GateApiException as e:
+            logger.error(f"Ошибка API Gate.io при пакетной отмене ордеров: {e}")
+            return [], chunk
+        except Exception as e:
+            logger.error(f"Ошибка при пакетной отмене ордеров: {e}")
+            return [], chunk
+
+    def cancel_all_orders(self, symbol: str) -> bool:
+        """Отмена всех открытых ордеров по торговой паре."""
+        try:
+            cancelled = self.spot_api.cancel_orders(symbol)
+            logger.info(f"Отменены все ордера по {symbol}: {len(cancelled)} шт.")
+            return True
+        except GateApiException as e:
+            logger.error(f"Ошибка API Gate.io при отмене всех ордеров: {e}")
+            return False
+        except Exception as e:
+            logger.error(f"Ошибка при отмене всех ордеров: {e}")
+            return False
+
+    def create_user_stream(self, ws_url: str = None) -> UserDataStream:
+        """Приватный канал spot.orders по всем парам."""
+        return GateIOUserDataStream(self.api_key, self.api_secret, ws_url)
+
+    def get_order_state(self, order_id: str, symbol: str) -> Optional[OrderState]:
+        """Проверка статуса ордера и исполненного объёма."""
         try:
             order = self.spot_api.get_order(order_id, symbol)
-            status = order.status == 'closed'  # 'closed' — выполнен, 'open' — активен
-            logger.debug(f"Статус ордера {order_id}: {'filled' if status else 'not filled'}")
-            return status
+            filled_qty = float(order.amount) - float(order.left)
+            logger.debug("Статус ордера {}: {}, исполнено {}", order_id, order.status, filled_qty)
+            return OrderState(order_id, gate_status(order.status, filled_qty), filled_qty,
+                              float(order.avg_deal_price or 0))
         except GateApiException as e:
             logger.error(f"Ошибка API Gate.io при проверке статуса ордера: {e}")
-            return False
+            return None
         except Exception as e:
             logger.error(f"Ошибка при проверке статуса ордера: {e}")
-            return False
+            return None
+
@@ -1,75 +1,133 @@
-import time
-import hmac
-import hashlib
 import requests
-from typing import List, Tuple
-from dotenv import load_dotenv
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
 import os
 from loguru import logger
 from exchange.Exchange import Exchange
+from exchange.OrderState import OrderState, BINANCE_STATUSES, ORDER_OPEN
+from exchange.RateLimiter import rate_limiter
+from exchange.RequestSigner import HmacSigner, JsonTemplate, QueryTemplate
+from exchange.SellLadder import to_depth_array
+from exchange.SymbolInfo import SymbolInfo
+from stream.DepthStream import DepthStream, MEXCDepthStream
+from stream.UserDataStream import MEXCUserDataStream, UserDataStream
 
-load_dotenv()
-logger.add("trade.log", rotation="1 MB")
 
 MEXC_API_URL = "https://api.mexc.com/api/v3"
+MEXC_BATCH_SIZE = 20  # Максимум ордеров в одном запросе batchOrders
+MEXC_TIMESTAMP_REJECTED = 700003  # Код ошибки: timestamp вне recvWindow
 
 
 class MEXCExchange(Exchange):
-    def __init__(self):
-        self.api_key = os.getenv("MEXC_API_KEY")
-        self.api_secret = os.getenv("MEXC_API_SECRET")
+    ORDER_BOOK_DEPTH = 10
+    ENV_PREFIX = "MEXC"
+
+    def __init__(self, api_key: str = None, api_secret: str = None):
+        self.api_key = api_key or os.getenv("MEXC_API_KEY")
+        self.api_secret = api_secret or os.getenv("MEXC_API_SECRET")
         if not self.api_key or not self.api_secret:
             logger.error("API ключи для MEXC не найдены в .env")
             raise ValueError("API keys not provided")
+        self.api_url = self.endpoint_override("API") or MEXC_API_URL
         # Создаём сессию для изоляции запросов
         self.session = requests.Session()
         self.session.headers.update({
             "X-MEXC-APIKEY": self.api_key,
             "Content-Type": "application/json"
         })
+        rate_limiter(self.ENV_PREFIX, self.api_key).mount(self.session)
+        self.signer = HmacSigner(self.api_secret)
+        self._order_queries: Dict[str, QueryTemplate] = {}
+        self._batch_orders: Dict[str, JsonTemplate] = {}
 
     def _sign_request(self, params: dict) -> dict:
-        timestamp = str(int(time.time() * 1000))
-        params['timestamp'] = timestamp
+        params['timestamp'] = str(self.clock.now_ms())
         query_string = "&".join([f"{k}={v}" for k, v in sorted(params.items())])
-        logger.debug(f"Строка для подписи: {query_string}")
-        signature = hmac.new(
-            self.api_secret.encode('utf-8'),
-            query_string.encode('utf-8'),
-            hashlib.sha256
-        ).hexdigest()
-        logger.debug(f"Сформированная подпись: {signature}")
-        params['signature'] = signature
+        params['signature'] = self.signer.hexdigest(query_string)
         return params
 
+    def _order_query(self, symbol: str) -> QueryTemplate:
+        """Строка запроса ордера по паре: подставляются только цена, объём и timestamp."""
+        if symbol not in self._order_queries:
+            self._order_queries[symbol] = QueryTemplate({"symbol": symbol, "side": "SELL", "type": "LIMIT"},
+                                                        ("quantity", "price", "timestamp"))
+        return self._order_queries[symbol]
+
+    def _batch_order(self, symbol: str) -> JsonTemplate:
+        """Закодированный JSON ордера по паре для batchOrders."""
+        if symbol not in self._batch_orders:
+            self._batch_orders[symbol] = JsonTemplate(
+                {"symbol": symbol, "side": "SELL", "type": "LIMIT", "quantity": None, "price": None}, url_encode=True)
+        return self._batch_orders[symbol]
+
+    def _post_signed(self, path: str, build_query: Callable[[int], str]) -> requests.Response:
+        """
+        POST с подписанной строкой запроса build_query(timestamp). Если биржа отвергла timestamp,
+        смещение часов перемеряется и запрос один раз подписывается заново.
+        """
+        for attempt in range(2):
+            query = build_query(self.clock.now_ms())
+            response = self.session.post(f"{self.api_url}{path}?{query}&signature={self.signer.hexdigest(query)}")
+            if attempt or response.status_code == 200 or not self._timestamp_rejected(response):
+                return response
+            logger.warning(f"MEXC отверг timestamp запроса {path}, синхронизируем время")
+            self.sync_clock()
+        return response
+
+    @staticmethod
+    def _timestamp_rejected(response: requests.Response) -> bool:
+        try:
+            return response.json().get('code') == MEXC_TIMESTAMP_REJECTED
+        except ValueError:
+            return False
+
     def create_symbol(self, assert_in: str, assert_out: str) -> str:
         try:
             symbol = f"{assert_in}{assert_out}"
-            logger.debug(f"Создан символ для MEXC: {symbol}")
+            logger.debug("Создан символ для MEXC: {}", symbol)
             return symbol
         except Exception as e:
             logger.error(f"Ошибка при создании символа: {e}")
             return ""
 
+    def get_server_time(self) -> int:
+        return int(self.session.get(f"{self.api_url}/time").json()['serverTime'])
+
+    def fetch_symbol_info(self, symbol: str) -> SymbolInfo:
+        response = self.session.get(f"{self.api_url}/exchangeInfo", params={"symbol": symbol})
+        result = response.json()
+        if response.status_code != 200 or not result.get('symbols'):
+            raise ValueError(f"Пара {symbol} не найдена: {result}")
+        info = result['symbols'][0]
+        # baseSizePrecision — шаг количества строкой, "0" означает точность baseAssetPrecision
+        lot_size = float(info.get('baseSizePrecision') or 0) or 10 ** -int(info['baseAssetPrecision'])
+        return SymbolInfo(
+            tick_size=10 ** -int(info['quotePrecision']),
+            lot_size=lot_size,
+            min_qty=lot_size,
+            min_notional=float(info.get('quoteAmountPrecision') or 0)
+        )
+
     def get_balance(self, asset: str, auto_transfer: bool = False) -> float:
         try:
             params = {}
             signed_params = self._sign_request(params)
             # Используем сессию вместо прямого requests.get
-            response = self.session.get(f"{MEXC_API_URL}/account", params=signed_params)
+            response = self.session.get(f"{self.api_url}/account", params=signed_params)
             result = response.json()
             if response.status_code == 200:
                 if 'balances' in result:
                     for balance in result['balances']:
                         if balance['asset'] == asset:
                             avail_bal = float(balance['free'])
-                            logger.debug(f"Найден баланс для {asset}: {avail_bal}")
+                            logger.debug("Найден баланс для {}: {}", asset, avail_bal)
                             return avail_bal
                 else:
-                    logger.debug(f"Ключ 'balances' не найден в ответе: {result}")
+                    logger.debug("Ключ 'balances' не найден в ответе: {}", result)
             else:
                 logger.error(f"Ошибка API: {result}")
-            logger.debug(f"Баланс для {asset} не найден, возвращаем 0")
+            logger.debug("Баланс для {} не найден, возвращаем 0", asset)
             return 0.0
         except Exception as e:
             logger.error(f"Ошибка при получении баланса: {e}")
@@ -79,10 +137,10 @@ class MEXCExchange(Exchange):
         try:
             params = {"symbol": symbol}
             signed_params = self._sign_request(params)
-            response = self.session.get(f"{MEXC_API_URL}/openOrders", params=signed_params)
+            response = self.session.get(f"{self.api_url}/openOrders", params=signed_params)
             result = response.json()
             if response.status_code == 200:
-                logger.debug(f"Получены открытые ордера для {symbol}: {len(result)} шт.")
+                logger.debug("Получены открытые ордера для {}: {} шт.", symbol, len(result))
                 return result
             logger.error(f"Ошибка получения ордеров: {result}")
             return []
@@ -90,67 +148,32 @@ class MEXCExchange(Exchange):
             logger.error(f"Ошибка при получении ордеров: {e}")
             return []
 
-    def calculate_sell_orders(self, symbol: str, quantity: float) -> List[Tuple[float, float]]:
+    def create_depth_stream(self, symbol: str, ws_url: str = None) -> DepthStream:
+        return MEXCDepthStream(symbol, ws_url)
+
+    def fetch_bids(self, symbol: str, depth: int) -> np.ndarray:
         try:
-            # Используем self.session.get вместо requests.get
-            response = self.session.get(f"{MEXC_API_URL}/depth", params={"symbol": symbol, "limit": 10})
+            response = self.session.get(f"{self.api_url}/depth", params={"symbol": symbol, "limit": depth})
             result = response.json()
-            if response.status_code == 200 and 'bids' in result:
-                bids = result['bids'][1:]
-                logger.info(f"Получены биды для {symbol}: {[(float(price), float(qty)) for price, qty in bids]}")
-
-                if not bids:
-                    logger.warning(f"Список бидов для {symbol} пуст")
-                    return []
-
-                orders = []
-                remaining_qty = quantity
-                success_rate = 0.10
-
-                for bid_price, bid_qty in bids:
-                    bid_price = float(bid_price)
-                    bid_qty = float(bid_qty)
-                    sell_qty = bid_qty * success_rate
-
-                    if sell_qty >= remaining_qty:
-                        orders.append((bid_price, remaining_qty))
-                        logger.debug(f"Добавлен последний ордер: цена {bid_price}, объём {remaining_qty}")
-                        return orders
-
-                    orders.append((bid_price, sell_qty))
-                    logger.debug(f"Добавлен ордер: цена {bid_price}, объём {sell_qty}")
-                    remaining_qty -= sell_qty
-                    success_rate += 0.05
-
-                if remaining_qty > 0 and bids:
-                    last_price = float(bids[-1][0])
-                    orders.append((last_price, remaining_qty))
-                    logger.debug(f"Добавлен остаточный ордер: цена {last_price}, объём {remaining_qty}")
-                logger.info(f"Итоговый список ордеров: {orders}")
-                return orders
-            logger.error(f"Ошибка получения книги ордеров: {result}")
-            return []
+            if response.status_code != 200 or 'bids' not in result:
+                logger.error(f"Ошибка получения книги ордеров: {result}")
+                return to_depth_array([])
+            return to_depth_array(result['bids'])
         except Exception as e:
-            logger.error(f"Ошибка при вычислении ордеров: {e}")
-            return []
+            logger.error(f"Ошибка при получении книги ордеров: {e}")
+            return to_depth_array([])
 
     def place_sell_order(self, symbol: str, quantity: float, price: float) -> str:
+        info = self.get_symbol_info(symbol)
         try:
-            params = {
-                "symbol": symbol,
-                "side": "SELL",
-                "type": "LIMIT",
-                "quantity": str(quantity),
-                "price": str(price)
-            }
-            signed_params = self._sign_request(params)
-            # Отправляем параметры в теле запроса в формате URL-encoded
-            response = self.session.post(f"{MEXC_API_URL}/order", data=signed_params)
+            template = self._order_query(symbol)
+            response = self._post_signed("/order", lambda timestamp: template.render(
+                quantity=info.format_qty(quantity), price=info.format_price(price), timestamp=timestamp))
             result = response.json()
-            logger.debug(f"Ответ API: {result}")  # Добавляем отладочный вывод
+            logger.debug("Ответ API: {}", result)  # Добавляем отладочный вывод
             if response.status_code == 200 and 'orderId' in result:
                 order_id = result['orderId']
-                logger.debug(f"Ордер успешно выставлен: {order_id}")
+                logger.debug("Ордер успешно выставлен: {}", order_id)
                 return order_id
             logger.error(f"Ошибка выставления ордера: {result}")
             return ""
@@ -158,30 +181,91 @@ class MEXCExchange(Exchange):
             logger.error(f"Ошибка при выставлении ордера: {e}")
             return ""
 
+    def place_sell_orders(self, symbol: str, orders: List[Tuple[float, float]]) -> List[str]:
+        batches = self.send_batches(orders, MEXC_BATCH_SIZE, lambda chunk: self._place_sell_orders_batch(symbol, chunk))
+        return [order_id for batch in batches for order_id in batch]
+
+    def _place_sell_orders_batch(self, symbol: str, orders: List[Tuple[float, float]]) -> List[str]:
+        info = self.get_symbol_info(symbol)
+        try:
+            # MEXC подписывает batchOrders в URL-encoded виде, поэтому отправляем ровно ту строку, что подписали
+            batch_orders = self._batch_order(symbol).render_list(
+                {"quantity": info.format_qty(quantity), "price": info.format_price(price)} for price, quantity in orders)
+            response = self._post_signed("/batchOrders",
+                                         lambda timestamp: f"batchOrders={batch_orders}&timestamp={timestamp}")
+            result = response.json()
+            logger.debug("Ответ API: {}", result)
+            if response.status_code != 200 or not isinstance(result, list) or len(result) != len(orders):
+                logger.error(f"Ошибка пакетного выставления ордеров: {result}")
+                return [""] * len(orders)
+            order_ids = []
+            for item in result:
+                if 'orderId' in item:
+                    logger.debug("Ордер успешно выставлен: {}", item['orderId'])
+                    order_ids.append(item['orderId'])
+                else:
+                    logger.error(f"Ошибка выставления ордера: {item}")
+                    order_ids.append("")
+            return order_ids
+        except Exception as e:
+            logger.error(f"Ошибка при пакетном выставлении ордеров: {e}")
+            return [""] * len(orders)
+
     def cancel_order(self, order_id: str, symbol: str):
         try:
             params = {"orderId": order_id, "symbol": symbol}
             signed_params = self._sign_request(params)
-            response = self.session.delete(f"{MEXC_API_URL}/order", json=signed_params)
+            response = self.session.delete(f"{self.api_url}/order", json=signed_params)
             if response.status_code == 200:
-                logger.debug(f"Ордер {order_id} отменён")
+                logger.debug("Ордер {} отменён", order_id)
             else:
                 logger.error(f"Ошибка отмены ордера: {response.json()}")
         except Exception as e:
             logger.error(f"Ошибка при отмене ордера: {e}")
 
-    def check_order_status(self, order_id: str, symbol: str) -> bool:
+    def cancel_all_orders(self, symbol: str) -> bool:
+        try:
+            signed_params = self._sign_request({"symbol": symbol})
+            response = self.session.delete(f"{self.api_url}/openOrders", params=signed_params)
+            result = response.json()
+            if response.status_code == 200:
+                logger.info(f"Отменены все ордера по {symbol}: {len(result)} шт.")
+                return True
+            logger.error(f"Ошибка отмены всех ордеров: {result}")
+            return False
+        except Exception as e:
+            logger.error(f"Ошибка при отмене всех ордеров: {e}")
+            return False
+
+    def create_user_stream(self, ws_url: str = None) -> UserDataStream:
+        return MEXCUserDataStream(self._create_listen_key, self._keepalive_listen_key, ws_url)
+
+    def _create_listen_key(self) -> str:
+        signed_params = self._sign_request({})
+        response = self.session.post(f"{self.api_url}/userDataStream", params=signed_params)
+        result = response.json()
+        if response.status_code != 200 or 'listenKey' not in result:
+            raise ValueError(f"Не удалось получить listenKey: {result}")
+        return result['listenKey']
+
+    def _keepalive_listen_key(self, listen_key: str):
+        signed_params = self._sign_request({"listenKey": listen_key})
+        response = self.session.put(f"{self.api_url}/userDataStream", params=signed_params)
+        if response.status_code != 200:
+            raise ValueError(f"Не удалось продлить listenKey: {response.text}")
+
+    def get_order_state(self, order_id: str, symbol: str) -> Optional[OrderState]:
         try:
             params = {"orderId": order_id, "symbol": symbol}
             signed_params = self._sign_request(params)
-            response = self.session.get(f"{MEXC_API_URL}/order", params=signed_params)
+            response = self.session.get(f"{self.api_url}/order", params=signed_params)
             result = response.json()
             if response.status_code == 200 and 'status' in result:
-                status = result['status'] == 'FILLED'
-                logger.debug(f"Статус ордера {order_id}: {'Filled' if status else 'Not Filled'}")
-                return status
+                logger.debug("Статус ордера {}: {}, исполнено {}", order_id, result['status'], result['executedQty'])
+                return OrderState.from_quote(order_id, BINANCE_STATUSES.get(result['status'], ORDER_OPEN),
+                                             float(result['executedQty']), float(result['cummulativeQuoteQty']))
             logger.error(f"Ошибка проверки статуса ордера: {result}")
-            return False
+            return None
         except Exception as e:
             logger.error(f"Ошибка при проверке статуса ордера: {e}")
-            return False
\ No newline at end of file
+            return None
@@ -0,0 +1,125 @@
+import itertools
+from bisect import bisect_left, insort
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+BUY = "buy"
+SELL = "sell"
+
+EPSILON = 1e-12
+
+
+class BookOrder:
+    __slots__ = ("order_id", "side", "price", "qty", "filled")
+
+    def __init__(self, order_id: str, side: str, price: float, qty: float):
+        self.order_id = order_id
+        self.side = side
+        self.price = price
+        self.qty = qty
+        self.filled = 0.0
+
+    @property
+    def left(self) -> float:
+        return self.qty - self.filled
+
+
+# Сделка: (id пассивного ордера, id агрессивного ордера, цена, объём)
+Fill = Tuple[str, str, float, float]
+
+
+# Книга одной стороны: уровни цены с очередями ордеров в порядке поступления (приоритет по времени)
+class _BookSide:
+    def __init__(self, descending: bool):
+        self.descending = descending  # Биды: лучшая цена — наибольшая
+        self.levels: Dict[float, Deque[BookOrder]] = {}
+        self.prices: List[float] = []  # По возрастанию
+
+    def best_price(self) -> Optional[float]:
+        if not self.prices:
+            return None
+        return self.prices[-1] if self.descending else self.prices[0]
+
+    def add(self, order: BookOrder):
+        level = self.levels.get(order.price)
+        if level is None:
+            level = self.levels[order.price] = deque()
+            insort(self.prices, order.price)
+        level.append(order)
+
+    def remove(self, order: BookOrder) -> bool:
+        level = self.levels.get(order.price)
+        if level is None:
+            return False
+        try:
+            level.remove(order)
+        except ValueError:
+            return False
+        if not level:
+            self._drop_level(order.price)
+        return True
+
+    def pop_front(self, price: float):
+        level = self.levels[price]
+        level.popleft()
+        if not level:
+            self._drop_level(price)
+
+    def depth(self, depth: int) -> List[Tuple[float, float]]:
+        prices = reversed(self.prices) if self.descending else iter(self.prices)
+        return [(price, sum(order.left for order in self.levels[price])) for price in itertools.islice(prices, depth)]
+
+    def _drop_level(self, price: float):
+        del self.levels[price]
+        del self.prices[bisect_left(self.prices, price)]
+
+
+# Книга ордеров одной пары с приоритетом цена-время
+class MatchingEngine:
+    def __init__(self):
+        self.bids = _BookSide(descending=True)
+        self.asks = _BookSide(descending=False)
+        self.orders: Dict[str, BookOrder] = {}  # Ордера, стоящие в книге
+
+    def submit(self, order_id: str, side: str, price: float, qty: float) -> List[Fill]:
+        """
+        Лимитный ордер: исполнить против встречной стороны по ценам пассивных ордеров,
+        остаток поставить в книгу. Возвращает список сделок.
+        """
+        order = BookOrder(order_id, side, price, qty)
+        fills = self._match(order)
+        if order.left > EPSILON:
+            (self.bids if side == BUY else self.asks).add(order)
+            self.orders[order_id] = order
+        return fills
+
+    def cancel(self, order_id: str) -> Optional[BookOrder]:
+        """Снять ордер из книги, None — ордера в книге нет (исполнен или не существовал)."""
+        order = self.orders.pop(order_id, None)
+        if order is None:
+            return None
+        (self.bids if order.side == BUY else self.asks).remove(order)
+        return order
+
+    def get_bids(self, depth: int) -> List[Tuple[float, float]]:
+        return self.bids.depth(depth)
+
+    def get_asks(self, depth: int) -> List[Tuple[float, float]]:
+        return self.asks.depth(depth)
+
+    def _match(self, taker: BookOrder) -> List[Fill]:
+        book = self.asks if taker.side == BUY else self.bids
+        fills = []
+        while taker.left > EPSILON:
+            best = book.best_price()
+            if best is None or (best > taker.price if taker.side == BUY else best < taker.price):
+                break
+            maker = book.levels[best][0]
+            qty = min(maker.left, taker.left)
+            maker.filled += qty
+            taker.filled += qty
+            if maker.left <= EPSILON:
+                book.pop_front(best)
+                del self.orders[maker.order_id]
+            fills.append((maker.order_id, taker.order_id, best, qty))
+        return fills
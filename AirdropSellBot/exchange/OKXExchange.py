@@ -1,37 +1,77 @@
 # Реализация для OKX
 import time
 from datetime import timedelta, datetime
-from typing import List, Tuple
-from dotenv import load_dotenv
+from typing import List, Optional, Tuple
+
+import numpy as np
 import os
 from loguru import logger
 
 from exchange.Exchange import Exchange
+from exchange.OrderState import OrderState, ORDER_OPEN
+from exchange.RateLimiter import rate_limiter
+from exchange.SellLadder import to_depth_array
+from exchange.SymbolInfo import SymbolInfo
+from stream.DepthStream import DepthStream, OKXDepthStream
+from stream.UserDataStream import OKXUserDataStream, UserDataStream
 from okx.MarketData import MarketAPI  # Проверяем правильность импорта
 from okx.Trade import TradeAPI  # Проверяем правильность импорта
 from okx.Account import AccountAPI  # Добавлен для баланса
 from okx.Funding import FundingAPI
+from okx.PublicData import PublicAPI
 from config import REQUEST_TIMEOUT, DELAY_BETWEEN_RETRIES
 
-load_dotenv()  # Загружаем переменные из .env
 
-# Настройка логирования
-logger.add("trade.log", rotation="1 MB")
+OKX_API_URL = "https://www.okx.com"
+OKX_BATCH_SIZE = 20  # Максимум ордеров в одном запросе batch-orders
 
 
 class OKXExchange(Exchange):
-    def __init__(self):
-        api_key = os.getenv("OKX_API_KEY")
-        api_secret = os.getenv("OKX_API_SECRET")
-        passphrase = os.getenv("OKX_PASSPHRASE")
-        self.trade_api = TradeAPI(api_key, api_secret, passphrase, flag="0", debug=False)
-        self.market_api = MarketAPI(api_key, api_secret, passphrase, flag="0", debug=False)
-        self.account_api = AccountAPI(api_key, api_secret, passphrase, flag="0", debug=False)
-        self.funding_api = FundingAPI(api_key, api_secret, passphrase, flag="0", debug=False)
+    DEPOSITS_PUSHED = False  # Зачисления приходят на Funding, а приватный поток видит только Trading
+    SUPPORTS_AMEND = True
+    ENV_PREFIX = "OKX"
+
+    def __init__(self, api_key: str = None, api_secret: str = None, passphrase: str = None):
+        api_key = api_key or os.getenv("OKX_API_KEY")
+        api_secret = api_secret or os.getenv("OKX_API_SECRET")
+        passphrase = passphrase or os.getenv("OKX_PASSPHRASE")
+        self.api_key = api_key
+        self.api_secret = api_secret
+        self.passphrase = passphrase
+        domain = self.endpoint_override("API") or OKX_API_URL
+        self.trade_api = TradeAPI(api_key, api_secret, passphrase, flag="0", domain=domain, debug=False)
+        self.market_api = MarketAPI(api_key, api_secret, passphrase, flag="0", domain=domain, debug=False)
+        self.account_api = AccountAPI(api_key, api_secret, passphrase, flag="0", domain=domain, debug=False)
+        self.funding_api = FundingAPI(api_key, api_secret, passphrase, flag="0", domain=domain, debug=False)
+        self.public_api = PublicAPI(api_key, api_secret, passphrase, flag="0", domain=domain, debug=False)
+        limiter = rate_limiter(self.ENV_PREFIX, api_key)
+        for api in (self.trade_api, self.market_api, self.account_api, self.funding_api, self.public_api):
+            limiter.hook_httpx(api)
 
     def create_symbol(self, assert_in: str, assert_out: str) -> str:
         return assert_in + "-" + assert_out
 
+    def get_server_time(self) -> int:
+        result = self.public_api.get_system_time()
+        return int(result['data'][0]['ts'])
+
+    def warm_up(self):
+        # Каждый API-объект python-okx — отдельный httpx-клиент (HTTP/2) со своим соединением, прогреваем все
+        for api in (self.trade_api, self.market_api, self.account_api, self.funding_api, self.public_api):
+            api.get("/api/v5/public/time")
+
+    def fetch_symbol_info(self, symbol: str) -> SymbolInfo:
+        result = self.public_api.get_instruments(instType="SPOT", instId=symbol)
+        if result['code'] != '0' or not result['data']:
+            raise ValueError(f"Пара {symbol} не найдена: {result['msg']}")
+        instrument = result['data'][0]
+        # OKX не публикует минимальную сумму ордера для спота
+        return SymbolInfo(
+            tick_size=float(instrument['tickSz']),
+            lot_size=float(instrument['lotSz']),
+            min_qty=float(instrument['minSz'])
+        )
+
     def get_balance(self, asset: str, auto_transfer: bool = False) -> float:
         try:
             if auto_transfer:
@@ -44,10 +84,10 @@ class OKXExchange(Exchange):
                     for balance in funding_result['data']:
                         if balance['ccy'] == asset:
                             funding_bal = float(balance['availBal'])
-                            logger.debug(f"Найден баланс Funding для {asset}: {funding_bal}")
+                            logger.debug("Найден баланс Funding для {}: {}", asset, funding_bal)
                             break
                     else:
-                        logger.debug(f"Баланс Funding для {asset} не найден")
+                        logger.debug("Баланс Funding для {} не найден", asset)
 
                     # Если на Funding есть средства, переводим их на Trading
                     if funding_bal > 0:
@@ -72,9 +112,9 @@ class OKXExchange(Exchange):
             for balance in trading_result['data'][0]['details']:
                 if balance['ccy'] == asset:
                     avail_bal = float(balance['availBal'])
-                    logger.debug(f"Найден баланс Trading для {asset}: {avail_bal}")
+                    logger.debug("Найден баланс Trading для {}: {}", asset, avail_bal)
                     return avail_bal
-            logger.debug(f"Баланс Trading для {asset} не найден, возвращаем 0")
+            logger.debug("Баланс Trading для {} не найден, возвращаем 0", asset)
             return 0.0
 
         except Exception as e:
@@ -88,73 +128,40 @@ class OKXExchange(Exchange):
                 logger.error(f"Ошибка получения ордеров: {result['msg']}")
                 return []
             orders = result['data']
-            logger.debug(f"Получены открытые ордера для {symbol}: {len(orders)} шт.")
+            logger.debug("Получены открытые ордера для {}: {} шт.", symbol, len(orders))
             return orders
         except Exception as e:
             logger.error(f"Ошибка при получении ордеров: {e}")
             return []
 
-    def calculate_sell_orders(self, symbol: str, quantity: float) -> List[Tuple[float, float]]:
+    def create_depth_stream(self, symbol: str, ws_url: str = None) -> DepthStream:
+        return OKXDepthStream(symbol, ws_url)
+
+    def fetch_bids(self, symbol: str, depth: int) -> np.ndarray:
         try:
-            order_book = self.market_api.get_orderbook(instId=symbol, sz=50)
+            order_book = self.market_api.get_orderbook(instId=symbol, sz=depth)
             if order_book['code'] != '0':
                 logger.error(f"Ошибка получения книги ордеров: {order_book['msg']}")
-                return []
-            bids = order_book['data'][0]['bids']
-            logger.info(f"Получены биды для {symbol}: {[(float(price), float(qty)) for price, qty, *_ in bids]}")
-
-            if len(bids) > 1:
-                bids = bids[1:]
-            else:
-                logger.warning(f"Получен только один бид для {symbol}, недостаточно данных для расчёта")
-                return []
-
-            if not bids:
-                logger.warning(f"Список бидов для {symbol} пуст после пропуска первого ордера")
-                return []
-
-            orders = []
-            remaining_qty = quantity
-            success_rate = 0.10
-
-            for bid_price, bid_qty, *_ in bids:
-                bid_price = float(bid_price)
-                bid_qty = float(bid_qty)
-                sell_qty = bid_qty * success_rate
-
-                if sell_qty >= remaining_qty:
-                    orders.append((bid_price, remaining_qty))
-                    logger.debug(f"Добавлен последний ордер: цена {bid_price}, объём {remaining_qty}")
-                    return orders
-
-                orders.append((bid_price, sell_qty))
-                logger.debug(f"Добавлен ордер: цена {bid_price}, объём {sell_qty}")
-                remaining_qty -= sell_qty
-                success_rate += 0.05
-
-            if remaining_qty > 0 and bids:
-                last_price = float(bids[-1][0])
-                orders.append((last_price, remaining_qty))
-                logger.debug(f"Добавлен остаточный ордер: цена {last_price}, объём {remaining_qty}")
-            logger.info(f"Итоговый список ордеров: {orders}")
-            return orders
+                return to_depth_array([])
+            return to_depth_array(order_book['data'][0]['bids'])
         except Exception as e:
-            logger.error(f"Ошибка при вычислении ордеров: {e}")
-            return []
+            logger.error(f"Ошибка при получении книги ордеров: {e}")
+            return to_depth_array([])
 
     def place_sell_order(self, symbol: str, quantity: float, price: float) -> str:
+        info = self.get_symbol_info(symbol)
         try:
             result = self.trade_api.place_order(
                 instId=symbol,
                 tdMode="cash",
                 side="sell",
                 ordType="limit",
-                sz=str(quantity),
-                px=str(price)
+                sz=info.format_qty(quantity),
+                px=info.format_price(price)
             )
             if result['code'] == '0':
                 order_id = result['data'][0]['ordId']
-                logger.debug(f"Ордер успешно выставлен: {order_id}")
+                logger.debug("Ордер успешно выставлен: {}", order_id)
                 return order_id
             else:
                 logger.error(f"Ошибка выставления ордера: {result['msg']}")
@@ -163,25 +170,141 @@ class OKXExchange(Exchange):
             logger.error(f"Ошибка при выставлении ордера: {e}")
             return ""
 
+    def place_sell_orders(self, symbol: str, orders: List[Tuple[float, float]]) -> List[str]:
+        batches = self.send_batches(orders, OKX_BATCH_SIZE, lambda chunk: self._place_sell_orders_batch(symbol, chunk))
+        return [order_id for batch in batches for order_id in batch]
+
+    def _place_sell_orders_batch(self, symbol: str, orders: List[Tuple[float, float]]) -> List[str]:
+        info = self.get_symbol_info(symbol)
+        try:
+            result = self.trade_api.place_multiple_orders([
+                {
+                    "instId": symbol,
+                    "tdMode": "cash",
+                    "side": "sell",
+                    "ordType": "limit",
+                    "sz": info.format_qty(quantity),
+                    "px": info.format_price(price)
+                }
+                for price, quantity in orders
+            ])
+            data = result.get('data') or []
+            if len(data) != len(orders):
+                logger.error(f"Ошибка пакетного выставления ордеров: {result['msg']}")
+                return [""] * len(orders)
+            order_ids = []
+            for item in data:
+                if item['sCode'] == '0':
+                    logger.debug("Ордер успешно выставлен: {}", item['ordId'])
+                    order_ids.append(item['ordId'])
+                else:
+                    logger.error(f"Ошибка выставления ордера: {item['sMsg']}")
+                    order_ids.append("")
+            return order_ids
+        except Exception as e:
+            logger.error(f"Ошибка при пакетном выставлении ордеров: {e}")
+            return [""] * len(orders)
+
+    def amend_order(self, order_id: str, symbol: str, quantity: float, price: float) -> bool:
+        info = self.get_symbol_info(symbol)
+        try:
+            result = self.trade_api.amend_order(instId=symbol, ordId=order_id, newSz=info.format_qty(quantity), newPx=info.format_price(price))
+            if result['code'] == '0':
+                logger.debug("Ордер {} перенесён: {} по {}", order_id, quantity, price)
+                return True
+            # 51503 и т.п.: ордер уже исполнен или отменён — его заменит новый
+            logger.debug("Ордер {} не изменён: {}", order_id, result['msg'])
+            return False
+        except Exception as e:
+            logger.error(f"Ошибка при изменении ордера: {e}")
+            return False
+
+    def amend_orders(self, symbol: str, amendments: List[Tuple[str, float, float]]) -> List[bool]:
+        batches = self.send_batches(amendments, OKX_BATCH_SIZE, lambda chunk: self._amend_orders_batch(symbol, chunk))
+        return [ok for batch in batches for ok in batch]
+
+    def _amend_orders_batch(self, symbol: str, amendments: List[Tuple[str, float, float]]) -> List[bool]:
+        info = self.get_symbol_info(symbol)
+        try:
+            result = self.trade_api.amend_multiple_orders([
+                {"instId": symbol, "ordId": order_id, "newSz": info.format_qty(quantity), "newPx": info.format_price(price)}
+                for order_id, price, quantity in amendments
+            ])
+            data = result.get('data') or []
+            if len(data) != len(amendments):
+                logger.error(f"Ошибка пакетного изменения ордеров: {result['msg']}")
+                return [False] * len(amendments)
+            results = []
+            for item in data:
+                if item['sCode'] != '0':
+                    logger.debug("Ордер {} не изменён: {}", item['ordId'], item['sMsg'])
+                results.append(item['sCode'] == '0')
+            return results
+        except Exception as e:
+            logger.error(f"Ошибка при пакетном изменении ордеров: {e}")
+            return [False] * len(amendments)
+
     def cancel_order(self, order_id: str, symbol: str):
         try:
             result = self.trade_api.cancel_order(instId=symbol, ordId=order_id)
             if result['code'] == '0':
-                logger.debug(f"Ордер {order_id} отменён")
+                logger.debug("Ордер {} отменён", order_id)
             else:
                 logger.error(f"Ошибка отмены ордера: {result['msg']}")
         except Exception as e:
             logger.error(f"Ошибка при отмене ордера: {e}")
 
-    def check_order_status(self, order_id: str, symbol: str) -> bool:
+    def cancel_orders(self, symbol: str, order_ids: List[str]) -> Tuple[List[str], List[str]]:
+        results = self.send_batches(order_ids, OKX_BATCH_SIZE, lambda chunk: self._cancel_orders_batch(symbol, chunk))
+        cancelled = [order_id for batch_cancelled, _ in results for order_id in batch_cancelled]
+        failed = [order_id for _, batch_failed in results for order_id in batch_failed]
+        logger.debug("Отменено ордеров: {}, не отменено: {}", len(cancelled), len(failed))
+        filled, _ = self._split_filled(symbol, failed)
+        return cancelled, filled
+
+    def _cancel_orders_batch(self, symbol: str, chunk: List[str]) -> Tuple[List[str], List[str]]:
+        try:
+            result = self.trade_api.cancel_multiple_orders([{"instId": symbol, "ordId": order_id} for order_id in chunk])
+            data = result.get('data') or []
+            if len(data) != len(chunk):
+                logger.error(f"Ошибка пакетной отмены ордеров: {result['msg']}")
+                return [], chunk
+            cancelled, failed = [], []
+            for item in data:
+                if item['sCode'] == '0':
+                    cancelled.append(item['ordId'])
+                else:
+                    # 51400/51402: ордер уже исполнен или закрыт — уточним статус ниже
+                    logger.debug("Ордер {} не отменён: {}", item['ordId'], item['sMsg'])
+                    failed.append(item['ordId'])
+            return cancelled, failed
+        except Exception as e:
+            logger.error(f"Ошибка при пакетной отмене ордеров: {e}")
+            return [], chunk
+
+    def cancel_all_orders(self, symbol: str) -> bool:
+        # У OKX нет cancel-all для спота: получаем открытые ордера и отменяем их пакетом
+        order_ids = [order['ordId'] for order in self.get_open_orders(symbol)]
+        if not order_ids:
+            return True
+        cancelled, filled = self.cancel_orders(symbol, order_ids)
+        logger.info(f"Отменены все ордера по {symbol}: отменено {len(cancelled)}, исполнено {len(filled)}")
+        return len(cancelled) + len(filled) == len(order_ids)
+
+    def create_user_stream(self, ws_url: str = None) -> UserDataStream:
+        return OKXUserDataStream(self.api_key, self.api_secret, self.passphrase, ws_url)
+
+    def get_order_state(self, order_id: str, symbol: str) -> Optional[OrderState]:
         try:
             result = self.trade_api.get_order(instId=symbol, ordId=order_id)
             if result['code'] != '0':
                 logger.error(f"Ошибка проверки статуса ордера: {result['msg']}")
-                return False
-            status = result['data'][0]['state'] == 'filled'
-            logger.debug(f"Статус ордера {order_id}: {'filled' if status else 'not filled'}")
-            return status
+                return None
+            order = result['data'][0]
+            logger.debug("Статус ордера {}: {}, исполнено {}", order_id, order['state'], order['accFillSz'])
+            return OrderState(order_id, OKXUserDataStream.STATUSES.get(order['state'], ORDER_OPEN),
+                              float(order['accFillSz'] or 0), float(order.get('avgPx') or 0))
         except Exception as e:
             logger.error(f"Ошибка при проверке статуса ордера: {e}")
-            return False
+            return None
+
@@ -0,0 +1,58 @@
+from typing import Dict
+
+# Нормализованные статусы ордеров
+ORDER_OPEN = "open"
+ORDER_PARTIALLY_FILLED = "partially_filled"
+ORDER_FILLED = "filled"
+ORDER_CANCELLED = "cancelled"
+ORDER_REJECTED = "rejected"
+
+ACTIVE_STATUSES = (ORDER_OPEN, ORDER_PARTIALLY_FILLED)
+
+# Статусы ордеров REST API v3 Binance (и совместимого с ним MEXC)
+BINANCE_STATUSES: Dict[str, str] = {
+    "NEW": ORDER_OPEN,
+    "PARTIALLY_FILLED": ORDER_PARTIALLY_FILLED,
+    "FILLED": ORDER_FILLED,
+    "CANCELED": ORDER_CANCELLED,
+    "PARTIALLY_CANCELED": ORDER_CANCELLED,
+    "EXPIRED": ORDER_CANCELLED,
+    "REJECTED": ORDER_REJECTED
+}
+
+
+# Состояние ордера на бирже: статус и накопленное исполнение
+class OrderState:
+    __slots__ = ("order_id", "status", "filled_qty", "avg_price")
+
+    def __init__(self, order_id: str, status: str, filled_qty: float = 0.0, avg_price: float = 0.0):
+        self.order_id = str(order_id)
+        self.status = status
+        self.filled_qty = filled_qty  # Исполненный объём с момента выставления, включая все изменения ордера
+        self.avg_price = avg_price  # Средняя цена исполнения, 0 — исполнений не было
+
+    @property
+    def active(self) -> bool:
+        """Ордер ещё в книге и может исполняться дальше."""
+        return self.status in ACTIVE_STATUSES
+
+    @property
+    def filled(self) -> bool:
+        return self.status == ORDER_FILLED
+
+    @staticmethod
+    def from_quote(order_id: str, status: str, filled_qty: float, quote_qty: float) -> "OrderState":
+        """Состояние по сумме сделок в котируемой валюте (cummulativeQuoteQty и т.п.)."""
+        return OrderState(order_id, status, filled_qty, quote_qty / filled_qty if filled_qty else 0.0)
+
+    def __repr__(self) -> str:
+        return f"OrderState({self.order_id}, {self.status}, filled_qty={self.filled_qty}, avg_price={self.avg_price})"
+
+
+def gate_status(status: str, filled_qty: float) -> str:
+    """Статус ордера Gate: closed — исполнен, cancelled — снят, open — в книге (частично исполнен, если filled_qty > 0)."""
+    if status == "closed":
+        return ORDER_FILLED
+    if status == "cancelled":
+        return ORDER_CANCELLED
+    return ORDER_PARTIALLY_FILLED if filled_qty > 0 else ORDER_OPEN
@@ -0,0 +1,388 @@
+import asyncio
+import json
+import threading
+import time
+from typing import Callable, Dict, Mapping, Optional, Tuple, Union
+from urllib.parse import parse_qsl, unquote, urlsplit
+
+from loguru import logger
+from requests.adapters import HTTPAdapter
+from requests.exceptions import ConnectionError as RequestsConnectionError
+
+from config import RATE_LIMIT_SAFETY, HTTP_RETRIES
+from metrics.ExchangeMetrics import record_request_retry
+
+# Приоритеты запросов: запросу доступна только часть ведра выше резерва его приоритета,
+# поэтому фоновый опрос баланса не может израсходовать лимит, нужный для выставления ордеров
+PRIORITY_ORDER = 0  # Выставление и отмена ордеров
+PRIORITY_MARKET = 1  # Биды, статусы ордеров, listenKey
+PRIORITY_ACCOUNT = 2  # Баланс, метаданные пары, время сервера, heartbeat
+RESERVED_SHARE = {PRIORITY_ORDER: 0.0, PRIORITY_MARKET: 0.1, PRIORITY_ACCOUNT: 0.3}
+
+# Заголовки ответа с расходом лимита: (ведро, тип значения); ведро None — первое ведро самого запроса
+USED = "used"
+REMAINING = "remaining"
+DEFAULT_RETRY_AFTER = 1.0  # Пауза после 429 без заголовка Retry-After, секунды
+RETRY_STATUSES = (500, 502, 503, 504)  # Ответы, после которых GET повторяется
+
+Cost = Union[int, Callable[[Dict[str, str], object], int]]
+
+
+# Ведро токенов: limit запросов (или единиц веса) за interval секунд
+class TokenBucket:
+    def __init__(self, name: str, limit: float, interval: float):
+        self.name = name
+        self.capacity = limit * RATE_LIMIT_SAFETY
+        self.rate = self.capacity / interval
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0  # После 429/418 биржа не принимает запросы до этого момента
+
+    def refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, cost: float, priority: int, now: float) -> float:
+        """Сколько ждать, пока запрос с таким весом и приоритетом можно отправить."""
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        # Запрос тяжелее доступной ему части ведра ждёт полного ведра, а не блокируется навсегда
+        needed = min(cost + self.capacity * RESERVED_SHARE[priority], self.capacity)
+        return max(0.0, (needed - self.tokens) / self.rate)
+
+    def sync(self, value: float, kind: str, limit: Optional[float] = None):
+        """Учесть расход по заголовку биржи: токенов не может быть больше, чем осталось на бирже за вычетом запаса."""
+        if kind == USED:
+            left = self.capacity - value
+        else:
+            limit = limit or self.capacity / RATE_LIMIT_SAFETY
+            left = value - limit * (1 - RATE_LIMIT_SAFETY)
+        self.tokens = min(self.tokens, left)
+
+    def block(self, seconds: float, now: float):
+        self.tokens = 0.0
+        self.updated = now
+        self.blocked_until = max(self.blocked_until, now + seconds)
+
+
+# Клиентский планировщик запросов одной биржи: веса эндпоинтов, ведра лимитов и заголовки расхода
+class RateLimiter:
+    def __init__(self, venue: str, buckets: Mapping[str, Tuple[float, float]],
+                 endpoints: Mapping[str, Tuple[int, Mapping[str, Cost]]],
+                 default: Tuple[int, Mapping[str, Cost]],
+                 headers: Mapping[str, Tuple[Optional[str], str]] = None, limit_header: str = None,
+                 shared_buckets: Mapping[str, TokenBucket] = None, lock: threading.Lock = None):
+        self.venue = venue
+        self.buckets = {name: TokenBucket(name, limit, interval) for name, (limit, interval) in buckets.items()}
+        # Ведра лимитов IP общие для всех ключей биржи, под общей блокировкой
+        self.buckets.update({name: bucket for name, bucket in (shared_buckets or {}).items() if name in self.buckets})
+        self.endpoints = endpoints
+        self.default = default
+        self.headers = {name.lower(): value for name, value in (headers or {}).items()}
+        self.limit_header = limit_header.lower() if limit_header else None  # Лимит эндпоинта из ответа
+        self._lock = lock or threading.Lock()
+
+    def endpoint(self, method: str, path: str) -> Tuple[int, Mapping[str, Cost]]:
+        """Приоритет и веса по ведрам; путь с id в конце ищется по шаблону .../*."""
+        spec = self.endpoints.get(f"{method} {path}")
+        if spec is None:
+            spec = self.endpoints.get(f"{method} {path.rsplit('/', 1)[0]}/*", self.default)
+        return spec
+
+    def _try_take(self, method: str, path: str, query: Dict[str, str], body) -> float:
+        priority, costs = self.endpoint(method, path)
+        weights = {name: cost(query, body) if callable(cost) else cost for name, cost in costs.items()}
+        with self._lock:
+            now = time.monotonic()
+            wait = 0.0
+            for name, weight in weights.items():
+                bucket = self.buckets[name]
+                bucket.refill(now)
+                wait = max(wait, bucket.wait_time(weight, priority, now))
+            if wait <= 0:
+                for name, weight in weights.items():
+                    self.buckets[name].tokens -= weight
+        return wait
+
+    def acquire(self, method: str, path: str, query: Dict[str, str] = None, body=None):
+        """Дождаться места в лимитах биржи и списать вес запроса (блокирующий вариант)."""
+        while True:
+            wait = self._try_take(method, path, query or {}, body)
+            if wait <= 0:
+                return
+            logger.debug("{}: {} {} ждёт лимит {:.0f} мс", self.venue, method, path, wait * 1000)
+            time.sleep(wait)
+
+    async def acquire_async(self, method: str, path: str, query: Dict[str, str] = None, body=None):
+        """То же для сопрограмм: ожидание не блокирует цикл событий."""
+        while True:
+            wait = self._try_take(method, path, query or {}, body)
+            if wait <= 0:
+                return
+            logger.debug("{}: {} {} ждёт лимит {:.0f} мс", self.venue, method, path, wait * 1000)
+            await asyncio.sleep(wait)
+
+    def observe(self, method: str, path: str, status: int, headers: Mapping[str, str]):
+        """Сверить ведра с заголовками расхода лимита, после 429/418 остановить запросы на Retry-After."""
+        _, costs = self.endpoint(method, path)
+        headers = {name.lower(): value for name, value in headers.items()}
+        with self._lock:
+            now = time.monotonic()
+            if status in (418, 429):
+                retry_after = _to_float(headers.get("retry-after")) or DEFAULT_RETRY_AFTER
+                logger.warning(f"{self.venue}: превышен лимит запросов на {method} {path}, пауза {retry_after} с")
+                for name in costs:
+                    self.buckets[name].block(retry_after, now)
+                return
+            limit = _to_float(headers.get(self.limit_header)) if self.limit_header else None
+            for header, (bucket_name, kind) in self.headers.items():
+                value = _to_float(headers.get(header))
+                name = bucket_name or next(iter(costs), None)
+                if value is None or name not in self.buckets:
+                    continue
+                bucket = self.buckets[name]
+                bucket.refill(now)
+                bucket.sync(value, kind, limit if bucket_name is None else None)
+
+    # --- Подключение к HTTP-клиентам SDK ---
+
+    def mount(self, session):
+        """
+        Пропускать через лимиты все запросы requests.Session (python-binance, pybit, MEXC).
+        Адаптер же сразу повторяет GET при 5xx и ошибках соединения (HTTP_RETRIES раз, без пауз: во время листинга
+        запрос книги или баланса не должен висеть секунды); POST ордеров не повторяется, чтобы не выставить дубль.
+        """
+        adapter = _RateLimitedAdapter(self)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+
+    def hook_httpx(self, client):
+        """Пропускать через лимиты запросы httpx.Client (python-okx)."""
+        def on_request(request):
+            self.acquire(request.method, request.url.path, dict(request.url.params), request.content)
+
+        def on_response(response):
+            self.observe(response.request.method, response.request.url.path, response.status_code, response.headers)
+
+        client.event_hooks = {"request": [on_request], "response": [on_response]}
+
+    def wrap_rest_client(self, rest_client):
+        """Пропускать через лимиты запросы RESTClientObject gate-api (urllib3)."""
+        request = rest_client.request
+
+        def limited_request(method, url, query_params=None, *args, **kwargs):
+            path = urlsplit(url).path
+            self.acquire(method, path, dict(query_params or []), kwargs.get("body"))
+            try:
+                response = request(method, url, query_params, *args, **kwargs)
+            except Exception as e:
+                # ApiException gate-api несёт код и заголовки ответа с ошибкой
+                if getattr(e, "status", None):
+                    self.observe(method, path, e.status, e.headers or {})
+                raise
+            self.observe(method, path, response.status, response.getheaders())
+            return response
+
+        rest_client.request = limited_request
+
+
+class _RateLimitedAdapter(HTTPAdapter):
+    def __init__(self, limiter: RateLimiter):
+        super().__init__()
+        self.limiter = limiter
+
+    def send(self, request, **kwargs):
+        url = urlsplit(request.url)
+        query = dict(parse_qsl(url.query))
+        retries = HTTP_RETRIES if request.method == "GET" else 0
+        while True:
+            # Каждая попытка списывается с ведер и сверяется с заголовками ответа
+            self.limiter.acquire(request.method, url.path, query, request.body)
+            try:
+                response = super().send(request, **kwargs)
+            except RequestsConnectionError as e:
+                if not retries:
+                    raise
+                reason = str(e)
+            else:
+                self.limiter.observe(request.method, url.path, response.status_code, response.headers)
+                if not retries or response.status_code not in RETRY_STATUSES:
+                    return response
+                reason = f"HTTP {response.status_code}"
+                response.close()
+            retries -= 1
+            record_request_retry(self.limiter.venue)
+            logger.debug("{}: повтор {} {} после ошибки: {}", self.limiter.venue, request.method, url.path, reason)
+
+
+def _to_float(value) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def batch_size(query: Dict[str, str], body) -> int:
+    """Число ордеров в пакетном запросе: список в теле, {"request": [...]} или batchOrders в строке запроса."""
+    if "batchOrders" in query:
+        body = unquote(query["batchOrders"])
+    if isinstance(body, bytes):
+        body = body.decode("utf-8")
+    if isinstance(body, str):
+        try:
+            body = json.loads(body) if body else None
+        except ValueError:
+            return 1
+    if isinstance(body, dict):
+        body = body.get("request")
+    return len(body) if isinstance(body, list) and body else 1
+
+
+def binance_depth_weight(query: Dict[str, str], body) -> int:
+    limit = int(query.get("limit", 100))
+    if limit <= 100:
+        return 5
+    if limit <= 500:
+        return 25
+    if limit <= 1000:
+        return 50
+    return 250
+
+
+# Опубликованные лимиты бирж. Ведро: (лимит, окно в секундах); эндпоинт: (приоритет, {ведро: вес});
+# ip_buckets — ведра лимитов IP, остальные считаются на ключ (аккаунт)
+RATE_LIMITS = {
+    "BINANCE": dict(
+        ip_buckets=("weight",),
+        buckets={"weight": (6000, 60), "orders": (100, 10)},
+        headers={"X-MBX-USED-WEIGHT-1M": ("weight", USED), "X-MBX-ORDER-COUNT-10S": ("orders", USED)},
+        default=(PRIORITY_MARKET, {"weight": 1}),
+        endpoints={
+            "GET /api/v3/ping": (PRIORITY_ACCOUNT, {"weight": 1}),
+            "GET /api/v3/time": (PRIORITY_ACCOUNT, {"weight": 1}),
+            "GET /api/v3/exchangeInfo": (PRIORITY_ACCOUNT, {"weight": 20}),
+            "GET /api/v3/account": (PRIORITY_ACCOUNT, {"weight": 20}),
+            "GET /api/v3/depth": (PRIORITY_MARKET, {"weight": binance_depth_weight}),
+            "GET /api/v3/order": (PRIORITY_MARKET, {"weight": 4}),
+            "GET /api/v3/openOrders": (PRIORITY_MARKET, {"weight": 6}),
+            "POST /api/v3/order": (PRIORITY_ORDER, {"weight": 1, "orders": 1}),
+            "DELETE /api/v3/order": (PRIORITY_ORDER, {"weight": 1}),
+            "DELETE /api/v3/openOrders": (PRIORITY_ORDER, {"weight": 1}),
+            "POST /api/v3/userDataStream": (PRIORITY_MARKET, {"weight": 2}),
+            "PUT /api/v3/userDataStream": (PRIORITY_ACCOUNT, {"weight": 2}),
+        },
+    ),
+    # Лимиты Bybit — на UID по каждому эндпоинту, плюс общий лимит IP
+    "BYBIT": dict(
+        ip_buckets=("ip",),
+        buckets={
+            "ip": (600, 5),
+            "create": (20, 1), "create-batch": (20, 1), "cancel": (20, 1), "cancel-batch": (20, 1),
+            "cancel-all": (20, 1), "amend": (20, 1), "amend-batch": (20, 1), "realtime": (50, 1), "history": (50, 1), "wallet": (50, 1),
+        },
+        headers={"X-Bapi-Limit-Status": (None, REMAINING)},
+        limit_header="X-Bapi-Limit",
+        default=(PRIORITY_ACCOUNT, {"ip": 1}),
+        endpoints={
+            "POST /v5/order/create": (PRIORITY_ORDER, {"create": 1, "ip": 1}),
+            "POST /v5/order/create-batch": (PRIORITY_ORDER, {"create-batch": batch_size, "ip": 1}),
+            "POST /v5/order/cancel": (PRIORITY_ORDER, {"cancel": 1, "ip": 1}),
+            "POST /v5/order/cancel-batch": (PRIORITY_ORDER, {"cancel-batch": batch_size, "ip": 1}),
+            "POST /v5/order/cancel-all": (PRIORITY_ORDER, {"cancel-all": 1, "ip": 1}),
+            "POST /v5/order/amend": (PRIORITY_ORDER, {"amend": 1, "ip": 1}),
+            "POST /v5/order/amend-batch": (PRIORITY_ORDER, {"amend-batch": batch_size, "ip": 1}),
+            "GET /v5/order/realtime": (PRIORITY_MARKET, {"realtime": 1, "ip": 1}),
+            "GET /v5/order/history": (PRIORITY_MARKET, {"history": 1, "ip": 1}),
+            "GET /v5/account/wallet-balance": (PRIORITY_ACCOUNT, {"wallet": 1, "ip": 1}),
+            "GET /v5/market/orderbook": (PRIORITY_MARKET, {"ip": 1}),
+        },
+    ),
+    # OKX ограничивает каждый эндпоинт отдельно, пакетные — по числу ордеров
+    "OKX": dict(
+        ip_buckets=("books", "instruments", "time",),
+        buckets={
+            "order": (60, 2), "batch-orders": (300, 2), "cancel-order": (60, 2), "cancel-batch": (300, 2),
+            "amend-order": (60, 2), "amend-batch": (300, 2), "get-order": (60, 2), "orders-pending": (60, 2),
+            "account-balance": (10, 2), "asset-balances": (6, 1), "transfer": (2, 1), "books": (40, 2),
+            "instruments": (20, 2), "time": (10, 2), "other": (10, 2),
+        },
+        default=(PRIORITY_ACCOUNT, {"other": 1}),
+        endpoints={
+            "POST /api/v5/trade/order": (PRIORITY_ORDER, {"order": 1}),
+            "POST /api/v5/trade/batch-orders": (PRIORITY_ORDER, {"batch-orders": batch_size}),
+            "POST /api/v5/trade/cancel-order": (PRIORITY_ORDER, {"cancel-order": 1}),
+            "POST /api/v5/trade/cancel-batch-orders": (PRIORITY_ORDER, {"cancel-batch": batch_size}),
+            "POST /api/v5/trade/amend-order": (PRIORITY_ORDER, {"amend-order": 1}),
+            "POST /api/v5/trade/amend-batch-orders": (PRIORITY_ORDER, {"amend-batch": batch_size}),
+            "GET /api/v5/trade/order": (PRIORITY_MARKET, {"get-order": 1}),
+            "GET /api/v5/trade/orders-pending": (PRIORITY_MARKET, {"orders-pending": 1}),
+            "GET /api/v5/market/books": (PRIORITY_MARKET, {"books": 1}),
+            "GET /api/v5/account/balance": (PRIORITY_ACCOUNT, {"account-balance": 1}),
+            "GET /api/v5/asset/balances": (PRIORITY_ACCOUNT, {"asset-balances": 1}),
+            "POST /api/v5/asset/transfer": (PRIORITY_MARKET, {"transfer": 1}),
+            "GET /api/v5/public/instruments": (PRIORITY_ACCOUNT, {"instruments": 1}),
+            "GET /api/v5/public/time": (PRIORITY_ACCOUNT, {"time": 1}),
+        },
+    ),
+    # Gate: выставление и изменение — по числу ордеров, отмена и прочие приватные запросы — отдельными лимитами
+    "GATE": dict(
+        ip_buckets=("public",),
+        buckets={"place": (10, 1), "cancel": (200, 1), "private": (200, 10), "public": (200, 10)},
+        headers={"X-Gate-RateLimit-Requests-Remain": (None, REMAINING)},
+        limit_header="X-Gate-RateLimit-Limit",
+        default=(PRIORITY_ACCOUNT, {"public": 1}),
+        endpoints={
+            "POST /api/v4/spot/orders": (PRIORITY_ORDER, {"place": 1}),
+            "POST /api/v4/spot/batch_orders": (PRIORITY_ORDER, {"place": batch_size}),
+            "DELETE /api/v4/spot/orders/*": (PRIORITY_ORDER, {"cancel": 1}),
+            "DELETE /api/v4/spot/orders": (PRIORITY_ORDER, {"cancel": 1}),
+            "POST /api/v4/spot/cancel_batch_orders": (PRIORITY_ORDER, {"cancel": 1}),
+            "PATCH /api/v4/spot/orders/*": (PRIORITY_ORDER, {"place": 1}),
+            "POST /api/v4/spot/amend_batch_orders": (PRIORITY_ORDER, {"place": batch_size}),
+            "GET /api/v4/spot/orders/*": (PRIORITY_MARKET, {"private": 1}),
+            "GET /api/v4/spot/orders": (PRIORITY_MARKET, {"private": 1}),
+            "GET /api/v4/spot/accounts": (PRIORITY_ACCOUNT, {"private": 1}),
+            "GET /api/v4/spot/order_book": (PRIORITY_MARKET, {"public": 1}),
+        },
+    ),
+    "MEXC": dict(
+        ip_buckets=("weight",),
+        buckets={"weight": (500, 10)},
+        default=(PRIORITY_MARKET, {"weight": 1}),
+        endpoints={
+            "GET /api/v3/time": (PRIORITY_ACCOUNT, {"weight": 1}),
+            "GET /api/v3/exchangeInfo": (PRIORITY_ACCOUNT, {"weight": 10}),
+            "GET /api/v3/account": (PRIORITY_ACCOUNT, {"weight": 10}),
+            "GET /api/v3/depth": (PRIORITY_MARKET, {"weight": 1}),
+            "GET /api/v3/order": (PRIORITY_MARKET, {"weight": 2}),
+            "GET /api/v3/openOrders": (PRIORITY_MARKET, {"weight": 3}),
+            "POST /api/v3/order": (PRIORITY_ORDER, {"weight": 1}),
+            "POST /api/v3/batchOrders": (PRIORITY_ORDER, {"weight": 1}),
+            "DELETE /api/v3/order": (PRIORITY_ORDER, {"weight": 1}),
+            "DELETE /api/v3/openOrders": (PRIORITY_ORDER, {"weight": 1}),
+            "PUT /api/v3/userDataStream": (PRIORITY_ACCOUNT, {"weight": 1}),
+        },
+    ),
+}
+
+_limiters: Dict[Tuple[str, str], RateLimiter] = {}
+_ip_buckets: Dict[str, Dict[str, TokenBucket]] = {}
+_venue_locks: Dict[str, threading.Lock] = {}
+_limiters_lock = threading.Lock()
+
+
+def rate_limiter(venue: str, api_key: str = "") -> RateLimiter:
+    """
+    Общий планировщик ключа api_key на бирже (по ENV_PREFIX): лимиты считаются на ключ и IP, а не на экземпляр адаптера.
+    Ведра ip_buckets из RATE_LIMITS делят все ключи биржи — это лимиты адреса, с которого работает процесс.
+    """
+    with _limiters_lock:
+        key = (venue, api_key or "")
+        if key not in _limiters:
+            spec = dict(RATE_LIMITS[venue])
+            shared = spec.pop("ip_buckets", ())
+            limiter = RateLimiter(venue, **spec, shared_buckets=_ip_buckets.get(venue),
+                                  lock=_venue_locks.setdefault(venue, threading.Lock()))
+            _ip_buckets.setdefault(venue, {name: limiter.buckets[name] for name in shared})
+            _limiters[key] = limiter
+        return _limiters[key]
@@ -0,0 +1,47 @@
+from importlib import import_module
+from typing import Dict, List, Tuple
+
+# Адаптер задаётся путём "модуль:класс" и импортируется только при выборе биржи,
+# поэтому запуск не тянет SDK остальных бирж (binance, pybit, okx, gate_api)
+_exchanges: Dict[str, Tuple[str, str, str]] = {}  # name -> (название в меню, синхронный, асинхронный)
+_classes: Dict[str, type] = {}
+
+
+def register_exchange(name: str, title: str, sync_path: str, async_path: str):
+    """Зарегистрировать биржу: пути синхронного (Exchange) и асинхронного (AsyncExchange) адаптеров."""
+    _exchanges[name] = (title, sync_path, async_path)
+
+
+def exchange_names() -> List[str]:
+    return list(_exchanges)
+
+
+def exchange_title(name: str) -> str:
+    return _exchanges[name][0]
+
+
+def exchange_class(name: str, use_async: bool = False) -> type:
+    """Класс адаптера биржи name; модуль импортируется при первом обращении."""
+    if name not in _exchanges:
+        raise ValueError(f"Неизвестная биржа: {name}, доступны: {', '.join(_exchanges)}")
+    path = _exchanges[name][2 if use_async else 1]
+    if path not in _classes:
+        module_name, class_name = path.split(":")
+        _classes[path] = getattr(import_module(module_name), class_name)
+    return _classes[path]
+
+
+def create_exchange(name: str, use_async: bool = False, **credentials):
+    """Экземпляр адаптера; без credentials ключи берутся из переменных окружения биржи."""
+    return exchange_class(name, use_async)(**credentials)
+
+
+# Порядок регистрации — номера бирж в меню SellOnExchange_main
+register_exchange("okx", "OKX", "exchange.OKXExchange:OKXExchange", "exchange.AsyncOKXExchange:AsyncOKXExchange")
+register_exchange("bybit", "Bybit", "exchange.BybitExchange:BybitExchange",
+                  "exchange.AsyncBybitExchange:AsyncBybitExchange")
+register_exchange("binance", "Binance", "exchange.BinanceExchange:BinanceExchange",
+                  "exchange.AsyncBinanceExchange:AsyncBinanceExchange")
+register_exchange("gate", "Gate.io", "exchange.GateIOExchange:GateIOExchange",
+                  "exchange.AsyncGateIOExchange:AsyncGateIOExchange")
+register_exchange("mexc", "MEXC", "exchange.MEXCExchange:MEXCExchange", "exchange.AsyncMEXCExchange:AsyncMEXCExchange")
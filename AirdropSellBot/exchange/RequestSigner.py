@@ -0,0 +1,131 @@
+import base64
+import hashlib
+import hmac
+import json
+import threading
+import time
+from typing import Awaitable, Callable, Dict, Iterable, Mapping, Optional
+from urllib.parse import quote
+
+from loguru import logger
+
+from config import SERVER_TIME_SYNC_INTERVAL
+
+MAX_SYNC_RTT = 1.0  # Замер времени с большей задержкой неточен и не меняет смещение, секунды
+
+
+# Смещение часов биржи относительно локальных: подписанные запросы несут время сервера, а не хоста
+class ServerClock:
+    def __init__(self, venue: str):
+        self.venue = venue
+        self.offset_ms = 0.0
+        self.synced_at = None  # time.monotonic() последней синхронизации
+
+    def now_ms(self) -> int:
+        return int(time.time() * 1000 + self.offset_ms)
+
+    def stale(self) -> bool:
+        return self.synced_at is None or time.monotonic() - self.synced_at > SERVER_TIME_SYNC_INTERVAL
+
+    def update(self, server_ms: int, sent_at: float, received_at: float):
+        """Учесть ответ /time: сервер отметил время примерно в середине запроса (sent_at, received_at — time.time())."""
+        rtt = received_at - sent_at
+        if rtt > MAX_SYNC_RTT:
+            logger.warning(f"{self.venue}: синхронизация времени пропущена, задержка {rtt * 1000:.0f} мс")
+            return
+        offset_ms = server_ms - (sent_at + received_at) * 500
+        if abs(offset_ms - self.offset_ms) > 1000:
+            logger.info(f"{self.venue}: смещение часов биржи {offset_ms:.0f} мс")
+        self.offset_ms = offset_ms
+        self.synced_at = time.monotonic()
+
+    def sync(self, fetch_server_time: Callable[[], int], samples: int = 1):
+        """Замерить смещение samples раз подряд и взять самый быстрый замер — он точнее всех."""
+        measurements = []
+        for _ in range(samples):
+            sent_at = time.time()
+            server_ms = fetch_server_time()
+            measurements.append((server_ms, sent_at, time.time()))
+        self.update(*min(measurements, key=lambda m: m[2] - m[1]))
+
+    async def sync_async(self, fetch_server_time: Callable[[], Awaitable[int]], samples: int = 1):
+        measurements = []
+        for _ in range(samples):
+            sent_at = time.time()
+            server_ms = await fetch_server_time()
+            measurements.append((server_ms, sent_at, time.time()))
+        self.update(*min(measurements, key=lambda m: m[2] - m[1]))
+
+
+# HMAC с заранее подготовленным ключом: на запрос остаются копия состояния и хэш самой строки
+class HmacSigner:
+    def __init__(self, secret: str, digestmod=hashlib.sha256):
+        self._key = hmac.new(secret.encode("utf-8"), digestmod=digestmod)
+
+    def _digest(self, payload: str):
+        mac = self._key.copy()
+        mac.update(payload.encode("utf-8"))
+        return mac
+
+    def hexdigest(self, payload: str) -> str:
+        return self._digest(payload).hexdigest()
+
+    def b64digest(self, payload: str) -> str:
+        return base64.b64encode(self._digest(payload).digest()).decode("ascii")
+
+
+# Строка запроса в порядке сортировки ключей, постоянные параметры подставлены заранее
+class QueryTemplate:
+    def __init__(self, fixed: Mapping[str, str], variable: Iterable[str]):
+        """fixed — постоянные параметры (уже закодированные), variable — имена подставляемых при вызове."""
+        variable = set(variable)
+        parts = []
+        for key in sorted(set(fixed) | variable):
+            if key in variable:
+                parts.append(f"{key}={{{key}}}")
+            else:
+                parts.append(f"{key}={fixed[key]}".replace("{", "{{").replace("}", "}}"))
+        self._format = "&".join(parts).format
+
+    def render(self, **values) -> str:
+        return self._format(**values)
+
+
+# JSON-объект ордера: постоянные поля сериализованы (и при url_encode закодированы) заранее.
+# Подставляемые значения — строки из цифр, точки и минуса, они не требуют ни экранирования, ни кодирования
+class JsonTemplate:
+    def __init__(self, fields: Mapping[str, Optional[str]], url_encode: bool = False):
+        """fields — поля по порядку; None — строковое поле, подставляемое при вызове."""
+        encode = (lambda text: quote(text, safe="")) if url_encode else (lambda text: text)
+        parts, literal = [], "{"
+        for key, value in fields.items():
+            literal += f"{json.dumps(key)}:"
+            if value is None:
+                parts.append(encode(literal + '"').replace("{", "{{").replace("}", "}}"))
+                parts.append(f"{{{key}}}")
+                literal = '",'
+            else:
+                literal += f"{json.dumps(value)},"
+        parts.append(encode(literal.rstrip(",") + "}").replace("{", "{{").replace("}", "}}"))
+        self._format = "".join(parts).format
+        self.separator = encode(",")
+
+    def render(self, **values) -> str:
+        return self._format(**values)
+
+    def render_list(self, items: Iterable[Mapping[str, object]]) -> str:
+        """JSON-массив объектов (при url_encode — закодированный)."""
+        text = self.separator.join(self._format(**item) for item in items)
+        return f"%5B{text}%5D" if self.separator != "," else f"[{text}]"
+
+
+_clocks: Dict[str, ServerClock] = {}
+_clocks_lock = threading.Lock()
+
+
+def server_clock(venue: str) -> ServerClock:
+    """Общие часы биржи (по ENV_PREFIX) для синхронных и асинхронных адаптеров."""
+    with _clocks_lock:
+        if venue not in _clocks:
+            _clocks[venue] = ServerClock(venue)
+        return _clocks[venue]
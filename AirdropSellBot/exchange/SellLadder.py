@@ -0,0 +1,104 @@
+from typing import List, Sequence, Tuple
+
+import numpy as np
+
+from config import SUCCESS_BID_START_RATE, SUCCESS_BID_RATE_STEP
+
+
+def to_depth_array(levels: Sequence[Sequence]) -> np.ndarray:
+    """Преобразовать уровни книги [[price, qty, ...], ...] (строки или числа) в массив float64 формы (N, 2)."""
+    return np.array([level[:2] for level in levels], dtype=np.float64).reshape(-1, 2)
+
+
+def build_sell_ladder(bids: np.ndarray, quantity: float,
+                      start_rate: float = SUCCESS_BID_START_RATE,
+                      rate_step: float = SUCCESS_BID_RATE_STEP) -> List[Tuple[float, float]]:
+    """
+    Общая для всех бирж лестница лимитных ордеров на продажу.
+
+    Первый бид пропускается, на i-м следующем уровне продаётся bid_qty * (start_rate + i * rate_step),
+    пока накопленный объём не покроет quantity. Если глубины не хватает, остаток выставляется
+    по цене последнего уровня. Вместо цикла по уровням используется накопленная сумма.
+
+    Args:
+        bids: Биды по убыванию цены, массив (N, 2) из to_depth_array
+        quantity: Сколько токенов нужно продать
+
+    Returns:
+        Список ордеров [(price, qty), ...]
+    """
+    levels = bids[1:]
+    if quantity <= 0 or len(levels) == 0:
+        return []
+
+    prices = levels[:, 0]
+    sizes = levels[:, 1] * (start_rate + rate_step * np.arange(len(levels)))
+    cumulative = np.cumsum(sizes)
+
+    # Первый уровень, на котором накопленный объём покрывает всё количество
+    last = int(np.searchsorted(cumulative, quantity, side='left'))
+    if last < len(levels):
+        sizes[last] = quantity - (cumulative[last - 1] if last else 0.0)
+        prices, sizes = prices[:last + 1], sizes[:last + 1]
+    else:
+        remainder = quantity - cumulative[-1]
+        if remainder > 0:
+            prices = np.append(prices, prices[-1])
+            sizes = np.append(sizes, remainder)
+
+    mask = sizes > 0
+    return list(zip(prices[mask].tolist(), sizes[mask].tolist()))
+
+
+def route_sell_ladder(books: Sequence[np.ndarray], inventory: Sequence[float], quantity: float,
+                      start_rate: float = SUCCESS_BID_START_RATE,
+                      rate_step: float = SUCCESS_BID_RATE_STEP) -> List[List[Tuple[float, float]]]:
+    """
+    Сводная лестница по нескольким биржам одной котируемой валюты.
+
+    Уровни каждой книги размечаются как в build_sell_ladder (без первого бида, доля start_rate + i * rate_step),
+    сливаются в одну лестницу по убыванию цены и заполняются сверху, пока не покрыт quantity:
+    каждый объём уходит туда, где за него сейчас платят больше всего, но не больше inventory биржи.
+    Если сводной глубины не хватает, остаток выставляется по цене последнего уровня,
+    начиная с биржи, где эта цена выше.
+
+    Args:
+        books: Биды каждой биржи по убыванию цены, массивы (N, 2) из to_depth_array
+        inventory: Сколько токенов можно продать на каждой бирже
+        quantity: Сколько токенов нужно продать всего
+
+    Returns:
+        Лестница для каждой биржи [[(price, qty), ...], ...] в порядке books
+    """
+    ladders: List[List[Tuple[float, float]]] = [[] for _ in books]
+    left = list(inventory)
+    levels = []
+    for venue, bids in enumerate(books):
+        book = bids[1:]
+        if len(book) and left[venue] > 0:
+            sizes = book[:, 1] * (start_rate + rate_step * np.arange(len(book)))
+            levels.append(np.column_stack((book[:, 0], sizes, np.full(len(book), venue))))
+    if quantity <= 0 or not levels:
+        return ladders
+
+    merged = np.concatenate(levels)
+    merged = merged[np.argsort(-merged[:, 0], kind='stable')]
+    remaining = quantity
+    for price, size, venue in merged.tolist():
+        venue = int(venue)
+        qty = min(size, left[venue], remaining)
+        if qty <= 0:
+            continue
+        ladders[venue].append((price, qty))
+        left[venue] -= qty
+        remaining -= qty
+        if remaining <= 0:
+            return ladders
+
+    tails = sorted(((float(level[-1, 0]), int(level[-1, 2])) for level in levels), reverse=True)
+    for price, venue in tails:
+        qty = min(left[venue], remaining)
+        if qty > 0:
+            ladders[venue].append((price, qty))
+            remaining -= qty
+    return ladders
@@ -0,0 +1,281 @@
+import itertools
+import threading
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from loguru import logger
+
+from exchange.Exchange import Exchange
+from exchange.MatchingEngine import BUY, SELL, Fill, MatchingEngine
+from exchange.OrderState import OrderState, ORDER_OPEN, ORDER_PARTIALLY_FILLED, ORDER_FILLED, ORDER_CANCELLED
+from exchange.SellLadder import to_depth_array
+from exchange.SymbolInfo import SymbolInfo
+from stream.DepthStream import DepthStream
+from stream.UserDataStream import UserDataStream
+
+EPSILON = 1e-9
+BALANCE_DECIMALS = 12  # Балансы округляются, чтобы после полной продажи не оставалась пыль float
+
+
+# Поток глубины без сети: биды читаются прямо из книги симулятора
+class SimulatedDepthStream(DepthStream):
+    PING_INTERVAL = 0
+
+    def __init__(self, symbol: str, exchange: "SimulatedExchange"):
+        super().__init__(symbol, "sim://depth")
+        self.exchange = exchange
+
+    def start(self):
+        self.connected = True
+
+    def stop(self):
+        self.connected = False
+
+    def get_bids(self, depth: int) -> Optional[List[Tuple[float, float]]]:
+        return self.exchange.book_bids(self.symbol, depth)
+
+    def subscribe_messages(self) -> List[str]:
+        return []
+
+    def process(self, message: dict):
+        pass
+
+
+# Приватный поток без сети: симулятор сам вызывает update_order / update_balance
+class SimulatedUserDataStream(UserDataStream):
+    PING_INTERVAL = 0
+
+    def __init__(self):
+        super().__init__("sim-user", "sim://user")
+
+    def start(self):
+        self.connected = True
+
+    def stop(self):
+        self.connected = False
+        self.on_disconnect()
+
+    def subscribe_messages(self) -> List[str]:
+        return []
+
+    def process(self, message: dict):
+        pass
+
+
+class _SimOrder:
+    __slots__ = ("order_id", "symbol", "price", "qty", "filled", "notional", "status")
+
+    def __init__(self, order_id: str, symbol: str, price: float, qty: float):
+        self.order_id = order_id
+        self.symbol = symbol
+        self.price = price
+        self.qty = qty
+        self.filled = 0.0
+        self.notional = 0.0  # Сумма сделок в котируемой валюте
+        self.status = ORDER_OPEN
+
+    @property
+    def avg_price(self) -> float:
+        return self.notional / self.filled if self.filled else 0.0
+
+    def to_dict(self) -> dict:
+        return {"orderId": self.order_id, "symbol": self.symbol, "price": self.price, "qty": self.qty,
+                "filled": self.filled, "avgPrice": self.avg_price, "status": self.status}
+
+
+# Бумажная биржа: книга с приоритетом цена-время в памяти, без сетевых запросов
+class SimulatedExchange(Exchange):
+    ENV_PREFIX = "SIM"
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency  # Имитация сетевой задержки каждого запроса в секундах
+        self.engines: Dict[str, MatchingEngine] = {}
+        self.symbol_infos: Dict[str, SymbolInfo] = {}
+        self.assets: Dict[str, Tuple[str, str]] = {}  # symbol -> (базовый, котируемый актив)
+        self.balances: Dict[str, float] = {}  # Свободные средства
+        self.locked: Dict[str, float] = {}  # Средства в открытых ордерах
+        self.orders: Dict[str, _SimOrder] = {}
+        self._ids = itertools.count(1)
+        self._market_ids = itertools.count(1)
+        self._lock = threading.RLock()
+
+    # --- Сценарий симуляции ---
+
+    def add_market(self, assert_in: str, assert_out: str, bids: Sequence[Sequence[float]] = (),
+                   symbol_info: SymbolInfo = None) -> str:
+        """Открыть пару с начальными бидами [(цена, объём), ...]."""
+        symbol = self.create_symbol(assert_in, assert_out)
+        with self._lock:
+            self.engines[symbol] = MatchingEngine()
+            self.symbol_infos[symbol] = symbol_info or SymbolInfo()
+            self.assets[symbol] = (assert_in, assert_out)
+        self.add_bids(symbol, bids)
+        return symbol
+
+    def add_bids(self, symbol: str, bids: Sequence[Sequence[float]]):
+        """Новые заявки покупателей: пересекающиеся с нашими ордерами сразу исполняются."""
+        with self._lock:
+            for price, qty in bids:
+                fills = self.engines[symbol].submit(f"m{next(self._market_ids)}", BUY, float(price), float(qty))
+                self._apply_fills(symbol, fills)
+
+    def set_bids(self, symbol: str, bids: Sequence[Sequence[float]]):
+        """Заменить всю ликвидность покупателей снапшотом (воспроизведение записанной книги)."""
+        with self._lock:
+            engine = self.engines[symbol]
+            for order_id in [order_id for order_id, order in engine.orders.items() if order.side == BUY]:
+                engine.cancel(order_id)
+            self.add_bids(symbol, bids)
+
+    def deposit(self, asset: str, qty: float):
+        """Зачисление на торговый аккаунт, приходит и в приватный поток."""
+        with self._lock:
+            self._add(self.balances, asset, qty)
+        self._push_balance(asset)
+
+    def book_bids(self, symbol: str, depth: int) -> List[Tuple[float, float]]:
+        with self._lock:
+            return self.engines[symbol].get_bids(depth)
+
+    # --- Интерфейс Exchange ---
+
+    def create_symbol(self, assert_in: str, assert_out: str) -> str:
+        return assert_in + assert_out
+
+    def get_server_time(self) -> int:
+        self._roundtrip()
+        return int(time.time() * 1000)
+
+    def fetch_symbol_info(self, symbol: str) -> SymbolInfo:
+        if symbol not in self.symbol_infos:
+            raise ValueError(f"Пара {symbol} не найдена")
+        return self.symbol_infos[symbol]
+
+    def get_symbol_info(self, symbol: str) -> SymbolInfo:
+        # Минуя файловый кэш: метаданные симулятора не должны попадать в кэш реальных бирж
+        return self.symbol_infos.get(symbol) or SymbolInfo()
+
+    def get_balance(self, asset: str, auto_transfer: bool = False) -> float:
+        self._roundtrip()
+        with self._lock:
+            return self.balances.get(asset, 0.0)
+
+    def get_open_orders(self, symbol: str) -> list:
+        self._roundtrip()
+        with self._lock:
+            return [order.to_dict() for order in self.orders.values()
+                    if order.symbol == symbol and order.status in (ORDER_OPEN, ORDER_PARTIALLY_FILLED)]
+
+    def create_depth_stream(self, symbol: str, ws_url: str = None) -> DepthStream:
+        return SimulatedDepthStream(symbol, self)
+
+    def fetch_bids(self, symbol: str, depth: int) -> np.ndarray:
+        self._roundtrip()
+        return to_depth_array(self.book_bids(symbol, depth))
+
+    def place_sell_order(self, symbol: str, quantity: float, price: float) -> str:
+        self._roundtrip()
+        return self._place(symbol, quantity, price)
+
+    def place_sell_orders(self, symbol: str, orders: List[Tuple[float, float]]) -> List[str]:
+        # Как пакетный запрос: одна задержка на всю лестницу, без пула потоков
+        self._roundtrip()
+        return [self._place(symbol, quantity, price) for price, quantity in orders]
+
+    def cancel_order(self, order_id: str, symbol: str):
+        self._roundtrip()
+        self._cancel(order_id)
+
+    def cancel_orders(self, symbol: str, order_ids: List[str]) -> Tuple[List[str], List[str]]:
+        self._roundtrip()
+        cancelled, filled = [], []
+        for order_id in order_ids:
+            if self._cancel(order_id):
+                cancelled.append(order_id)
+            elif self.orders.get(order_id) and self.orders[order_id].status == ORDER_FILLED:
+                filled.append(order_id)
+        return cancelled, filled
+
+    def cancel_all_orders(self, symbol: str) -> bool:
+        self._roundtrip()
+        with self._lock:
+            order_ids = [order.order_id for order in self.orders.values() if order.symbol == symbol]
+            for order_id in order_ids:
+                self._cancel(order_id)
+        return True
+
+    def get_order_state(self, order_id: str, symbol: str) -> Optional[OrderState]:
+        self._roundtrip()
+        with self._lock:
+            order = self.orders.get(order_id)
+            return OrderState(order_id, order.status, order.filled, order.avg_price) if order is not None else None
+
+    def create_user_stream(self, ws_url: str = None) -> UserDataStream:
+        return SimulatedUserDataStream()
+
+    # --- Внутреннее ---
+
+    def _place(self, symbol: str, quantity: float, price: float) -> str:
+        with self._lock:
+            base_asset, _ = self.assets[symbol]
+            if self.balances.get(base_asset, 0.0) + EPSILON < quantity:
+                logger.error(f"Недостаточно {base_asset} для ордера {quantity} по {price}")
+                return ""
+            self._add(self.balances, base_asset, -quantity)
+            self._add(self.locked, base_asset, quantity)
+            order = _SimOrder(str(next(self._ids)), symbol, price, quantity)
+            self.orders[order.order_id] = order
+            self._push_order(order)
+            self._apply_fills(symbol, self.engines[symbol].submit(order.order_id, SELL, price, quantity))
+        self._push_balance(base_asset)
+        return order.order_id
+
+    def _cancel(self, order_id: str) -> bool:
+        with self._lock:
+            order = self.orders.get(order_id)
+            if order is None or self.engines[order.symbol].cancel(order_id) is None:
+                return False
+            base_asset, _ = self.assets[order.symbol]
+            left = order.qty - order.filled
+            self._add(self.locked, base_asset, -left)
+            self._add(self.balances, base_asset, left)
+            order.status = ORDER_CANCELLED
+            self._push_order(order)
+        self._push_balance(base_asset)
+        return True
+
+    def _apply_fills(self, symbol: str, fills: List[Fill]):
+        """Учесть сделки по нашим ордерам: статусы, балансы и события приватного потока."""
+        base_asset, quote_asset = self.assets[symbol]
+        touched = False
+        for maker_id, taker_id, price, qty in fills:
+            for order_id in (maker_id, taker_id):
+                order = self.orders.get(order_id)
+                if order is None:
+                    continue  # Заявка рынка
+                order.filled += qty
+                order.notional += qty * price
+                order.status = ORDER_FILLED if order.qty - order.filled <= EPSILON else ORDER_PARTIALLY_FILLED
+                self._add(self.locked, base_asset, -qty)
+                self._add(self.balances, quote_asset, qty * price)
+                self._push_order(order)
+                touched = True
+        if touched:
+            self._push_balance(quote_asset)
+
+    def _push_order(self, order: _SimOrder):
+        if self.user_stream is not None:
+            self.user_stream.update_order(order.order_id, order.status, order.filled, order.avg_price)
+
+    def _push_balance(self, asset: str):
+        if self.user_stream is not None:
+            self.user_stream.update_balance(asset, self.balances.get(asset, 0.0))
+
+    @staticmethod
+    def _add(accounts: Dict[str, float], asset: str, amount: float):
+        accounts[asset] = round(accounts.get(asset, 0.0) + amount, BALANCE_DECIMALS)
+
+    def _roundtrip(self):
+        if self.latency:
+            time.sleep(self.latency)
@@ -0,0 +1,208 @@
+import json
+import os
+import threading
+import time
+from decimal import Decimal, ROUND_DOWN
+from typing import Dict, List, Optional, Tuple
+
+from loguru import logger
+
+from config import ROUNDING_PRECISION, SYMBOL_INFO_CACHE_FILE, SYMBOL_INFO_REFRESH_INTERVAL
+
+FETCH_RETRY_INTERVAL = 5  # Не чаще раза в 5 секунд запрашивать метаданные пары, которой ещё нет на бирже
+
+
+def _floor_to_step(value: float, step: float) -> float:
+    if step <= 0:
+        return value
+    step = Decimal(str(step))
+    return float((Decimal(str(value)) / step).to_integral_value(ROUND_DOWN) * step)
+
+
+def _format_to_step(value: float, step: float) -> str:
+    """
+    Число в десятичной записи без экспоненты с точностью шага: шаг 1e-08 — 8 знаков, шаг 1 — целое.
+    Значение уже округлено до шага, квантование только убирает хвосты float (0.30000000000000004).
+    """
+    number = Decimal(str(value))
+    if step > 0:
+        exponent = min(Decimal(str(step)).normalize().as_tuple().exponent, 0)
+        number = number.quantize(Decimal(1).scaleb(exponent))
+    else:
+        number = number.normalize()
+    return format(number, "f")
+
+
+# Торговые ограничения пары
+class SymbolInfo:
+    def __init__(self, tick_size: float = 0.0, lot_size: float = ROUNDING_PRECISION,
+                 min_qty: float = 0.0, min_notional: float = 0.0):
+        self.tick_size = tick_size  # Шаг цены, 0 — без округления
+        self.lot_size = lot_size  # Шаг количества
+        self.min_qty = min_qty
+        self.min_notional = min_notional  # Минимальная сумма ордера в котируемой валюте
+
+    def round_price(self, price: float) -> float:
+        """Цена вниз до шага: для продажи это чуть агрессивнее, ордер не становится хуже рынка."""
+        return _floor_to_step(price, self.tick_size)
+
+    def round_quantity(self, quantity: float) -> float:
+        return _floor_to_step(quantity, self.lot_size)
+
+    def format_price(self, price: float) -> str:
+        """Цена для запроса к бирже: 1.234e-05 при шаге 1e-08 отправляется как "0.00001234"."""
+        return _format_to_step(price, self.tick_size)
+
+    def format_qty(self, quantity: float) -> str:
+        """Объём для запроса к бирже: 200000.0 при шаге 1 отправляется как "200000"."""
+        return _format_to_step(quantity, self.lot_size)
+
+    def min_sell_quantity(self) -> float:
+        return max(self.lot_size, self.min_qty)
+
+    def is_valid(self, price: float, quantity: float) -> bool:
+        return quantity >= self.min_sell_quantity() and price * quantity >= self.min_notional
+
+    def normalize_orders(self, orders: List[Tuple[float, float]]) -> List[Tuple[float, float]]:
+        """
+        Округлить лестницу до точности биржи. Объём уровней, не проходящих минимумы,
+        и остатки округления переносятся на следующий (более низкий) уровень.
+        """
+        normalized = []
+        carry = 0.0
+        for price, quantity in orders:
+            price = self.round_price(price)
+            total = quantity + carry
+            rounded = self.round_quantity(total)
+            if not self.is_valid(price, rounded):
+                carry = total
+                continue
+            normalized.append((price, rounded))
+            carry = total - rounded
+        # Накопленный остаток добавляем к последнему ордеру, если он набирает хотя бы один шаг
+        if normalized and carry > 0:
+            price, quantity = normalized[-1]
+            normalized[-1] = (price, self.round_quantity(quantity + carry))
+        return normalized
+
+    def to_dict(self) -> dict:
+        return {
+            "tick_size": self.tick_size,
+            "lot_size": self.lot_size,
+            "min_qty": self.min_qty,
+            "min_notional": self.min_notional
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "SymbolInfo":
+        return cls(data["tick_size"], data["lot_size"], data["min_qty"], data["min_notional"])
+
+    def __repr__(self):
+        return f"SymbolInfo({self.to_dict()})"
+
+
+# Кэш метаданных пар: загружается из файла, дополняется с бирж и обновляется в фоне
+class SymbolInfoCache:
+    def __init__(self, path: str = SYMBOL_INFO_CACHE_FILE, refresh_interval: float = SYMBOL_INFO_REFRESH_INTERVAL):
+        self.path = path
+        self.refresh_interval = refresh_interval
+        self._infos: Dict[str, SymbolInfo] = self._load()
+        self._tracked: Dict[str, Tuple[object, str]] = {}  # ключ -> (биржа, символ) для фонового обновления
+        self._failed_at: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._refresher = None
+
+    def get(self, exchange, symbol: str) -> SymbolInfo:
+        """Метаданные пары из кэша; при отсутствии — запрос к бирже, при ошибке — ограничения по умолчанию."""
+        key = f"{type(exchange).__name__}:{symbol}"
+        with self._lock:
+            self._tracked[key] = (exchange, symbol)
+            info = self._infos.get(key)
+        self._start_refresher()
+        if info is not None:
+            return info
+        if time.monotonic() - self._failed_at.get(key, -FETCH_RETRY_INTERVAL) < FETCH_RETRY_INTERVAL:
+            return SymbolInfo()
+        return self._fetch(key, exchange, symbol) or SymbolInfo()
+
+    async def aget(self, exchange, symbol: str) -> SymbolInfo:
+        """
+        То же для AsyncExchange. Фоновый поток обновления не может ждать сопрограммы биржи,
+        поэтому асинхронные пары не отслеживаются: их метаданные обновляются при перезапуске.
+        """
+        key = f"{type(exchange).__name__}:{symbol}"
+        with self._lock:
+            info = self._infos.get(key)
+        if info is not None:
+            return info
+        if time.monotonic() - self._failed_at.get(key, -FETCH_RETRY_INTERVAL) < FETCH_RETRY_INTERVAL:
+            return SymbolInfo()
+        return await self.arefresh(exchange, symbol) or SymbolInfo()
+
+    def refresh(self, exchange, symbol: str) -> Optional[SymbolInfo]:
+        """Перезапросить метаданные пары у биржи без оглядки на кэш; None — пары на бирже ещё нет."""
+        return self._fetch(f"{type(exchange).__name__}:{symbol}", exchange, symbol)
+
+    async def arefresh(self, exchange, symbol: str) -> Optional[SymbolInfo]:
+        key = f"{type(exchange).__name__}:{symbol}"
+        try:
+            info = await exchange.fetch_symbol_info(symbol)
+        except Exception as e:
+            logger.warning(f"Не удалось получить метаданные {symbol}: {e}")
+            self._failed_at[key] = time.monotonic()
+            return None
+        self._store(key, info)
+        return info
+
+    def _fetch(self, key: str, exchange, symbol: str):
+        try:
+            info = exchange.fetch_symbol_info(symbol)
+        except Exception as e:
+            logger.warning(f"Не удалось получить метаданные {symbol}: {e}")
+            self._failed_at[key] = time.monotonic()
+            return None
+        self._store(key, info)
+        return info
+
+    def _store(self, key: str, info: SymbolInfo):
+        logger.debug("Метаданные {}: {}", key, info)
+        with self._lock:
+            self._infos[key] = info
+        self._save()
+
+    def _start_refresher(self):
+        if self._refresher is None:
+            self._refresher = threading.Thread(target=self._refresh_loop, name="symbol-info-refresh", daemon=True)
+            self._refresher.start()
+
+    def _refresh_loop(self):
+        while True:
+            time.sleep(self.refresh_interval)
+            with self._lock:
+                tracked = list(self._tracked.items())
+            for key, (exchange, symbol) in tracked:
+                self._fetch(key, exchange, symbol)
+
+    def _load(self) -> Dict[str, SymbolInfo]:
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                return {key: SymbolInfo.from_dict(data) for key, data in json.load(f).items()}
+        except Exception as e:
+            logger.warning(f"Не удалось прочитать кэш метаданных {self.path}: {e}")
+            return {}
+
+    def _save(self):
+        with self._lock:
+            data = {key: info.to_dict() for key, info in self._infos.items()}
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, indent=2)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            logger.warning(f"Не удалось сохранить кэш метаданных {self.path}: {e}")
+
+
+symbol_info_cache = SymbolInfoCache()
@@ -0,0 +1,217 @@
+import contextvars
+import functools
+import inspect
+import json
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, Optional, Tuple
+
+from loguru import logger
+
+# Границы корзин гистограммы задержек в секундах
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Методы Exchange, время которых измеряется. Лестница на биржах без пакетного API замеряется по ордерам
+# (place_sell_order), на остальных — по пакетам (_place_sell_orders_batch, в метриках без подчёркивания)
+INSTRUMENTED_METHODS = (
+    "get_balance",
+    "fetch_bids",
+    "calculate_sell_orders",
+    "place_sell_order",
+    "place_sell_orders",
+    "_place_sell_orders_batch",
+    "amend_order",
+    "amend_orders",
+    "cancel_order",
+    "cancel_orders",
+    "cancel_all_orders",
+    "get_order_state",
+    "get_server_time",
+    "fetch_symbol_info",
+)
+
+
+class _Call:
+    def __init__(self, metrics: "ExchangeMetrics", venue: str, name: str):
+        self.metrics = metrics
+        self.venue = venue
+        self.name = name
+        self.errors = 0
+
+
+# Текущий замеряемый вызов: свой в каждом потоке и в каждой задаче asyncio
+_current_call: contextvars.ContextVar[Optional[_Call]] = contextvars.ContextVar("exchange_call", default=None)
+
+
+# Гистограмма задержек, ошибки и повторы одного метода одной биржи
+class MethodStats:
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.retries = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)  # Последняя корзина — +Inf
+
+    def observe(self, seconds: float, errors: int):
+        self.count += 1
+        self.errors += errors
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self.buckets[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "retries": self.retries,
+            "avg_ms": round(self.total / self.count * 1000, 3) if self.count else 0.0,
+            "max_ms": round(self.max * 1000, 3),
+            "buckets": {
+                **{str(bound): n for bound, n in zip(LATENCY_BUCKETS, self.buckets)},
+                "+Inf": self.buckets[-1]
+            }
+        }
+
+
+# Реестр метрик вызовов бирж
+class ExchangeMetrics:
+    def __init__(self):
+        self._stats: Dict[Tuple[str, str], MethodStats] = {}
+        self._lock = threading.Lock()
+
+    def record(self, exchange: str, method: str, seconds: float, errors: int = 0):
+        with self._lock:
+            self._get(exchange, method).observe(seconds, errors)
+
+    def record_retry(self, exchange: str, method: str):
+        with self._lock:
+            self._get(exchange, method).retries += 1
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            result = {}
+            for (exchange, method), stats in sorted(self._stats.items()):
+                result.setdefault(exchange, {})[method] = stats.to_dict()
+            return result
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict(), indent=2, ensure_ascii=False)
+
+    def to_prometheus(self) -> str:
+        """Текстовый формат экспозиции Prometheus (строки каждой метрики идут одной группой)."""
+        with self._lock:
+            items = [(f'exchange="{exchange}",method="{method}"', stats)
+                     for (exchange, method), stats in sorted(self._stats.items())]
+        lines = ["# TYPE exchange_request_seconds histogram"]
+        for labels, stats in items:
+            cumulative = 0
+            for bound, n in zip(LATENCY_BUCKETS, stats.buckets):
+                cumulative += n
+                lines.append(f'exchange_request_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'exchange_request_seconds_bucket{{{labels},le="+Inf"}} {stats.count}')
+            lines.append(f"exchange_request_seconds_sum{{{labels}}} {stats.total}")
+            lines.append(f"exchange_request_seconds_count{{{labels}}} {stats.count}")
+        lines.append("# TYPE exchange_request_errors_total counter")
+        lines.extend(f"exchange_request_errors_total{{{labels}}} {stats.errors}" for labels, stats in items)
+        lines.append("# TYPE exchange_request_retries_total counter")
+        lines.extend(f"exchange_request_retries_total{{{labels}}} {stats.retries}" for labels, stats in items)
+        return "\n".join(lines) + "\n"
+
+    def dump(self, path: str, fmt: str = "json"):
+        """Записать метрики в файл в формате json или prometheus."""
+        content = self.to_prometheus() if fmt == "prometheus" else self.to_json()
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(content)
+        logger.info(f"Метрики бирж сохранены в {path}")
+
+    def _get(self, exchange: str, method: str) -> MethodStats:
+        key = (exchange, method)
+        if key not in self._stats:
+            self._stats[key] = MethodStats()
+        return self._stats[key]
+
+
+exchange_metrics = ExchangeMetrics()
+_error_counter_added = False
+
+
+def exchange_name(exchange) -> str:
+    return type(exchange).__name__.replace("Exchange", "") or type(exchange).__name__
+
+
+def instrument(exchange, metrics: ExchangeMetrics = exchange_metrics):
+    """
+    Обернуть методы биржи замером времени. Адаптеры перехватывают исключения и пишут их
+    в лог, поэтому ошибкой вызова считается и исключение, и запись уровня ERROR внутри него.
+    """
+    if getattr(exchange, "_instrumented", False):
+        return exchange
+    venue = exchange_name(exchange)
+    for name in INSTRUMENTED_METHODS:
+        method = getattr(exchange, name, None)
+        if method is not None:
+            setattr(exchange, name, _timed(metrics, venue, name.lstrip("_"), method))
+    exchange._instrumented = True
+    return exchange
+
+
+def _timed(metrics: ExchangeMetrics, venue: str, name: str, method):
+    if inspect.iscoroutinefunction(method):
+        @functools.wraps(method)
+        async def async_wrapper(*args, **kwargs):
+            call = _Call(metrics, venue, name)
+            token = _current_call.set(call)
+            started = time.perf_counter()
+            try:
+                return await method(*args, **kwargs)
+            except Exception:
+                call.errors += 1
+                raise
+            finally:
+                _current_call.reset(token)
+                metrics.record(venue, name, time.perf_counter() - started, call.errors)
+        return async_wrapper
+
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        call = _Call(metrics, venue, name)
+        token = _current_call.set(call)
+        started = time.perf_counter()
+        try:
+            return method(*args, **kwargs)
+        except Exception:
+            call.errors += 1
+            raise
+        finally:
+            _current_call.reset(token)
+            metrics.record(venue, name, time.perf_counter() - started, call.errors)
+    return wrapper
+
+
+def record_request_retry(venue: str):
+    """Засчитать повтор HTTP-запроса замеряемому вызову биржи, а вне замеряемых вызовов — запросам биржи в целом."""
+    call = _current_call.get()
+    if call is not None:
+        call.metrics.record_retry(call.venue, call.name)
+    else:
+        exchange_metrics.record_retry(venue, "http")
+
+
+def count_logged_errors():
+    """
+    Считать записи уровня ERROR ошибками замеряемого вызова. Подключается при настройке процесса
+    (bootstrap.setup), а не при импорте: иначе импорт модуля менял бы обработчики loguru. Повторный вызов ничего не делает.
+    """
+    global _error_counter_added
+    if _error_counter_added:
+        return
+    _error_counter_added = True
+    logger.add(_count_logged_error, level="ERROR", format="{message}")
+
+
+def _count_logged_error(message):
+    call = _current_call.get()
+    if call is not None:
+        call.errors += 1
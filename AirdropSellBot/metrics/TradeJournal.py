@@ -0,0 +1,111 @@
+import atexit
+import json
+import queue
+import threading
+import time
+from typing import List, Optional, Tuple
+
+import numpy as np
+from loguru import logger
+
+from exchange.OrderState import OrderState
+
+JOURNAL_BATCH = 256  # Сколько событий писатель забирает из очереди за одну запись в файл
+
+
+# Журнал сделок: события цикла продажи (книга, лестница, ордера, отмены, исполнения) в JSON-lines.
+# Цикл продажи только кладёт кортеж в очередь; форматирование и запись на диск — в фоновом потоке,
+# поэтому медленный диск не задерживает выставление ордеров. Каждая строка — самостоятельный JSON-объект:
+# {"ts": unix-время, "event": тип, ...поля события}
+class TradeJournal:
+    def __init__(self):
+        self.path: Optional[str] = None
+        self._queue: Optional[queue.SimpleQueue] = None  # None — журнал не открыт, события отбрасываются
+        self._writer: Optional[threading.Thread] = None
+
+    def open(self, path: str):
+        """Начать запись в path (дописывание в конец файла)."""
+        if self._queue is not None:
+            return
+        self.path = path
+        self._queue = queue.SimpleQueue()
+        self._writer = threading.Thread(target=self._write_loop, args=(self._queue, path), name="trade-journal",
+                                        daemon=True)
+        self._writer.start()
+        atexit.register(self.close)
+
+    def close(self):
+        """Дописать накопленные события и закрыть файл."""
+        if self._queue is None:
+            return
+        self._queue.put(None)
+        self._writer.join()
+        self._queue = None
+
+    def record(self, event: str, **fields):
+        """Поставить событие в очередь; поля сериализуются уже в фоновом потоке."""
+        if self._queue is not None:
+            self._queue.put((time.time(), event, fields))
+
+    def book(self, venue: str, symbol: str, bids: np.ndarray):
+        self.record("book", venue=venue, symbol=symbol, bids=bids)
+
+    def ladder(self, venue: str, symbol: str, orders: List[Tuple[float, float]]):
+        self.record("ladder", venue=venue, symbol=symbol, orders=orders)
+
+    def order(self, venue: str, symbol: str, order_id: Optional[str], price: float, qty: float):
+        """Выставление ордера; order_id None — биржа его не приняла."""
+        self.record("order", venue=venue, symbol=symbol, order_id=order_id, price=price, qty=qty)
+
+    def amend(self, venue: str, symbol: str, order_id: str, price: float, qty: float, ok: bool):
+        self.record("amend", venue=venue, symbol=symbol, order_id=order_id, price=price, qty=qty, ok=ok)
+
+    def cancel(self, venue: str, symbol: str, order_ids: List[str]):
+        self.record("cancel", venue=venue, symbol=symbol, order_ids=order_ids)
+
+    def fill(self, venue: str, symbol: str, state: OrderState):
+        """Состояние ордера после цикла: статус и накопленное исполнение."""
+        self.record("fill", venue=venue, symbol=symbol, order_id=state.order_id, status=state.status,
+                    filled_qty=state.filled_qty, avg_price=state.avg_price)
+
+    @staticmethod
+    def _write_loop(events: queue.SimpleQueue, path: str):
+        with open(path, "a", encoding="utf-8") as f:
+            while True:
+                batch = [events.get()]
+                while len(batch) < JOURNAL_BATCH:
+                    try:
+                        batch.append(events.get_nowait())
+                    except queue.Empty:
+                        break
+                closing = None in batch
+                lines = []
+                for item in batch:
+                    if item is None:
+                        continue
+                    ts, event, fields = item
+                    try:
+                        lines.append(json.dumps({"ts": ts, "event": event, **fields}, default=_to_json))
+                    except (TypeError, ValueError) as e:
+                        logger.warning(f"Событие журнала {event} не записано: {e}")
+                f.write("".join(line + "\n" for line in lines))
+                f.flush()
+                if closing:
+                    return
+
+
+def _to_json(value):
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"{type(value).__name__} не сериализуется в JSON")
+
+
+def read_journal(path: str) -> List[dict]:
+    """Прочитать журнал для разбора после прогона: список событий по порядку записи."""
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+trade_journal = TradeJournal()
@@ -0,0 +1,139 @@
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+from loguru import logger
+
+from stream.LocalOrderBook import LocalOrderBook
+
+# Колонки записи книги: каждая в своём файле <name>.bin, строки добавляются в конец
+COLUMNS = {
+    "ts": np.dtype("<i8"),  # Время получения, наносекунды Unix
+    "side": np.dtype("i1"),  # BID / ASK, с флагом SNAPSHOT для уровней снапшота
+    "price": np.dtype("<f8"),
+    "qty": np.dtype("<f8"),  # 0 в обновлении — уровень удалён
+}
+BID = 0
+ASK = 1
+SNAPSHOT = 2  # Строки снапшота с одинаковым ts полностью заменяют книгу
+META_FILE = "meta.json"
+
+
+# Запись снапшотов и обновлений локальной книги в колоночные бинарные файлы
+class DepthRecorder:
+    def __init__(self, directory: str, meta: Optional[dict] = None):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        meta_path = os.path.join(directory, META_FILE)
+        if meta is not None and not os.path.exists(meta_path):
+            with open(meta_path, "w", encoding="utf-8") as f:
+                json.dump(meta, f, indent=2)
+        self._files = {name: open(os.path.join(directory, f"{name}.bin"), "ab") for name in COLUMNS}
+        self._books = []
+        self._lock = threading.Lock()
+        self.rows = 0
+
+    @classmethod
+    def for_symbol(cls, base_directory: str, exchange: str, symbol: str, meta: Optional[dict] = None) -> "DepthRecorder":
+        """Отдельный каталог на каждую запись: <base>/<биржа>_<пара>_<время старта>."""
+        started = datetime.now().strftime("%Y%m%d-%H%M%S")
+        meta = {"exchange": exchange, "symbol": symbol, "started_at": started, **(meta or {})}
+        return cls(os.path.join(base_directory, f"{exchange}_{symbol}_{started}"), meta)
+
+    def attach(self, book: LocalOrderBook):
+        """Записывать все изменения книги до close()."""
+        book.listeners.append(self.record)
+        self._books.append(book)
+
+    def record(self, snapshot: bool, bids: Sequence[Sequence], asks: Sequence[Sequence]):
+        rows = len(bids) + len(asks)
+        if not rows:
+            return
+        flag = SNAPSHOT if snapshot else 0
+        side = np.empty(rows, dtype=COLUMNS["side"])
+        side[:len(bids)] = BID | flag
+        side[len(bids):] = ASK | flag
+        levels = np.array([level[:2] for level in bids] + [level[:2] for level in asks], dtype=np.float64)
+        columns = {
+            "ts": np.full(rows, time.time_ns(), dtype=COLUMNS["ts"]),
+            "side": side,
+            "price": levels[:, 0].astype(COLUMNS["price"]),
+            "qty": levels[:, 1].astype(COLUMNS["qty"]),
+        }
+        with self._lock:
+            if self._files is None:
+                return
+            for name, values in columns.items():
+                self._files[name].write(values.tobytes())
+            self.rows += rows
+
+    def close(self):
+        for book in self._books:
+            if self.record in book.listeners:
+                book.listeners.remove(self.record)
+        self._books = []
+        with self._lock:
+            if self._files is None:
+                return
+            for f in self._files.values():
+                f.close()
+            self._files = None
+        logger.info(f"Запись книги {self.directory}: {self.rows} строк")
+
+
+# Чтение записи через memmap без загрузки в память
+class DepthRecording:
+    def __init__(self, directory: str):
+        self.directory = directory
+        meta_path = os.path.join(directory, META_FILE)
+        self.meta: dict = {}
+        if os.path.exists(meta_path):
+            with open(meta_path, encoding="utf-8") as f:
+                self.meta = json.load(f)
+        paths = {name: os.path.join(directory, f"{name}.bin") for name in COLUMNS}
+        # При аварийной остановке колонки могут различаться на неполную строку, берём общую длину
+        rows = min(os.path.getsize(path) // COLUMNS[name].itemsize for name, path in paths.items())
+        self.columns: Dict[str, np.ndarray] = {
+            name: np.memmap(path, dtype=COLUMNS[name], mode="r", shape=(rows,)) if rows
+            else np.empty(0, dtype=COLUMNS[name])
+            for name, path in paths.items()
+        }
+        self._snapshot_starts = None
+
+    def __len__(self) -> int:
+        return len(self.columns["ts"])
+
+    @property
+    def ts(self) -> np.ndarray:
+        return self.columns["ts"]
+
+    @property
+    def side(self) -> np.ndarray:
+        return self.columns["side"]
+
+    @property
+    def price(self) -> np.ndarray:
+        return self.columns["price"]
+
+    @property
+    def qty(self) -> np.ndarray:
+        return self.columns["qty"]
+
+    def snapshot_starts(self) -> np.ndarray:
+        """Индексы первых строк каждого снапшота."""
+        if self._snapshot_starts is None:
+            is_snapshot = (self.side & SNAPSHOT) != 0
+            continues = np.zeros(len(self), dtype=bool)
+            continues[1:] = is_snapshot[:-1] & (self.ts[1:] == self.ts[:-1])
+            self._snapshot_starts = np.flatnonzero(is_snapshot & ~continues)
+        return self._snapshot_starts
+
+    def seek(self, ts: int) -> int:
+        """Индекс начала последнего снапшота не позже ts: с него можно восстановить книгу на момент ts."""
+        starts = self.snapshot_starts()
+        position = int(np.searchsorted(self.ts[starts], ts, side="right")) - 1
+        return int(starts[position]) if position >= 0 else 0
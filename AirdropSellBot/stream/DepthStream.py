@@ -0,0 +1,256 @@
+import json
+import threading
+import time
+from abc import abstractmethod
+from typing import Callable, List, Optional, Sequence, Tuple
+
+from loguru import logger
+
+from stream.LocalOrderBook import LocalOrderBook
+from stream.WebSocketStream import WebSocketStream
+
+MAX_BUFFERED_EVENTS = 1000  # Сколько обновлений копить, пока не загружен снапшот
+SNAPSHOT_RETRY_DELAY = 0.5  # Пауза перед повторной загрузкой снапшота после ошибки, секунды; удваивается
+SNAPSHOT_RETRY_MAX_DELAY = 10  # Потолок паузы: до листинга пара может долго отдавать ошибку
+
+# (bids, asks, id последнего обновления) из REST-снапшота
+SnapshotLoader = Callable[[str], Tuple[List[Sequence], List[Sequence], int]]
+
+
+class SequenceGapError(Exception):
+    """Пропуск в последовательности обновлений книги ордеров."""
+    pass
+
+
+# Базовый класс подписки на публичный поток глубины
+class DepthStream(WebSocketStream):
+    def __init__(self, symbol: str, ws_url: str = None):
+        super().__init__(f"depth-{symbol}", ws_url)
+        self.symbol = symbol
+        self.book = LocalOrderBook(symbol)
+
+    def get_bids(self, depth: int) -> Optional[List[Tuple[float, float]]]:
+        """Лучшие биды из памяти или None, если книга не синхронизирована."""
+        if not self.book.synced:
+            return None
+        return self.book.get_bids(depth)
+
+    def handle_message(self, raw: str):
+        try:
+            super().handle_message(raw)
+        except SequenceGapError as e:
+            logger.warning(f"Разрыв последовательности книги {self.symbol}: {e}, пересинхронизация")
+            self.book.reset()
+            self.resync()
+
+    def resync(self):
+        """По умолчанию переподключаемся: после подписки биржа пришлёт новый снапшот."""
+        if self.ws:
+            self.ws.close()
+
+    def on_disconnect(self):
+        self.book.reset()
+
+
+# Поток с синхронизацией по REST-снапшоту (обновления с диапазоном id: first_id..last_id).
+# Снапшот загружается в отдельном потоке, один на синхронизацию: кадры WebSocket тем временем копятся в буфере,
+# а тяжёлый по весу REST-запрос не повторяется на каждый кадр и не задерживает чтение потока
+class SnapshotSyncedDepthStream(DepthStream):
+    def __init__(self, symbol: str, snapshot_loader: SnapshotLoader, ws_url: str = None):
+        super().__init__(symbol, ws_url)
+        self.snapshot_loader = snapshot_loader
+        self._buffer = []
+        self._lock = threading.Lock()  # Буфер, применение обновлений и состояние загрузчика
+        self._loading = False
+        self._stopped = threading.Event()
+
+    @abstractmethod
+    def parse_event(self, message: dict) -> Optional[Tuple[int, int, list, list]]:
+        """Извлечь (first_id, last_id, bids, asks) из сообщения или None."""
+        pass
+
+    def start(self):
+        self._stopped.clear()
+        super().start()
+
+    def stop(self):
+        self._stopped.set()
+        super().stop()
+
+    def process(self, message: dict):
+        event = self.parse_event(message)
+        if event is None:
+            return
+        with self._lock:
+            if self.book.synced:
+                self._apply_event(event)
+                return
+            # До загрузки снапшота копим обновления, затем применяем те, что новее снапшота
+            self._buffer.append(event)
+            del self._buffer[:-MAX_BUFFERED_EVENTS]
+            if self._loading:
+                return
+            self._loading = True
+        threading.Thread(target=self._load_snapshot, name=f"{self.name}-snapshot", daemon=True).start()
+
+    def resync(self):
+        with self._lock:
+            self._buffer = []
+
+    def on_disconnect(self):
+        super().on_disconnect()
+        self.resync()
+
+    def _load_snapshot(self):
+        """
+        Загружать снапшот, пока он не ляжет на буфер обновлений. После ошибки или снапшота старше буфера —
+        повтор с нарастающей паузой. Если буфер сброшен (разрыв, переподключение), загрузчик завершается:
+        следующий кадр запустит новый.
+        """
+        delay = SNAPSHOT_RETRY_DELAY
+        while not self._stopped.is_set():
+            with self._lock:
+                if not self._buffer:
+                    self._loading = False
+                    return
+            try:
+                bids, asks, snapshot_id = self.snapshot_loader(self.symbol)
+            except Exception as e:
+                logger.error(f"Ошибка загрузки снапшота книги {self.symbol}: {e}")
+            else:
+                with self._lock:
+                    if not self._buffer or self._sync_from_snapshot(bids, asks, snapshot_id):
+                        self._loading = False
+                        return
+                logger.debug("Снапшот книги {} старше буфера обновлений, ждём следующий", self.symbol)
+            self._stopped.wait(delay)
+            delay = min(delay * 2, SNAPSHOT_RETRY_MAX_DELAY)
+        with self._lock:
+            self._loading = False
+
+    def _sync_from_snapshot(self, bids: list, asks: list, snapshot_id: int) -> bool:
+        """Собрать книгу из снапшота и буфера (под self._lock). False — снапшот старше буфера."""
+        if snapshot_id + 1 < self._buffer[0][0]:
+            return False
+        self.book.apply_snapshot(bids, asks, snapshot_id)
+        buffered, self._buffer = self._buffer, []
+        try:
+            for event in buffered:
+                self._apply_event(event)
+        except SequenceGapError as e:
+            logger.warning(f"Разрыв последовательности книги {self.symbol}: {e}, пересинхронизация")
+            self.book.reset()
+        return True
+
+    def _apply_event(self, event: Tuple[int, int, list, list]):
+        first_id, last_id, bids, asks = event
+        if last_id <= self.book.last_update_id:
+            return  # Обновление уже учтено в снапшоте
+        if first_id > self.book.last_update_id + 1:
+            raise SequenceGapError(f"ожидалось обновление {self.book.last_update_id + 1}, получено {first_id}")
+        self.book.apply_delta(bids, asks, last_id)
+
+
+class BinanceDepthStream(SnapshotSyncedDepthStream):
+    WS_URL = "wss://stream.binance.com:9443/ws"
+    PING_INTERVAL = 0  # Binance сам присылает ping, websocket-client отвечает на него
+
+    def subscribe_messages(self) -> List[str]:
+        return [json.dumps({"method": "SUBSCRIBE", "params": [f"{self.symbol.lower()}@depth@100ms"], "id": 1})]
+
+    def parse_event(self, message: dict) -> Optional[Tuple[int, int, list, list]]:
+        if message.get('e') != 'depthUpdate':
+            return None
+        return int(message['U']), int(message['u']), message['b'], message['a']
+
+
+class GateIODepthStream(SnapshotSyncedDepthStream):
+    WS_URL = "wss://api.gateio.ws/ws/v4/"
+
+    def subscribe_messages(self) -> List[str]:
+        return [json.dumps({
+            "time": int(time.time()),
+            "channel": "spot.order_book_update",
+            "event": "subscribe",
+            "payload": [self.symbol, "100ms"]
+        })]
+
+    def ping_message(self) -> Optional[str]:
+        return json.dumps({"time": int(time.time()), "channel": "spot.ping"})
+
+    def parse_event(self, message: dict) -> Optional[Tuple[int, int, list, list]]:
+        if message.get('channel') != 'spot.order_book_update' or message.get('event') != 'update':
+            return None
+        result = message['result']
+        return int(result['U']), int(result['u']), result['b'], result['a']
+
+
+class BybitDepthStream(DepthStream):
+    WS_URL = "wss://stream.bybit.com/v5/public/spot"
+
+    def subscribe_messages(self) -> List[str]:
+        return [json.dumps({"op": "subscribe", "args": [f"orderbook.50.{self.symbol}"]})]
+
+    def ping_message(self) -> Optional[str]:
+        return json.dumps({"op": "ping"})
+
+    def process(self, message: dict):
+        if not message.get('topic', '').startswith('orderbook.'):
+            return
+        data = message['data']
+        update_id = int(data['u'])
+        # u == 1 означает, что биржа перезапустила поток и прислала снапшот
+        if message['type'] == 'snapshot' or update_id == 1:
+            self.book.apply_snapshot(data['b'], data['a'], update_id)
+            return
+        if not self.book.synced:
+            return
+        if update_id != self.book.last_update_id + 1:
+            raise SequenceGapError(f"ожидалось обновление {self.book.last_update_id + 1}, получено {update_id}")
+        self.book.apply_delta(data['b'], data['a'], update_id)
+
+
+class OKXDepthStream(DepthStream):
+    WS_URL = "wss://ws.okx.com:8443/ws/v5/public"
+
+    def subscribe_messages(self) -> List[str]:
+        return [json.dumps({"op": "subscribe", "args": [{"channel": "books", "instId": self.symbol}]})]
+
+    def ping_message(self) -> Optional[str]:
+        return "ping"
+
+    def process(self, message: dict):
+        if message.get('arg', {}).get('channel') != 'books' or 'data' not in message:
+            return
+        for data in message['data']:
+            seq_id = int(data['seqId'])
+            if message.get('action') == 'snapshot':
+                self.book.apply_snapshot(data['bids'], data['asks'], seq_id)
+                continue
+            if not self.book.synced:
+                continue
+            prev_seq_id = int(data['prevSeqId'])
+            if prev_seq_id != self.book.last_update_id:
+                raise SequenceGapError(f"prevSeqId {prev_seq_id} не совпадает с последним seqId {self.book.last_update_id}")
+            self.book.apply_delta(data['bids'], data['asks'], seq_id)
+
+
+class MEXCDepthStream(DepthStream):
+    WS_URL = "wss://wbs.mexc.com/ws"
+
+    def subscribe_messages(self) -> List[str]:
+        return [json.dumps({"method": "SUBSCRIPTION", "params": [f"spot@public.limit.depth.v3.api@{self.symbol}@20"]})]
+
+    def ping_message(self) -> Optional[str]:
+        return json.dumps({"method": "PING"})
+
+    def process(self, message: dict):
+        data = message.get('d')
+        if not isinstance(data, dict) or 'bids' not in data:
+            return
+        # Канал limit.depth присылает каждый раз полный срез из 20 уровней
+        self.book.apply_snapshot(
+            [(level['p'], level['v']) for level in data['bids']],
+            [(level['p'], level['v']) for level in data.get('asks', [])],
+            int(data.get('r', 0))
+        )
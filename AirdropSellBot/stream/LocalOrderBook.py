@@ -0,0 +1,67 @@
+import heapq
+import threading
+import time
+from typing import Callable, Iterable, List, Sequence, Tuple
+
+
+class LocalOrderBook:
+    """Локальная книга ордеров, поддерживаемая из снапшотов и инкрементальных обновлений."""
+
+    def __init__(self, symbol: str):
+        self.symbol = symbol
+        self.bids = {}  # цена -> объём
+        self.asks = {}
+        self.last_update_id = 0
+        self.synced = False
+        self.updated_at = 0.0  # time.monotonic() последнего изменения
+        self.listeners: List[Callable[[bool, Sequence, Sequence], None]] = []  # (снапшот?, bids, asks), например запись книги
+        self._lock = threading.Lock()
+
+    def apply_snapshot(self, bids: Iterable[Sequence], asks: Iterable[Sequence], update_id: int = 0):
+        """Полностью заменить содержимое книги снапшотом."""
+        with self._lock:
+            self.bids = {float(level[0]): float(level[1]) for level in bids if float(level[1]) > 0}
+            self.asks = {float(level[0]): float(level[1]) for level in asks if float(level[1]) > 0}
+            self.last_update_id = update_id
+            self.synced = True
+            self.updated_at = time.monotonic()
+        for listener in self.listeners:
+            listener(True, bids, asks)
+
+    def apply_delta(self, bids: Iterable[Sequence], asks: Iterable[Sequence], update_id: int = 0):
+        """Применить инкрементальное обновление: нулевой объём удаляет уровень."""
+        with self._lock:
+            self._apply_side(self.bids, bids)
+            self._apply_side(self.asks, asks)
+            self.last_update_id = update_id
+            self.updated_at = time.monotonic()
+        for listener in self.listeners:
+            listener(False, bids, asks)
+
+    def reset(self):
+        """Сбросить книгу до следующего снапшота (разрыв последовательности или переподключение)."""
+        with self._lock:
+            self.bids = {}
+            self.asks = {}
+            self.last_update_id = 0
+            self.synced = False
+
+    def get_bids(self, depth: int) -> List[Tuple[float, float]]:
+        """Лучшие биды по убыванию цены."""
+        with self._lock:
+            return heapq.nlargest(depth, self.bids.items())
+
+    def get_asks(self, depth: int) -> List[Tuple[float, float]]:
+        """Лучшие аски по возрастанию цены."""
+        with self._lock:
+            return heapq.nsmallest(depth, self.asks.items())
+
+    @staticmethod
+    def _apply_side(side: dict, levels: Iterable[Sequence]):
+        for level in levels:
+            price = float(level[0])
+            qty = float(level[1])
+            if qty > 0:
+                side[price] = qty
+            else:
+                side.pop(price, None)
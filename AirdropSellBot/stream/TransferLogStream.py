@@ -0,0 +1,55 @@
+import json
+import threading
+from typing import List, Optional
+
+from loguru import logger
+
+from stream.WebSocketStream import WebSocketStream
+
+# keccak("Transfer(address,address,uint256)") — topic0 события ERC-20 Transfer
+TRANSFER_TOPIC = "0xddf252ad1be2c89b69c2b068fc378daa952ba7f163c4a11628f55a4df523b3ef"
+
+
+def address_topic(address: str) -> str:
+    """Индексированный адрес в topics: 32 байта с нулями слева."""
+    return "0x" + "0" * 24 + address[2:].lower()
+
+
+def transfer_filter(token: str, to: str) -> dict:
+    """Фильтр логов Transfer токена token на адрес to (для eth_subscribe и eth_getLogs)."""
+    return {"address": token, "topics": [TRANSFER_TOPIC, None, address_topic(to)]}
+
+
+# Подписка eth_subscribe("logs") на входящие переводы токена: узел присылает лог в момент включения
+# перевода в блок, без опроса баланса
+class TransferLogStream(WebSocketStream):
+    PING_INTERVAL = 0
+
+    def __init__(self, ws_url: str, token: str, to: str):
+        super().__init__("transfer-logs", ws_url)
+        self.filter = transfer_filter(token, to)
+        self.last_block: Optional[int] = None
+        self._transfer = threading.Event()
+
+    def subscribe_messages(self) -> List[str]:
+        return [json.dumps({"jsonrpc": "2.0", "id": 1, "method": "eth_subscribe", "params": ["logs", self.filter]})]
+
+    def process(self, message: dict):
+        if "error" in message:
+            logger.error(f"Подписка {self.name} отклонена: {message['error']}")
+            return
+        if message.get("method") != "eth_subscription":
+            return  # Ответ с id подписки
+        log = message["params"]["result"]
+        if log.get("removed"):
+            return  # Лог из блока, отменённого реорганизацией
+        self.last_block = int(log["blockNumber"], 16)
+        logger.debug("Входящий перевод в блоке {}: {}", self.last_block, log.get("transactionHash"))
+        self._transfer.set()
+
+    def wait_for_transfer(self, timeout: float) -> Optional[int]:
+        """Номер блока входящего перевода или None, если за timeout переводов не было."""
+        if not self._transfer.wait(timeout):
+            return None
+        self._transfer.clear()
+        return self.last_block
@@ -0,0 +1,344 @@
+import base64
+import hashlib
+import hmac
+import json
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from loguru import logger
+
+from exchange.OrderState import OrderState, BINANCE_STATUSES, ORDER_OPEN, ORDER_PARTIALLY_FILLED, ORDER_FILLED, \
+    ORDER_CANCELLED, ORDER_REJECTED
+from stream.WebSocketStream import WebSocketStream
+
+LISTEN_KEY_KEEPALIVE_INTERVAL = 30 * 60  # Продление listenKey (Binance, MEXC) в секундах
+
+
+# Базовый класс приватного потока: таблицы состояний ордеров и балансов, обновляемые push-событиями биржи
+class UserDataStream(WebSocketStream):
+    def __init__(self, name: str, ws_url: str = None):
+        super().__init__(name, ws_url)
+        self._orders: Dict[str, OrderState] = {}
+        self._balances: Dict[str, float] = {}
+        self._condition = threading.Condition()
+
+    def get_balance(self, asset: str) -> Optional[float]:
+        """Последний баланс актива из потока или None, если событий по нему не было."""
+        with self._condition:
+            return self._balances.get(asset)
+
+    def wait_for_balance(self, asset: str, timeout: float) -> Optional[float]:
+        """Ждать ненулевой баланс актива не дольше timeout секунд, вернуть его или None."""
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            while True:
+                balance = self._balances.get(asset, 0.0)
+                remaining = deadline - time.monotonic()
+                if balance > 0:
+                    return balance
+                if remaining <= 0 or not self.connected:
+                    return None
+                self._condition.wait(remaining)
+
+    def update_balance(self, asset: str, free: float):
+        with self._condition:
+            self._balances[asset] = free
+            self._condition.notify_all()
+        logger.debug("Баланс {} из потока: {}", asset, free)
+
+    def get_order(self, order_id: str) -> Optional[OrderState]:
+        """Последнее известное состояние ордера."""
+        with self._condition:
+            return self._orders.get(str(order_id))
+
+    def get_orders(self, order_ids: List[str], timeout: float = 0.0, final_only: bool = False) -> Dict[str, OrderState]:
+        """
+        Состояния ордеров из потока. С final_only — только завершённые (исполнены, отменены):
+        их событий ждём не дольше timeout секунд, незавершённые в ответ не попадают.
+        """
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            while True:
+                states = {order_id: self._orders[str(order_id)] for order_id in order_ids
+                          if str(order_id) in self._orders
+                          and not (final_only and self._orders[str(order_id)].active)}
+                remaining = deadline - time.monotonic()
+                if len(states) == len(order_ids) or remaining <= 0 or not self.connected:
+                    return states
+                self._condition.wait(remaining)
+
+    def wait_for_fills(self, order_ids: List[str], timeout: float) -> List[str]:
+        """
+        Ждать, пока все ордера исполнятся, но не дольше timeout секунд.
+        Просыпается на каждом событии по ордерам. Возвращает исполненные order_id.
+        """
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            while True:
+                filled = [order_id for order_id in order_ids
+                          if str(order_id) in self._orders and self._orders[str(order_id)].filled]
+                remaining = deadline - time.monotonic()
+                if len(filled) == len(order_ids) or remaining <= 0 or not self.connected:
+                    return filled
+                self._condition.wait(remaining)
+
+    def update_order(self, order_id, status: str, filled_qty: float, avg_price: float):
+        with self._condition:
+            self._orders[str(order_id)] = OrderState(order_id, status, filled_qty, avg_price)
+            self._condition.notify_all()
+        logger.debug("Ордер {}: {}, исполнено {} по {}", order_id, status, filled_qty, avg_price)
+
+    def on_disconnect(self):
+        # Будим ожидающих, чтобы они перешли на опрос статусов через REST
+        with self._condition:
+            self._condition.notify_all()
+
+
+class BinanceUserDataStream(UserDataStream):
+    WS_URL = "wss://stream.binance.com:9443/ws"
+    PING_INTERVAL = LISTEN_KEY_KEEPALIVE_INTERVAL
+    STATUSES = BINANCE_STATUSES
+
+    def __init__(self, client, ws_url: str = None):
+        super().__init__("binance-user", ws_url)
+        self.client = client
+        self.listen_key = None
+
+    def connect_url(self) -> str:
+        self.listen_key = self.client.stream_get_listen_key()
+        return f"{self.ws_url}/{self.listen_key}"
+
+    def subscribe_messages(self) -> List[str]:
+        return []  # Подписка задаётся listenKey в URL
+
+    def ping_message(self) -> Optional[str]:
+        # Вместо пинга продлеваем listenKey через REST
+        if self.listen_key:
+            self.client.stream_keepalive(self.listen_key)
+        return None
+
+    def process(self, message: dict):
+        if message.get('e') == 'outboundAccountPosition':
+            for balance in message['B']:
+                self.update_balance(balance['a'], float(balance['f']))
+            return
+        if message.get('e') != 'executionReport':
+            return
+        filled_qty = float(message['z'])
+        avg_price = float(message['Z']) / filled_qty if filled_qty else 0.0
+        self.update_order(message['i'], self.STATUSES.get(message['X'], ORDER_OPEN), filled_qty, avg_price)
+
+
+class BybitUserDataStream(UserDataStream):
+    WS_URL = "wss://stream.bybit.com/v5/private"
+    STATUSES = {
+        "New": ORDER_OPEN,
+        "PartiallyFilled": ORDER_PARTIALLY_FILLED,
+        "Filled": ORDER_FILLED,
+        "Cancelled": ORDER_CANCELLED,
+        "PartiallyFilledCanceled": ORDER_CANCELLED,
+        "Rejected": ORDER_REJECTED
+    }
+
+    def __init__(self, api_key: str, api_secret: str, ws_url: str = None):
+        super().__init__("bybit-user", ws_url)
+        self.api_key = api_key
+        self.api_secret = api_secret
+
+    def subscribe_messages(self) -> List[str]:
+        expires = int((time.time() + 10) * 1000)
+        signature = hmac.new(self.api_secret.encode('utf-8'), f"GET/realtime{expires}".encode('utf-8'),
+                             hashlib.sha256).hexdigest()
+        return [
+            json.dumps({"op": "auth", "args": [self.api_key, expires, signature]}),
+            json.dumps({"op": "subscribe", "args": ["order", "wallet"]})
+        ]
+
+    def ping_message(self) -> Optional[str]:
+        return json.dumps({"op": "ping"})
+
+    def process(self, message: dict):
+        if message.get('topic') == 'wallet':
+            for account in message['data']:
+                for coin in account['coin']:
+                    self.update_balance(coin['coin'], float(coin['walletBalance'] or 0))
+            return
+        if message.get('topic') != 'order':
+            return
+        for order in message['data']:
+            if order.get('category') != 'spot':
+                continue
+            avg_price = float(order['avgPrice']) if order.get('avgPrice') else 0.0
+            self.update_order(order['orderId'], self.STATUSES.get(order['orderStatus'], ORDER_OPEN),
+                              float(order['cumExecQty']), avg_price)
+
+
+class OKXUserDataStream(UserDataStream):
+    WS_URL = "wss://ws.okx.com:8443/ws/v5/private"
+    STATUSES = {
+        "live": ORDER_OPEN,
+        "partially_filled": ORDER_PARTIALLY_FILLED,
+        "filled": ORDER_FILLED,
+        "canceled": ORDER_CANCELLED,
+        "mmp_canceled": ORDER_CANCELLED
+    }
+
+    def __init__(self, api_key: str, api_secret: str, passphrase: str, ws_url: str = None):
+        super().__init__("okx-user", ws_url)
+        self.api_key = api_key
+        self.api_secret = api_secret
+        self.passphrase = passphrase
+
+    def subscribe_messages(self) -> List[str]:
+        timestamp = str(int(time.time()))
+        sign = base64.b64encode(hmac.new(self.api_secret.encode('utf-8'),
+                                         f"{timestamp}GET/users/self/verify".encode('utf-8'),
+                                         hashlib.sha256).digest()).decode()
+        # Подписка отправляется после подтверждения логина (см. process)
+        return [json.dumps({"op": "login", "args": [{
+            "apiKey": self.api_key,
+            "passphrase": self.passphrase,
+            "timestamp": timestamp,
+            "sign": sign
+        }]})]
+
+    def ping_message(self) -> Optional[str]:
+        return "ping"
+
+    def process(self, message: dict):
+        if message.get('event') == 'login':
+            if message.get('code') == '0' and self.ws:
+                self.ws.send(json.dumps({"op": "subscribe", "args": [
+                    {"channel": "orders", "instType": "SPOT"},
+                    {"channel": "account"}
+                ]}))
+            elif message.get('code') != '0':
+                logger.error(f"Ошибка авторизации приватного потока OKX: {message.get('msg')}")
+            return
+        channel = message.get('arg', {}).get('channel')
+        if channel == 'account' and 'data' in message:
+            # Канал account отражает только торговый аккаунт, поступления на Funding видит REST-опрос
+            for account in message['data']:
+                for detail in account['details']:
+                    self.update_balance(detail['ccy'], float(detail['availBal'] or 0))
+            return
+        if channel != 'orders' or 'data' not in message:
+            return
+        for order in message['data']:
+            avg_price = float(order['avgPx']) if order.get('avgPx') else 0.0
+            self.update_order(order['ordId'], self.STATUSES.get(order['state'], ORDER_OPEN),
+                              float(order['accFillSz'] or 0), avg_price)
+
+
+class GateIOUserDataStream(UserDataStream):
+    WS_URL = "wss://api.gateio.ws/ws/v4/"
+
+    def __init__(self, api_key: str, api_secret: str, ws_url: str = None):
+        super().__init__("gate-user", ws_url)
+        self.api_key = api_key
+        self.api_secret = api_secret
+
+    def subscribe_messages(self) -> List[str]:
+        return [
+            self._private_subscribe("spot.orders", ["!all"]),
+            self._private_subscribe("spot.balances", [])
+        ]
+
+    def ping_message(self) -> Optional[str]:
+        return json.dumps({"time": int(time.time()), "channel": "spot.ping"})
+
+    def process(self, message: dict):
+        if message.get('event') != 'update':
+            return
+        if message.get('channel') == 'spot.balances':
+            for balance in message['result']:
+                self.update_balance(balance['currency'], float(balance['available']))
+            return
+        if message.get('channel') != 'spot.orders':
+            return
+        for order in message['result']:
+            filled_qty = float(order['amount']) - float(order['left'])
+            if order['event'] == 'finish':
+                status = ORDER_FILLED if order.get('finish_as') == 'filled' else ORDER_CANCELLED
+            else:
+                status = ORDER_PARTIALLY_FILLED if filled_qty > 0 else ORDER_OPEN
+            self.update_order(order['id'], status, filled_qty, float(order.get('avg_deal_price') or 0))
+
+    def _private_subscribe(self, channel: str, payload: list) -> str:
+        timestamp = int(time.time())
+        sign = hmac.new(self.api_secret.encode('utf-8'),
+                        f"channel={channel}&event=subscribe&time={timestamp}".encode('utf-8'),
+                        hashlib.sha512).hexdigest()
+        return json.dumps({
+            "time": timestamp,
+            "channel": channel,
+            "event": "subscribe",
+            "payload": payload,
+            "auth": {"method": "api_key", "KEY": self.api_key, "SIGN": sign}
+        })
+
+
+class MEXCUserDataStream(UserDataStream):
+    WS_URL = "wss://wbs.mexc.com/ws"
+    STATUSES = {
+        1: ORDER_OPEN,
+        2: ORDER_FILLED,
+        3: ORDER_PARTIALLY_FILLED,
+        4: ORDER_CANCELLED,
+        5: ORDER_CANCELLED
+    }
+
+    def __init__(self, listen_key_factory: Callable[[], str], listen_key_keepalive: Callable[[str], None],
+                 ws_url: str = None):
+        super().__init__("mexc-user", ws_url)
+        self.listen_key_factory = listen_key_factory
+        self.listen_key_keepalive = listen_key_keepalive
+        self.listen_key = None
+
+    def start(self):
+        super().start()
+        # PING_INTERVAL занят прикладным пингом, listenKey продлевается отдельным потоком
+        threading.Thread(target=self._keepalive_loop, name=f"{self.name}-keepalive", daemon=True).start()
+
+    def connect_url(self) -> str:
+        self.listen_key = self.listen_key_factory()
+        return f"{self.ws_url}?listenKey={self.listen_key}"
+
+    def _keepalive_loop(self):
+        while self._running:
+            time.sleep(LISTEN_KEY_KEEPALIVE_INTERVAL)
+            if self.connected:
+                self.extend_listen_key()
+
+    def extend_listen_key(self):
+        """
+        Продлить listenKey. Без продления MEXC сбрасывает ключ через 60 минут, и соединение молча перестаёт
+        получать события. Ключ, который не удалось продлить, считаем истёкшим: поток закрывается, ожидающие
+        переходят на REST-опрос, а переподключение получает новый ключ.
+        """
+        if not self.listen_key:
+            return
+        try:
+            self.listen_key_keepalive(self.listen_key)
+        except Exception as e:
+            logger.warning(f"listenKey MEXC не продлён: {e}, переподключение")
+            self.listen_key = None
+            self.drop_connection()
+
+    def subscribe_messages(self) -> List[str]:
+        return [json.dumps({"method": "SUBSCRIPTION",
+                            "params": ["spot@private.orders.v3.api", "spot@private.account.v3.api"]})]
+
+    def ping_message(self) -> Optional[str]:
+        return json.dumps({"method": "PING"})
+
+    def process(self, message: dict):
+        if message.get('c') == 'spot@private.account.v3.api':
+            self.update_balance(message['d']['a'], float(message['d']['f']))
+            return
+        if message.get('c') != 'spot@private.orders.v3.api':
+            return
+        order = message['d']
+        self.update_order(order['i'], self.STATUSES.get(int(order['s']), ORDER_OPEN),
+                          float(order.get('cv', 0)), float(order.get('ap', 0)))
@@ -0,0 +1,123 @@
+import json
+import socket
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import List, Optional
+
+import websocket
+from loguru import logger
+
+RECONNECT_DELAY = 1  # Пауза перед переподключением в секундах
+
+
+# Базовый класс WebSocket-подписки с переподключением и прикладным пингом
+class WebSocketStream(ABC):
+    WS_URL = ""
+    PING_INTERVAL = 20  # Интервал прикладного пинга в секундах, 0 — не нужен
+
+    def __init__(self, name: str, ws_url: str = None):
+        self.name = name
+        self.ws_url = ws_url or self.WS_URL  # Можно указать локальный сервер, воспроизводящий записанные кадры
+        self.ws = None
+        self.connected = False
+        self._running = False
+
+    def start(self):
+        """Запустить поток в фоне, переподключаясь при обрыве."""
+        self._running = True
+        threading.Thread(target=self._run, name=self.name, daemon=True).start()
+        if self.PING_INTERVAL:
+            threading.Thread(target=self._ping_loop, name=f"{self.name}-ping", daemon=True).start()
+
+    def stop(self):
+        self._running = False
+        if self.ws:
+            self.ws.close()
+
+    def drop_connection(self):
+        """
+        Разорвать текущее соединение из любого потока, _run подключится заново. Сокет закрывается через shutdown:
+        после ws.close() из чужого потока чтение может остаться ждать в select на уже закрытом дескрипторе.
+        """
+        ws = self.ws
+        sock = ws.sock.sock if ws and ws.sock else None
+        if sock:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    def handle_message(self, raw: str):
+        """Обработать один кадр потока. Используется и для воспроизведения записанных кадров."""
+        try:
+            message = json.loads(raw)
+        except ValueError:
+            return  # Текстовые ответы на пинг ("pong")
+        if isinstance(message, dict):
+            self.process(message)
+
+    def replay(self, frames):
+        """Прогнать записанные кадры через обработчик без сети."""
+        for frame in frames:
+            self.handle_message(frame)
+
+    @abstractmethod
+    def subscribe_messages(self) -> List[str]:
+        """Сообщения авторизации и подписки, отправляемые после подключения."""
+        pass
+
+    @abstractmethod
+    def process(self, message: dict):
+        """Обработать сообщение биржи."""
+        pass
+
+    def ping_message(self) -> Optional[str]:
+        return None
+
+    def connect_url(self) -> str:
+        """URL для очередного подключения (для потоков с listenKey формируется заново)."""
+        return self.ws_url
+
+    def on_disconnect(self):
+        pass
+
+    def _run(self):
+        while self._running:
+            try:
+                url = self.connect_url()
+            except Exception as e:
+                logger.error(f"Не удалось подготовить подключение {self.name}: {e}")
+                time.sleep(RECONNECT_DELAY)
+                continue
+            self.ws = websocket.WebSocketApp(
+                url,
+                on_open=self._on_open,
+                on_message=lambda ws, raw: self.handle_message(raw),
+                on_error=lambda ws, error: logger.error(f"Ошибка потока {self.name}: {error}"),
+                on_close=self._on_close
+            )
+            self.ws.run_forever()
+            if self._running:
+                time.sleep(RECONNECT_DELAY)
+
+    def _on_open(self, ws):
+        self.connected = True
+        for message in self.subscribe_messages():
+            ws.send(message)
+        logger.debug("Подключён поток {}", self.name)
+
+    def _on_close(self, ws, status_code, reason):
+        self.connected = False
+        self.on_disconnect()
+        logger.debug("Поток {} закрыт: {} {}", self.name, status_code, reason)
+
+    def _ping_loop(self):
+        while self._running:
+            time.sleep(self.PING_INTERVAL)
+            try:
+                message = self.ping_message()
+                if self.connected and message:
+                    self.ws.send(message)
+            except Exception as e:
+                logger.debug("Не удалось отправить пинг потока {}: {}", self.name, e)
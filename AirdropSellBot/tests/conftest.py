@@ -0,0 +1,5 @@
+# Модули бота импортируются от корня AirdropSellBot (from exchange..., from stream...), как при запуске скриптов
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,216 @@
+# Воспроизведение записанных кадров потоков глубины: синхронизация по снапшоту, разрыв последовательности,
+# сброс и пересборка книги. Снапшот грузится в фоновом потоке, поэтому тесты дожидаются сборки книги.
+# Последний тест прогоняет те же кадры через локальный WebSocket мок-биржи
+import json
+import threading
+import time
+
+import pytest
+
+import stream.DepthStream
+from benchmark.MockExchangeServer import Dialect, MockExchangeServer
+from benchmark.MockVenue import MockVenue
+from stream.DepthStream import BinanceDepthStream, BybitDepthStream, GateIODepthStream, OKXDepthStream
+
+
+class SnapshotLoader:
+    """REST-снапшоты по очереди: (bids, asks, id последнего обновления); исключение в очереди — ошибка запроса."""
+
+    def __init__(self, *snapshots):
+        self.snapshots = list(snapshots)
+        self.calls = 0
+
+    def __call__(self, symbol: str):
+        self.calls += 1
+        snapshot = self.snapshots.pop(0)
+        if isinstance(snapshot, Exception):
+            raise snapshot
+        return snapshot
+
+
+@pytest.fixture(autouse=True)
+def fast_snapshot_retry(monkeypatch):
+    monkeypatch.setattr(stream.DepthStream, "SNAPSHOT_RETRY_DELAY", 0.01)
+
+
+def wait_until(condition, timeout: float = 5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "не дождались условия"
+        time.sleep(0.005)
+
+
+def wait_loaded(stream):
+    """Дождаться, пока фоновый загрузчик снапшота завершится."""
+    wait_until(lambda: not stream._loading)
+
+
+def binance_frame(first_id: int, last_id: int, bids: list) -> str:
+    return json.dumps({"e": "depthUpdate", "s": "TESTUSDT", "U": first_id, "u": last_id, "b": bids, "a": []})
+
+
+def gate_frame(first_id: int, last_id: int, bids: list) -> str:
+    return json.dumps({"channel": "spot.order_book_update", "event": "update",
+                       "result": {"s": "TEST_USDT", "U": first_id, "u": last_id, "b": bids, "a": []}})
+
+
+# Запись Binance: до снапшота (lastUpdateId 100) — устаревшее и перекрывающее обновления,
+# затем разрыв 106..107 и обновления, которые должны лечь поверх второго снапшота (lastUpdateId 110)
+BINANCE_FRAMES = [
+    binance_frame(95, 99, [["1.00", "7"]]),  # Уже учтено в снапшоте
+    binance_frame(99, 101, [["0.99", "5"]]),  # Перекрывает снапшот
+    binance_frame(102, 105, [["1.00", "0"], ["0.97", "3"]]),
+    binance_frame(108, 109, [["0.50", "1"]]),  # Разрыв: пропущены 106..107
+    binance_frame(110, 111, [["0.96", "4"]]),
+    binance_frame(112, 112, [["0.95", "2"]]),
+]
+FIRST_SNAPSHOT = ([["1.00", "10"], ["0.98", "10"]], [], 100)
+SECOND_SNAPSHOT = ([["0.99", "6"], ["0.98", "1"]], [], 110)
+BOOK_AFTER_GAP = [(0.99, 6.0), (0.98, 1.0), (0.96, 4.0), (0.95, 2.0)]
+
+
+def test_binance_snapshot_sync_skips_stale_updates():
+    loader = SnapshotLoader(FIRST_SNAPSHOT)
+    stream = BinanceDepthStream("TESTUSDT", loader)
+    stream.replay(BINANCE_FRAMES[:3])
+    wait_until(lambda: stream.book.last_update_id == 105)
+
+    assert loader.calls == 1
+    assert stream.get_bids(10) == [(0.99, 5.0), (0.98, 10.0), (0.97, 3.0)]
+
+
+def test_binance_gap_resets_and_rebuilds_from_new_snapshot():
+    loader = SnapshotLoader(FIRST_SNAPSHOT, SECOND_SNAPSHOT)
+    stream = BinanceDepthStream("TESTUSDT", loader)
+    stream.replay(BINANCE_FRAMES[:4])
+    wait_loaded(stream)
+
+    assert not stream.book.synced  # Разрыв сбросил книгу
+    assert stream.get_bids(10) is None
+    assert loader.calls == 1  # Новый снапшот запрашивается только по следующему кадру
+
+    stream.replay(BINANCE_FRAMES[4:])
+    wait_until(lambda: stream.book.last_update_id == 112)
+    assert loader.calls == 2
+    assert stream.get_bids(10) == BOOK_AFTER_GAP  # Уровень 0.50 из обновления после разрыва не попал в книгу
+
+
+def test_binance_retries_snapshot_older_than_buffer():
+    # Снапшот старше первого буферизованного обновления: загрузчик повторяет запрос после паузы
+    loader = SnapshotLoader(([["1.00", "1"]], [], 90), SECOND_SNAPSHOT)
+    stream = BinanceDepthStream("TESTUSDT", loader)
+    stream.replay([binance_frame(105, 111, [["0.96", "4"]])])
+    wait_until(lambda: stream.book.synced)
+    assert loader.calls == 2
+
+    stream.replay([binance_frame(112, 112, [["0.95", "2"]])])
+    assert stream.get_bids(10) == BOOK_AFTER_GAP
+
+
+def test_one_snapshot_request_per_resync_while_frames_buffer():
+    # Пока снапшот грузится, кадры только копятся: запрос не повторяется на каждый кадр и не блокирует поток
+    release = threading.Event()
+
+    def slow_loader(symbol: str):
+        slow_loader.calls += 1
+        release.wait(5)
+        return FIRST_SNAPSHOT
+
+    slow_loader.calls = 0
+    stream = BinanceDepthStream("TESTUSDT", slow_loader)
+    started = time.monotonic()
+    stream.replay([binance_frame(101 + i, 101 + i, [["0.99", str(i + 1)]]) for i in range(50)])
+    assert time.monotonic() - started < 1
+    assert slow_loader.calls == 1
+
+    release.set()
+    wait_until(lambda: stream.book.last_update_id == 150)
+    assert slow_loader.calls == 1
+    assert stream.get_bids(1) == [(1.00, 10.0)]
+
+
+def test_failed_snapshot_retried_with_backoff_not_per_frame():
+    loader = SnapshotLoader(RuntimeError("symbol not listed"), RuntimeError("symbol not listed"), FIRST_SNAPSHOT)
+    stream = BinanceDepthStream("TESTUSDT", loader)
+    for i in range(20):
+        stream.replay([binance_frame(101 + i, 101 + i, [["0.99", "5"]])])
+    wait_until(lambda: stream.book.last_update_id == 120)
+    assert loader.calls == 3
+
+
+def test_gate_gap_resets_and_rebuilds_from_new_snapshot():
+    loader = SnapshotLoader(FIRST_SNAPSHOT, SECOND_SNAPSHOT)
+    stream = GateIODepthStream("TEST_USDT", loader)
+    stream.replay([gate_frame(99, 101, [["0.99", "5"]]), gate_frame(102, 105, [["1.00", "0"], ["0.97", "3"]])])
+    wait_until(lambda: stream.book.last_update_id == 105)
+    assert stream.get_bids(10) == [(0.99, 5.0), (0.98, 10.0), (0.97, 3.0)]
+
+    stream.replay([gate_frame(108, 109, [["0.50", "1"]])])
+    assert not stream.book.synced
+
+    stream.replay([gate_frame(110, 111, [["0.96", "4"]]), gate_frame(112, 112, [["0.95", "2"]])])
+    wait_until(lambda: stream.book.last_update_id == 112)
+    assert stream.get_bids(10) == BOOK_AFTER_GAP
+
+
+def test_bybit_gap_waits_for_next_snapshot():
+    def frame(kind: str, update_id: int, bids: list) -> str:
+        return json.dumps({"topic": "orderbook.50.TESTUSDT", "type": kind, "data": {"u": update_id, "b": bids, "a": []}})
+
+    stream = BybitDepthStream("TESTUSDT")
+    stream.replay([frame("snapshot", 10, [["1.00", "10"]]), frame("delta", 11, [["0.99", "5"]])])
+    assert stream.get_bids(10) == [(1.00, 10.0), (0.99, 5.0)]
+
+    stream.replay([frame("delta", 13, [["0.50", "1"]])])  # Пропущено 12
+    assert not stream.book.synced
+    stream.replay([frame("delta", 14, [["0.40", "1"]])])  # До снапшота дельты не применяются
+    assert not stream.book.synced
+
+    stream.replay([frame("snapshot", 20, [["0.98", "3"]]), frame("delta", 21, [["0.97", "2"]])])
+    assert stream.get_bids(10) == [(0.98, 3.0), (0.97, 2.0)]
+
+
+def test_okx_prev_seq_id_mismatch_resets_book():
+    def frame(action: str, prev_seq_id: int, seq_id: int, bids: list) -> str:
+        return json.dumps({"arg": {"channel": "books", "instId": "TEST-USDT"}, "action": action,
+                           "data": [{"prevSeqId": prev_seq_id, "seqId": seq_id, "bids": bids, "asks": []}]})
+
+    stream = OKXDepthStream("TEST-USDT")
+    stream.replay([frame("snapshot", -1, 100, [["1.00", "10", "0", "1"]]),
+                   frame("update", 100, 101, [["0.99", "5", "0", "1"]])])
+    assert stream.get_bids(10) == [(1.00, 10.0), (0.99, 5.0)]
+
+    stream.replay([frame("update", 102, 103, [["0.50", "1", "0", "1"]])])
+    assert not stream.book.synced
+
+    stream.replay([frame("snapshot", -1, 200, [["0.98", "3", "0", "1"]])])
+    assert stream.get_bids(10) == [(0.98, 3.0)]
+
+
+# Диалект мок-биржи, который после подписки отдаёт записанные кадры
+class ReplayDialect(Dialect):
+    def __init__(self, frames: list):
+        super().__init__(MockVenue("TEST"), "TESTUSDT")
+        self.frames = frames
+
+    def on_ws_message(self, ws, message: str):
+        if json.loads(message).get("method") == "SUBSCRIBE":
+            return self.frames
+        return []
+
+
+def test_binance_replay_over_local_websocket():
+    server = MockExchangeServer(ReplayDialect(BINANCE_FRAMES))
+    server.start()
+    loader = SnapshotLoader(FIRST_SNAPSHOT, SECOND_SNAPSHOT)
+    stream = BinanceDepthStream("TESTUSDT", loader, f"{server.ws_url}/ws")
+    stream.start()
+    try:
+        deadline = time.monotonic() + 5
+        while stream.book.last_update_id != 112 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert loader.calls == 2
+        assert stream.get_bids(10) == BOOK_AFTER_GAP
+    finally:
+        stream.stop()
+        server.stop()
@@ -0,0 +1,66 @@
+# Замер выставления лестницы: кроме всей лестницы, время каждого пакета (биржи с пакетным API)
+# или каждого ордера (остальные) попадает в метрики отдельной строкой
+import asyncio
+from typing import List, Tuple
+
+from exchange.Exchange import Exchange
+from metrics.ExchangeMetrics import ExchangeMetrics, instrument
+
+BATCH_SIZE = 2
+LADDER = [(1.0 - i * 0.01, 1.0) for i in range(5)]
+
+
+class BatchVenue:
+    """Пакетное выставление, как MEXCExchange.place_sell_orders."""
+
+    def place_sell_orders(self, symbol: str, orders: List[Tuple[float, float]]) -> List[str]:
+        batches = Exchange.send_batches(orders, BATCH_SIZE, lambda chunk: self._place_sell_orders_batch(symbol, chunk))
+        return [order_id for batch in batches for order_id in batch]
+
+    def _place_sell_orders_batch(self, symbol: str, orders: List[Tuple[float, float]]) -> List[str]:
+        return [f"{symbol}-{price}" for price, _ in orders]
+
+
+class SingleVenue:
+    """Выставление по одному ордеру, как Exchange.place_sell_orders по умолчанию."""
+    place_sell_orders = Exchange.place_sell_orders
+
+    def place_sell_order(self, symbol: str, quantity: float, price: float) -> str:
+        return f"{symbol}-{price}"
+
+
+class AsyncBatchVenue:
+    """Пакеты уходят одновременно, как AsyncMEXCExchange.place_sell_orders."""
+
+    async def place_sell_orders(self, symbol: str, orders: List[Tuple[float, float]]) -> List[str]:
+        batches = await asyncio.gather(*(self._place_sell_orders_batch(symbol, orders[start:start + BATCH_SIZE])
+                                         for start in range(0, len(orders), BATCH_SIZE)))
+        return [order_id for batch in batches for order_id in batch]
+
+    async def _place_sell_orders_batch(self, symbol: str, orders: List[Tuple[float, float]]) -> List[str]:
+        return [f"{symbol}-{price}" for price, _ in orders]
+
+
+def counts(metrics: ExchangeMetrics, venue: str) -> dict:
+    return {method: stats["count"] for method, stats in metrics.to_dict()[venue].items()}
+
+
+def test_batches_timed_separately():
+    metrics = ExchangeMetrics()
+    exchange = instrument(BatchVenue(), metrics)
+    assert len(exchange.place_sell_orders("MEME", LADDER)) == len(LADDER)
+    assert counts(metrics, "BatchVenue") == {"place_sell_orders": 1, "place_sell_orders_batch": 3}
+
+
+def test_single_orders_timed_separately():
+    metrics = ExchangeMetrics()
+    exchange = instrument(SingleVenue(), metrics)
+    assert len(exchange.place_sell_orders("MEME", LADDER)) == len(LADDER)
+    assert counts(metrics, "SingleVenue") == {"place_sell_orders": 1, "place_sell_order": len(LADDER)}
+
+
+def test_async_batches_timed_separately():
+    metrics = ExchangeMetrics()
+    exchange = instrument(AsyncBatchVenue(), metrics)
+    assert len(asyncio.run(exchange.place_sell_orders("MEME", LADDER))) == len(LADDER)
+    assert counts(metrics, "AsyncBatchVenue") == {"place_sell_orders": 1, "place_sell_orders_batch": 3}
@@ -0,0 +1,75 @@
+# Повтор запросов в адаптере планировщика: GET повторяется сразу и один раз, каждая попытка списывается
+# с ведер и попадает в метрики как повтор; POST не повторяется
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+import requests
+
+from exchange.RateLimiter import RateLimiter, PRIORITY_MARKET
+from metrics.ExchangeMetrics import ExchangeMetrics, _timed
+
+
+class FailingHandler(BaseHTTPRequestHandler):
+    """Отвечает 503 на каждый запрос, пока не исчерпан server.failures."""
+
+    def _respond(self):
+        self.server.hits.append(self.command)
+        status = 503 if len(self.server.hits) <= self.server.failures else 200
+        self.send_response(status)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"{}")
+
+    do_GET = do_POST = _respond
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = HTTPServer(("127.0.0.1", 0), FailingHandler)
+    httpd.hits, httpd.failures = [], 0
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield httpd
+    httpd.shutdown()
+
+
+@pytest.fixture
+def session():
+    limiter = RateLimiter("TEST", buckets={"weight": (100, 60)}, endpoints={},
+                          default=(PRIORITY_MARKET, {"weight": 10}))
+    http = requests.Session()
+    limiter.mount(http)
+    return limiter, http
+
+
+def test_get_retried_once_without_backoff_and_charged_per_attempt(server, session):
+    limiter, http = session
+    server.failures = 1
+    metrics = ExchangeMetrics()
+    fetch = _timed(metrics, "Test", "fetch_bids", lambda: http.get(f"http://127.0.0.1:{server.server_port}/depth"))
+
+    started = time.monotonic()
+    assert fetch().status_code == 200
+    assert time.monotonic() - started < 0.5
+    assert server.hits == ["GET", "GET"]
+    bucket = limiter.buckets["weight"]
+    assert bucket.tokens < bucket.capacity - 10 - 5  # Списаны обе попытки, а не одна (с запасом на пополнение)
+    assert metrics.to_dict()["Test"]["fetch_bids"]["retries"] == 1
+
+
+def test_get_gives_up_after_single_retry(server, session):
+    _, http = session
+    server.failures = 5
+    assert http.get(f"http://127.0.0.1:{server.server_port}/depth").status_code == 503
+    assert server.hits == ["GET", "GET"]
+
+
+def test_post_not_retried(server, session):
+    _, http = session
+    server.failures = 1
+    assert http.post(f"http://127.0.0.1:{server.server_port}/order").status_code == 503
+    assert server.hits == ["POST"]
@@ -0,0 +1,41 @@
+# Цены и объёмы уходят на биржу строками в десятичной записи с точностью шагов пары, без экспоненты и хвостов float
+from exchange.RequestSigner import JsonTemplate, QueryTemplate
+from exchange.SymbolInfo import SymbolInfo
+
+MEME = SymbolInfo(tick_size=1e-08, lot_size=1.0)
+
+
+def test_format_with_small_tick_has_no_exponent():
+    assert str(1.234e-05) == "1.234e-05"
+    assert MEME.format_price(1.234e-05) == "0.00001234"
+    assert MEME.format_price(1e-08) == "0.00000001"
+    assert MEME.format_qty(200000.0) == "200000"
+
+
+def test_format_drops_float_tails():
+    info = SymbolInfo(tick_size=0.0001, lot_size=0.01)
+    assert info.format_price(0.1 + 0.2) == "0.3000"
+    assert info.format_qty(0.30000000000000004) == "0.30"
+    assert info.format_qty(12.0) == "12.00"
+
+
+def test_format_without_tick_keeps_significant_digits():
+    info = SymbolInfo(tick_size=0.0)
+    assert info.format_price(1.234e-05) == "0.00001234"
+    assert info.format_price(2.5e+06) == "2500000"
+
+
+def test_normalized_ladder_formats_at_exchange_precision():
+    orders = MEME.normalize_orders([(1.2345678e-05, 150000.4), (1.2299999e-05, 49999.9)])
+    assert [(MEME.format_price(price), MEME.format_qty(quantity)) for price, quantity in orders] == [
+        ("0.00001234", "150000"), ("0.00001229", "50000")]
+
+
+def test_mexc_templates_render_formatted_values():
+    query = QueryTemplate({"symbol": "MEMEUSDT", "side": "SELL", "type": "LIMIT"}, ("quantity", "price", "timestamp"))
+    assert query.render(quantity=MEME.format_qty(200000.0), price=MEME.format_price(1.234e-05), timestamp=1) == (
+        "price=0.00001234&quantity=200000&side=SELL&symbol=MEMEUSDT&timestamp=1&type=LIMIT")
+
+    batch = JsonTemplate({"symbol": "MEMEUSDT", "quantity": None, "price": None})
+    assert batch.render_list([{"quantity": MEME.format_qty(200000.0), "price": MEME.format_price(1.234e-05)}]) == (
+        '[{"symbol":"MEMEUSDT","quantity":"200000","price":"0.00001234"}]')
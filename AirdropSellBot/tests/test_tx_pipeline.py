@@ -0,0 +1,129 @@
+# Конвейер транзакций на eth-tester: последовательные nonce без ожидания майнинга, замена с тем же nonce
+# и поднятой комиссией через TX_BUMP_BLOCKS блоков, квитанция по любой из версий транзакции.
+# Фоновый поток не запускается, проверки квитанций вызываются напрямую. eth-tester с выключенным
+# автомайнингом принимает только nonce, следующий за смайненными, поэтому конвейер из нескольких
+# транзакций проверяется с автомайнингом, а замены — без него
+import pytest
+from eth_account import Account
+from web3 import EthereumTesterProvider, Web3
+
+import chain.TxPipeline
+from chain.TxPipeline import TxPipeline
+from config import TX_BUMP_BLOCKS
+
+TRANSFER_ABI = [{
+    "type": "function", "name": "transfer", "stateMutability": "nonpayable",
+    "inputs": [{"name": "to", "type": "address"}, {"name": "amount", "type": "uint256"}],
+    "outputs": [{"name": "", "type": "bool"}]
+}]
+GAS_LIMIT = 100000
+
+
+@pytest.fixture
+def chain_env(monkeypatch):
+    provider = EthereumTesterProvider()
+    w3 = Web3(provider)
+    account = Account.create()
+    w3.eth.send_transaction({"from": w3.eth.accounts[0], "to": account.address, "value": 10 ** 20})
+    # Адрес без кода: вызов transfer проходит, для конвейера это обычный вызов контракта
+    token = w3.eth.contract(address=Account.create().address, abi=TRANSFER_ABI)
+    pipeline = TxPipeline(w3, account, chain_id=w3.eth.chain_id)
+    monkeypatch.setattr(pipeline, "start", lambda: None)
+    return provider.ethereum_tester, w3, token, pipeline
+
+
+@pytest.fixture
+def nonce_reads(chain_env, monkeypatch):
+    """Запросы nonce к сети."""
+    w3 = chain_env[1]
+    reads = []
+    get_transaction_count = w3.eth.get_transaction_count
+
+    def counted(*args):
+        reads.append(args)
+        return get_transaction_count(*args)
+
+    monkeypatch.setattr(w3.eth, "get_transaction_count", counted)
+    return reads
+
+
+def transfer(token, amount: int = 1):
+    return token.functions.transfer(token.address, amount)
+
+
+def test_pipelined_submits_get_sequential_nonces(chain_env, nonce_reads):
+    tester, w3, token, pipeline = chain_env
+    futures = [pipeline.submit(transfer(token, amount), GAS_LIMIT) for amount in range(1, 4)]
+    assert len(nonce_reads) == 1  # Nonce из сети читается один раз, дальше — локальный счётчик
+    assert sorted(pipeline._pending) == [0, 1, 2]
+    assert not any(future.done() for future in futures)  # submit не ждёт квитанций
+
+    block = w3.eth.block_number
+    for nonce in range(3):
+        pipeline._check(pipeline._pending[nonce], block)
+
+    receipts = [future.result(timeout=0) for future in futures]
+    assert [w3.eth.get_transaction(receipt["transactionHash"])["nonce"] for receipt in receipts] == [0, 1, 2]
+    assert all(receipt["status"] == 1 for receipt in receipts)
+    assert not pipeline._pending
+
+
+def test_stuck_transaction_replaced_with_same_nonce_and_higher_fee(chain_env):
+    tester, w3, token, pipeline = chain_env
+    tester.disable_auto_mine_transactions()
+    future = pipeline.submit(transfer(token), GAS_LIMIT)
+    tx = pipeline._pending[0]
+    original_fees = (tx.tx["maxFeePerGas"], tx.tx["maxPriorityFeePerGas"])
+
+    pipeline._check(tx, tx.sent_block + TX_BUMP_BLOCKS - 1)
+    assert len(tx.hashes) == 1  # Раньше TX_BUMP_BLOCKS блоков комиссия не поднимается
+
+    pipeline._check(tx, tx.sent_block + TX_BUMP_BLOCKS)
+    assert tx.bumps == 1 and len(tx.hashes) == 2
+    assert tx.tx["nonce"] == 0
+    assert tx.tx["maxFeePerGas"] > original_fees[0] and tx.tx["maxPriorityFeePerGas"] > original_fees[1]
+
+    tester.mine_blocks(1)
+    pipeline._check(tx, w3.eth.block_number)
+    receipt = future.result(timeout=0)
+    assert receipt["transactionHash"] == tx.hashes[-1]  # Узел оставил в мемпуле замену
+    assert w3.eth.get_transaction(tx.hashes[-1])["maxFeePerGas"] == tx.tx["maxFeePerGas"]
+
+
+def test_receipt_found_under_earlier_hash_when_replacement_rejected(chain_env):
+    tester, w3, token, pipeline = chain_env
+    tester.disable_auto_mine_transactions()
+    future = pipeline.submit(transfer(token), GAS_LIMIT)
+    tx = pipeline._pending[0]
+    original_tx = tx.tx
+    tester.mine_blocks(1)
+
+    # Проверка опоздала: первая версия уже смайнена, замену узел отвергает (nonce too low)
+    pipeline._replace(tx)
+    assert tx.tx is original_tx and len(tx.hashes) == 1
+
+    pipeline._check(tx, w3.eth.block_number)
+    assert future.result(timeout=0)["transactionHash"] == tx.hashes[0]
+    assert pipeline.submit(transfer(token), GAS_LIMIT) is not None
+    assert 1 in pipeline._pending  # Следующий перевод идёт со следующим nonce
+
+
+def test_receipt_timeout_resets_nonce_counter(chain_env, nonce_reads, monkeypatch):
+    tester, w3, token, pipeline = chain_env
+    tester.disable_auto_mine_transactions()
+    future = pipeline.submit(transfer(token), GAS_LIMIT)
+    monkeypatch.setattr(chain.TxPipeline, "TX_RECEIPT_TIMEOUT", -1)
+
+    pipeline._check(pipeline._pending[0], w3.eth.block_number)
+    with pytest.raises(TimeoutError):
+        future.result(timeout=0)
+    assert not pipeline._pending
+
+    # Брошенная транзакция могла выпасть из мемпула: следующий nonce перечитывается из сети, а не продолжает счётчик
+    future = pipeline.submit(transfer(token, 2), GAS_LIMIT)
+    assert len(nonce_reads) == 2
+    tx = pipeline._pending[0]
+
+    tester.mine_blocks(1)
+    pipeline._check(tx, w3.eth.block_number)
+    assert future.result(timeout=0)["status"] == 1
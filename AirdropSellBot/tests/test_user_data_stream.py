@@ -0,0 +1,74 @@
+# listenKey MEXC на локальном WebSocket мок-биржи: ключ продлевается, пока поток подключён,
+# а ключ, который не удалось продлить, считается истёкшим — поток рвёт соединение и получает новый ключ
+import time
+
+import pytest
+
+import stream.UserDataStream
+import stream.WebSocketStream
+from benchmark.MockExchangeServer import MEXCDialect, MockExchangeServer
+from benchmark.MockVenue import MockVenue
+from stream.UserDataStream import MEXCUserDataStream
+
+
+def wait_until(condition, timeout: float = 5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "не дождались условия"
+        time.sleep(0.005)
+
+
+@pytest.fixture
+def server(monkeypatch):
+    monkeypatch.setattr(stream.UserDataStream, "LISTEN_KEY_KEEPALIVE_INTERVAL", 0.05)
+    monkeypatch.setattr(stream.WebSocketStream, "RECONNECT_DELAY", 0.05)
+    server = MockExchangeServer(MEXCDialect(MockVenue("MEXC"), "TESTUSDT"))
+    server.start()
+    yield server
+    server.stop()
+
+
+class ListenKeys:
+    """Выдаёт ключи key-1, key-2...; продление падает для ключей из expired."""
+
+    def __init__(self):
+        self.created = []
+        self.extended = []
+        self.expired = set()
+
+    def create(self) -> str:
+        self.created.append(f"key-{len(self.created) + 1}")
+        return self.created[-1]
+
+    def keepalive(self, listen_key: str):
+        self.extended.append(listen_key)
+        if listen_key in self.expired:
+            raise ValueError("This listenKey does not exist.")
+
+
+def test_mexc_listen_key_extended_while_connected(server):
+    keys = ListenKeys()
+    user_stream = MEXCUserDataStream(keys.create, keys.keepalive, f"{server.ws_url}/ws")
+    user_stream.start()
+    try:
+        wait_until(lambda: len(keys.extended) >= 2)
+        assert set(keys.extended) == {"key-1"}
+        assert user_stream.connected and keys.created == ["key-1"]
+    finally:
+        user_stream.stop()
+
+
+def test_mexc_expired_listen_key_treated_as_disconnect(server):
+    keys = ListenKeys()
+    keys.expired.add("key-1")
+    user_stream = MEXCUserDataStream(keys.create, keys.keepalive, f"{server.ws_url}/ws")
+    disconnects = []
+    on_disconnect = user_stream.on_disconnect
+    user_stream.on_disconnect = lambda: (disconnects.append(time.monotonic()), on_disconnect())
+    user_stream.start()
+    try:
+        wait_until(lambda: disconnects)  # Ожидающие событий будятся и переходят на REST
+        wait_until(lambda: user_stream.connected and user_stream.listen_key == "key-2")
+        assert keys.created[:2] == ["key-1", "key-2"]
+    finally:
+        user_stream.stop()